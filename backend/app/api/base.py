@@ -2,13 +2,16 @@
 """
 API层基类，提供通用的端点实现
 """
+import asyncio
 import logging
 import aiofiles
 from pathlib import Path
 from typing import Optional
-from fastapi import APIRouter, UploadFile, HTTPException
+from fastapi import APIRouter, UploadFile, HTTPException, Query, Request, Response
 
-from ..config import Config
+from try_on_anything.observability.metrics import observe_stage, STAGE_UPLOAD
+
+from ..config import get_config
 from ..schemas import (
     TaskStatus,
     TaskType,
@@ -16,11 +19,20 @@ from ..schemas import (
     TaskStatusResponse,
     TryOnResultResponse,
     TaskDeleteResponse,
+    TimelineEvent,
+    TaskTimelineResponse,
 )
 from ..services import task_manager
-from .utils import validate_file, validate_file_size, generate_filename, find_existing_images
+from ..services.blob_store import blob_store
+from ..services.derivatives import derivative_service
+from ..services.storage import save_task_files, task_file_url
+from .utils import (validate_file, validate_file_size, generate_filename, find_existing_images,
+                    task_cache_headers, is_not_modified, task_status_response)
+
+config = get_config()
 
-config = Config()
+# 取消任务时等待处理协程退出（包括取消远程生成任务）的最长时间（秒）
+_CANCEL_WAIT_SECONDS = 10
 
 
 class BaseTryOnRouter:
@@ -65,6 +77,18 @@ class BaseTryOnRouter:
             methods=["GET"],
             response_model=TryOnResultResponse
         )
+        self.router.add_api_route(
+            "/timeline/{task_id}",
+            self.get_task_timeline,
+            methods=["GET"],
+            response_model=TaskTimelineResponse
+        )
+        self.router.add_api_route(
+            "/cancel/{task_id}",
+            self.cancel_task,
+            methods=["POST"],
+            response_model=TaskStatusResponse
+        )
         self.router.add_api_route(
             "/task/{task_id}",
             self.delete_task,
@@ -72,20 +96,88 @@ class BaseTryOnRouter:
             response_model=TaskDeleteResponse
         )
 
-    async def get_task_status(self, task_id: str):
-        """查询任务状态"""
+    async def get_task_status(
+        self,
+        task_id: str,
+        request: Request,
+        http_response: Response,
+        wait: float = Query(0, ge=0, description="长轮询等待秒数（需携带 If-None-Match，状态未变化时最多等待该时间）"),
+        wait_for_change: Optional[int] = Query(None, description="客户端已知的状态版本号，版本号未变化时等待下一次状态变化"),
+        timeout: Optional[float] = Query(None, ge=0, description="wait_for_change 的最长等待秒数"),
+    ):
+        """查询任务状态
+
+        支持两种长轮询方式，状态变化（状态、进度、结果、错误）时立即返回，减少轮询请求数：
+        - wait_for_change=<version>&timeout=<秒>：版本号与当前一致时等待，返回 200 和最新状态（超时时版本号不变）
+        - If-None-Match + wait=<秒>：ETag 仍然有效时等待，超时后返回 304
+        """
+        task_info = await task_manager.get_task(task_id)
+        if not task_info:
+            raise HTTPException(status_code=404, detail="任务不存在")
+
+        if wait_for_change is not None:
+            if timeout is None:
+                timeout = config.STATUS_WAIT_DEFAULT_SECONDS
+            task_info = await self._wait_for_change(task_info, wait_for_change, timeout)
+        elif wait and is_not_modified(request, task_info):
+            task_info = await self._wait_for_change(task_info, task_info.version, wait)
+
+        headers = task_cache_headers(task_info)
+        if wait_for_change is None and is_not_modified(request, task_info):
+            return Response(status_code=304, headers=headers)
+        http_response.headers.update(headers)
+
+        return task_status_response(task_info)
+
+    @staticmethod
+    async def _wait_for_change(task_info, version: int, timeout: float):
+        """等待任务状态版本号离开 version（最长 STATUS_WAIT_MAX_SECONDS 秒），返回最新的任务信息
+
+        Raises:
+            HTTPException: 等待期间任务被删除时抛出404错误
+        """
+        await task_info.wait_for_change(version, min(timeout, config.STATUS_WAIT_MAX_SECONDS))
+        task_info = await task_manager.get_task(task_info.task_id)
+        if not task_info:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return task_info
+
+    async def get_task_timeline(self, task_id: str):
+        """查询任务各阶段时间线及耗时分解"""
         task_info = await task_manager.get_task(task_id)
         if not task_info:
             raise HTTPException(status_code=404, detail="任务不存在")
 
-        return TaskStatusResponse(
+        return TaskTimelineResponse(
             task_id=task_info.task_id,
             task_type=task_info.task_type,
             status=task_info.status,
-            message=task_info.message,
-            progress=task_info.progress,
+            created_at=task_info.created_at,
+            events=[TimelineEvent(t_ms=t_ms, event=event, detail=detail)
+                    for t_ms, event, detail in task_info.timeline],
+            dropped_events=task_info.timeline_dropped,
+            breakdown_ms=task_info.stage_breakdown(),
         )
 
+    async def cancel_task(self, task_id: str):
+        """取消任务
+
+        停止本地处理并取消已提交的远程生成任务，立即释放处理名额和远程调用配额；
+        任务文件夹保留，可以通过 resubmit 重新提交
+        """
+        task_info = await task_manager.get_task(task_id)
+        if not task_info:
+            raise HTTPException(status_code=404, detail="任务不存在")
+
+        runner = task_info.runner
+        if not task_info.cancel("用户取消"):
+            raise HTTPException(status_code=409, detail="任务已结束，无法取消")
+        if runner is not None and not runner.done():
+            # 等待处理协程退出，返回时客户端和处理名额已经释放
+            await asyncio.wait({runner}, timeout=_CANCEL_WAIT_SECONDS)
+
+        return task_status_response(task_info)
+
     async def delete_task(self, task_id: str):
         """删除任务"""
         success = await task_manager.delete_task(task_id)
@@ -98,13 +190,18 @@ class BaseTryOnRouter:
         else:
             raise HTTPException(status_code=404, detail="任务不存在")
 
-    async def get_task_result(self, task_id: str):
-        """获取任务结果（通用实现）"""
+    async def get_task_result(self, task_id: str, request: Request, http_response: Response):
+        """获取任务结果（通用实现，支持 If-None-Match 条件请求）"""
         task_info = await task_manager.get_task(task_id)
         if not task_info:
             logging.error(f"任务 {task_id} 不存在，无法获取结果")
             raise HTTPException(status_code=404, detail="任务不存在")
 
+        headers = task_cache_headers(task_info)
+        if is_not_modified(request, task_info):
+            return Response(status_code=304, headers=headers)
+        http_response.headers.update(headers)
+
         # 构建响应（使用任务类型动态获取字段）
         response_data = {
             "task_id": task_info.task_id,
@@ -126,16 +223,15 @@ class BaseTryOnRouter:
         image_paths = self._get_image_paths_from_task(task_info)
         for key, path in image_paths.items():
             if path:
-                filename = Path(path).name
-                url = f"/api/tasks/{task_id}/{filename}"
-                setattr(response, f"{key}_url", url)
+                setattr(response, f"{key}_url", task_file_url(task_id, path))
+                setattr(response, f"{key}_thumbnail_url", self._thumbnail_url(task_id, path))
 
         # 如果任务完成，添加结果图URL
-        if task_info.status == TaskStatus.COMPLETED and task_info.result:
-            downloaded_images = task_info.result.get("downloaded_images", [])
-            if downloaded_images:
-                result_filename = Path(downloaded_images[0]).name
-                response.result_image_url = f"/api/tasks/{task_id}/{result_filename}"
+        if task_info.status == TaskStatus.COMPLETED and task_info.result_images:
+            result_image = task_info.result_images[0]
+            response.result_image_url = task_file_url(task_id, result_image)
+            response.result_image_thumbnail_url = self._thumbnail_url(task_id, result_image)
+            response.result_image_srcset = derivative_service.srcset(task_id, result_image)
 
         # 如果任务失败，添加错误信息
         if task_info.status == TaskStatus.FAILED:
@@ -143,6 +239,11 @@ class BaseTryOnRouter:
 
         return response
 
+    @staticmethod
+    def _thumbnail_url(task_id: str, path: str) -> str:
+        """预览用缩略图地址（WebP）"""
+        return derivative_service.url(task_id, path, config.DERIVATIVE_THUMBNAIL_WIDTH, "webp")
+
     def _get_image_paths_from_task(self, task_info) -> dict:
         """从任务信息中获取图片路径"""
         paths = {}
@@ -170,28 +271,37 @@ class BaseTryOnRouter:
         Returns:
             保存后的图片路径字典 {key: str}
         """
-        result = {}
-        existing_images = existing_images or {}
-
-        for key, upload_file in images.items():
-            if upload_file:
-                # 验证并保存新上传的文件
-                validate_file(upload_file)
-                filename = generate_filename(upload_file.filename)
-                file_path = task_info.task_dir / filename
-
-                content = await upload_file.read()
-                await validate_file_size(content, upload_file.filename)
-
-                async with aiofiles.open(file_path, "wb") as f:
-                    await f.write(content)
-
-                result[key] = str(file_path)
-            elif key in existing_images and existing_images[key]:
-                # 使用已存在的文件
-                result[key] = str(existing_images[key])
-            else:
-                # 既没有上传新文件，也没有已存在的文件
-                result[key] = None
+        with observe_stage(STAGE_UPLOAD):
+            result = {}
+            existing_images = existing_images or {}
+
+            for key, upload_file in images.items():
+                if upload_file:
+                    # 验证并保存新上传的文件
+                    validate_file(upload_file)
+                    content = await upload_file.read()
+                    await validate_file_size(content, upload_file.filename)
+
+                    if blob_store is not None:
+                        # 按内容去重：相同图片只保存一份，任务文件夹中为硬链接
+                        ext = Path(upload_file.filename).suffix
+                        file_path = await blob_store.save(content, ext, task_info.task_dir, key)
+                    else:
+                        file_path = task_info.task_dir / generate_filename(upload_file.filename)
+                        async with aiofiles.open(file_path, "wb") as f:
+                            await f.write(content)
+                    # 保存到存储后端（本地存储时为空操作）
+                    await save_task_files(task_info.task_id, [file_path])
+
+                    result[key] = str(file_path)
+                elif key in existing_images and existing_images[key]:
+                    # 使用已存在的文件
+                    result[key] = str(existing_images[key])
+                else:
+                    # 既没有上传新文件，也没有已存在的文件
+                    result[key] = None
 
+        # 统计新上传文件的磁盘占用，超出配额时淘汰最久未访问的旧任务
+        task_manager.refresh_disk_usage(task_info)
+        await task_manager.enforce_disk_quota(exclude=task_info.task_id)
         return result
@@ -2,18 +2,22 @@
 """
 服装试穿相关API路由
 """
+import os
 from typing import Optional
 from fastapi import UploadFile, File, Form, Header, HTTPException
 import httpx
 from pydantic import BaseModel
+from try_on_anything.common.constants import DEFAULT_DASHSCOPE_BASE_URL
+from try_on_anything.observability.tracing import get_current_span
 
 from ..schemas import TaskType, TryOnSubmitResponse
+from ..services.task_manager import tenant_key_hash
 from ..services import task_manager, clothing_try_on_service
-from ..config import Config
+from ..config import get_config
 from .base import BaseTryOnRouter
 from .utils import find_existing_images
 
-config = Config()
+config = get_config()
 
 
 class ClothingTryOnRouter(BaseTryOnRouter):
@@ -39,12 +43,16 @@ class ClothingTryOnRouter(BaseTryOnRouter):
         use_vl_model: bool = Form(True, description="是否使用VL模型"),
         vl_model: str = Form("qwen3-vl-plus", description="VL模型名称"),
         img_gen_model: str = Form("wan2.6-image", description="图像生成模型名称"),
+        seed: Optional[int] = Form(None, ge=0, le=2147483647,
+                                   description="图像生成随机数种子（可选，相同种子和输入可复现结果）"),
         vl_model_api_key: Optional[str] = Header(None, alias="X-VL-API-Key"),
         img_gen_model_api_key: Optional[str] = Header(None, alias="X-Image-API-Key"),
     ):
         """提交服装试穿任务"""
         # 创建任务
-        task_info, deleted_task_id = await task_manager.create_task(self.task_type)
+        task_info, deleted_task_id = await task_manager.create_task(
+            self.task_type, tenant_key_hash(img_gen_model_api_key or vl_model_api_key))
+        get_current_span().set_attribute("task_id", task_info.task_id)
 
         # 处理并保存图片
         images = {
@@ -65,6 +73,7 @@ class ClothingTryOnRouter(BaseTryOnRouter):
             img_gen_model_api_key=img_gen_model_api_key,
             vl_model=vl_model,
             img_gen_model=img_gen_model,
+            seed=seed,
         )
 
         return TryOnSubmitResponse(
@@ -84,6 +93,7 @@ class ClothingTryOnRouter(BaseTryOnRouter):
         use_vl_model: bool = Form(True),
         vl_model: str = Form("qwen3-vl-plus"),
         img_gen_model: str = Form("wan2.6-image"),
+        seed: Optional[int] = Form(None, ge=0, le=2147483647),
         vl_model_api_key: Optional[str] = Header(None, alias="X-VL-API-Key"),
         img_gen_model_api_key: Optional[str] = Header(None, alias="X-Image-API-Key"),
     ):
@@ -98,10 +108,11 @@ class ClothingTryOnRouter(BaseTryOnRouter):
         if task_info:
             task_info = await task_manager.reset_task(task_id)
         else:
-            task_info = await task_manager.create_task_with_id(task_id, self.task_type)
+            task_info = await task_manager.create_task_with_id(
+                task_id, self.task_type, tenant_key_hash(img_gen_model_api_key or vl_model_api_key))
 
         # 查找已有图片
-        existing = find_existing_images(task_dir, count=2)
+        existing = find_existing_images(task_dir, keys=["clothing", "person"])
         existing_dict = {
             "clothing": existing[0],
             "person": existing[1]
@@ -132,6 +143,7 @@ class ClothingTryOnRouter(BaseTryOnRouter):
             img_gen_model_api_key=img_gen_model_api_key,
             vl_model=vl_model,
             img_gen_model=img_gen_model,
+            seed=seed,
         )
 
         return TryOnSubmitResponse(
@@ -180,7 +192,8 @@ async def test_connection(request: TestConnectionRequest):
     if not api_key or not api_key.strip():
         return TestConnectionResponse(success=False, message="API Key不能为空")
 
-    url = "https://dashscope.aliyuncs.com/compatible-mode/v1/models"
+    dashscope_base_url = (os.getenv("DASHSCOPE_BASE_URL") or DEFAULT_DASHSCOPE_BASE_URL).rstrip("/")
+    url = f"{dashscope_base_url}/compatible-mode/v1/models"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
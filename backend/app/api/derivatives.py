@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+图片派生图接口（缩略图 / WebP / AVIF）
+"""
+import logging
+from pathlib import Path
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from ..config import get_config
+from ..services import task_manager
+from ..services.derivatives import derivative_service
+from ..services.storage import storage, task_file_key
+from .utils import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+
+logger = logging.getLogger(__name__)
+
+config = get_config()
+
+router = APIRouter(prefix="/derivatives", tags=["派生图"])
+
+
+@router.get("/{task_id}/{filename}")
+async def get_derivative(
+    task_id: str,
+    filename: str,
+    w: int = Query(..., description="宽度档位（像素）"),
+    format: str = Query("webp", description="输出格式：webp、avif 或 jpeg"),
+    v: Optional[str] = Query(None, description="源文件版本（由结果接口返回的地址携带）"),
+):
+    """获取任务图片的派生图，首次请求时生成并缓存
+
+    地址中的源文件版本与当前源文件一致时返回长期缓存响应头，
+    否则（未携带版本或源文件已被覆盖）返回需要重新验证的响应头。
+    使用远程存储且本地任务文件夹中没有源图片时（例如服务重启或多实例部署），先从存储下载到本地
+    """
+    error = derivative_service.validate(w, format)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    # 只允许任务文件夹中的图片文件，不允许访问子目录或隐藏文件
+    if Path(filename).name != filename or filename.startswith(".") \
+            or Path(filename).suffix.lower() not in config.ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="不支持的源文件")
+
+    task_info = await task_manager.get_task(task_id)
+    if not task_info:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    source = task_info.task_dir / filename
+    downloaded = False
+    if storage.remote and not source.is_file():
+        try:
+            await storage.download_to(task_file_key(task_id, filename), source)
+            downloaded = True
+        except Exception as e:
+            logger.info(f"从存储下载任务 {task_id} 的源图片 {filename} 失败: {e!r}")
+            source.unlink(missing_ok=True)
+
+    try:
+        version = derivative_service.source_version(source)
+        cached = derivative_service.derived_path(task_info.task_dir, filename, w, format,
+                                                 version).is_file()
+        path = await derivative_service.get(task_info.task_dir, filename, w, format)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="图片不存在")
+    except OSError:
+        raise HTTPException(status_code=400, detail="无法读取源图片")
+
+    if downloaded or not cached:
+        # 新生成的派生图和从存储下载的源图片计入任务目录磁盘占用
+        task_manager.refresh_disk_usage(task_info)
+        await task_manager.enforce_disk_quota(exclude=task_id)
+
+    cache_control = IMMUTABLE_CACHE_CONTROL if v == version else REVALIDATE_CACHE_CONTROL
+    return FileResponse(path, media_type=derivative_service.media_type(format),
+                        headers={"Cache-Control": cache_control})
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+诊断管理接口
+"""
+import secrets
+from datetime import datetime
+from typing import Optional, Dict, List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from ..config import get_config
+from ..schemas import TaskStatus, TaskType, TaskSummary, TaskListResponse
+from ..services import task_manager
+from ..services.loop_monitor import get_loop_monitor
+from ..services.task_index import encode_cursor, decode_cursor
+
+config = get_config()
+
+
+def verify_admin_token(admin_token: Optional[str] = Header(None, alias="X-Admin-Token")) -> None:
+    """校验管理接口令牌
+
+    诊断接口可以列出全部任务ID（任务ID是访问任务结果和上传文件的唯一凭据），
+    未配置 ADMIN_TOKEN 时全部诊断接口关闭
+
+    Raises:
+        HTTPException: 未配置 ADMIN_TOKEN 时抛出404错误，令牌缺失或错误时抛出403错误
+    """
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="诊断接口未启用，请设置环境变量 ADMIN_TOKEN 后重启服务")
+    if not (admin_token and secrets.compare_digest(admin_token, config.ADMIN_TOKEN)):
+        raise HTTPException(status_code=403, detail="管理接口令牌无效")
+
+
+router = APIRouter(prefix="/diagnostics", tags=["诊断"],
+                   dependencies=[Depends(verify_admin_token)])
+
+
+def _require_loop_monitor():
+    monitor = get_loop_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=404,
+                            detail="事件循环监控未开启，请设置环境变量 LOOP_MONITOR_ENABLED=1 后重启服务")
+    return monitor
+
+
+@router.get("/event-loop")
+async def get_event_loop_stats(top: int = Query(20, ge=1, le=100, description="返回的阻塞点数量")):
+    """获取事件循环延迟统计和阻塞最严重的调用位置"""
+    return _require_loop_monitor().snapshot(top=top)
+
+
+@router.post("/event-loop/reset")
+async def reset_event_loop_stats():
+    """清空事件循环监控统计（验证修复效果前使用）"""
+    _require_loop_monitor().reset()
+    return {"success": True}
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+@router.get("/timeline-stats")
+async def get_timeline_stats(
+    task_type: Optional[TaskType] = Query(None, description="任务类型，默认统计全部类型"),
+    status: Optional[TaskStatus] = Query(TaskStatus.COMPLETED, description="任务状态"),
+):
+    """汇总当前保留任务的时间线，按阶段给出耗时分位数（毫秒）"""
+    durations: Dict[str, List[float]] = {}
+    task_count = 0
+    for task_info in await task_manager.list_tasks():
+        if task_type and task_info.task_type != task_type:
+            continue
+        if status and task_info.status != status:
+            continue
+        task_count += 1
+        for stage, elapsed_ms in task_info.stage_breakdown().items():
+            durations.setdefault(stage, []).append(elapsed_ms)
+
+    stages = {}
+    for stage, values in sorted(durations.items()):
+        values.sort()
+        stages[stage] = {
+            "count": len(values),
+            "p50": _percentile(values, 0.50),
+            "p90": _percentile(values, 0.90),
+            "p99": _percentile(values, 0.99),
+            "max": values[-1],
+        }
+    return {"task_count": task_count, "stages": stages}
+
+
+@router.get("/tasks", response_model=TaskListResponse)
+async def list_tasks(
+    task_type: Optional[TaskType] = Query(None, description="任务类型"),
+    status: Optional[TaskStatus] = Query(None, description="任务状态"),
+    tenant: Optional[str] = Query(None, description="租户（API Key 哈希）"),
+    created_after: Optional[datetime] = Query(None, description="创建时间下界（包含）"),
+    created_before: Optional[datetime] = Query(None, description="创建时间上界（不包含）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    limit: int = Query(50, ge=1, le=500, description="每页数量"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="按创建时间排序：desc 从新到旧，asc 从旧到新"),
+):
+    """分页列出任务，支持按任务类型、状态、创建时间范围和租户筛选（使用任务索引，不遍历全部任务）"""
+    try:
+        after_key = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    tasks, next_key = await task_manager.query_tasks(
+        task_type=task_type, status=status, tenant=tenant,
+        created_after=created_after, created_before=created_before,
+        cursor=after_key, limit=limit, newest_first=order == "desc")
+    return TaskListResponse(
+        tasks=[TaskSummary(
+            task_id=task_info.task_id,
+            task_type=task_info.task_type,
+            status=task_info.status,
+            message=task_info.message,
+            progress=task_info.progress,
+            created_at=task_info.created_at,
+            updated_at=task_info.updated_at,
+            tenant=task_info.tenant,
+        ) for task_info in tasks],
+        next_cursor=encode_cursor(next_key) if next_key else None,
+    )
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+跨任务类型的任务查询接口
+"""
+from fastapi import APIRouter, HTTPException
+
+from ..config import get_config
+from ..schemas import BulkStatusRequest, BulkStatusResponse
+from ..services import task_manager
+from .utils import task_status_response
+
+config = get_config()
+
+router = APIRouter(prefix="/task-status", tags=["任务查询"])
+
+
+@router.post("/batch", response_model=BulkStatusResponse)
+async def get_task_statuses(request: BulkStatusRequest):
+    """批量查询任务状态
+
+    一次请求返回多个任务的状态，所有任务来自任务管理器的同一次读取；
+    可按任务类型和状态筛选，被筛选掉的任务不出现在结果中，不存在的任务ID列在 missing 中
+    """
+    # 去重并保持请求中的顺序
+    task_ids = list(dict.fromkeys(request.task_ids))
+    if len(task_ids) > config.BULK_STATUS_MAX_IDS:
+        raise HTTPException(status_code=400,
+                            detail=f"单次最多查询 {config.BULK_STATUS_MAX_IDS} 个任务")
+
+    found = await task_manager.get_tasks(task_ids)
+    statuses = set(request.status or ())
+    tasks = []
+    for task_id in task_ids:
+        task_info = found.get(task_id)
+        if task_info is None:
+            continue
+        if request.task_type and task_info.task_type != request.task_type:
+            continue
+        if statuses and task_info.status not in statuses:
+            continue
+        tasks.append(task_status_response(task_info))
+
+    return BulkStatusResponse(tasks=tasks,
+                              missing=[task_id for task_id in task_ids if task_id not in found])
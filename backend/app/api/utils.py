@@ -2,16 +2,28 @@
 """
 API层通用工具函数
 """
+import time
 import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Dict
 from io import BytesIO
 from PIL import Image
-from fastapi import UploadFile, HTTPException
+from fastapi import UploadFile, HTTPException, Request
+from starlette.staticfiles import StaticFiles
 
-from ..config import Config
+from ..config import get_config
+from ..schemas import TaskStatusResponse
+from ..services.blob_store import parse_linked_filename
+from ..services.storage import storage
 
-config = Config()
+config = get_config()
+
+# 内容不会再变化的文件（派生图、内容寻址文件）使用的长期缓存响应头
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 内容会变化的响应（任务状态、结果、细节图）：允许缓存，但每次使用前需要用 ETag 重新验证
+REVALIDATE_CACHE_CONTROL = "no-cache"
 
 
 def validate_file(file: UploadFile) -> None:
@@ -73,16 +85,23 @@ def generate_filename(original_filename: str) -> str:
     return f"{uuid.uuid4()}{ext}"
 
 
-def find_existing_images(task_dir: Path, count: int = 2) -> list:
+def find_existing_images(task_dir: Path, count: int = 2, keys: Optional[list] = None) -> list:
     """从任务文件夹中查找已有的图片文件
 
+    按内容去重保存的文件名带有用途（"<用途>-<摘要>.jpg"），指定 keys 时按用途查找；
+    硬链接文件的修改时间是 blob 首次写入的时间，不能用来判断上传顺序。
+    找不到对应用途的文件时（旧版本保存的任务），按修改时间顺序查找
+
     Args:
         task_dir: 任务文件夹路径
-        count: 需要查找的图片数量
+        count: 需要查找的图片数量（指定 keys 时为 keys 的长度）
+        keys: 按顺序需要查找的图片用途，例如 ["clothing", "person"]
 
     Returns:
         图片路径列表，如果找不到则对应位置为None
     """
+    if keys:
+        count = len(keys)
     if not task_dir or not task_dir.exists():
         return [None] * count
 
@@ -90,10 +109,15 @@ def find_existing_images(task_dir: Path, count: int = 2) -> list:
     image_extensions = {'.jpg', '.jpeg', '.png', '.webp'}
     image_files = []
 
+    linked_files = {}
+
     for file in task_dir.iterdir():
         if file.is_file() and file.suffix.lower() in image_extensions:
+            match = parse_linked_filename(file.name)
+            if match:
+                linked_files[match["key"]] = file
             # 排除结果图片
-            if 'result' not in file.name.lower() and 'output' not in file.name.lower():
+            elif 'result' not in file.name.lower() and 'output' not in file.name.lower():
                 image_files.append(file)
 
     # 按修改时间排序
@@ -102,6 +126,120 @@ def find_existing_images(task_dir: Path, count: int = 2) -> list:
     # 返回指定数量的图片路径
     result = []
     for i in range(count):
-        result.append(image_files[i] if i < len(image_files) else None)
+        if keys and keys[i] in linked_files:
+            result.append(linked_files[keys[i]])
+        else:
+            result.append(image_files[i] if i < len(image_files) else None)
 
     return result
+
+
+def task_file_cache_control(filename: str) -> str:
+    """任务文件的缓存策略
+
+    上传文件（内容寻址或 UUID 文件名）、生成结果图（以远程任务ID命名）和派生图写入后不会再修改，
+    可以长期缓存；只有饰品细节图（"<饰品图>_detail.<扩展名>"）在重新提交时会按新的识别结果覆盖
+
+    Args:
+        filename: 任务文件名
+
+    Returns:
+        Cache-Control 响应头的值
+    """
+    if Path(filename).stem.endswith("_detail"):
+        return REVALIDATE_CACHE_CONTROL
+    return IMMUTABLE_CACHE_CONTROL
+
+
+class TaskFilesStaticFiles(StaticFiles):
+    """任务文件静态文件服务，按文件是否会被修改设置 Cache-Control"""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = task_file_cache_control(Path(full_path).name)
+        return response
+
+
+def _presign_window() -> Optional[int]:
+    """远程存储时结果中的文件地址为预签名 URL，返回当前所处的签名窗口编号（本地存储返回 None）
+
+    窗口长度取签名有效期的一半：同一窗口内生成的 URL 在窗口结束后仍至少有一半有效期，
+    客户端凭 304 继续使用缓存中的 URL 时不会拿到已过期的地址
+    """
+    if not storage.remote:
+        return None
+    return int(time.time()) // max(1, config.S3_PRESIGN_EXPIRES // 2)
+
+
+def _task_last_modified(task_info) -> datetime:
+    """任务状态/结果的最后修改时间（远程存储时不早于当前签名窗口的开始时间）"""
+    updated_at = task_info.updated_at.astimezone(timezone.utc)
+    window = _presign_window()
+    if window is None:
+        return updated_at
+    window_start = datetime.fromtimestamp(window * max(1, config.S3_PRESIGN_EXPIRES // 2), timezone.utc)
+    return max(updated_at, window_start)
+
+
+def task_cache_headers(task_info) -> Dict[str, str]:
+    """任务状态/结果响应的缓存验证头
+
+    ETag 由任务创建时间和状态版本号生成（后端重启后重建的任务不会与旧 ETag 冲突）。
+    使用远程存储时结果中包含会过期的预签名 URL，ETag 和 Last-Modified 还会随签名窗口变化，
+    进入新窗口后客户端的条件请求不再命中 304，从而拿到重新签名的地址
+
+    Args:
+        task_info: 任务信息对象
+
+    Returns:
+        包含 ETag、Last-Modified 和 Cache-Control 的响应头字典
+    """
+    etag = f"{task_info.created_at.timestamp():.6f}-{task_info.version}"
+    window = _presign_window()
+    if window is not None:
+        etag = f"{etag}-{window}"
+    return {
+        "ETag": f'W/"{etag}"',
+        "Last-Modified": format_datetime(_task_last_modified(task_info), usegmt=True),
+        "Cache-Control": REVALIDATE_CACHE_CONTROL,
+    }
+
+
+def is_not_modified(request: Request, task_info) -> bool:
+    """判断客户端缓存的任务状态/结果是否仍然有效（If-None-Match 优先于 If-Modified-Since）
+
+    Args:
+        request: 请求对象
+        task_info: 任务信息对象
+
+    Returns:
+        客户端缓存仍然有效时返回 True，应返回 304
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = task_cache_headers(task_info)["ETag"]
+        # 弱比较：忽略 W/ 前缀
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or etag.removeprefix("W/") in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # Last-Modified 只精确到秒，同一秒内的多次更新无法区分，只有修改时间严格早于该时间才视为未修改
+        return since.tzinfo is not None and _task_last_modified(task_info) < since
+    return False
+
+
+def task_status_response(task_info) -> TaskStatusResponse:
+    """由任务信息构建状态响应（单个和批量状态查询共用）"""
+    return TaskStatusResponse(
+        task_id=task_info.task_id,
+        task_type=task_info.task_type,
+        status=task_info.status,
+        message=task_info.message,
+        progress=task_info.progress,
+        version=task_info.version,
+    )
@@ -3,20 +3,43 @@
 应用配置管理
 """
 import os
+from functools import lru_cache
 from pydantic import BaseModel, model_validator
-from typing import List, Set
+from typing import List, Set, Optional
 from pathlib import Path
 
+from try_on_anything.common.constants import DEFAULT_RESULT_CACHE_MAX_BYTES
+
 
 # 后端目录（模块级常量，供类属性默认值使用）
 _BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+def _env_flag(name: str, default: bool = False) -> bool:
+    """读取布尔类型的环境变量（1/true/yes/on 视为开启）"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数类型的环境变量，未设置时返回默认值"""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_int_list(name: str, default: List[int]) -> List[int]:
+    """读取逗号分隔的整数列表环境变量，未设置时返回默认值"""
+    value = os.getenv(name)
+    return [int(item) for item in value.split(",") if item.strip()] if value else default
+
+
 class Config(BaseModel):
     """应用配置类
 
     使用 Pydantic BaseModel 进行类型强校验。
-    在需要使用配置的文件中声明实例: config = Config()
+    在需要使用配置的文件中获取共享实例: config = get_config()
     """
 
     # Pydantic v2 配置
@@ -24,20 +47,75 @@ class Config(BaseModel):
 
     # 后端目录
     BASE_DIR: Path = _BASE_DIR
-    # 任务数据存储目录（每个任务一个文件夹）
-    TASKS_DIR: Path = _BASE_DIR / "tasks"
+    # 任务数据存储目录（每个任务一个文件夹），可通过环境变量 TASKS_DIR 覆盖
+    TASKS_DIR: Path = Path(os.getenv("TASKS_DIR") or _BASE_DIR / "tasks")
     # 允许的图片格式
     ALLOWED_EXTENSIONS: Set[str] = {".jpg", ".jpeg", ".png", ".webp"}
     # 最大文件大小 (30MB)
     MAX_FILE_SIZE: int = 30 * 1024 * 1024
     # API前缀
     API_PREFIX: str = "/api"
-    # 任务超时时间（秒）
-    TASK_TIMEOUT: int = 300
+    # 任务截止时间预算（秒）：从提交开始计时，VL识别、提交、轮询和下载各阶段只使用剩余预算
+    TASK_TIMEOUT: int = _env_int("TASK_TIMEOUT", 300)
+    # 状态接口长轮询（wait、timeout 参数）的最长等待时间（秒）
+    STATUS_WAIT_MAX_SECONDS: int = _env_int("STATUS_WAIT_MAX_SECONDS", 30)
+    # 状态接口按版本号长轮询（wait_for_change 参数）未指定 timeout 时的默认等待时间（秒）
+    STATUS_WAIT_DEFAULT_SECONDS: int = _env_int("STATUS_WAIT_DEFAULT_SECONDS", 25)
+    # 批量状态查询单次最多的任务ID数量
+    BULK_STATUS_MAX_IDS: int = _env_int("BULK_STATUS_MAX_IDS", 1000)
+    # 任务状态存储：memory（保存在进程内存中，只能以单个工作进程运行）
+    TASK_STORE: str = os.getenv("TASK_STORE", "memory")
+    # 工作进程启动时是否预热（注册图片格式插件、解析远程服务域名），生产启动模式会自动开启
+    WARMUP_ON_STARTUP: bool = _env_flag("WARMUP_ON_STARTUP")
+    # 模型客户端池最多保留的客户端数量（按客户端类型和 API Key 区分，超出时淘汰最近最少使用的空闲客户端）
+    CLIENT_POOL_MAX_SIZE: int = _env_int("CLIENT_POOL_MAX_SIZE", 32)
+    # 服务关闭时等待进行中任务完成的最长时间（秒），超时后取消剩余任务
+    SHUTDOWN_TIMEOUT_SECONDS: int = _env_int("SHUTDOWN_TIMEOUT_SECONDS", 30)
     # 任务过期时间（小时）
     TASK_MAX_AGE_HOURS: int = 24
     # 任务数量上限（超过此数量会自动删除最早的任务）
-    MAX_TASKS: int = 20
+    MAX_TASKS: int = _env_int("MAX_TASKS", 20)
+    # 任务目录磁盘配额（字节，0 表示不限制），超出时淘汰最久未访问的已结束任务
+    TASKS_DIR_MAX_BYTES: int = _env_int("TASKS_DIR_MAX_BYTES", 0)
+    # 是否对上传文件按内容去重（相同内容只保存一份，任务文件夹中使用硬链接）
+    BLOB_DEDUP_ENABLED: bool = _env_flag("BLOB_DEDUP_ENABLED", True)
+    # 上传文件内容寻址存储目录，需与任务数据目录位于同一文件系统才能使用硬链接
+    BLOBS_DIR: Path = Path(os.getenv("BLOBS_DIR") or _BASE_DIR / "blobs")
+    # 任务文件存储后端：local（本地任务目录，通过 /api/tasks 访问）或 s3（S3 兼容对象存储，返回预签名 URL）
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    # S3 兼容对象存储配置（STORAGE_BACKEND=s3 时生效）
+    S3_ENDPOINT_URL: Optional[str] = os.getenv("S3_ENDPOINT_URL")
+    # 生成预签名 URL 使用的对外地址（浏览器可访问），未设置时与 S3_ENDPOINT_URL 相同
+    S3_PUBLIC_ENDPOINT_URL: Optional[str] = os.getenv("S3_PUBLIC_ENDPOINT_URL")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "try-on-anything")
+    S3_ACCESS_KEY_ID: Optional[str] = os.getenv("S3_ACCESS_KEY_ID")
+    S3_SECRET_ACCESS_KEY: Optional[str] = os.getenv("S3_SECRET_ACCESS_KEY")
+    S3_REGION: str = os.getenv("S3_REGION", "us-east-1")
+    # 预签名 URL 有效期（秒）
+    S3_PRESIGN_EXPIRES: int = _env_int("S3_PRESIGN_EXPIRES", 3600)
+    # 图片派生图（缩略图/WebP/AVIF）允许的宽度档位（像素）
+    DERIVATIVE_WIDTHS: List[int] = _env_int_list("DERIVATIVE_WIDTHS", [256, 512, 1024])
+    # 结果接口中 *_thumbnail_url 字段使用的宽度档位
+    DERIVATIVE_THUMBNAIL_WIDTH: int = _env_int("DERIVATIVE_THUMBNAIL_WIDTH", 512)
+    # 生成派生图的工作线程数
+    DERIVATIVE_WORKERS: int = _env_int("DERIVATIVE_WORKERS", 2)
+    # 每个任务时间线最多保留的事件数（超出后只保留任务结束事件，避免长时间轮询无限增长）
+    TASK_TIMELINE_MAX_EVENTS: int = _env_int("TASK_TIMELINE_MAX_EVENTS", 500)
+    # 是否启用生成结果缓存（指定随机数种子时，相同输入、提示词和参数直接复用结果，不再调用远程API）
+    RESULT_CACHE_ENABLED: bool = _env_flag("RESULT_CACHE_ENABLED")
+    # 生成结果缓存目录
+    RESULT_CACHE_DIR: Path = _BASE_DIR / "cache" / "results"
+    # 生成结果缓存最大占用空间（字节，默认1GB）
+    RESULT_CACHE_MAX_BYTES: int = _env_int("RESULT_CACHE_MAX_BYTES",
+                                           DEFAULT_RESULT_CACHE_MAX_BYTES)
+    # 是否开启事件循环监控诊断模式（检测阻塞事件循环的同步调用）
+    LOOP_MONITOR_ENABLED: bool = _env_flag("LOOP_MONITOR_ENABLED")
+    # 事件循环阻塞判定阈值（毫秒），超过该值时记录调用栈
+    LOOP_MONITOR_THRESHOLD_MS: int = _env_int("LOOP_MONITOR_THRESHOLD_MS", 100)
+    # 事件循环延迟采样间隔（毫秒）
+    LOOP_MONITOR_INTERVAL_MS: int = _env_int("LOOP_MONITOR_INTERVAL_MS", 50)
+    # 管理接口令牌，访问诊断接口需要携带请求头 X-Admin-Token（未设置时诊断接口关闭）
+    ADMIN_TOKEN: Optional[str] = os.getenv("ADMIN_TOKEN")
 
     @property
     def CORS_ORIGINS(self) -> List[str]:
@@ -56,4 +134,18 @@ class Config(BaseModel):
     def _ensure_dirs_exist(self) -> "Config":
         """确保必要目录存在"""
         self.TASKS_DIR.mkdir(parents=True, exist_ok=True)
+        if self.BLOB_DEDUP_ENABLED:
+            self.BLOBS_DIR.mkdir(parents=True, exist_ok=True)
         return self
+
+
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    """获取共享的配置实例
+
+    所有模块共用同一个实例，只在第一次调用时读取环境变量和创建目录。
+
+    Returns:
+        Config: 配置实例
+    """
+    return Config()
@@ -6,14 +6,31 @@ FastAPI 应用主入口
 import asyncio
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 
-from .config import Config
+from try_on_anything.clients.resilience import get_circuit_breaker_states, CircuitBreaker
+from try_on_anything.observability.metrics import REGISTRY
+from try_on_anything.observability.tracing import (configure_tracing_from_env,
+                                                   shutdown_tracing, start_span)
+
+from .config import get_config
 from .api.accessory_try_on import router as accessory_try_on_router
 from .api.clothing_try_on import router as clothing_try_on_router
+from .api.diagnostics import router as diagnostics_router
+from .api.derivatives import router as derivatives_router
+from .api.tasks import router as tasks_router
+from .api.utils import TaskFilesStaticFiles
 from .services.task_manager import task_manager
+from .services import result_cache
+from .services.blob_store import blob_store
+from .services.base import drain_tasks
+from .services.client_pool import client_pool
+from .services.derivatives import derivative_service
+from .services.loop_monitor import create_loop_monitor
+from .services.storage import storage
+from .services.warmup import warm_up
 
 # 配置全局日志格式，统一算法模块的日志输出风格
 logging.basicConfig(
@@ -22,7 +39,10 @@ logging.basicConfig(
 )
 
 # 声明配置实例
-config = Config()
+config = get_config()
+
+# 根据环境变量 TRACING_EXPORTER（none/file/otlp）配置链路追踪，默认不启用
+configure_tracing_from_env()
 
 
 async def cleanup_task():
@@ -32,20 +52,45 @@ async def cleanup_task():
         cleaned = await task_manager.cleanup_old_tasks()
         if cleaned > 0:
             logging.info(f"已清理 {cleaned} 个过期任务")
+        # 回收没有任务引用的上传文件（例如重启前被删除的任务文件夹）
+        if blob_store:
+            collected = await blob_store.collect_garbage_async()
+            if collected > 0:
+                logging.info(f"已回收 {collected} 个未被引用的上传文件")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
+    # 生产模式：开始接收请求前预热当前工作进程
+    if config.WARMUP_ON_STARTUP:
+        await warm_up()
     # 启动时：创建清理任务
     cleanup_task_handle = asyncio.create_task(cleanup_task())
+    # 诊断模式：启动事件循环监控
+    loop_monitor = None
+    if config.LOOP_MONITOR_ENABLED:
+        loop_monitor = create_loop_monitor(
+            threshold=config.LOOP_MONITOR_THRESHOLD_MS / 1000,
+            sample_interval=config.LOOP_MONITOR_INTERVAL_MS / 1000)
+        loop_monitor.start()
     yield
+    # 关闭时：等待进行中的任务完成（超时后取消），再关闭复用的模型客户端和存储连接
+    await drain_tasks(config.SHUTDOWN_TIMEOUT_SECONDS)
+    await client_pool.aclose()
+    await storage.aclose()
+    if loop_monitor:
+        await loop_monitor.stop()
     # 关闭时：取消清理任务
     cleanup_task_handle.cancel()
     try:
         await cleanup_task_handle
     except asyncio.CancelledError:
         pass
+    # 关闭派生图工作线程池
+    derivative_service.shutdown()
+    # 发送缓冲中的追踪数据
+    shutdown_tracing()
 
 
 # 创建FastAPI应用实例
@@ -67,14 +112,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 挂载任务文件夹目录（每个任务一个子文件夹，包含uploads和results）
+
+@app.middleware("http")
+async def tracing_middleware(request: Request, call_next):
+    """为每个请求创建根 span，请求内创建的后台任务会以该 span 为父 span"""
+    with start_span(f"HTTP {request.method}", {
+            "http.method": request.method,
+            "http.target": request.url.path,
+    }) as span:
+        response = await call_next(request)
+        # 路由匹配后才能拿到路由模板和路径参数
+        route = request.scope.get("route")
+        if span.recording and route is not None and hasattr(route, "path"):
+            span.name = f"HTTP {request.method} {route.path}"
+            span.set_attribute("http.route", route.path)
+        span.set_attribute("task_id", request.scope.get("path_params", {}).get("task_id"))
+        span.set_attribute("http.status_code", response.status_code)
+        return response
+
+
+# 挂载任务文件夹目录（每个任务一个子文件夹，包含uploads和results），
+# 写入后不再修改的文件返回长期缓存响应头
 app.mount("/api/tasks",
-          StaticFiles(directory=str(config.TASKS_DIR)),
+          TaskFilesStaticFiles(directory=str(config.TASKS_DIR)),
           name="tasks")
 
 # 注册API路由
 app.include_router(accessory_try_on_router, prefix="/api")
 app.include_router(clothing_try_on_router, prefix="/api")
+app.include_router(diagnostics_router, prefix="/api")
+app.include_router(derivatives_router, prefix="/api")
+app.include_router(tasks_router, prefix="/api")
 
 
 @app.get("/")
@@ -85,5 +153,26 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """健康检查端点"""
-    return {"status": "healthy"}
+    """健康检查端点
+
+    任意外部依赖（DashScope 接口）的熔断器处于打开状态时，整体状态为 degraded
+    """
+    circuit_breakers = get_circuit_breaker_states()
+    degraded = any(breaker["state"] == CircuitBreaker.OPEN
+                   for breaker in circuit_breakers.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "circuit_breakers": circuit_breakers,
+        "result_cache": result_cache.stats if result_cache else None,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 指标端点
+
+    包含各处理阶段（上传、VL识别、编码、提交、排队、轮询、下载）的耗时直方图、
+    正在执行数量、按模型统计的错误数，以及各状态的任务数量（队列深度）
+    """
+    return PlainTextResponse(REGISTRY.render(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
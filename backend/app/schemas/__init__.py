@@ -7,8 +7,14 @@ from .common import (
     TaskType,
     TryOnSubmitResponse,
     TaskStatusResponse,
+    BulkStatusRequest,
+    BulkStatusResponse,
+    TaskSummary,
+    TaskListResponse,
     TryOnResultResponse,
     TaskDeleteResponse,
+    TimelineEvent,
+    TaskTimelineResponse,
 )
 
 __all__ = [
@@ -16,6 +22,12 @@ __all__ = [
     "TaskType",
     "TryOnSubmitResponse",
     "TaskStatusResponse",
+    "BulkStatusRequest",
+    "BulkStatusResponse",
+    "TaskSummary",
+    "TaskListResponse",
     "TryOnResultResponse",
     "TaskDeleteResponse",
+    "TimelineEvent",
+    "TaskTimelineResponse",
 ]
@@ -2,9 +2,10 @@
 """
 Pydantic数据模型 - 请求和响应的数据结构定义
 """
-from typing import Optional
+from typing import Optional, List, Dict
+from datetime import datetime
 from enum import Enum
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class TaskStatus(str, Enum):
@@ -13,6 +14,7 @@ class TaskStatus(str, Enum):
     PROCESSING = "processing"    # 处理中
     COMPLETED = "completed"      # 已完成
     FAILED = "failed"            # 失败
+    CANCELLED = "cancelled"      # 已取消
 
 
 class TaskType(str, Enum):
@@ -36,6 +38,38 @@ class TaskStatusResponse(BaseModel):
     status: TaskStatus          # 任务状态
     message: Optional[str] = None   # 状态描述
     progress: Optional[int] = None  # 进度百分比 (0-100)
+    version: int = 0                # 状态版本号，作为 wait_for_change 参数可等待下一次状态变化
+
+
+class BulkStatusRequest(BaseModel):
+    """批量任务状态查询请求"""
+    task_ids: List[str] = Field(..., min_length=1)     # 任务ID列表
+    task_type: Optional[TaskType] = None        # 只返回该类型的任务
+    status: Optional[List[TaskStatus]] = None   # 只返回处于这些状态的任务
+
+
+class BulkStatusResponse(BaseModel):
+    """批量任务状态查询响应"""
+    tasks: List[TaskStatusResponse]     # 任务状态（按请求中的顺序，不含被筛选掉的任务）
+    missing: List[str] = []             # 不存在的任务ID
+
+
+class TaskSummary(BaseModel):
+    """任务列表中的任务摘要"""
+    task_id: str                # 任务ID
+    task_type: TaskType         # 任务类型
+    status: TaskStatus          # 任务状态
+    message: Optional[str] = None   # 状态描述
+    progress: Optional[int] = None  # 进度百分比 (0-100)
+    created_at: datetime        # 任务创建时间
+    updated_at: datetime        # 任务最后更新时间
+    tenant: Optional[str] = None    # 租户（提交任务时 API Key 的哈希，使用服务端默认 Key 时为空）
+
+
+class TaskListResponse(BaseModel):
+    """任务列表分页响应"""
+    tasks: List[TaskSummary]        # 本页任务
+    next_cursor: Optional[str] = None   # 下一页游标（没有下一页时为空）
 
 
 class TryOnResultResponse(BaseModel):
@@ -54,6 +88,30 @@ class TryOnResultResponse(BaseModel):
     person_image_url: Optional[str] = None      # 原人物图片URL
     person_position: Optional[str] = None       # 识别的穿戴位置
     error_message: Optional[str] = None         # 错误信息（如果失败）
+    # 派生图（按需生成并长期缓存，适合预览展示）
+    result_image_thumbnail_url: Optional[str] = None     # 结果图缩略图URL（WebP）
+    accessory_image_thumbnail_url: Optional[str] = None  # 饰品图缩略图URL
+    clothing_image_thumbnail_url: Optional[str] = None   # 服装图缩略图URL
+    person_image_thumbnail_url: Optional[str] = None     # 人物图缩略图URL
+    result_image_srcset: Optional[Dict[str, str]] = None  # 结果图各格式的 srcset，例如 {"avif": "... 256w, ... 512w"}
+
+
+class TimelineEvent(BaseModel):
+    """任务时间线事件"""
+    t_ms: float                 # 相对任务创建的毫秒数（单调时钟）
+    event: str                  # 事件名称，例如 queued、vl_analysis.start、wan_polling.poll
+    detail: Optional[str] = None    # 事件详情（模型名称、远程任务状态、错误类型等）
+
+
+class TaskTimelineResponse(BaseModel):
+    """任务时间线响应"""
+    task_id: str                # 任务ID
+    task_type: TaskType         # 任务类型
+    status: TaskStatus          # 任务状态
+    created_at: datetime        # 任务创建时间
+    events: List[TimelineEvent]     # 时间线事件（按时间顺序）
+    dropped_events: int = 0         # 时间线已满后丢弃的事件数
+    breakdown_ms: Dict[str, float]  # 最近一次提交各阶段耗时（毫秒）
 
 
 class TaskDeleteResponse(BaseModel):
@@ -3,6 +3,7 @@
 服务层包
 """
 from .task_manager import TaskManager, TaskInfo, task_manager
+from .base import result_cache
 from .accessory_try_on import AccessoryTryOnService, accessory_try_on_service
 from .clothing_try_on import ClothingTryOnService, clothing_try_on_service
 
@@ -10,6 +11,7 @@ __all__ = [
     "TaskManager",
     "TaskInfo",
     "task_manager",
+    "result_cache",
     "AccessoryTryOnService",
     "accessory_try_on_service",
     "ClothingTryOnService",
@@ -33,7 +33,8 @@ class AccessoryTryOnService(BaseTryOnService):
         vl_model_api_key: Optional[str] = None,
         img_gen_model_api_key: Optional[str] = None,
         vl_model: str = "qwen3-vl-plus",
-        img_gen_model: str = "wan2.6-image"
+        img_gen_model: str = "wan2.6-image",
+        seed: Optional[int] = None
     ):
         """启动饰品试戴任务
 
@@ -49,6 +50,7 @@ class AccessoryTryOnService(BaseTryOnService):
             img_gen_model_api_key: 图像生成模型API Key
             vl_model: VL模型名称
             img_gen_model: 图像生成模型名称
+            seed: 图像生成随机数种子（可选，指定时可使用生成结果缓存）
         """
         # 准备图片路径字典
         image_paths = {
@@ -60,7 +62,8 @@ class AccessoryTryOnService(BaseTryOnService):
         # 准备任务参数字典
         task_params = {
             "accessory_type": accessory_type,
-            "person_position": person_position
+            "person_position": person_position,
+            "seed": seed
         }
 
         # 保存路径到任务信息
@@ -3,14 +3,72 @@
 Service层基类，提供通用的业务逻辑
 """
 import asyncio
+import hashlib
+import json
 import logging
+import time
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set
+import httpx
 from abc import ABC, abstractmethod
 
 from try_on_anything.clients import QwenVLClient, WanModelClient
-from .task_manager import TaskInfo
+from try_on_anything.common.deadline import Deadline
+from try_on_anything.generators import GenerationResultCache
+from try_on_anything.observability.metrics import (REGISTRY, STAGE_TASK,
+                                                   STAGE_IN_FLIGHT,
+                                                   record_stage_duration,
+                                                   listen_stage_events)
+from try_on_anything.observability.tracing import start_span
+from .client_pool import client_pool
+from .task_manager import TaskInfo, task_manager
+from .storage import save_task_files
 from ..schemas import TaskStatus
+from ..config import get_config
+
+# 声明配置实例
+config = get_config()
+
+# 全局生成结果缓存实例（所有服务共享同一缓存目录，仅在配置启用时创建）
+result_cache: Optional[GenerationResultCache] = None
+if config.RESULT_CACHE_ENABLED:
+    result_cache = GenerationResultCache(
+        cache_dir=str(config.RESULT_CACHE_DIR),
+        max_size_bytes=config.RESULT_CACHE_MAX_BYTES
+    )
+
+# 正在执行的任务（保留引用，避免被垃圾回收；服务关闭时等待其完成）
+_running_tasks: Set[asyncio.Task] = set()
+# 取消超时未完成的任务后，等待其清理（归还客户端、记录指标）的最长时间（秒）
+_CANCEL_GRACE_SECONDS = 5
+
+
+async def drain_tasks(timeout: float) -> int:
+    """等待正在执行的任务完成，超时后取消剩余任务（服务关闭时调用）
+
+    Args:
+        timeout (float): 最长等待时间（秒）
+
+    Returns:
+        int: 超时被取消的任务数量
+    """
+    pending = {task for task in _running_tasks if not task.done()}
+    if not pending:
+        return 0
+    logging.info(f"等待 {len(pending)} 个进行中的任务完成（最长 {timeout} 秒）...")
+    _, pending = await asyncio.wait(pending, timeout=timeout)
+    if pending:
+        logging.warning(f"{len(pending)} 个任务未在 {timeout} 秒内完成，取消这些任务")
+        for task in pending:
+            task.cancel("服务正在关闭")
+        await asyncio.wait(pending, timeout=_CANCEL_GRACE_SECONDS)
+    return len(pending)
+
+
+# 任务结束计数（按任务类型、最终状态和生成模型统计）
+TASKS_FINISHED = REGISTRY.counter(
+    "try_on_tasks_finished_total", "已结束的任务数量",
+    ("task_type", "status", "model"))
 
 
 class BaseTryOnService(ABC):
@@ -43,6 +101,8 @@ class BaseTryOnService(ABC):
     ):
         """获取Pipeline实例（通用实现）
 
+        模型客户端从客户端池中获取（连接在任务之间复用），任务结束后需要调用 _release_pipeline 归还。
+
         Args:
             use_vl_model: 是否使用VL模型
             download_root_path: 下载路径
@@ -52,20 +112,25 @@ class BaseTryOnService(ABC):
         Returns:
             Pipeline实例
         """
-        # 1. 创建 WanModelClient
-        wan_client = WanModelClient(api_key=img_gen_model_api_key)
+        # 1. 获取 WanModelClient
+        wan_client = client_pool.acquire(WanModelClient, img_gen_model_api_key)
 
         # 2. 创建 Generator
         generator_class = self.get_generator_class()
         img_generator = generator_class(
             wan_client=wan_client,
-            download_root_path=download_root_path
+            download_root_path=download_root_path,
+            result_cache=result_cache
         )
 
-        # 3. 创建 QwenVLClient（仅在启用VL模型时需要）
+        # 3. 获取 QwenVLClient（仅在启用VL模型时需要）
         vl_client = None
         if use_vl_model:
-            vl_client = QwenVLClient(api_key=vl_model_api_key)
+            try:
+                vl_client = client_pool.acquire(QwenVLClient, vl_model_api_key)
+            except Exception:
+                client_pool.release(wan_client)
+                raise
 
         # 4. 创建 Pipeline
         pipeline_class = self.get_pipeline_class()
@@ -75,6 +140,18 @@ class BaseTryOnService(ABC):
             use_vl_model=use_vl_model
         )
 
+    @staticmethod
+    def _release_pipeline(pipeline) -> None:
+        """将Pipeline使用的模型客户端归还到客户端池
+
+        Args:
+            pipeline: _get_pipeline 返回的Pipeline实例，None 时不做任何操作
+        """
+        if pipeline is None:
+            return
+        client_pool.release(pipeline.img_generator.wan_client)
+        client_pool.release(getattr(pipeline, "vl_client", None))
+
     async def process_task(
         self,
         task_info: TaskInfo,
@@ -84,10 +161,14 @@ class BaseTryOnService(ABC):
         vl_model_api_key: Optional[str] = None,
         img_gen_model_api_key: Optional[str] = None,
         vl_model: str = "qwen3-vl-plus",
-        img_gen_model: str = "wan2.6-image"
+        img_gen_model: str = "wan2.6-image",
+        deadline: Optional[Deadline] = None
     ):
         """处理任务（通用实现）
 
+        VL识别、重新连接远程任务、提交、轮询和下载都在任务截止时间内完成，
+        剩余预算耗尽时立即失败（同时取消已提交的远程任务），不会因各阶段超时叠加而远超 TASK_TIMEOUT
+
         Args:
             task_info: 任务信息对象
             image_paths: 图片路径字典
@@ -97,7 +178,11 @@ class BaseTryOnService(ABC):
             img_gen_model_api_key: 图像生成模型API Key
             vl_model: VL模型名称
             img_gen_model: 图像生成模型名称
+            deadline: 任务截止时间（提交任务时创建），默认为 None（从现在开始计算 TASK_TIMEOUT）
         """
+        if deadline is None:
+            deadline = Deadline(config.TASK_TIMEOUT)
+
         # 定义状态回调函数
         async def status_callback(status: str, progress: int):
             """Pipeline状态回调函数"""
@@ -107,63 +192,199 @@ class BaseTryOnService(ABC):
                 progress
             )
 
-        try:
-            # 更新任务状态为处理中
-            task_info.update_status(
-                TaskStatus.PROCESSING,
-                "准备中...",
-                0
-            )
+        # 本次任务输入的签名，输入不变时才允许重新连接之前提交的远程任务
+        task_signature = self._build_task_signature(
+            image_paths, task_params, use_vl_model, vl_model, img_gen_model
+        )
 
-            # 获取Pipeline实例
-            pipeline = self._get_pipeline(
-                use_vl_model=use_vl_model,
-                download_root_path=str(task_info.task_dir),
-                vl_model_api_key=vl_model_api_key,
-                img_gen_model_api_key=img_gen_model_api_key
-            )
+        async def task_submitted_callback(dashscope_task_id: str, context: Dict[str, Any]):
+            """记录已提交的DashScope任务，轮询失败后重新提交时可重新连接"""
+            task_info.dashscope_task_id = dashscope_task_id
+            task_info.dashscope_task_signature = task_signature
+            task_info.dashscope_task_context = context
 
-            # 调用Pipeline执行任务
-            result = await pipeline.run(
-                **image_paths,
-                **task_params,
-                vl_model_name=vl_model,
-                img_gen_model_name=img_gen_model,
-                status_callback=status_callback
-            )
+        task_span_attributes = {
+            "task_id": task_info.task_id,
+            "task.type": task_info.task_type.value,
+            "vl_model": vl_model if use_vl_model else None,
+            "img_gen_model": img_gen_model,
+        }
+        # 各处理阶段（VL识别、提交、轮询、下载）的事件写入任务时间线
+        with start_span("process_task", task_span_attributes) as task_span, \
+                listen_stage_events(task_info.add_event):
+            STAGE_IN_FLIGHT.inc(stage=STAGE_TASK, model=img_gen_model)
+            task_info.add_event("started")
+            start_time = time.perf_counter()
+            pipeline = None
+            try:
+                # 更新任务状态为处理中
+                task_info.update_status(
+                    TaskStatus.PROCESSING,
+                    "准备中...",
+                    0
+                )
 
-            # 处理结果
-            self._handle_result(task_info, result)
+                # 获取Pipeline实例
+                pipeline = self._get_pipeline(
+                    use_vl_model=use_vl_model,
+                    download_root_path=str(task_info.task_dir),
+                    vl_model_api_key=vl_model_api_key,
+                    img_gen_model_api_key=img_gen_model_api_key
+                )
 
-        except FileNotFoundError as e:
-            # 文件不存在错误
-            error_msg = f"文件不存在: {str(e)}"
-            logging.error(error_msg)
-            task_info.set_error(error_msg)
+                async with deadline.enforce():
+                    # 优先重新连接之前提交且仍在运行或已成功的远程任务
+                    result = None
+                    if (task_info.dashscope_task_id
+                            and task_info.dashscope_task_signature == task_signature):
+                        result = await self._resume_remote_task(
+                            task_info, pipeline, status_callback, img_gen_model, deadline
+                        )
 
-        except ValueError as e:
-            # 参数验证错误
-            error_msg = f"参数错误: {str(e)}"
-            logging.error(error_msg)
-            task_info.set_error(error_msg)
+                    # 调用Pipeline执行任务
+                    if result is None:
+                        result = await pipeline.run(
+                            **image_paths,
+                            **task_params,
+                            vl_model_name=vl_model,
+                            img_gen_model_name=img_gen_model,
+                            status_callback=status_callback,
+                            task_submitted_callback=task_submitted_callback,
+                            deadline=deadline
+                        )
 
-        except ConnectionError as e:
-            # 网络连接错误
-            error_msg = f"网络连接失败: {str(e)}"
-            logging.error(error_msg)
-            task_info.set_error(error_msg)
+                # 处理结果
+                self._handle_result(task_info, result)
+                # 结果图和自动裁剪的细节图保存到存储后端
+                if task_info.status == TaskStatus.COMPLETED:
+                    await save_task_files(task_info.task_id, [
+                        *task_info.result_images, task_info.accessory_detail_image_path])
 
-        except TimeoutError as e:
-            # 超时错误
-            error_msg = f"请求超时: {str(e)}"
-            logging.error(error_msg)
-            task_info.set_error(error_msg)
+            except FileNotFoundError as e:
+                # 文件不存在错误
+                error_msg = f"文件不存在: {str(e)}"
+                logging.error(error_msg)
+                task_info.set_error(error_msg)
 
-        except Exception as e:
-            # 未知错误
-            error_msg = f"系统错误: {str(e)}"
-            logging.exception(f"任务处理失败: {e}")  # 记录完整堆栈
-            task_info.set_error(error_msg)
+            except ValueError as e:
+                # 参数验证错误
+                error_msg = f"参数错误: {str(e)}"
+                logging.error(error_msg)
+                task_info.set_error(error_msg)
+
+            except ConnectionError as e:
+                # 网络连接错误
+                error_msg = f"网络连接失败: {str(e)}"
+                logging.error(error_msg)
+                task_info.set_error(error_msg)
+
+            except TimeoutError as e:
+                # 超时错误
+                error_msg = f"请求超时: {str(e)}"
+                logging.error(error_msg)
+                task_info.set_error(error_msg)
+
+            except Exception as e:
+                if deadline.expired:
+                    # 按剩余预算缩短的请求超时（httpx / OpenAI SDK 的超时异常）
+                    error_msg = f"请求超时: {deadline.exceeded()}（{e!r}）"
+                    logging.error(error_msg)
+                    task_info.set_error(error_msg)
+                else:
+                    # 未知错误
+                    error_msg = f"系统错误: {str(e)}"
+                    logging.exception(f"任务处理失败: {e}")  # 记录完整堆栈
+                    task_info.set_error(error_msg)
+
+            except asyncio.CancelledError as e:
+                # 任务被取消（取消接口、删除任务或服务关闭时超时未完成）
+                if not task_info.finished:
+                    task_info.set_cancelled(e.args[0] if e.args else "任务已取消")
+                raise
+
+            finally:
+                self._release_pipeline(pipeline)
+                STAGE_IN_FLIGHT.dec(stage=STAGE_TASK, model=img_gen_model)
+                record_stage_duration(STAGE_TASK, time.perf_counter() - start_time,
+                                      img_gen_model)
+                TASKS_FINISHED.inc(task_type=task_info.task_type.value,
+                                   status=task_info.status.value,
+                                   model=img_gen_model)
+                task_span.set_attributes({
+                    "task.status": task_info.status.value,
+                    "task.error_message": task_info.error_message,
+                    "dashscope.task_id": task_info.dashscope_task_id,
+                })
+                # 统计细节图和下载结果的磁盘占用，超出配额时淘汰最久未访问的旧任务
+                task_manager.refresh_disk_usage(task_info)
+                await task_manager.enforce_disk_quota(exclude=task_info.task_id)
+
+    @staticmethod
+    def _build_task_signature(
+        image_paths: Dict[str, str],
+        task_params: Dict[str, Any],
+        use_vl_model: bool,
+        vl_model: str,
+        img_gen_model: str
+    ) -> str:
+        """根据任务输入计算签名（图片路径在上传新图片后会变化）"""
+        payload = json.dumps(
+            [image_paths, task_params, use_vl_model, vl_model, img_gen_model],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _resume_remote_task(
+        self,
+        task_info: TaskInfo,
+        pipeline,
+        status_callback,
+        img_gen_model: str = "",
+        deadline: Optional[Deadline] = None
+    ) -> Optional[Dict[str, Any]]:
+        """尝试重新连接之前提交的DashScope远程任务
+
+        远程任务仍在排队/运行或已成功时，继续轮询并下载结果，不会重新生成；
+        远程任务已失败、已过期或无法查询时返回 None，由调用方重新执行Pipeline
+
+        Args:
+            task_info: 任务信息对象
+            pipeline: Pipeline实例
+            status_callback: 状态回调函数
+            img_gen_model: 图像生成模型名称（用于指标标签）
+            deadline: 任务截止时间，默认为 None
+
+        Returns:
+            重新连接成功时返回任务结果，否则返回 None
+        """
+        dashscope_task_id = task_info.dashscope_task_id
+        img_generator = pipeline.img_generator
+        try:
+            remote = await img_generator.wan_client.get_task_result(dashscope_task_id,
+                                                                    deadline=deadline)
+        except (httpx.HTTPError, ConnectionError) as e:
+            logging.warning(f"查询远程任务 {dashscope_task_id} 失败，将重新生成: {e!r}")
+            return None
+
+        remote_status = remote.get("output", {}).get("task_status")
+        if remote_status not in ("PENDING", "RUNNING", "SUCCEEDED"):
+            logging.info(f"远程任务 {dashscope_task_id} 状态为 {remote_status}，将重新生成")
+            task_info.dashscope_task_id = None
+            return None
+
+        await status_callback("重新连接已提交的生成任务...", 50)
+        try:
+            result = await img_generator.resume_generation(
+                dashscope_task_id, model=img_gen_model, deadline=deadline
+            )
+        except Exception:
+            # 重新连接失败（如结果图片链接已过期）时清除远程任务信息，下次重新提交时重新生成
+            task_info.dashscope_task_id = None
+            raise
+
+        result.update(task_info.dashscope_task_context or {})
+        return result
 
     def _handle_result(self, task_info: TaskInfo, result: Dict[str, Any]):
         """处理Pipeline返回的结果（通用实现）"""
@@ -201,6 +422,9 @@ class BaseTryOnService(ABC):
         for key in ["accessory_type", "clothing_type", "person_position"]:
             if key in result:
                 setattr(task_info, key, result[key])
+        # 未上传细节图时由VL模型识别结果自动裁剪
+        if result.get("accessory_detail_img_path"):
+            task_info.accessory_detail_image_path = result["accessory_detail_img_path"]
 
     def start_task(
         self,
@@ -213,13 +437,15 @@ class BaseTryOnService(ABC):
         vl_model: str = "qwen3-vl-plus",
         img_gen_model: str = "wan2.6-image"
     ):
-        """启动异步任务（通用实现）"""
-        # 保存文件路径到任务信息
-        for key, path in image_paths.items():
-            setattr(task_info, f"{key}_path", path)
+        """启动异步任务（通用实现，图片路径由子类保存到任务信息）
 
+        任务截止时间从提交时开始计算，排队等待的时间同样计入 TASK_TIMEOUT
+        """
+        # 子类已更新图片路径，结果接口的内容随之变化
+        task_info.touch()
+        deadline = Deadline(config.TASK_TIMEOUT)
         # 创建异步任务
-        asyncio.create_task(
+        task = asyncio.create_task(
             self.process_task(
                 task_info=task_info,
                 image_paths=image_paths,
@@ -228,6 +454,10 @@ class BaseTryOnService(ABC):
                 vl_model_api_key=vl_model_api_key,
                 img_gen_model_api_key=img_gen_model_api_key,
                 vl_model=vl_model,
-                img_gen_model=img_gen_model
+                img_gen_model=img_gen_model,
+                deadline=deadline
             )
         )
+        task_info.attach_runner(task)
+        _running_tasks.add(task)
+        task.add_done_callback(_running_tasks.discard)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+内容寻址的上传文件存储（跨任务去重）
+
+上传文件按 SHA-256 摘要保存为唯一的 blob（BLOBS_DIR/ab/abcdef....jpg），
+任务文件夹中的文件是指向 blob 的硬链接，文件名为 "<用途>-<摘要><扩展名>"。
+同一张图片上传多次只占用一份磁盘空间、只写一次。
+
+引用计数直接使用文件系统的硬链接数：blob 的 st_nlink 为 1 时说明只剩 blob 自身，
+没有任何任务在使用，可以安全删除。不支持硬链接（例如跨文件系统）时退化为复制文件。
+blob 只占用一份磁盘空间，其总大小在这里单独统计，任务文件夹统计占用时跳过硬链接文件。
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Iterable, List
+
+import aiofiles
+
+from try_on_anything.observability.metrics import REGISTRY
+
+from ..config import get_config
+
+logger = logging.getLogger(__name__)
+
+config = get_config()
+
+# 任务文件夹中指向 blob 的文件名：<用途>-<sha256><扩展名>
+_LINKED_NAME_RE = re.compile(r"^(?P<key>[a-z_]+)-(?P<digest>[0-9a-f]{64})(?P<ext>\.[A-Za-z0-9]+)$")
+
+BLOB_WRITES = REGISTRY.counter(
+    "try_on_blob_writes_total", "上传文件写入内容寻址存储的次数（hit 表示内容已存在，无需写入）",
+    ("result",))
+
+
+def linked_filename(key: str, digest: str, ext: str) -> str:
+    """生成任务文件夹中指向 blob 的文件名"""
+    return f"{key}-{digest}{ext.lower()}"
+
+
+def parse_linked_filename(name: str) -> Optional[re.Match]:
+    """解析任务文件夹中指向 blob 的文件名，不匹配时返回 None"""
+    return _LINKED_NAME_RE.match(name)
+
+
+class BlobStore:
+    """内容寻址的上传文件存储
+
+    Args:
+        root (Path): blob 存储目录
+
+    Attributes:
+        _bytes (int): 全部 blob 的磁盘占用（字节），启动时统计一次，之后在写入和回收时增量更新
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # 全量回收在线程池中执行，占用统计需要加锁
+        self._bytes_lock = threading.Lock()
+        self._bytes = 0
+        for blob in self.root.glob("*/*"):
+            try:
+                self._bytes += blob.stat().st_size
+            except FileNotFoundError:
+                continue
+
+    @property
+    def disk_usage(self) -> int:
+        """全部 blob 的磁盘占用（字节）"""
+        return self._bytes
+
+    def _add_bytes(self, size: int) -> None:
+        with self._bytes_lock:
+            self._bytes += size
+
+    def blob_path(self, digest: str, ext: str) -> Path:
+        """根据摘要和扩展名获取 blob 路径"""
+        return self.root / digest[:2] / f"{digest}{ext.lower()}"
+
+    async def save(self, content: bytes, ext: str, task_dir: Path, key: str) -> Path:
+        """保存上传内容并链接到任务文件夹
+
+        内容已存在时只创建硬链接，不重复写入
+
+        Args:
+            content (bytes): 文件内容
+            ext (str): 文件扩展名（例如 ".jpg"）
+            task_dir (Path): 任务文件夹
+            key (str): 文件用途（例如 "person"、"clothing"），用于文件名
+
+        Returns:
+            Path: 任务文件夹中的文件路径
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        blob = self.blob_path(digest, ext)
+        target = Path(task_dir) / linked_filename(key, digest, ext)
+        if blob.exists():
+            BLOB_WRITES.inc(result="hit")
+        else:
+            BLOB_WRITES.inc(result="miss")
+            await self._write_blob(blob, content)
+        # 写入与链接之间没有 await，任务删除时的回收不会删掉刚写入的 blob；
+        # 线程中的全量回收会跳过最近修改的 blob，这里仍兜底处理 blob 被删除的情况
+        try:
+            self._link(blob, target)
+        except FileNotFoundError:
+            await self._write_blob(blob, content)
+            self._link(blob, target)
+        return target
+
+    async def _write_blob(self, blob: Path, content: bytes) -> None:
+        """先写临时文件再原子重命名，避免其他请求读到写了一半的 blob"""
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = blob.with_name(f".{blob.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(content)
+            # 并发上传相同内容时只有第一次重命名新增占用，之后的重命名只是替换为相同内容
+            existed = blob.exists()
+            os.replace(tmp_path, blob)
+            if not existed:
+                self._add_bytes(len(content))
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    @staticmethod
+    def _link(blob: Path, target: Path) -> None:
+        if target.exists():
+            if os.path.samefile(blob, target):
+                return
+            target.unlink()
+        try:
+            os.link(blob, target)
+        except OSError as e:
+            # 跨文件系统或文件系统不支持硬链接时退化为复制
+            logger.debug(f"无法创建硬链接 {target} -> {blob}（{e!r}），改为复制文件")
+            shutil.copyfile(blob, target)
+
+    def blobs_referenced_by(self, task_dir: Path) -> List[Path]:
+        """获取任务文件夹引用的 blob 路径（只读取该任务文件夹）"""
+        blobs = []
+        try:
+            with os.scandir(task_dir) as entries:
+                for entry in entries:
+                    match = parse_linked_filename(entry.name)
+                    if match:
+                        blobs.append(self.blob_path(match["digest"], match["ext"]))
+        except FileNotFoundError:
+            pass
+        return blobs
+
+    def release(self, blobs: Iterable[Path]) -> int:
+        """删除任务文件后调用，回收不再被任何任务引用的 blob
+
+        Args:
+            blobs (Iterable[Path]): 被删除任务引用过的 blob 路径
+
+        Returns:
+            int: 回收的 blob 数量
+        """
+        removed = 0
+        for blob in blobs:
+            try:
+                stat = blob.stat()
+                if stat.st_nlink <= 1:
+                    blob.unlink()
+                    self._add_bytes(-stat.st_size)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def collect_garbage(self, min_age_seconds: float = 60) -> int:
+        """遍历整个存储目录，回收没有任何任务引用的 blob（定期清理时调用）
+
+        Args:
+            min_age_seconds (float, optional): 跳过最近修改的 blob（可能刚写入还未链接），默认值为 60
+
+        Returns:
+            int: 回收的 blob 数量
+        """
+        removed = 0
+        deadline = time.time() - min_age_seconds
+        for blob in self.root.glob("*/*"):
+            try:
+                if blob.stat().st_mtime > deadline:
+                    continue
+            except FileNotFoundError:
+                continue
+            removed += self.release([blob])
+        return removed
+
+    async def collect_garbage_async(self, min_age_seconds: float = 60) -> int:
+        """在线程池中执行 collect_garbage，避免阻塞事件循环"""
+        return await asyncio.to_thread(self.collect_garbage, min_age_seconds)
+
+
+# 全局 blob 存储实例（关闭去重时为 None，上传文件直接写入任务文件夹）
+blob_store: Optional[BlobStore] = BlobStore(config.BLOBS_DIR) if config.BLOB_DEDUP_ENABLED else None
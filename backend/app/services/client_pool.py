@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+模型客户端池
+
+每个任务都新建 WanModelClient / QwenVLClient 时，连接池和 TLS 会话无法在任务之间复用，
+每个任务都要重新建立连接（QwenVLClient 还会新建一个 AsyncOpenAI 连接池）。
+客户端池按（客户端类型, API Key）复用长期存活的客户端：
+- 任务开始时 acquire 获取（不存在时创建），任务结束时 release 归还
+- 数量超过上限时按最近最少使用（LRU）淘汰空闲的客户端并关闭其连接，正在被任务使用的客户端不会被淘汰
+- 客户端的连接绑定在事件循环上，事件循环变化时丢弃全部客户端
+
+Pipeline 和图像生成器保存了任务文件夹等任务级状态，仍然每个任务创建，开销可以忽略。
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set
+
+from try_on_anything.observability.metrics import REGISTRY
+
+from ..config import get_config
+
+config = get_config()
+
+logger = logging.getLogger(__name__)
+
+# 客户端池获取次数（hit 表示复用已有客户端，miss 表示新建）和淘汰次数
+CLIENT_POOL_EVENTS = REGISTRY.counter(
+    "try_on_client_pool_events_total", "模型客户端池事件数量（hit/miss/evict）",
+    ("client", "event"))
+
+
+class _PoolEntry:
+    __slots__ = ("key", "client", "leases")
+
+    def __init__(self, key: Hashable, client: Any):
+        self.key = key
+        self.client = client
+        # 正在使用该客户端的任务数
+        self.leases = 0
+
+
+class ClientPool:
+    """按键复用的客户端池（LRU 淘汰空闲客户端）
+
+    Args:
+        max_size (int): 最多保留的客户端数量
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, _PoolEntry]" = OrderedDict()
+        # 客户端对象ID -> 池条目，归还时按客户端查找
+        self._by_client: Dict[int, _PoolEntry] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 正在关闭被淘汰客户端的后台任务（保留引用，避免被垃圾回收）
+        self._closing: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def acquire(self, client_class: type, api_key: Optional[str]) -> Any:
+        """获取客户端（不存在时创建），使用完毕后需要调用 release 归还
+
+        Args:
+            client_class (type): 客户端类型（WanModelClient / QwenVLClient）
+            api_key (str, optional): API Key，None 表示使用环境变量中的默认 API Key
+
+        Returns:
+            Any: 客户端实例
+
+        Raises:
+            ValueError: 创建客户端失败时（例如未提供 API Key）
+        """
+        self._check_loop()
+        key = (client_class.__name__, api_key)
+        entry = self._entries.get(key)
+        if entry is None:
+            client = client_class(api_key=api_key)
+            entry = _PoolEntry(key, client)
+            self._entries[key] = entry
+            self._by_client[id(client)] = entry
+            CLIENT_POOL_EVENTS.inc(client=client_class.__name__, event="miss")
+        else:
+            self._entries.move_to_end(key)
+            CLIENT_POOL_EVENTS.inc(client=client_class.__name__, event="hit")
+        entry.leases += 1
+        self._evict_idle()
+        return entry.client
+
+    def release(self, client: Any) -> None:
+        """归还客户端（不是从池中获取的客户端会被忽略）
+
+        Args:
+            client (Any): acquire 返回的客户端，None 时不做任何操作
+        """
+        entry = self._by_client.get(id(client)) if client is not None else None
+        if entry is None or entry.client is not client:
+            return
+        entry.leases = max(entry.leases - 1, 0)
+        self._evict_idle()
+
+    def clients(self) -> List[Any]:
+        """当前池中的全部客户端"""
+        return [entry.client for entry in self._entries.values()]
+
+    async def aclose(self) -> None:
+        """关闭池中全部客户端（服务关闭时调用，此时任务应已结束）"""
+        entries = list(self._entries.values())
+        self._entries.clear()
+        self._by_client.clear()
+        if self._loop is not asyncio.get_running_loop():
+            return
+        await asyncio.gather(*[self._close(entry.client) for entry in entries], *self._closing)
+
+    def _check_loop(self) -> None:
+        """事件循环变化时丢弃旧事件循环上创建的客户端（旧循环已关闭，无法再关闭其连接）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._entries.clear()
+            self._by_client.clear()
+            self._closing.clear()
+            self._loop = loop
+
+    def _evict_idle(self) -> None:
+        """超过数量上限时，按最近最少使用顺序淘汰空闲客户端"""
+        if len(self._entries) <= self.max_size:
+            return
+        for entry in [e for e in self._entries.values() if e.leases == 0]:
+            if len(self._entries) <= self.max_size:
+                break
+            del self._entries[entry.key]
+            del self._by_client[id(entry.client)]
+            CLIENT_POOL_EVENTS.inc(client=entry.key[0], event="evict")
+            task = asyncio.get_running_loop().create_task(self._close(entry.client))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(client: Any) -> None:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭被淘汰的客户端失败: {e!r}")
+
+
+# 全局客户端池
+client_pool = ClientPool(max_size=config.CLIENT_POOL_MAX_SIZE)
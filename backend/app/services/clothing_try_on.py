@@ -32,7 +32,8 @@ class ClothingTryOnService(BaseTryOnService):
         vl_model_api_key: Optional[str] = None,
         img_gen_model_api_key: Optional[str] = None,
         vl_model: str = "qwen3-vl-plus",
-        img_gen_model: str = "wan2.6-image"
+        img_gen_model: str = "wan2.6-image",
+        seed: Optional[int] = None
     ):
         """启动服装试穿任务
 
@@ -47,6 +48,7 @@ class ClothingTryOnService(BaseTryOnService):
             img_gen_model_api_key: 图像生成模型API Key
             vl_model: VL模型名称
             img_gen_model: 图像生成模型名称
+            seed: 图像生成随机数种子（可选，指定时可使用生成结果缓存）
         """
         # 准备图片路径字典
         image_paths = {
@@ -57,7 +59,8 @@ class ClothingTryOnService(BaseTryOnService):
         # 准备任务参数字典
         task_params = {
             "clothing_type": clothing_type,
-            "person_position": person_position
+            "person_position": person_position,
+            "seed": seed
         }
 
         # 保存路径到任务信息
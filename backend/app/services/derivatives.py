@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+图片派生图服务（缩略图 / WebP / AVIF）
+
+前端展示预览时不需要下载数 MB 的原图和生成图。派生图按固定宽度档位和格式按需生成：
+第一次请求时在工作线程池中解码、缩放、编码（Pillow 在这些操作中会释放 GIL），
+结果缓存在任务文件夹的 derived 子目录中，之后直接返回缓存文件，随任务一起删除。
+
+派生图文件名和地址中包含源文件版本（修改时间和大小），细节图等会被重新提交覆盖的源文件
+更新后得到新的派生图和新地址，因此地址中的版本与源文件一致时可以使用长期缓存（immutable）。
+"""
+import asyncio
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from PIL import Image, ImageOps, features
+
+from try_on_anything.observability.metrics import REGISTRY
+
+from ..config import get_config
+
+config = get_config()
+
+# 派生图缓存子目录（位于任务文件夹中）
+DERIVED_DIR_NAME = "derived"
+
+# 输出格式 -> (Pillow 格式名, 扩展名, Content-Type, 编码参数)
+_FORMATS = {
+    "webp": ("WEBP", ".webp", "image/webp", {"quality": 80, "method": 4}),
+    "avif": ("AVIF", ".avif", "image/avif", {"quality": 60, "speed": 8}),
+    "jpeg": ("JPEG", ".jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# 带透明通道的图片转为 JPEG 时使用的背景色
+_JPEG_BACKGROUND = (255, 255, 255)
+
+DERIVATIVE_REQUESTS = REGISTRY.counter(
+    "try_on_derivative_requests_total", "派生图请求次数（hit 表示命中缓存，miss 表示新生成）",
+    ("format", "result"))
+
+
+def supported_formats() -> List[str]:
+    """当前 Pillow 支持输出的派生图格式（AVIF 需要 Pillow 编译时带有 libavif）"""
+    return [fmt for fmt in _FORMATS
+            if fmt == "jpeg" or features.check(fmt)]
+
+
+def render_derivative(source: Path, target: Path, width: int, fmt: str) -> Path:
+    """生成单个派生图（同步，在工作线程中执行）
+
+    先写入临时文件再重命名，并发读取时不会拿到写了一半的文件
+
+    Args:
+        source (Path): 源图片路径
+        target (Path): 派生图输出路径
+        width (int): 目标宽度（源图更窄时保持原宽度，不放大）
+        fmt (str): 输出格式（webp/avif/jpeg）
+
+    Returns:
+        Path: 派生图路径
+    """
+    pil_format, _, _, save_kwargs = _FORMATS[fmt]
+    with Image.open(source) as img:
+        # JPEG 可在解码时直接按 1/2、1/4、1/8 缩小，大图生成缩略图时可节省大部分解码时间
+        # （请求正方形尺寸，EXIF 旋转后宽度仍不小于目标宽度）
+        img.draft(None, (width, width))
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.Resampling.LANCZOS)
+
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if fmt == "jpeg" and has_alpha:
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, _JPEG_BACKGROUND)
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        elif img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if has_alpha else "RGB")
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            img.save(tmp_path, format=pil_format, **save_kwargs)
+            os.replace(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    return target
+
+
+class DerivativeService:
+    """按需生成并缓存图片派生图
+
+    Args:
+        widths (List[int]): 允许的宽度档位
+        max_workers (int, optional): 工作线程数，默认值为 2
+    """
+
+    def __init__(self, widths: List[int], max_workers: int = 2):
+        self.widths = sorted(set(widths))
+        self.formats = supported_formats()
+        self.max_workers = max_workers
+        # 工作线程池在第一次生成时创建，关闭后再次使用会重新创建
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 正在生成的派生图，相同派生图的并发请求共用一次生成
+        self._inflight: Dict[Path, asyncio.Future] = {}
+
+    @staticmethod
+    def source_version(source: Path) -> str:
+        """源文件版本（修改时间和大小），源文件被覆盖后版本随之变化
+
+        Raises:
+            FileNotFoundError: 源文件不存在时
+        """
+        stat = Path(source).stat()
+        return f"{stat.st_mtime_ns:x}{stat.st_size:x}"
+
+    @staticmethod
+    def derived_path(task_dir: Path, filename: str, width: int, fmt: str, version: str) -> Path:
+        """派生图缓存路径：<任务文件夹>/derived/<源文件名>.<源文件版本>.w<宽度><扩展名>"""
+        return (task_dir / DERIVED_DIR_NAME
+                / f"{Path(filename).name}.{version}.w{width}{_FORMATS[fmt][1]}")
+
+    @staticmethod
+    def media_type(fmt: str) -> str:
+        """派生图的 Content-Type"""
+        return _FORMATS[fmt][2]
+
+    def validate(self, width: int, fmt: str) -> Optional[str]:
+        """校验宽度和格式，不合法时返回错误描述"""
+        if width not in self.widths:
+            return f"不支持的宽度 {width}，可选值: {', '.join(map(str, self.widths))}"
+        if fmt not in self.formats:
+            return f"不支持的格式 {fmt}，可选值: {', '.join(self.formats)}"
+        return None
+
+    async def get(self, task_dir: Path, filename: str, width: int, fmt: str) -> Path:
+        """获取源文件当前版本的派生图，不存在时在工作线程池中生成
+
+        Args:
+            task_dir (Path): 任务文件夹
+            filename (str): 源图片文件名（任务文件夹中的文件）
+            width (int): 宽度档位
+            fmt (str): 输出格式
+
+        Returns:
+            Path: 派生图路径
+
+        Raises:
+            FileNotFoundError: 源图片不存在时
+        """
+        source = task_dir / filename
+        if not source.is_file():
+            raise FileNotFoundError(source)
+        target = self.derived_path(task_dir, filename, width, fmt, self.source_version(source))
+        if target.is_file():
+            DERIVATIVE_REQUESTS.inc(format=fmt, result="hit")
+            return target
+
+        pending = self._inflight.get(target)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="derivative")
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, render_derivative, source, target, width, fmt)
+        self._inflight[target] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._inflight.pop(target, None)
+            else:
+                # 请求被取消时生成仍在继续，完成后再移除
+                future.add_done_callback(lambda _: self._inflight.pop(target, None))
+        DERIVATIVE_REQUESTS.inc(format=fmt, result="miss")
+        return result
+
+    def url(self, task_id: str, path: str, width: int, fmt: str) -> str:
+        """派生图访问地址（本地源文件存在时附带源文件版本 v，源文件更新后地址随之变化）"""
+        url = (f"{config.API_PREFIX}/derivatives/{quote(task_id)}/{quote(Path(path).name)}"
+               f"?w={width}&format={fmt}")
+        try:
+            return f"{url}&v={self.source_version(path)}"
+        except OSError:
+            return url
+
+    def srcset(self, task_id: str, path: str) -> Dict[str, str]:
+        """各格式所有宽度档位的 srcset，例如 {"webp": "<url> 256w, <url> 512w"}"""
+        return {fmt: ", ".join(f"{self.url(task_id, path, width, fmt)} {width}w"
+                               for width in self.widths)
+                for fmt in self.formats}
+
+    def shutdown(self) -> None:
+        """关闭工作线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局派生图服务实例
+derivative_service = DerivativeService(config.DERIVATIVE_WIDTHS,
+                                       max_workers=config.DERIVATIVE_WORKERS)
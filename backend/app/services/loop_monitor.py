@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+事件循环延迟与阻塞调用检测（诊断模式）
+
+- 采样协程：按固定间隔在事件循环中休眠，实际唤醒时间与预期时间之差即为事件循环延迟
+- 看门狗线程：采样协程长时间没有心跳时（说明事件循环被同步调用阻塞），
+  通过 sys._current_frames() 抓取事件循环线程当前的调用栈
+- 事件循环恢复后，将本次阻塞时长归到抓取到的调用栈上，按代码位置汇总阻塞次数和总时长
+
+开启方式：设置环境变量 LOOP_MONITOR_ENABLED=1，结果通过 /api/diagnostics/event-loop 查看
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# 优先定位到本项目代码中的调用位置（跳过标准库和第三方库的栈帧）
+_PROJECT_MARKERS = (f"{os.sep}backend{os.sep}", f"{os.sep}try_on_anything{os.sep}")
+# 每个阻塞点保留的调用栈帧数
+_STACK_DEPTH = 20
+
+
+class LoopMonitor:
+    """事件循环延迟与阻塞调用检测器
+
+    Args:
+        threshold (float, optional): 阻塞判定阈值（秒），事件循环延迟超过该值时记录调用栈，默认值为 0.1
+        sample_interval (float, optional): 采样间隔（秒），默认值为 0.05
+        max_samples (int, optional): 用于计算分位数的最近延迟样本数，默认值为 2000
+        max_offenders (int, optional): 最多保留的阻塞点数量，默认值为 100
+    """
+
+    def __init__(self,
+                 threshold: float = 0.1,
+                 sample_interval: float = 0.05,
+                 max_samples: int = 2000,
+                 max_offenders: int = 100):
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.max_offenders = max_offenders
+        self._lags: deque = deque(maxlen=max_samples)
+        self._offenders: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._total_samples = 0
+        self._blocked_events = 0
+        self._max_lag = 0.0
+        self._started_at: Optional[datetime] = None
+
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._pending_stack: Optional[traceback.StackSummary] = None
+        self._sampler: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._sampler is not None and not self._sampler.done()
+
+    def start(self) -> None:
+        """在当前事件循环中启动采样协程和看门狗线程（需在事件循环中调用）"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._started_at = datetime.now()
+        self._stop_event.clear()
+        self._sampler = asyncio.get_running_loop().create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        logger.info(f"事件循环监控已启动，阻塞阈值 {self.threshold * 1000:.0f}ms")
+
+    async def stop(self) -> None:
+        """停止采样协程和看门狗线程"""
+        self._stop_event.set()
+        if self._sampler:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except asyncio.CancelledError:
+                pass
+            self._sampler = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.sample_interval
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.sample_interval)
+            self._record_lag(max(0.0, loop.time() - expected))
+
+    def _watch(self) -> None:
+        """看门狗线程：心跳超时说明事件循环被阻塞，抓取事件循环线程的调用栈"""
+        check_interval = max(0.005, min(self.sample_interval, self.threshold / 2))
+        while not self._stop_event.wait(check_interval):
+            stalled = time.monotonic() - self._heartbeat - self.sample_interval
+            if stalled < self.threshold:
+                continue
+            with self._lock:
+                if self._pending_stack is not None:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame, limit=_STACK_DEPTH)
+            with self._lock:
+                self._pending_stack = stack
+
+    def _record_lag(self, lag: float) -> None:
+        with self._lock:
+            self._total_samples += 1
+            self._lags.append(lag)
+            self._max_lag = max(self._max_lag, lag)
+            stack, self._pending_stack = self._pending_stack, None
+            if lag < self.threshold:
+                return
+            self._blocked_events += 1
+            location = self._locate(stack) if stack else "<未抓取到调用栈>"
+            offender = self._offenders.get(location)
+            if offender is None:
+                if len(self._offenders) >= self.max_offenders:
+                    # 淘汰累计阻塞时间最短的阻塞点
+                    weakest = min(self._offenders, key=lambda k: self._offenders[k]["total_blocked_ms"])
+                    del self._offenders[weakest]
+                offender = self._offenders[location] = {
+                    "location": location,
+                    "count": 0,
+                    "total_blocked_ms": 0.0,
+                    "max_blocked_ms": 0.0,
+                }
+            lag_ms = lag * 1000
+            offender["count"] += 1
+            offender["total_blocked_ms"] += lag_ms
+            offender["max_blocked_ms"] = max(offender["max_blocked_ms"], lag_ms)
+            offender["last_seen"] = datetime.now().isoformat(timespec="seconds")
+            if stack:
+                offender["stack"] = [f"{f.filename}:{f.lineno} in {f.name}" for f in stack]
+
+        stack_text = "".join(stack.format()) if stack else "<未抓取到调用栈>\n"
+        logger.warning(f"事件循环被阻塞 {lag_ms:.0f}ms，阻塞位置: {location}\n{stack_text}")
+
+    @staticmethod
+    def _locate(stack: traceback.StackSummary) -> str:
+        """取调用栈中最内层的项目代码位置，没有项目代码时取最内层栈帧"""
+        for frame in reversed(stack):
+            if any(marker in frame.filename for marker in _PROJECT_MARKERS):
+                return f"{frame.filename}:{frame.lineno} in {frame.name}"
+        frame = stack[-1]
+        return f"{frame.filename}:{frame.lineno} in {frame.name}"
+
+    def snapshot(self, top: int = 20) -> Dict[str, Any]:
+        """获取监控统计
+
+        Args:
+            top (int, optional): 返回累计阻塞时间最长的前 top 个阻塞点，默认值为 20
+
+        Returns:
+            Dict[str, Any]: 延迟分位数、阻塞次数和阻塞点列表
+        """
+        with self._lock:
+            lags = sorted(self._lags)
+            offenders = sorted(self._offenders.values(),
+                               key=lambda o: o["total_blocked_ms"], reverse=True)[:top]
+            offenders = [dict(o) for o in offenders]
+            total_samples = self._total_samples
+            blocked_events = self._blocked_events
+            max_lag = self._max_lag
+
+        def _percentile(q: float) -> Optional[float]:
+            if not lags:
+                return None
+            return round(lags[min(len(lags) - 1, int(q * len(lags)))] * 1000, 3)
+
+        for offender in offenders:
+            offender["total_blocked_ms"] = round(offender["total_blocked_ms"], 3)
+            offender["max_blocked_ms"] = round(offender["max_blocked_ms"], 3)
+
+        return {
+            "running": self.running,
+            "started_at": self._started_at.isoformat(timespec="seconds") if self._started_at else None,
+            "threshold_ms": self.threshold * 1000,
+            "sample_interval_ms": self.sample_interval * 1000,
+            "total_samples": total_samples,
+            "blocked_events": blocked_events,
+            "lag_ms": {
+                "mean": round(statistics.fmean(lags) * 1000, 3) if lags else None,
+                "p50": _percentile(0.50),
+                "p99": _percentile(0.99),
+                "max": round(max_lag * 1000, 3),
+            },
+            "offenders": offenders,
+        }
+
+    def reset(self) -> None:
+        """清空统计数据"""
+        with self._lock:
+            self._lags.clear()
+            self._offenders.clear()
+            self._total_samples = 0
+            self._blocked_events = 0
+            self._max_lag = 0.0
+            self._pending_stack = None
+
+
+# 全局事件循环监控实例（仅在诊断模式开启时启动）
+loop_monitor: Optional[LoopMonitor] = None
+
+
+def get_loop_monitor() -> Optional[LoopMonitor]:
+    """获取全局事件循环监控实例，诊断模式未开启时返回 None"""
+    return loop_monitor
+
+
+def create_loop_monitor(threshold: float, sample_interval: float) -> LoopMonitor:
+    """创建全局事件循环监控实例
+
+    Args:
+        threshold (float): 阻塞判定阈值（秒）
+        sample_interval (float): 采样间隔（秒）
+
+    Returns:
+        LoopMonitor: 事件循环监控实例
+    """
+    global loop_monitor
+    loop_monitor = LoopMonitor(threshold=threshold, sample_interval=sample_interval)
+    return loop_monitor
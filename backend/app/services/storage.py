@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+任务文件存储
+
+任务处理始终在本地任务文件夹中进行（图像编码、细节图裁剪都需要本地文件），
+任务文件（上传图片、细节图、生成结果）同时以 "<任务ID>/<文件名>" 为键保存到存储后端：
+- local：存储根目录就是任务数据目录，不会重复复制，通过 /api/tasks 静态文件访问
+- s3：上传到 S3 兼容对象存储，接口返回预签名 URL，任务文件不再只能由处理它的机器提供
+"""
+import asyncio
+import logging
+from pathlib import Path
+from typing import Iterable, Optional
+
+from try_on_anything.storage import Storage, LocalStorage, S3Storage
+
+from ..config import get_config
+
+logger = logging.getLogger(__name__)
+
+config = get_config()
+
+# 后台删除任务的引用，避免任务在完成前被垃圾回收
+_background_tasks: set = set()
+
+
+def create_storage() -> Storage:
+    """根据配置创建存储后端
+
+    Raises:
+        ValueError: 当存储后端名称不支持或 S3 配置缺失时
+    """
+    backend = config.STORAGE_BACKEND.lower()
+    if backend == "local":
+        return LocalStorage(config.TASKS_DIR, url_prefix=f"{config.API_PREFIX}/tasks")
+    if backend == "s3":
+        if not (config.S3_ENDPOINT_URL and config.S3_ACCESS_KEY_ID and config.S3_SECRET_ACCESS_KEY):
+            raise ValueError("使用 s3 存储时需要设置 S3_ENDPOINT_URL、S3_ACCESS_KEY_ID 和 S3_SECRET_ACCESS_KEY")
+        return S3Storage(
+            endpoint_url=config.S3_ENDPOINT_URL,
+            bucket=config.S3_BUCKET,
+            access_key=config.S3_ACCESS_KEY_ID,
+            secret_key=config.S3_SECRET_ACCESS_KEY,
+            region=config.S3_REGION,
+            public_endpoint_url=config.S3_PUBLIC_ENDPOINT_URL,
+            presign_expires=config.S3_PRESIGN_EXPIRES,
+        )
+    raise ValueError(f"不支持的存储后端: {config.STORAGE_BACKEND}，可选值: local、s3")
+
+
+def task_file_key(task_id: str, path: str) -> str:
+    """任务文件在存储中的键"""
+    return f"{task_id}/{Path(path).name}"
+
+
+def task_file_url(task_id: str, path: str) -> str:
+    """任务文件的访问地址"""
+    return storage.url(task_file_key(task_id, path))
+
+
+async def save_task_files(task_id: str, paths: Iterable[Optional[str]]) -> None:
+    """将本地任务文件保存到存储后端（本地存储时为空操作）
+
+    Args:
+        task_id (str): 任务ID
+        paths (Iterable[Optional[str]]): 本地文件路径，None 或不存在的文件会被跳过
+    """
+    if not storage.remote:
+        return
+    for path in paths:
+        if path and Path(path).is_file():
+            await storage.put_file(task_file_key(task_id, path), Path(path))
+
+
+def schedule_delete_task_files(task_id: str) -> None:
+    """删除任务时在后台删除远程存储中的任务文件（本地存储随任务文件夹一起删除）"""
+    if not storage.remote:
+        return
+
+    async def _delete():
+        try:
+            await storage.delete_prefix(f"{task_id}/")
+        except Exception as e:
+            logger.warning(f"删除任务 {task_id} 的远程文件失败: {e!r}")
+
+    try:
+        task = asyncio.get_running_loop().create_task(_delete())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    except RuntimeError:
+        logger.warning(f"当前没有运行中的事件循环，未删除任务 {task_id} 的远程文件")
+
+
+# 全局存储后端实例
+storage: Storage = create_storage()
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+任务二级索引（按创建时间排序，支持游标分页）
+
+每个任务的排序键为 (创建时间戳, 任务ID)，全局索引和每个二级索引（任务类型、状态、租户）
+都是按排序键有序的列表：
+- 分页查询时选择筛选条件中最短的索引列表，二分查找定位到游标/时间范围的起点，
+  顺序取出下一页并用其余筛选条件逐个校验，不需要遍历全部任务
+- 任务状态变化时只在两个状态列表之间移动一个键（二分查找定位）
+
+索引只在事件循环线程中修改（任务创建、删除、状态变化），不需要额外加锁。
+"""
+import base64
+import binascii
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..schemas import TaskStatus, TaskType
+
+# 排序键：(创建时间戳, 任务ID)
+SortKey = Tuple[float, str]
+
+
+def encode_cursor(key: SortKey) -> str:
+    """将排序键编码为不透明的分页游标"""
+    return base64.urlsafe_b64encode(f"{key[0]!r}|{key[1]}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """解析分页游标
+
+    Raises:
+        ValueError: 游标格式错误时
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, task_id = raw.split("|", 1)
+        return float(timestamp), task_id
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+def _remove(keys: List[SortKey], key: SortKey) -> None:
+    i = bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+class TaskIndex:
+    """任务二级索引
+
+    Args:
+        get_task (Callable): 按任务ID获取任务信息的函数（用于校验未被选中的筛选条件）
+    """
+
+    def __init__(self, get_task: Callable[[str], Optional[object]]):
+        self._get_task = get_task
+        self._all: List[SortKey] = []
+        self._by_type: Dict[TaskType, List[SortKey]] = {}
+        self._by_status: Dict[TaskStatus, List[SortKey]] = {}
+        self._by_tenant: Dict[str, List[SortKey]] = {}
+        # 各（任务类型, 状态）的任务数量，抓取指标时直接读取
+        self._counts: Dict[Tuple[TaskType, TaskStatus], int] = {}
+
+    @staticmethod
+    def sort_key(task_info) -> SortKey:
+        return task_info.created_at.timestamp(), task_info.task_id
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def add(self, task_info) -> None:
+        """加入任务（任务创建时调用）"""
+        key = self.sort_key(task_info)
+        insort(self._all, key)
+        insort(self._by_type.setdefault(task_info.task_type, []), key)
+        insort(self._by_status.setdefault(task_info.status, []), key)
+        self._count(task_info.task_type, task_info.status, 1)
+        if task_info.tenant:
+            insort(self._by_tenant.setdefault(task_info.tenant, []), key)
+
+    def remove(self, task_info) -> None:
+        """移除任务（任务删除时调用）"""
+        key = self.sort_key(task_info)
+        i = bisect_left(self._all, key)
+        if i == len(self._all) or self._all[i] != key:
+            return
+        del self._all[i]
+        self._count(task_info.task_type, task_info.status, -1)
+        for index, value in ((self._by_type, task_info.task_type),
+                             (self._by_status, task_info.status),
+                             (self._by_tenant, task_info.tenant)):
+            keys = index.get(value)
+            if keys is not None:
+                _remove(keys, key)
+                if not keys:
+                    del index[value]
+
+    def status_changed(self, task_info, old_status: TaskStatus) -> None:
+        """任务状态变化时，将任务从旧状态列表移动到新状态列表"""
+        key = self.sort_key(task_info)
+        keys = self._by_status.get(old_status)
+        if keys is not None:
+            _remove(keys, key)
+            if not keys:
+                del self._by_status[old_status]
+        insort(self._by_status.setdefault(task_info.status, []), key)
+        self._count(task_info.task_type, old_status, -1)
+        self._count(task_info.task_type, task_info.status, 1)
+
+    def _count(self, task_type: TaskType, status: TaskStatus, delta: int) -> None:
+        self._counts[(task_type, status)] = self._counts.get((task_type, status), 0) + delta
+
+    def oldest(self) -> Optional[str]:
+        """最早创建的任务ID"""
+        return self._all[0][1] if self._all else None
+
+    def count(self, task_type: TaskType, status: TaskStatus) -> int:
+        """指定类型和状态的任务数量"""
+        return self._counts.get((task_type, status), 0)
+
+    def _matches(self, task_id: str, task_type: Optional[TaskType] = None,
+                 status: Optional[TaskStatus] = None, tenant: Optional[str] = None) -> bool:
+        task_info = self._get_task(task_id)
+        return (task_info is not None
+                and (task_type is None or task_info.task_type == task_type)
+                and (status is None or task_info.status == status)
+                and (tenant is None or task_info.tenant == tenant))
+
+    def query(self,
+              task_type: Optional[TaskType] = None,
+              status: Optional[TaskStatus] = None,
+              tenant: Optional[str] = None,
+              created_after: Optional[float] = None,
+              created_before: Optional[float] = None,
+              cursor: Optional[SortKey] = None,
+              limit: int = 50,
+              newest_first: bool = True) -> Tuple[List[str], Optional[SortKey]]:
+        """按筛选条件分页查询任务ID
+
+        Args:
+            task_type (TaskType, optional): 任务类型，默认值为 None（不筛选）
+            status (TaskStatus, optional): 任务状态，默认值为 None（不筛选）
+            tenant (str, optional): 租户（API Key 哈希），默认值为 None（不筛选）
+            created_after (float, optional): 创建时间下界（时间戳，包含），默认值为 None
+            created_before (float, optional): 创建时间上界（时间戳，不包含），默认值为 None
+            cursor (SortKey, optional): 上一页返回的游标，默认值为 None（第一页）
+            limit (int, optional): 每页数量，默认值为 50
+            newest_first (bool, optional): 是否按创建时间从新到旧排序，默认值为 True
+
+        Returns:
+            Tuple[List[str], Optional[SortKey]]: 本页任务ID，以及下一页游标（没有下一页时为 None）
+        """
+        # 选择最短的索引列表作为扫描对象，其余条件逐个校验
+        candidates: List[Tuple[List[SortKey], Optional[str]]] = [(self._all, None)]
+        if task_type is not None:
+            candidates.append((self._by_type.get(task_type, []), "task_type"))
+        if status is not None:
+            candidates.append((self._by_status.get(status, []), "status"))
+        if tenant is not None:
+            candidates.append((self._by_tenant.get(tenant, []), "tenant"))
+        keys, scanned = min(candidates, key=lambda c: len(c[0]))
+        filters = {"task_type": task_type, "status": status, "tenant": tenant}
+        if scanned is not None:
+            filters[scanned] = None
+        check = any(value is not None for value in filters.values())
+
+        # 时间范围和游标共同确定扫描区间 [lo, hi)
+        lo = 0 if created_after is None else bisect_left(keys, (created_after, ""))
+        hi = len(keys) if created_before is None else bisect_left(keys, (created_before, ""))
+        if cursor is not None:
+            if newest_first:
+                hi = min(hi, bisect_left(keys, cursor))
+            else:
+                lo = max(lo, bisect_right(keys, cursor))
+
+        positions = range(hi - 1, lo - 1, -1) if newest_first else range(lo, hi)
+        page: List[str] = []
+        last_key: Optional[SortKey] = None
+        for i in positions:
+            key = keys[i]
+            if check and not self._matches(key[1], **filters):
+                continue
+            if len(page) == limit:
+                # 还有下一条匹配的任务，返回游标
+                return page, last_key
+            page.append(key[1])
+            last_key = key
+        return page, None
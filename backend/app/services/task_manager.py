@@ -3,39 +3,71 @@
 任务管理器 - 管理异步任务的状态和结果
 """
 import asyncio
+import hashlib
+import os
 import shutil
 import logging
-from typing import Dict, Any, Optional, Tuple
+import time
+from array import array
+from typing import Dict, Any, Optional, Tuple, List, Callable
 from datetime import datetime
 from pathlib import Path
 import uuid
 
+from try_on_anything.observability.metrics import REGISTRY
+
 from ..schemas import TaskStatus, TaskType
-from ..config import Config
+from ..config import get_config
+from .blob_store import blob_store
+from .derivatives import DERIVED_DIR_NAME
+from .task_index import TaskIndex, SortKey
+from .storage import schedule_delete_task_files
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
 # 声明配置实例
-config = Config()
+config = get_config()
+
+# 时间线事件：(相对任务创建的毫秒数, 事件名称, 事件详情)
+TimelineEvent = Tuple[float, str, Optional[str]]
+# 任务结束事件，时间线已满时仍然记录
+_TERMINAL_EVENTS = {"completed", "failed", "cancelled"}
+# 任务已结束的状态（不能再取消）
+FINISHED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+# (事件名称, 事件详情) 取值种类很少，所有任务共享同一个元组对象，时间线每个事件只占一个指针
+_EVENT_KEYS: Dict[Tuple[str, Optional[str]], Tuple[str, Optional[str]]] = {}
+_EVENT_KEYS_LIMIT = 4096
+
+
+def tenant_key_hash(api_key: Optional[str]) -> Optional[str]:
+    """计算租户标识：API Key 的 SHA-256 前 16 位十六进制（不保存 Key 本身），未提供 Key 时返回 None"""
+    if not api_key or not api_key.strip():
+        return None
+    return hashlib.sha256(api_key.strip().encode("utf-8")).hexdigest()[:16]
 
 
 class TaskInfo:
     """任务信息类
 
+    使用 __slots__ 存储，不为每个实例创建 __dict__；任务结果只保留接口需要的本地结果图路径，
+    不保存完整的 DashScope 响应，保留大量任务时内存占用更小。
+
     Args:
         task_id (str): 任务ID
         task_dir (Path): 任务专属文件夹路径
         task_type (TaskType): 任务类型（饰品试戴或服装穿戴）
+        tenant (Optional[str], optional): 租户标识（提交任务时 API Key 的哈希，使用服务端默认 Key 时为 None），默认值为 None
 
     Attributes:
-        status (TaskStatus): 任务状态
+        status (TaskStatus): 任务状态（变化时通知任务管理器更新状态索引）
         message (str): 任务状态描述
         progress (int): 任务进度百分比
-        result (Optional[Dict[str, Any]]): 任务结果
+        result_images (Tuple[str, ...]): 下载到本地的结果图路径
         error_message (Optional[str]): 任务错误信息
         created_at (datetime): 任务创建时间
         updated_at (datetime): 任务最后更新时间
+        version (int): 任务状态版本号，状态、进度、结果或错误每次变化时加 1（用于 ETag 和长轮询）
         person_image_path (Optional[str]): 人物图片路径
         person_position (Optional[str]): 识别出的穿戴位置
         accessory_image_path (Optional[str]): 饰品图片路径（饰品任务）
@@ -43,22 +75,61 @@ class TaskInfo:
         accessory_type (Optional[str]): 识别出的饰品类型（饰品任务）
         clothing_image_path (Optional[str]): 服装图片路径（服装任务）
         clothing_type (Optional[str]): 识别出的服装类型（服装任务）
+        dashscope_task_id (Optional[str]): 已提交的 DashScope 图像生成任务ID
+        dashscope_task_signature (Optional[str]): 提交 DashScope 任务时的输入签名（图片路径、参数等）
+        dashscope_task_context (Optional[Dict[str, Any]]): 提交 DashScope 任务时使用的识别信息
+        timeline (List[TimelineEvent]): 只追加的阶段事件时间线，时间为相对任务创建的单调时钟毫秒数（只读）
+        timeline_dropped (int): 时间线已满后丢弃的事件数
+        disk_bytes (int): 任务文件夹已统计的磁盘占用（字节）
+        last_accessed (float): 最近一次访问任务的单调时钟时间，磁盘超出配额时优先淘汰最久未访问的任务
+        runner (Optional[asyncio.Task]): 正在处理该任务的协程任务（处理结束后为 None），取消任务时取消它
     """
 
-    def __init__(self, task_id: str, task_dir: Path, task_type: TaskType):
+    __slots__ = (
+        "task_id", "task_dir", "task_type", "tenant",
+        "_status", "_status_listener", "message", "progress", "result_images", "error_message",
+        "created_at", "updated_at", "version", "_changed",
+        "_created_monotonic", "_timeline_ms", "_timeline_events", "timeline_dropped",
+        "disk_bytes", "last_accessed", "runner",
+        "person_image_path", "person_position",
+        "accessory_image_path", "accessory_detail_image_path", "accessory_type",
+        "clothing_image_path", "clothing_type",
+        "dashscope_task_id", "dashscope_task_signature", "dashscope_task_context",
+    )
+
+    def __init__(self, task_id: str, task_dir: Path, task_type: TaskType,
+                 tenant: Optional[str] = None):
         # 基础信息
         self.task_id: str = task_id
         self.task_dir: Path = task_dir
         self.task_type: TaskType = task_type
+        self.tenant: Optional[str] = tenant
 
         # 任务状态信息
-        self.status: TaskStatus = TaskStatus.PENDING
+        self._status: TaskStatus = TaskStatus.PENDING
+        # 状态变化回调 (任务信息, 旧状态)，由任务管理器设置，用于维护状态索引
+        self._status_listener: Optional[Callable[["TaskInfo", TaskStatus], None]] = None
         self.message: str = "任务已创建，等待处理"
         self.progress: int = 0
-        self.result: Optional[Dict[str, Any]] = None
+        self.result_images: Tuple[str, ...] = ()
         self.error_message: Optional[str] = None
         self.created_at: datetime = datetime.now()
-        self.updated_at: datetime = datetime.now()
+        self.updated_at: datetime = self.created_at
+        self.version: int = 0
+        # 等待状态变化的请求共用的事件，变化时唤醒并替换为新事件（没有等待者时为 None）
+        self._changed: Optional[asyncio.Event] = None
+
+        # 阶段事件时间线（使用单调时钟，不受系统时间调整影响）
+        self._created_monotonic: float = time.monotonic()
+        self._timeline_ms = array("d")
+        self._timeline_events: List[Tuple[str, Optional[str]]] = []
+        self.timeline_dropped: int = 0
+        self.add_event("queued")
+
+        # 磁盘占用统计
+        self.disk_bytes: int = 0
+        self.last_accessed: float = self._created_monotonic
+        self.runner: Optional[asyncio.Task] = None
 
         # 公共图片路径
         self.person_image_path: Optional[str] = None
@@ -73,6 +144,118 @@ class TaskInfo:
         self.clothing_image_path: Optional[str] = None
         self.clothing_type: Optional[str] = None
 
+        # DashScope 远程任务信息（重新提交时用于重新连接仍在运行或已成功的远程任务）
+        self.dashscope_task_id: Optional[str] = None
+        self.dashscope_task_signature: Optional[str] = None
+        self.dashscope_task_context: Optional[Dict[str, Any]] = None
+
+    @property
+    def status(self) -> TaskStatus:
+        return self._status
+
+    @status.setter
+    def status(self, status: TaskStatus):
+        old_status, self._status = self._status, status
+        if old_status != status and self._status_listener is not None:
+            self._status_listener(self, old_status)
+
+    def add_event(self, event: str, detail: Optional[str] = None):
+        """向时间线追加一个事件
+
+        Args:
+            event (str): 事件名称，例如 "queued"、"vl_analysis.start"、"wan_polling.poll"
+            detail (str, optional): 事件详情，例如远程任务状态或错误类型，默认值为 None
+        """
+        if (len(self._timeline_events) >= config.TASK_TIMELINE_MAX_EVENTS
+                and event not in _TERMINAL_EVENTS):
+            self.timeline_dropped += 1
+            return
+        self._append_event(round((time.monotonic() - self._created_monotonic) * 1000, 3),
+                           event, detail)
+
+    def _append_event(self, elapsed_ms: float, event: str, detail: Optional[str]):
+        key = (event, detail)
+        shared = _EVENT_KEYS.get(key)
+        if shared is None:
+            shared = key
+            if len(_EVENT_KEYS) < _EVENT_KEYS_LIMIT:
+                _EVENT_KEYS[key] = key
+        self._timeline_ms.append(elapsed_ms)
+        self._timeline_events.append(shared)
+
+    @property
+    def timeline(self) -> List[TimelineEvent]:
+        return [(elapsed_ms, event, detail)
+                for elapsed_ms, (event, detail) in zip(self._timeline_ms, self._timeline_events)]
+
+    def stage_breakdown(self) -> Dict[str, float]:
+        """根据时间线计算各阶段耗时
+
+        只统计最近一次提交（最后一个 queued 事件之后）的事件，同名阶段多次出现时
+        （例如编码、多张图片下载）耗时累加。另外给出 queue_wait（入队到开始处理）
+        和 total（入队到任务结束）。
+
+        Returns:
+            Dict[str, float]: 阶段名称到耗时（毫秒）的映射
+        """
+        breakdown: Dict[str, float] = {}
+        open_stages: Dict[str, List[float]] = {}
+        queued_at = 0.0
+        started_at: Optional[float] = None
+        finished_at: Optional[float] = None
+        for elapsed_ms, event, _ in self.timeline:
+            if event == "queued":
+                breakdown, open_stages = {}, {}
+                queued_at, started_at, finished_at = elapsed_ms, None, None
+                continue
+            if event == "started" and started_at is None:
+                started_at = elapsed_ms
+            elif event in _TERMINAL_EVENTS:
+                finished_at = elapsed_ms
+            stage, _, phase = event.rpartition(".")
+            if phase == "start":
+                open_stages.setdefault(stage, []).append(elapsed_ms)
+            elif phase in ("end", "error") and open_stages.get(stage):
+                begin = open_stages[stage].pop()
+                breakdown[stage] = round(breakdown.get(stage, 0.0) + elapsed_ms - begin, 3)
+        if started_at is not None:
+            breakdown["queue_wait"] = round(started_at - queued_at, 3)
+        if finished_at is not None:
+            breakdown["total"] = round(finished_at - queued_at, 3)
+        return breakdown
+
+    def touch(self):
+        """记录一次状态变化：更新修改时间和版本号，并唤醒等待状态变化的请求"""
+        self.updated_at = datetime.now()
+        self.version += 1
+        self.notify_waiters()
+
+    def notify_waiters(self):
+        """唤醒所有等待状态变化的请求（任务被删除时也会调用）"""
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    async def wait_for_change(self, version: int, timeout: float) -> bool:
+        """等待任务状态版本号离开指定版本
+
+        Args:
+            version (int): 调用方已知的版本号
+            timeout (float): 最长等待时间（秒）
+
+        Returns:
+            bool: 版本号已变化返回 True，超时返回 False
+        """
+        if self.version != version:
+            return True
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
     def update_status(self,
                       status: TaskStatus,
                       message: str = None,
@@ -89,19 +272,20 @@ class TaskInfo:
             self.message = message
         if progress is not None:
             self.progress = progress
-        self.updated_at = datetime.now()
+        self.touch()
 
     def set_result(self, result: Dict[str, Any]):
-        """设置任务结果
+        """设置任务结果（只保留下载到本地的结果图路径）
 
         Args:
             result (Dict[str, Any]): 任务结果
         """
-        self.result = result
+        self.result_images = tuple(result.get("downloaded_images", ()))
         self.status = TaskStatus.COMPLETED
         self.progress = 100
         self.message = "任务完成"
-        self.updated_at = datetime.now()
+        self.touch()
+        self.add_event("completed")
 
     def set_error(self, error_message: str):
         """设置任务错误
@@ -112,7 +296,58 @@ class TaskInfo:
         self.error_message = error_message
         self.status = TaskStatus.FAILED
         self.message = f"任务失败: {error_message}"
-        self.updated_at = datetime.now()
+        self.touch()
+        self.add_event("failed")
+
+    def set_cancelled(self, reason: str):
+        """设置任务已取消
+
+        Args:
+            reason (str): 取消原因
+        """
+        self.status = TaskStatus.CANCELLED
+        self.message = f"任务已取消: {reason}"
+        self.touch()
+        self.add_event("cancelled", reason)
+
+    @property
+    def finished(self) -> bool:
+        """任务是否已结束（完成、失败或已取消）"""
+        return self._status in FINISHED_STATUSES
+
+    def attach_runner(self, runner: asyncio.Task):
+        """关联处理该任务的协程任务，协程结束后自动解除关联
+
+        Args:
+            runner (asyncio.Task): 执行 process_task 的协程任务
+        """
+        self.runner = runner
+        runner.add_done_callback(self._runner_done)
+
+    def _runner_done(self, runner: asyncio.Task):
+        # 协程在开始执行前就被取消时不会进入 process_task 的异常处理，在这里补记取消状态
+        if runner.cancelled() and not self.finished:
+            self.set_cancelled("任务已取消")
+        if self.runner is runner:
+            self.runner = None
+
+    def cancel(self, reason: str) -> bool:
+        """取消任务：立即标记为已取消，并取消正在处理该任务的协程
+
+        协程在下一个等待点收到 asyncio.CancelledError，停止后续处理（已提交的远程生成任务会被一并取消）
+
+        Args:
+            reason (str): 取消原因
+
+        Returns:
+            bool: 任务已结束、无法取消时返回 False
+        """
+        if self.finished:
+            return False
+        self.set_cancelled(reason)
+        if self.runner is not None and not self.runner.done():
+            self.runner.cancel(reason)
+        return True
 
 
 class TaskManager:
@@ -121,17 +356,44 @@ class TaskManager:
     使用内存字典存储任务状态，适合单机部署
     后续可扩展为Redis存储以支持分布式部署
 
+    任务目录的磁盘占用按任务增量统计：任务文件写入后只重新统计该任务自己的文件夹，
+    删除任务时扣除其占用，不会遍历整个任务目录
+
+    任务列表查询使用按创建时间排序的二级索引（任务类型、状态、租户），
+    任务创建、删除和状态变化时增量维护，分页查询不需要遍历全部任务
+
     Attributes:
         _tasks (Dict[str, TaskInfo]): 任务字典，键为任务ID，值为任务信息对象
         _lock (asyncio.Lock): 异步锁，用于保护任务字典的并发访问
+        _disk_usage (int): 全部任务文件夹的磁盘占用（字节，不含指向 blob 的硬链接）
+        _index (TaskIndex): 任务二级索引
 
     """
 
     def __init__(self):
         self._tasks: Dict[str, TaskInfo] = {}
         self._lock = asyncio.Lock()  # 异步锁，保护任务字典的并发访问
-
-    async def create_task(self, task_type: TaskType) -> Tuple[TaskInfo, Optional[str]]:
+        self._evict_lock = asyncio.Lock()  # 保证同一时间只有一个磁盘配额淘汰过程
+        self._disk_usage: int = 0
+        self._index = TaskIndex(self._tasks.get)
+
+    def _add_task_internal(self, task_info: TaskInfo) -> None:
+        """加入任务字典和索引（不加锁，供已持有锁的方法调用）"""
+        previous = self._tasks.get(task_info.task_id)
+        if previous is not None:
+            self._index.remove(previous)
+            previous._status_listener = None
+        self._tasks[task_info.task_id] = task_info
+        self._index.add(task_info)
+        task_info._status_listener = self._index.status_changed
+
+    @property
+    def disk_usage(self) -> int:
+        """全部任务文件夹和上传文件 blob 的磁盘占用（字节）"""
+        return self._disk_usage + (blob_store.disk_usage if blob_store else 0)
+
+    async def create_task(self, task_type: TaskType,
+                          tenant: Optional[str] = None) -> Tuple[TaskInfo, Optional[str]]:
         """创建新任务，同时创建任务专属文件夹
 
         Fetures:
@@ -139,6 +401,7 @@ class TaskManager:
 
         Args:
             task_type (TaskType): 任务类型（饰品试戴或服装穿戴）
+            tenant (Optional[str], optional): 租户标识（API Key 哈希，见 tenant_key_hash），默认值为 None
 
         Returns:
             Tuple[TaskInfo, Optional[str]]: 新创建的任务信息对象，以及被删除的旧任务ID（如果有）
@@ -149,21 +412,24 @@ class TaskManager:
             # 检查任务数量是否超过上限
             if len(self._tasks) >= config.MAX_TASKS:
                 # 找到最早创建的任务
-                oldest_task = min(self._tasks.values(),
-                                  key=lambda t: t.created_at)
-                deleted_task_id = oldest_task.task_id
+                deleted_task_id = self._index.oldest()
                 logger.warning(
                     f"任务数量已达上限({config.MAX_TASKS})，自动删除最早的任务: {deleted_task_id}"
                 )
-                self._delete_task_internal(deleted_task_id)
+                deleted_dir = self._delete_task_internal(deleted_task_id)
+                TASKS_EVICTED.inc(reason="max_tasks")
+            else:
+                deleted_dir = None
 
             task_id = str(uuid.uuid4())
             # 创建任务专属文件夹
             task_dir = config.TASKS_DIR / task_id
             task_dir.mkdir(parents=True, exist_ok=True)
-            task_info = TaskInfo(task_id, task_dir, task_type)
-            self._tasks[task_id] = task_info
-            return task_info, deleted_task_id
+            task_info = TaskInfo(task_id, task_dir, task_type, tenant)
+            self._add_task_internal(task_info)
+        if deleted_dir is not None:
+            await self._remove_task_files(deleted_task_id, deleted_dir)
+        return task_info, deleted_task_id
 
     async def get_task(self, task_id: str) -> Optional[TaskInfo]:
         """获取任务信息
@@ -174,45 +440,119 @@ class TaskManager:
             Optional[TaskInfo]: 任务信息对象，如果不存在则返回 None
         """
         async with self._lock:
-            return self._tasks.get(task_id)
+            task_info = self._tasks.get(task_id)
+            if task_info:
+                task_info.last_accessed = time.monotonic()
+            return task_info
 
-    async def reset_task(self, task_id: str) -> Optional[TaskInfo]:
-        """重置任务状态，用于失败任务的重新提交
+    async def get_tasks(self, task_ids: List[str]) -> Dict[str, TaskInfo]:
+        """批量获取任务信息（只获取一次锁，所有任务来自同一时刻的一致读取）
 
-        将任务状态重置为PENDING，清除错误信息和结果，但保留任务文件夹
+        Args:
+            task_ids (List[str]): 任务ID列表
+        Returns:
+            Dict[str, TaskInfo]: 存在的任务，键为任务ID（不存在的任务ID不包含在内）
+        """
+        now = time.monotonic()
+        async with self._lock:
+            found = {}
+            for task_id in task_ids:
+                task_info = self._tasks.get(task_id)
+                if task_info:
+                    task_info.last_accessed = now
+                    found[task_id] = task_info
+            return found
+
+    async def query_tasks(self,
+                          task_type: Optional[TaskType] = None,
+                          status: Optional[TaskStatus] = None,
+                          tenant: Optional[str] = None,
+                          created_after: Optional[datetime] = None,
+                          created_before: Optional[datetime] = None,
+                          cursor: Optional[SortKey] = None,
+                          limit: int = 50,
+                          newest_first: bool = True) -> Tuple[List[TaskInfo], Optional[SortKey]]:
+        """按筛选条件分页查询任务（使用二级索引，不遍历全部任务）
 
         Args:
-            task_id (str): 任务ID
+            task_type (TaskType, optional): 任务类型，默认值为 None（不筛选）
+            status (TaskStatus, optional): 任务状态，默认值为 None（不筛选）
+            tenant (str, optional): 租户（API Key 哈希），默认值为 None（不筛选）
+            created_after (datetime, optional): 创建时间下界（包含），默认值为 None
+            created_before (datetime, optional): 创建时间上界（不包含），默认值为 None
+            cursor (SortKey, optional): 上一页返回的游标，默认值为 None（第一页）
+            limit (int, optional): 每页数量，默认值为 50
+            newest_first (bool, optional): 是否按创建时间从新到旧排序，默认值为 True
         Returns:
-            Optional[TaskInfo]: 重置后的任务信息对象，如果任务不存在则返回 None
+            Tuple[List[TaskInfo], Optional[SortKey]]: 本页任务，以及下一页游标（没有下一页时为 None）
         """
         async with self._lock:
-            task_info = self._tasks.get(task_id)
-            if not task_info:
-                return None
-
-            # 重置任务状态
-            task_info.status = TaskStatus.PENDING
-            task_info.message = "任务已重置，等待处理"
-            task_info.progress = 0
-            task_info.result = None
-            task_info.error_message = None
-            task_info.updated_at = datetime.now()
-            # 清除之前的识别结果（公共字段）
-            task_info.person_position = None
-            # 清除饰品相关识别结果
-            task_info.accessory_type = None
-            # 清除服装相关识别结果
-            task_info.clothing_type = None
+            task_ids, next_cursor = self._index.query(
+                task_type=task_type, status=status, tenant=tenant,
+                created_after=created_after.timestamp() if created_after else None,
+                created_before=created_before.timestamp() if created_before else None,
+                cursor=cursor, limit=limit, newest_first=newest_first)
+            return [self._tasks[task_id] for task_id in task_ids], next_cursor
 
-            return task_info
+    async def list_tasks(self) -> List[TaskInfo]:
+        """获取当前全部任务的快照列表
+
+        Returns:
+            List[TaskInfo]: 任务信息对象列表
+        """
+        async with self._lock:
+            return list(self._tasks.values())
+
+    async def reset_task(self, task_id: str) -> Optional[TaskInfo]:
+        """重置任务状态，用于任务的重新提交
 
-    async def create_task_with_id(self, task_id: str, task_type: TaskType) -> TaskInfo:
+        将任务状态重置为PENDING，清除错误信息和结果，但保留任务文件夹。
+        已提交的 DashScope 任务信息会被保留，输入不变时可以重新连接该远程任务，避免重复生成。
+        任务仍在处理中时先取消并等待上一次处理结束，避免新旧两次处理同时写入同一个任务
+
+        Args:
+            task_id (str): 任务ID
+        Returns:
+            Optional[TaskInfo]: 重置后的任务信息对象，如果任务不存在则返回 None
+        """
+        while True:
+            async with self._lock:
+                task_info = self._tasks.get(task_id)
+                if not task_info:
+                    return None
+                runner = task_info.runner
+                if runner is None or runner.done():
+                    self._reset_task_internal(task_info)
+                    return task_info
+            # 不持有锁等待上一次处理结束（处理协程退出前可能需要获取锁），结束后重新检查
+            task_info.cancel("任务已重新提交")
+            await asyncio.wait({runner})
+
+    @staticmethod
+    def _reset_task_internal(task_info: TaskInfo) -> None:
+        """重置任务状态（供已持有锁的方法调用）"""
+        task_info.status = TaskStatus.PENDING
+        task_info.message = "任务已重置，等待处理"
+        task_info.progress = 0
+        task_info.result_images = ()
+        task_info.error_message = None
+        task_info.add_event("queued", "resubmit")
+        # 清除之前的识别结果（公共字段）
+        task_info.person_position = None
+        # 清除饰品相关识别结果
+        task_info.accessory_type = None
+        # 清除服装相关识别结果
+        task_info.clothing_type = None
+        task_info.touch()
+
+    async def create_task_with_id(self, task_id: str, task_type: TaskType,
+                                  tenant: Optional[str] = None) -> TaskInfo:
         """使用指定的task_id创建任务（用于后端重启后恢复任务）
 
         Args:
             task_id (str): 指定的任务ID
             task_type (TaskType): 任务类型（饰品试戴或服装穿戴）
+            tenant (Optional[str], optional): 租户标识（API Key 哈希），默认值为 None
         Returns:
             TaskInfo: 新创建的任务信息对象
         """
@@ -220,31 +560,132 @@ class TaskManager:
             # 创建任务专属文件夹
             task_dir = config.TASKS_DIR / task_id
             task_dir.mkdir(parents=True, exist_ok=True)
-            task_info = TaskInfo(task_id, task_dir, task_type)
-            self._tasks[task_id] = task_info
+            task_info = TaskInfo(task_id, task_dir, task_type, tenant)
+            self._add_task_internal(task_info)
+            # 重启前已存在的文件计入磁盘占用
+            self.refresh_disk_usage(task_info)
             return task_info
 
-    def _delete_task_internal(self, task_id: str) -> bool:
+    def refresh_disk_usage(self, task_info: TaskInfo) -> int:
+        """重新统计单个任务文件夹的磁盘占用，并增量更新总占用
+
+        在任务文件写入后调用（上传保存、细节图裁剪、结果下载、生成派生图），
+        只读取该任务文件夹及其派生图子目录中的文件。
+        指向 blob 的硬链接（链接数大于 1）不计入任务文件夹，blob 的占用由 BlobStore 单独统计，
+        多个任务共享的同一份内容只计算一次
+
+        Args:
+            task_info (TaskInfo): 任务信息对象
+        Returns:
+            int: 该任务文件夹当前的磁盘占用（字节）
+        """
+        size = 0
+        for folder in (task_info.task_dir, task_info.task_dir / DERIVED_DIR_NAME):
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False):
+                            stat = entry.stat(follow_symlinks=False)
+                            if stat.st_nlink <= 1:
+                                size += stat.st_size
+            except FileNotFoundError:
+                pass
+        # 任务已被删除时不再计入总占用
+        if self._tasks.get(task_info.task_id) is task_info:
+            self._disk_usage += size - task_info.disk_bytes
+        task_info.disk_bytes = size
+        return size
+
+    async def enforce_disk_quota(self, exclude: Optional[str] = None) -> List[str]:
+        """磁盘占用超出配额时，按最近访问时间从旧到新淘汰已结束的任务
+
+        等待处理和处理中的任务不会被淘汰
+
+        Args:
+            exclude (str, optional): 不参与淘汰的任务ID（通常为当前请求的任务），默认值为 None
+        Returns:
+            List[str]: 被淘汰的任务ID列表
+        """
+        quota = config.TASKS_DIR_MAX_BYTES
+        if not quota or self.disk_usage <= quota:
+            return []
+        evicted = []
+        # 逐个淘汰：锁内只摘除任务记录，删除文件在锁外的线程中进行，
+        # 删除完成后总占用（包含回收的 blob）才会下降，再决定是否继续淘汰
+        async with self._evict_lock:
+            while self.disk_usage > quota:
+                async with self._lock:
+                    candidates = [
+                        t for t in self._tasks.values()
+                        if t.task_id != exclude
+                        and t.status not in (TaskStatus.PENDING, TaskStatus.PROCESSING)
+                    ]
+                    if not candidates:
+                        break
+                    task_id = min(candidates, key=lambda t: t.last_accessed).task_id
+                    task_dir = self._delete_task_internal(task_id)
+                await self._remove_task_files(task_id, task_dir)
+                evicted.append(task_id)
+        if evicted:
+            TASKS_EVICTED.inc(len(evicted), reason="disk_quota")
+            logger.warning(
+                f"任务目录磁盘占用超出配额({quota} 字节)，已淘汰最久未访问的 {len(evicted)} 个任务"
+            )
+        if self.disk_usage > quota:
+            logger.warning(
+                f"任务目录磁盘占用 {self.disk_usage} 字节仍超出配额 {quota} 字节（剩余任务均在处理中）"
+            )
+        return evicted
+
+    def _delete_task_internal(self, task_id: str) -> Optional[Path]:
         """内部删除方法（不加锁，供已持有锁的方法调用）
-        
+
+        只摘除任务记录并停止处理，不删除文件；调用方释放锁后
+        需以返回的目录调用 _remove_task_files 删除任务文件
+
         Args:
             task_id (str): 任务ID
         Returns:
-            bool: 如果任务存在并成功删除返回 True，否则返回 False
+            Optional[Path]: 待删除的任务文件夹；任务和文件夹都不存在时返回 None
         """
-        deleted = False
-        if task_id in self._tasks:
-            task_info = self._tasks[task_id]
-            if task_info.task_dir and task_info.task_dir.exists():
-                shutil.rmtree(task_info.task_dir, ignore_errors=True)
-            del self._tasks[task_id]
-            deleted = True
-        else:
-            task_dir = config.TASKS_DIR / task_id
-            if task_dir.exists():
-                shutil.rmtree(task_dir, ignore_errors=True)
-                deleted = True
-        return deleted
+        task_info = self._tasks.pop(task_id, None)
+        task_dir = task_info.task_dir if task_info else config.TASKS_DIR / task_id
+        if task_info:
+            self._disk_usage -= task_info.disk_bytes
+            self._index.remove(task_info)
+            task_info._status_listener = None
+            # 停止仍在处理中的任务，不再占用处理名额和远程调用配额
+            task_info.cancel("任务已删除")
+            # 正在等待状态变化的请求立即返回（随后会得到 404）
+            task_info.notify_waiters()
+            return task_dir
+        if task_dir.exists():
+            return task_dir
+        return None
+
+    async def _remove_task_files(self, task_id: str, task_dir: Path):
+        """删除任务文件夹（在线程中进行，不阻塞事件循环，调用时不应持有锁）
+
+        Args:
+            task_id (str): 任务ID
+            task_dir (Path): _delete_task_internal 返回的任务文件夹
+        """
+        await asyncio.to_thread(self._remove_task_dir, task_dir)
+        schedule_delete_task_files(task_id)
+
+    @staticmethod
+    def _remove_task_dir(task_dir: Path):
+        """删除任务文件夹，并回收不再被其他任务引用的上传文件
+
+        Args:
+            task_dir (Path): 任务文件夹
+        """
+        if not task_dir.exists():
+            return
+        blobs = blob_store.blobs_referenced_by(task_dir) if blob_store else []
+        shutil.rmtree(task_dir, ignore_errors=True)
+        if blobs:
+            blob_store.release(blobs)
 
     async def delete_task(self, task_id: str) -> bool:
         """删除任务及其文件夹
@@ -255,7 +696,11 @@ class TaskManager:
             bool: 如果任务存在并成功删除返回 True，否则返回 False
         """
         async with self._lock:
-            return self._delete_task_internal(task_id)
+            task_dir = self._delete_task_internal(task_id)
+        if task_dir is None:
+            return False
+        await self._remove_task_files(task_id, task_dir)
+        return True
 
     async def cleanup_old_tasks(self, max_age_hours: int = None):
         """清理过期任务及其文件夹
@@ -275,10 +720,34 @@ class TaskManager:
                     task_info.created_at).total_seconds() > max_age_hours *
                 3600
             ]
-            for task_id in expired_tasks:
-                self._delete_task_internal(task_id)
-            return len(expired_tasks)
+            deleted = [(task_id, self._delete_task_internal(task_id)) for task_id in expired_tasks]
+        for task_id, task_dir in deleted:
+            await self._remove_task_files(task_id, task_dir)
+        return len(expired_tasks)
 
 
 # 全局任务管理器实例
 task_manager = TaskManager()
+
+# 当前各状态的任务数量，pending 即等待处理的队列深度
+TASKS_BY_STATUS = REGISTRY.gauge(
+    "try_on_tasks", "当前各状态的任务数量", ("task_type", "status"))
+TASKS_DISK_BYTES = REGISTRY.gauge(
+    "try_on_tasks_disk_bytes", "任务目录磁盘占用（字节，包含上传文件 blob）")
+TASKS_DISK_QUOTA_BYTES = REGISTRY.gauge(
+    "try_on_tasks_disk_quota_bytes", "任务目录磁盘配额（字节，0 表示不限制）")
+TASKS_EVICTED = REGISTRY.counter(
+    "try_on_tasks_evicted_total", "因超出任务数量上限或磁盘配额被淘汰的任务数量", ("reason",))
+
+
+def _collect_task_counts() -> None:
+    """抓取指标时读取各状态的任务数量（由任务索引增量维护，无需遍历任务）"""
+    for task_type in TaskType:
+        for status in TaskStatus:
+            TASKS_BY_STATUS.set(task_manager._index.count(task_type, status),
+                                task_type=task_type.value, status=status.value)
+    TASKS_DISK_BYTES.set(task_manager.disk_usage)
+    TASKS_DISK_QUOTA_BYTES.set(config.TASKS_DIR_MAX_BYTES)
+
+
+REGISTRY.register_collector(_collect_task_counts)
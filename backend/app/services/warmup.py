@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+工作进程预热
+
+生产模式下每个工作进程在开始接收请求前执行一次，避免首个请求承担初始化开销：
+- 注册 Pillow 图片格式插件（否则第一次生成 WebP/AVIF 派生图时才加载）
+- 解析 DashScope 服务域名，提前暴露 DNS 配置问题
+- 在后台线程中导入 openai（导入约需数百毫秒，启动阶段不导入以加快冷启动），
+  避免第一个识别请求在事件循环中等待导入
+
+预热失败只记录警告，不影响服务启动。
+"""
+import asyncio
+import importlib
+import logging
+import os
+import socket
+import time
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+from try_on_anything.common.constants import DEFAULT_DASHSCOPE_BASE_URL
+
+from .derivatives import supported_formats
+
+logger = logging.getLogger(__name__)
+
+# 域名解析超时时间（秒）
+_RESOLVE_TIMEOUT = 5
+
+
+async def warm_up() -> None:
+    """预热当前工作进程"""
+    start = time.perf_counter()
+    Image.init()
+    formats = supported_formats()
+
+    loop = asyncio.get_running_loop()
+    # 不等待导入完成，不影响工作进程就绪
+    loop.run_in_executor(None, importlib.import_module, "openai")
+
+    base_url = os.getenv("DASHSCOPE_BASE_URL") or DEFAULT_DASHSCOPE_BASE_URL
+    parts = urlsplit(base_url)
+    host = parts.hostname
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    if host:
+        try:
+            await asyncio.wait_for(loop.getaddrinfo(host, port, type=socket.SOCK_STREAM),
+                                   timeout=_RESOLVE_TIMEOUT)
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"预热时解析 {host} 失败: {e!r}")
+
+    logger.info(f"工作进程 {os.getpid()} 预热完成（派生图格式: {', '.join(formats)}），"
+                f"耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
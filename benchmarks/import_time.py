@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+后端冷启动导入耗时基准测试
+
+在全新的子进程中使用 `python -X importtime` 导入后端应用，统计总导入耗时和自身耗时最高的模块，
+并检查启动阶段是否导入了应推迟到第一次使用时才导入的重量级依赖（例如 openai）。
+
+使用示例：
+    python -m benchmarks.import_time
+    # 总导入耗时（多次运行的中位数）超过 800 毫秒时以非零状态码退出
+    python -m benchmarks.import_time --budget-ms 800 --repeat 5
+"""
+from typing import Optional, Dict, Any, List, Tuple
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 默认测量的模块
+DEFAULT_MODULE = "backend.app.main"
+# 默认导入耗时预算（毫秒）
+DEFAULT_BUDGET_MS = 800
+# 启动阶段不应导入的模块（第一次使用时才导入）
+DEFAULT_FORBIDDEN = ["openai"]
+
+# -X importtime 输出格式："import time:  self [us] | cumulative | imported package"
+_LINE_PATTERN = re.compile(r"^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """解析 -X importtime 的输出
+
+    Args:
+        stderr (str): 子进程的标准错误输出
+
+    Returns:
+        List[Tuple[str, int, int, int]]: (模块名, 自身耗时微秒, 累计耗时微秒, 嵌套层级) 列表
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def measure_import(module: str = DEFAULT_MODULE) -> Dict[str, Any]:
+    """在新的子进程中导入模块一次，统计导入耗时
+
+    Args:
+        module (str): 模块名，默认值为 DEFAULT_MODULE
+
+    Returns:
+        Dict[str, Any]: 包含 total_ms（模块累计导入耗时）、modules（本次导入的全部模块名）
+            和 self_us（各模块自身耗时，微秒）的统计结果
+
+    Raises:
+        RuntimeError: 子进程导入失败时
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(PROJECT_ROOT), str(PROJECT_ROOT / "src")] +
+        ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=PROJECT_ROOT, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+    entries = parse_importtime(proc.stderr)
+    total_us = next((cumulative for name, _, cumulative, level in entries
+                     if name == module and level == 0), 0)
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "modules": [name for name, *_ in entries],
+        "self_us": {name: self_us for name, self_us, *_ in entries},
+    }
+
+
+def run_benchmark(module: str = DEFAULT_MODULE, repeat: int = 3, top: int = 10,
+                  forbidden: Optional[List[str]] = None) -> Dict[str, Any]:
+    """多次测量模块导入耗时
+
+    Args:
+        module (str): 模块名，默认值为 DEFAULT_MODULE
+        repeat (int): 测量次数，默认值为 3
+        top (int): 报告自身耗时最高的模块数量，默认值为 10
+        forbidden (List[str], optional): 启动阶段不应导入的顶层包，默认值为 None（使用 DEFAULT_FORBIDDEN）
+
+    Returns:
+        Dict[str, Any]: 包含 median_ms/runs_ms/top_modules/forbidden_imported 的测量报告
+    """
+    forbidden = DEFAULT_FORBIDDEN if forbidden is None else forbidden
+    runs = [measure_import(module) for _ in range(repeat)]
+    last = runs[-1]
+    # 按顶层包汇总自身耗时，便于定位重量级依赖
+    by_package: Dict[str, int] = {}
+    for name, self_us in last["self_us"].items():
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    top_packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    imported = {name.split(".")[0] for name in last["modules"]}
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(r["total_ms"] for r in runs), 1),
+        "runs_ms": [r["total_ms"] for r in runs],
+        "top_packages_ms": {package: round(us / 1000, 1) for package, us in top_packages},
+        "forbidden_imported": sorted(p for p in forbidden if p in imported),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="后端冷启动导入耗时基准测试")
+    parser.add_argument("--module", type=str, default=DEFAULT_MODULE,
+                        help=f"测量的模块 (默认: {DEFAULT_MODULE})")
+    parser.add_argument("--repeat", type=int, default=3, help="测量次数 (默认: 3)")
+    parser.add_argument("--top", type=int, default=10, help="报告自身耗时最高的顶层包数量 (默认: 10)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"导入耗时预算（毫秒，默认: {DEFAULT_BUDGET_MS}）")
+    parser.add_argument("--forbid", type=str, nargs="*", default=DEFAULT_FORBIDDEN,
+                        help=f"启动阶段不应导入的顶层包 (默认: {' '.join(DEFAULT_FORBIDDEN)})")
+    parser.add_argument("--output", type=str, default=None, help="结果 JSON 输出路径")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.module, repeat=args.repeat, top=args.top, forbidden=args.forbid)
+    report["budget_ms"] = args.budget_ms
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(output, encoding="utf-8")
+
+    failed = False
+    if report["median_ms"] > args.budget_ms:
+        print(f"\n导入 {args.module} 耗时 {report['median_ms']}ms，超过预算 {args.budget_ms}ms")
+        failed = True
+    if report["forbidden_imported"]:
+        print(f"\n导入 {args.module} 时加载了应延迟导入的包: {', '.join(report['forbidden_imported'])}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+后端端到端压测脚本
+
+在进程内启动 FastAPI 后端，DashScope 接口由本地模拟服务（子进程）代替，
+按指定并发驱动 提交任务 -> 轮询状态 -> 获取结果 的完整流程，统计：
+    - 提交吞吐量、状态查询 QPS
+    - 提交/状态查询/结果查询接口的延迟分位数（p50/p90/p99）
+    - 任务端到端完成时间分位数
+    - 后端进程 RSS（峰值与结束时）
+    - 后端事件循环延迟（调度延迟）分位数
+
+结果以 JSON 格式输出，便于跨版本对比。
+
+使用示例：
+    python -m benchmarks.load_test --tasks 50 --concurrency 10 --image-size 1024 \\
+        --generation-time 2 --output results/load_test.json
+
+也可以通过 --backend-url 压测已启动的后端（此时不统计 RSS 和事件循环延迟，
+且需要自行将后端的 DASHSCOPE_BASE_URL 指向模拟服务）。
+"""
+from typing import Optional, Dict, Any, List
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+# 事件循环延迟采样间隔（秒）
+LOOP_LAG_SAMPLE_INTERVAL = 0.05
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """计算延迟分位数（毫秒）
+
+    Args:
+        values (List[float]): 延迟样本（秒）
+
+    Returns:
+        Dict[str, Optional[float]]: 包含 count/mean/p50/p90/p99/max 的统计结果，样本为空时各项为 None
+    """
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def _pick(q: float) -> float:
+        index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50": _pick(0.50),
+        "p90": _pick(0.90),
+        "p99": _pick(0.99),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+def current_rss_bytes() -> Optional[int]:
+    """读取当前进程 RSS（字节），不支持 /proc 的平台返回 None"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def peak_rss_bytes() -> int:
+    """读取进程峰值 RSS（字节）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 单位为 KB
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def make_image(size: int, seed: int) -> bytes:
+    """生成指定尺寸的噪声图像（JPEG 编码），避免纯色图像压缩率过高导致上传体积失真"""
+    noise = Image.effect_noise((size, size), 64 + seed % 32).convert("RGB")
+    buffer = io.BytesIO()
+    noise.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class LoopMonitor:
+    """在被测事件循环中周期性采样调度延迟和 RSS"""
+
+    def __init__(self):
+        self.lags: List[float] = []
+        self.rss_samples: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOOP_LAG_SAMPLE_INTERVAL
+            await asyncio.sleep(LOOP_LAG_SAMPLE_INTERVAL)
+            self.lags.append(max(0.0, loop.time() - expected))
+            rss = current_rss_bytes()
+            if rss is not None:
+                self.rss_samples.append(rss)
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """在指定事件循环中启动采样"""
+        self._task = asyncio.run_coroutine_threadsafe(self._run(), loop)
+
+    def stop(self):
+        """停止采样"""
+        if self._task:
+            self._task.cancel()
+
+
+class InProcessBackend:
+    """在后台线程中运行被测后端（独立事件循环，便于采样事件循环延迟）"""
+
+    def __init__(self, host: str = "127.0.0.1"):
+        import uvicorn
+        from backend.app.main import app
+
+        self.host = host
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host=host, port=0, log_level="warning"))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    @property
+    def base_url(self) -> str:
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://{self.host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("后端服务启动失败")
+            time.sleep(0.02)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+def start_fake_dashscope(port: int, args: argparse.Namespace) -> subprocess.Popen:
+    """以子进程方式启动本地 DashScope 模拟服务（避免计入后端进程 RSS）"""
+    command = [
+        sys.executable, "-m", "try_on_anything.testing.fake_dashscope",
+        "--port", str(port),
+        "--generation-time", str(args.generation_time),
+        "--latency", str(args.dashscope_latency),
+        "--chat-latency", str(args.chat_latency),
+        "--failure-rate", str(args.failure_rate),
+    ]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [str(PROJECT_ROOT / "src"), os.environ.get("PYTHONPATH", "")]))
+    process = subprocess.Popen(command, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/__fake__/stats", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("DashScope 模拟服务启动失败")
+
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LoadRunner:
+    """压测执行器：每个并发单元循环执行 提交 -> 轮询 -> 获取结果"""
+
+    def __init__(self, base_url: str, args: argparse.Namespace):
+        self.base_url = base_url
+        self.args = args
+        self.endpoint = f"/api/{args.task_type}-try-on"
+        self.images = {
+            "item": make_image(args.image_size, 1),
+            "person": make_image(args.image_size, 2),
+        }
+        self.submit_latencies: List[float] = []
+        self.status_latencies: List[float] = []
+        self.result_latencies: List[float] = []
+        self.completion_times: List[float] = []
+        self.outcomes: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self._remaining = args.tasks
+
+    def _record_error(self, name: str):
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    async def _run_one(self, client: httpx.AsyncClient):
+        item_field = "clothing_image" if self.args.task_type == "clothing" else "accessory_image"
+        files = {
+            item_field: ("item.jpg", self.images["item"], "image/jpeg"),
+            "person_image": ("person.jpg", self.images["person"], "image/jpeg"),
+        }
+        data = {"use_vl_model": str(self.args.use_vl_model).lower()}
+
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{self.endpoint}/submit", files=files, data=data)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            self._record_error(f"submit:{type(e).__name__}")
+            return
+        submitted = time.perf_counter()
+        self.submit_latencies.append(submitted - start)
+        task_id = response.json()["task_id"]
+
+        status = None
+        while time.perf_counter() - submitted < self.args.task_timeout:
+            await asyncio.sleep(self.args.poll_interval)
+            poll_start = time.perf_counter()
+            try:
+                response = await client.get(f"{self.endpoint}/status/{task_id}")
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                self._record_error(f"status:{type(e).__name__}")
+                continue
+            self.status_latencies.append(time.perf_counter() - poll_start)
+            status = response.json()["status"]
+            if status in ("completed", "failed"):
+                break
+        else:
+            status = "timeout"
+
+        if status in ("completed", "failed"):
+            self.completion_times.append(time.perf_counter() - start)
+            result_start = time.perf_counter()
+            try:
+                response = await client.get(f"{self.endpoint}/result/{task_id}")
+                response.raise_for_status()
+                self.result_latencies.append(time.perf_counter() - result_start)
+            except httpx.HTTPError as e:
+                self._record_error(f"result:{type(e).__name__}")
+        self.outcomes[status] = self.outcomes.get(status, 0) + 1
+
+    async def _worker(self, client: httpx.AsyncClient):
+        while self._remaining > 0:
+            self._remaining -= 1
+            await self._run_one(client)
+
+    async def run(self) -> float:
+        """执行压测，返回总耗时（秒）"""
+        headers = {"X-VL-API-Key": self.args.api_key, "X-Image-API-Key": self.args.api_key}
+        limits = httpx.Limits(max_connections=self.args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=self.base_url, headers=headers,
+                                     limits=limits, timeout=60) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*[self._worker(client) for _ in range(self.args.concurrency)])
+            return time.perf_counter() - start
+
+
+def build_report(runner: LoadRunner, duration: float, args: argparse.Namespace,
+                 monitor: Optional[LoopMonitor]) -> Dict[str, Any]:
+    """汇总压测结果"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    report = {
+        "benchmark": "load_test",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("api_key", "output")},
+        "duration_seconds": round(duration, 3),
+        "outcomes": runner.outcomes,
+        "errors": runner.errors,
+        "throughput": {
+            "submit_per_second": round(len(runner.submit_latencies) / duration, 3),
+            "completed_per_second": round(runner.outcomes.get("completed", 0) / duration, 3),
+            "status_poll_qps": round(len(runner.status_latencies) / duration, 3),
+        },
+        "latency_ms": {
+            "submit": percentiles(runner.submit_latencies),
+            "status": percentiles(runner.status_latencies),
+            "result": percentiles(runner.result_latencies),
+            "completion": percentiles(runner.completion_times),
+        },
+        "rss_bytes": None,
+        "event_loop_lag_ms": None,
+    }
+    if monitor is not None:
+        report["rss_bytes"] = {
+            "peak": peak_rss_bytes(),
+            "max_sampled": max(monitor.rss_samples) if monitor.rss_samples else None,
+            "final": current_rss_bytes(),
+        }
+        report["event_loop_lag_ms"] = percentiles(monitor.lags)
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="后端端到端压测")
+    parser.add_argument("--tasks", type=int, default=20, help="任务总数 (默认: 20)")
+    parser.add_argument("--concurrency", type=int, default=5, help="并发数 (默认: 5)")
+    parser.add_argument("--task-type", choices=["clothing", "accessory"], default="clothing",
+                        help="任务类型 (默认: clothing)")
+    parser.add_argument("--image-size", type=int, default=1024, help="上传图像边长（像素）(默认: 1024)")
+    parser.add_argument("--use-vl-model", action=argparse.BooleanOptionalAction, default=True,
+                        help="是否使用VL模型识别类型和位置 (默认: 是)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="状态轮询间隔（秒）(默认: 0.5)")
+    parser.add_argument("--task-timeout", type=float, default=300, help="单个任务超时时间（秒）(默认: 300)")
+    parser.add_argument("--generation-time", type=float, default=2.0,
+                        help="模拟服务图像生成耗时中位数（秒）(默认: 2.0)")
+    parser.add_argument("--dashscope-latency", type=float, default=0.05,
+                        help="模拟服务接口延迟中位数（秒）(默认: 0.05)")
+    parser.add_argument("--chat-latency", type=float, default=1.0,
+                        help="模拟服务对话接口延迟中位数（秒）(默认: 1.0)")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="模拟服务故障注入概率 (默认: 0)")
+    parser.add_argument("--backend-url", type=str, default=None,
+                        help="压测已启动的后端地址，不指定时在进程内启动后端")
+    parser.add_argument("--api-key", type=str, default="sk-load-test", help="传给后端的 API Key")
+    parser.add_argument("--output", type=str, default=None, help="结果 JSON 输出路径，不指定时仅打印")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    fake_process = None
+    backend = None
+    monitor = None
+    tasks_dir = None
+
+    try:
+        if args.backend_url:
+            base_url = args.backend_url.rstrip("/")
+        else:
+            fake_port = _free_port()
+            fake_process = start_fake_dashscope(fake_port, args)
+            # 必须在导入后端之前设置，后端配置和客户端在导入/创建时读取环境变量
+            tasks_dir = tempfile.TemporaryDirectory(prefix="try_on_load_test_")
+            os.environ["DASHSCOPE_BASE_URL"] = f"http://127.0.0.1:{fake_port}"
+            os.environ["TASKS_DIR"] = tasks_dir.name
+            os.environ["MAX_TASKS"] = str(max(args.tasks, args.concurrency) + 1)
+            backend = InProcessBackend()
+            backend.start()
+            base_url = backend.base_url
+            monitor = LoopMonitor()
+            monitor.start(backend.loop)
+
+        runner = LoadRunner(base_url, args)
+        duration = asyncio.run(runner.run())
+        report = build_report(runner, duration, args, monitor)
+    finally:
+        if monitor:
+            monitor.stop()
+        if backend:
+            backend.stop()
+        if fake_process:
+            fake_process.terminate()
+            fake_process.wait(timeout=10)
+        if tasks_dir:
+            tasks_dir.cleanup()
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
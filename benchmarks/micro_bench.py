@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+图像预处理热点函数微基准测试
+
+在合成图像语料（多种尺寸、格式、宽高比）上测量以下函数的耗时和峰值内存：
+    - WanModelClient._ensure_size_limits
+    - WanModelClient._encode_img
+    - encode_image_for_vl
+    - AccessoryTryOnPipeline._crop_detail_image
+    - validate_file_size
+
+峰值内存使用 tracemalloc 统计，覆盖 Python 层分配（文件字节、base64 字符串等），
+不包含 Pillow 在 C 层直接分配的像素缓冲区。
+
+使用示例：
+    # 运行并保存基线
+    python -m benchmarks.micro_bench --save-baseline results/micro_bench_baseline.json
+    # 与基线对比，耗时或内存劣化超过 25% 时以非零状态码退出
+    python -m benchmarks.micro_bench --compare results/micro_bench_baseline.json --threshold 0.25
+
+不同机器之间的耗时通过固定的校准负载归一化后再比较。
+"""
+from typing import Optional, Dict, Any, List, Callable, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from PIL import Image
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from try_on_anything.clients import WanModelClient, QwenVLClient
+from try_on_anything.generators import AccessoryTryOnImageGenerator
+from try_on_anything.pipelines import AccessoryTryOnPipeline
+from try_on_anything.utils.image_utils import encode_image_for_vl
+from backend.app.api.utils import validate_file_size
+
+# 合成图像语料：(名称, 宽, 高)
+FULL_SIZES = [
+    ("small_1x1", 256, 256),  # 小于最小边，需要放大
+    ("medium_4x3", 1280, 960),  # 常见手机照片缩略尺寸，无需缩放
+    ("wide_16x9", 1920, 1080),
+    ("tall_1x3", 600, 1800),
+    ("large_3x2", 6000, 4000),  # 超过最大边，需要缩小
+]
+QUICK_SIZES = [
+    ("small_1x1", 128, 128),
+    ("medium_4x3", 640, 480),
+]
+FORMATS = [("jpg", "JPEG"), ("png", "PNG"), ("webp", "WEBP")]
+# 细节裁剪使用的相对坐标边界框
+DETAIL_BBOX = {"x1": 0.2, "y1": 0.2, "x2": 0.6, "y2": 0.7}
+
+
+def build_corpus(root: Path, quick: bool = False) -> List[Tuple[str, Path]]:
+    """生成合成图像语料
+
+    Args:
+        root (Path): 语料输出目录
+        quick (bool, optional): 是否使用小规模语料（用于测试），默认值为 False
+
+    Returns:
+        List[Tuple[str, Path]]: (用例名称, 图像路径) 列表
+    """
+    corpus = []
+    for size_name, width, height in (QUICK_SIZES if quick else FULL_SIZES):
+        # 低分辨率噪声放大后的图像更接近真实照片的压缩率，纯色或全分辨率噪声都会让编码耗时严重失真
+        noise = Image.effect_noise((max(1, width // 4), max(1, height // 4)), 48)
+        img = noise.convert("RGB").resize((width, height), Image.Resampling.BICUBIC)
+        for ext, img_format in FORMATS:
+            path = root / f"{size_name}.{ext}"
+            img.save(path, format=img_format)
+            corpus.append((f"{size_name}.{ext}", path))
+    return corpus
+
+
+def calibrate(iterations: int = 200_000) -> float:
+    """执行固定的纯 Python 负载，返回耗时（秒），用于跨机器归一化"""
+    start = time.perf_counter()
+    total = 0
+    for i in range(iterations):
+        total += i * i % 7
+    return time.perf_counter() - start
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """测量函数耗时和峰值内存
+
+    先执行一次预热，然后计时 repeat 次，最后单独在 tracemalloc 下执行一次统计峰值内存
+    （tracemalloc 会显著拖慢执行，因此不与计时混在一起）。
+
+    Args:
+        func (Callable[[], Any]): 被测函数（无参数）
+        repeat (int): 计时重复次数
+
+    Returns:
+        Dict[str, float]: 包含 median_ms/min_ms/mean_ms/peak_mem_bytes 的统计结果
+    """
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "min_ms": round(min(timings) * 1000, 4),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 4),
+        "peak_mem_bytes": peak,
+    }
+
+
+def build_cases(corpus: List[Tuple[str, Path]]) -> List[Tuple[str, str, Callable[[], Any]]]:
+    """为语料中的每张图像构造各被测函数的调用
+
+    Returns:
+        List[Tuple[str, str, Callable[[], Any]]]: (函数名, 用例名, 无参调用) 列表
+    """
+    wan_client = WanModelClient(api_key="sk-micro-bench")
+    pipeline = AccessoryTryOnPipeline(
+        img_generator=AccessoryTryOnImageGenerator(wan_client=wan_client),
+        vl_client=QwenVLClient(api_key="sk-micro-bench"))
+    loop = asyncio.new_event_loop()
+
+    def _ensure_size_limits(path: Path):
+        with Image.open(path) as img:
+            img.load()
+            return wan_client._ensure_size_limits(img)
+
+    cases = []
+    for case_name, path in corpus:
+        content = path.read_bytes()
+        cases.extend([
+            ("WanModelClient._ensure_size_limits", case_name,
+             lambda p=path: _ensure_size_limits(p)),
+            ("WanModelClient._encode_img", case_name,
+             lambda p=path: wan_client._encode_img(str(p))),
+            ("encode_image_for_vl", case_name,
+             lambda p=path: encode_image_for_vl(str(p))),
+            ("AccessoryTryOnPipeline._crop_detail_image", case_name,
+             lambda p=path: pipeline._crop_detail_image(str(p), DETAIL_BBOX)),
+            ("validate_file_size", case_name,
+             lambda c=content, n=case_name: loop.run_until_complete(validate_file_size(c, n))),
+        ])
+    return cases
+
+
+def run_benchmarks(quick: bool = False,
+                   repeat: Optional[int] = None,
+                   functions: Optional[List[str]] = None) -> Dict[str, Any]:
+    """运行全部微基准测试
+
+    Args:
+        quick (bool, optional): 是否使用小规模语料和较少的重复次数，默认值为 False
+        repeat (int, optional): 每个用例的计时重复次数，默认值为 None（quick 模式 3 次，否则 5 次）
+        functions (List[str], optional): 仅运行名称包含其中任一关键字的函数，默认值为 None（全部运行）
+
+    Returns:
+        Dict[str, Any]: 测试结果，results 以 "函数名[用例名]" 为键
+    """
+    repeat = repeat or (3 if quick else 5)
+    # 大图缩放会触发 WARNING 日志，避免刷屏影响计时
+    logging.disable(logging.WARNING)
+    try:
+        with tempfile.TemporaryDirectory(prefix="try_on_micro_bench_") as tmp_dir:
+            corpus = build_corpus(Path(tmp_dir), quick=quick)
+            results = {}
+            for func_name, case_name, call in build_cases(corpus):
+                if functions and not any(f in func_name for f in functions):
+                    continue
+                results[f"{func_name}[{case_name}]"] = measure(call, repeat)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return {
+        "benchmark": "micro_bench",
+        "quick": quick,
+        "repeat": repeat,
+        "calibration_seconds": round(min(calibrate() for _ in range(3)), 6),
+        "results": results,
+    }
+
+
+def compare_with_baseline(current: Dict[str, Any],
+                          baseline: Dict[str, Any],
+                          threshold: float = 0.25,
+                          memory_threshold: Optional[float] = None) -> List[str]:
+    """与基线结果对比，返回劣化项描述列表
+
+    耗时按两次运行的校准负载耗时之比归一化后比较中位数，内存直接比较峰值。
+
+    Args:
+        current (Dict[str, Any]): 本次运行结果
+        baseline (Dict[str, Any]): 基线结果
+        threshold (float, optional): 允许的耗时劣化比例，默认值为 0.25（25%）
+        memory_threshold (float, optional): 允许的内存劣化比例，默认值为 None（与 threshold 相同）
+
+    Returns:
+        List[str]: 劣化项描述，为空表示没有超过阈值的劣化
+    """
+    memory_threshold = threshold if memory_threshold is None else memory_threshold
+    scale = current["calibration_seconds"] / baseline["calibration_seconds"]
+    regressions = []
+    for key, base in baseline["results"].items():
+        now = current["results"].get(key)
+        if now is None:
+            continue
+        expected_ms = base["median_ms"] * scale
+        if expected_ms > 0 and now["median_ms"] > expected_ms * (1 + threshold):
+            regressions.append(
+                f"{key}: 耗时 {now['median_ms']:.3f}ms，基线（归一化后）{expected_ms:.3f}ms，"
+                f"劣化 {now['median_ms'] / expected_ms - 1:.0%}")
+        if base["peak_mem_bytes"] > 0 and \
+                now["peak_mem_bytes"] > base["peak_mem_bytes"] * (1 + memory_threshold):
+            regressions.append(
+                f"{key}: 峰值内存 {now['peak_mem_bytes']} 字节，基线 {base['peak_mem_bytes']} 字节，"
+                f"劣化 {now['peak_mem_bytes'] / base['peak_mem_bytes'] - 1:.0%}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="图像预处理热点函数微基准测试")
+    parser.add_argument("--quick", action="store_true", help="使用小规模语料快速运行")
+    parser.add_argument("--repeat", type=int, default=None, help="每个用例的计时重复次数")
+    parser.add_argument("--function", action="append", default=None,
+                        help="仅运行名称包含该关键字的函数，可多次指定")
+    parser.add_argument("--output", type=str, default=None, help="结果 JSON 输出路径")
+    parser.add_argument("--save-baseline", type=str, default=None, help="将本次结果保存为基线")
+    parser.add_argument("--compare", type=str, default=None, help="与指定基线文件对比")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="允许的劣化比例 (默认: 0.25)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(quick=args.quick, repeat=args.repeat, functions=args.function)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    print(output)
+    for path in filter(None, [args.output, args.save_baseline]):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(output, encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare_with_baseline(report, baseline, threshold=args.threshold)
+        if regressions:
+            print("\n检测到性能劣化：")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\n未检测到超过阈值的性能劣化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
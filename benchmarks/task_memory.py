@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+任务信息（TaskInfo）内存占用基准测试
+
+按真实流程填充任务信息（上传图片路径、识别结果、DashScope 任务信息、时间线、结果），
+使用 tracemalloc 统计保留 N 个任务时每个任务的平均内存占用。
+
+使用示例：
+    python -m benchmarks.task_memory --counts 10000 100000
+    # 每个任务超过 2048 字节时以非零状态码退出
+    python -m benchmarks.task_memory --budget 2048
+"""
+from typing import Optional, Dict, Any, List
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+import uuid
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from backend.app.schemas import TaskType
+from backend.app.services.task_manager import TaskInfo
+
+# 每个任务的默认内存预算（字节）
+DEFAULT_BUDGET_BYTES = 2048
+# 模拟的 DashScope 图像生成任务响应中的结果图链接
+_RESULT_URL = ("https://dashscope-result-bj.oss-cn-beijing.aliyuncs.com/1d/ab/"
+               "20260101/a1b2c3d4/{task_id}.png?Expires=1767225600&OSSAccessKeyId=LTAI5t"
+               "&Signature=abcdefghijklmnopqrstuvwxyz0123456789")
+
+
+def _fake_dashscope_result(task_dir: Path, dashscope_task_id: str) -> Dict[str, Any]:
+    image_url = _RESULT_URL.format(task_id=dashscope_task_id)
+    return {
+        "request_id": str(uuid.uuid4()),
+        "output": {
+            "task_id": dashscope_task_id,
+            "task_status": "SUCCEEDED",
+            "submit_time": "2026-01-01 12:00:00.000",
+            "scheduled_time": "2026-01-01 12:00:00.100",
+            "end_time": "2026-01-01 12:00:20.000",
+            "finished": True,
+            "choices": [{"finish_reason": "stop",
+                         "message": {"role": "assistant",
+                                     "content": [{"image": image_url, "type": "image"}]}}],
+        },
+        "usage": {"image_count": 1, "size": "1280*1280"},
+        "clothing_type": "上衣",
+        "person_position": "上身",
+        "downloaded_images": [str(task_dir / f"{dashscope_task_id}.png")],
+    }
+
+
+def build_task(root: Path) -> TaskInfo:
+    """按真实流程构造一个已完成的服装任务"""
+    task_id = str(uuid.uuid4())
+    task_dir = root / task_id
+    task_info = TaskInfo(task_id, task_dir, TaskType.CLOTHING)
+    task_info.clothing_image_path = str(task_dir / f"{uuid.uuid4().hex}.jpg")
+    task_info.person_image_path = str(task_dir / f"{uuid.uuid4().hex}.jpg")
+    task_info.add_event("started")
+    for event, detail in [("vl_analysis.start", "qwen3-vl-plus"), ("vl_analysis.end", None),
+                          ("wan_submit.start", "wan2.6-image"), ("wan_submit.end", None),
+                          ("wan_polling.start", "wan2.6-image"), ("wan_polling.poll", "PENDING"),
+                          ("wan_polling.poll", "RUNNING"), ("wan_polling.poll", "SUCCEEDED"),
+                          ("wan_polling.end", None), ("download.start", "wan2.6-image"),
+                          ("download.end", None)]:
+        task_info.add_event(event, detail)
+    dashscope_task_id = str(uuid.uuid4())
+    task_info.dashscope_task_id = dashscope_task_id
+    task_info.dashscope_task_signature = uuid.uuid4().hex * 2
+    task_info.dashscope_task_context = {"clothing_type": "上衣", "person_position": "上身"}
+    task_info.clothing_type = "上衣"
+    task_info.person_position = "上身"
+    task_info.update_status(task_info.status, "正在下载生成结果...", 90)
+    task_info.set_result(_fake_dashscope_result(task_dir, dashscope_task_id))
+    return task_info
+
+
+def measure_tasks(count: int, root: Optional[Path] = None) -> Dict[str, Any]:
+    """统计保留 count 个任务时的内存占用
+
+    Args:
+        count (int): 任务数量
+        root (Path, optional): 任务目录根路径（只用于构造路径，不会创建目录），默认值为 /tmp/tasks
+
+    Returns:
+        Dict[str, Any]: 包含 total_bytes/bytes_per_task 的统计结果
+    """
+    root = root or Path("/tmp/tasks")
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tasks = {}
+        for _ in range(count):
+            task_info = build_task(root)
+            tasks[task_info.task_id] = task_info
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    total = after - before
+    return {"count": count, "total_bytes": total, "bytes_per_task": round(total / count, 1)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="任务信息内存占用基准测试")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10_000, 100_000],
+                        help="保留的任务数量 (默认: 10000 100000)")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET_BYTES,
+                        help=f"每个任务的内存预算（字节，默认: {DEFAULT_BUDGET_BYTES}）")
+    parser.add_argument("--output", type=str, default=None, help="结果 JSON 输出路径")
+    args = parser.parse_args(argv)
+
+    results = [measure_tasks(count) for count in args.counts]
+    report = {"benchmark": "task_memory", "budget_bytes_per_task": args.budget, "results": results}
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(output, encoding="utf-8")
+
+    over_budget = [r for r in results if r["bytes_per_task"] > args.budget]
+    for r in over_budget:
+        print(f"\n{r['count']} 个任务时每个任务占用 {r['bytes_per_task']} 字节，超过预算 {args.budget} 字节")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ export const submitTryOnTask = accessoryApi.submitTask
 export const getTaskStatus = accessoryApi.getTaskStatus
 export const getTaskResult = accessoryApi.getTaskResult
 export const deleteTask = accessoryApi.deleteTask
+export const cancelTask = accessoryApi.cancelTask
 export const resubmitTask = accessoryApi.resubmitTask
 
 export default accessoryApi
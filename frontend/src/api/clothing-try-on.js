@@ -8,6 +8,7 @@ export const submitClothingTryOnTask = clothingApi.submitTask
 export const getClothingTaskStatus = clothingApi.getTaskStatus
 export const getClothingTaskResult = clothingApi.getTaskResult
 export const deleteClothingTask = clothingApi.deleteTask
+export const cancelClothingTask = clothingApi.cancelTask
 export const resubmitClothingTask = clothingApi.resubmitTask
 
 export default clothingApi
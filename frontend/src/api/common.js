@@ -62,10 +62,15 @@ export function createTryOnApi(apiPrefix) {
     /**
      * 查询任务状态
      * @param {string} taskId - 任务ID
+     * @param {number|null} waitForChange - 已知的状态版本号，传入时服务端等待到状态变化或超时后才返回（长轮询）
+     * @param {number} timeout - 长轮询最长等待秒数
      * @returns {Promise} 返回任务状态
      */
-    async getTaskStatus(taskId) {
-      const response = await api.get(`/${apiPrefix}/status/${taskId}`)
+    async getTaskStatus(taskId, waitForChange = null, timeout = 25) {
+      const params = waitForChange === null || waitForChange === undefined
+        ? {}
+        : { wait_for_change: waitForChange, timeout }
+      const response = await api.get(`/${apiPrefix}/status/${taskId}`, { params })
       return response.data
     },
 
@@ -79,6 +84,16 @@ export function createTryOnApi(apiPrefix) {
       return response.data
     },
 
+    /**
+     * 取消任务（停止处理中的任务，任务文件保留，可以重新提交）
+     * @param {string} taskId - 任务ID
+     * @returns {Promise} 返回取消后的任务状态
+     */
+    async cancelTask(taskId) {
+      const response = await api.post(`/${apiPrefix}/cancel/${taskId}`)
+      return response.data
+    },
+
     /**
      * 删除任务
      * @param {string} taskId - 任务ID
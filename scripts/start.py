@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
-开发环境启动脚本
-同时启动前后端服务，统一管理进程
+启动脚本
+- 开发模式（默认）：同时启动前后端服务，统一管理进程
+- 生产模式（--mode prod）：以多个工作进程运行后端服务，支持 SIGHUP 平滑重启
 """
 
 import subprocess
@@ -12,8 +13,20 @@ import time
 import logging
 import threading
 import argparse
+import importlib.util
+import inspect
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
+
+# 项目根目录
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 后端 ASGI 应用的导入路径
+BACKEND_APP = 'backend.app.main:app'
+
+# 可供多个工作进程共享的任务状态存储（目前任务状态只保存在进程内存中，尚无共享存储实现）
+SHARED_TASK_STORES = frozenset()
 
 # 保存原始代码页（用于退出时恢复）
 _original_codepage = None
@@ -104,14 +117,18 @@ class ColoredFormatter(logging.Formatter):
         return result
 
 
-def setup_logging():
-    """配置日志系统"""
+def setup_logging(prefix='dev'):
+    """配置日志系统
+
+    Args:
+        prefix (str): 日志文件名前缀，默认值为 'dev'
+    """
     # 创建 logs 目录
-    log_dir = Path(__file__).parent.parent / 'logs'
+    log_dir = PROJECT_ROOT / 'logs'
     log_dir.mkdir(exist_ok=True)
 
     # 生成日志文件名（按日期）
-    log_file = log_dir / f"dev_{datetime.now().strftime('%Y%m%d')}.log"
+    log_file = log_dir / f"{prefix}_{datetime.now().strftime('%Y%m%d')}.log"
 
     # 创建根 logger
     root_logger = logging.getLogger()
@@ -379,6 +396,129 @@ def start_services(logger: logging.Logger,
         logger.info("所有服务已停止")
 
 
+def validate_workers(workers: int, task_store: str) -> Optional[str]:
+    """校验工作进程数与任务状态存储是否匹配
+
+    每个工作进程都有自己的内存，任务状态只保存在内存中时，创建任务和查询状态的请求
+    可能落到不同的工作进程上，导致查询不到任务。
+
+    Args:
+        workers (int): 工作进程数
+        task_store (str): 任务状态存储（配置项 TASK_STORE）
+
+    Returns:
+        Optional[str]: 校验失败时的错误信息，校验通过时为 None
+    """
+    if workers < 1:
+        return f"工作进程数必须大于等于 1，当前为 {workers}"
+    if workers > 1 and task_store not in SHARED_TASK_STORES:
+        return (f"任务状态存储 TASK_STORE={task_store} 只保存在单个进程内存中，"
+                f"{workers} 个工作进程之间无法共享任务状态。"
+                "请使用 --workers 1，或配置可共享的任务状态存储后再启动多个工作进程")
+    return None
+
+
+def _module_available(name: str) -> bool:
+    """判断可选依赖是否已安装"""
+    return importlib.util.find_spec(name) is not None
+
+
+def build_server_config(host: str, port: int, workers: int,
+                        graceful_timeout: int):
+    """构建生产模式的 uvicorn 配置
+
+    已安装 uvloop/httptools（uvicorn[standard]）时使用它们作为事件循环和 HTTP 解析器，
+    否则退回 asyncio 事件循环和 h11。
+
+    Args:
+        host (str): 监听的主机地址
+        port (int): 监听的端口
+        workers (int): 工作进程数
+        graceful_timeout (int): 停止或重启工作进程时等待进行中请求完成的最长时间（秒）
+
+    Returns:
+        uvicorn.Config: uvicorn 配置
+    """
+    import uvicorn
+
+    return uvicorn.Config(
+        BACKEND_APP,
+        host=host,
+        port=port,
+        workers=workers,
+        loop='uvloop' if _module_available('uvloop') else 'asyncio',
+        http='httptools' if _module_available('httptools') else 'h11',
+        timeout_graceful_shutdown=graceful_timeout,
+        proxy_headers=True,
+        log_level='info')
+
+
+def start_production(logger: logging.Logger,
+                     host: str = "0.0.0.0",
+                     port: int = 8000,
+                     workers: int = 1,
+                     graceful_timeout: int = 30):
+    """以生产模式启动后端服务（不启动前端开发服务器）
+
+    主进程只负责监听端口和管理工作进程，工作进程启动时会先预热再接收请求。
+    即使只有一个工作进程也由 uvicorn 的多进程管理器托管，从而支持以下信号：
+    - SIGHUP：平滑重启，逐个启动新的工作进程，就绪后再停止对应的旧进程
+    - SIGINT/SIGTERM：等待进行中的请求完成（最长 graceful_timeout 秒）后退出
+
+    Args:
+        logger (logging.Logger): 日志记录器
+        host (str): 后端服务监听的主机地址
+        port (int): 后端服务监听的端口
+        workers (int): 工作进程数
+        graceful_timeout (int): 停止或重启工作进程时等待进行中请求完成的最长时间（秒）
+    """
+    # 工作进程以 spawn 方式启动，会继承主进程的 sys.path 和环境变量
+    for path in (PROJECT_ROOT / 'src', PROJECT_ROOT):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+    os.environ.setdefault('WARMUP_ON_STARTUP', '1')
+
+    from backend.app.config import get_config
+    from uvicorn.supervisors import Multiprocess
+
+    error = validate_workers(workers, get_config().TASK_STORE)
+    if error:
+        logger.error(error)
+        sys.exit(1)
+
+    server_config = build_server_config(host, port, workers, graceful_timeout)
+    if server_config.loop != 'uvloop' or server_config.http != 'httptools':
+        logger.warning("未安装 uvloop/httptools，使用 asyncio 事件循环和 h11，"
+                       "可通过 pip install 'uvicorn[standard]' 安装")
+
+    display_host = "localhost" if host == "0.0.0.0" else host
+    logger.info("=" * 60)
+    logger.info(f"生产模式: {workers} 个工作进程，事件循环 {server_config.loop}，"
+                f"HTTP 解析器 {server_config.http}")
+    logger.info(
+        f"{Colors.BLUE}  后端地址: http://{display_host}:{port}{Colors.RESET}")
+    if hasattr(signal, 'SIGHUP'):
+        logger.info(f"平滑重启: kill -HUP {os.getpid()}")
+    logger.info("=" * 60)
+
+    sock = server_config.bind_socket()
+    # 旧版本 uvicorn 的 Multiprocess 需要传入工作进程的入口函数
+    if 'target' in inspect.signature(Multiprocess).parameters:
+        import uvicorn
+        supervisor = Multiprocess(server_config,
+                                  target=uvicorn.Server(server_config).run,
+                                  sockets=[sock])
+    else:
+        supervisor = Multiprocess(server_config, sockets=[sock])
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+    logger.info("后端服务已停止")
+
+
 def main():
     """主函数"""
     # 设置 Windows 编码（保存原始代码页）
@@ -387,7 +527,7 @@ def main():
     try:
         # 解析命令行参数
         parser = argparse.ArgumentParser(
-            description='随心穿戴v1.1.0 - 开发环境启动脚本',
+            description='随心穿戴v1.1.0 - 启动脚本',
             formatter_class=argparse.RawDescriptionHelpFormatter,
             epilog='''
 示例:
@@ -399,8 +539,16 @@ def main():
 
   # 仅修改端口
   python scripts/start.py --port 9000
+
+  # 生产模式（只启动后端，支持 kill -HUP 平滑重启）
+  python scripts/start.py --mode prod --port 8000
         ''')
 
+        parser.add_argument('--mode',
+                            choices=['dev', 'prod'],
+                            default='dev',
+                            help='启动模式：dev 同时启动前后端开发服务，prod 以生产模式启动后端 (默认: dev)')
+
         parser.add_argument('--host',
                             type=str,
                             default='0.0.0.0',
@@ -411,8 +559,28 @@ def main():
                             default=8000,
                             help='后端服务监听的端口 (默认: 8000)')
 
+        parser.add_argument('--workers',
+                            type=int,
+                            default=int(os.getenv('WEB_CONCURRENCY', '1')),
+                            help='生产模式的工作进程数，大于 1 时需要可共享的任务状态存储 '
+                            '(默认: 环境变量 WEB_CONCURRENCY 或 1)')
+
+        parser.add_argument('--graceful-timeout',
+                            type=int,
+                            default=30,
+                            help='生产模式停止或重启工作进程时等待进行中请求完成的最长时间，单位秒 (默认: 30)')
+
         args = parser.parse_args()
 
+        if args.mode == 'prod':
+            setup_logging('prod')
+            start_production(get_logger('后端'),
+                             host=args.host,
+                             port=args.port,
+                             workers=args.workers,
+                             graceful_timeout=args.graceful_timeout)
+            return
+
         # 设置日志系统
         setup_logging()
         system_logger = get_logger('系统')
@@ -1,7 +1,10 @@
-from openai import AsyncOpenAI
 import os
 from pydantic import BaseModel
-from typing import Optional, Union, AsyncGenerator, Dict, Literal, List, Any
+from typing import Optional, Union, AsyncGenerator, Dict, Literal, List, Any, Tuple
+
+from ..common.constants import VL_CHAT_RATE_LIMIT, DEFAULT_DASHSCOPE_BASE_URL
+from ..common.deadline import Deadline, remaining_timeout
+from .resilience import get_guard, parse_retry_after, RETRYABLE_STATUS_CODES
 
 
 class ChatResponse(BaseModel):
@@ -16,25 +19,87 @@ class ChatChunkDelta(BaseModel):
     content: str
 
 
+def classify_openai_error(error: Exception) -> Tuple[bool, Optional[float]]:
+    """OpenAI 兼容接口的错误分类
+
+    Args:
+        error (Exception): 请求抛出的异常
+
+    Returns:
+        Tuple[bool, Optional[float]]: (是否可重试, Retry-After 秒数)
+    """
+    # openai 导入耗时较长，只在创建客户端时导入；能走到这里说明已经导入过
+    from openai import APIStatusError, APIConnectionError
+
+    if isinstance(error, APIStatusError):
+        return (error.status_code in RETRYABLE_STATUS_CODES,
+                parse_retry_after(error.response.headers.get("Retry-After")))
+    # 包括 APITimeoutError
+    if isinstance(error, APIConnectionError):
+        return True, None
+    return False, None
+
+
 class QwenVLClient:
     """ Qwen-VL 客户端封装，用于与 OpenAI 兼容的接口进行交互
 
     Args:
         api_key (str, optional): API 密钥，如果不提供则从环境变量 DASHSCOPE_API_KEY 读取，默认值为 None。
-        base_url (str, optional): API 基础 URL，默认值为 "https://dashscope.aliyuncs.com/compatible-mode/v1"。
+        base_url (str, optional): API 基础 URL，默认值为 None，即 "{DashScope 服务地址}/compatible-mode/v1"，
+            其中 DashScope 服务地址从环境变量 DASHSCOPE_BASE_URL 读取，未设置时为 DEFAULT_DASHSCOPE_BASE_URL。
     """
 
     def __init__(
             self,
             api_key: Optional[str] = None,
-            base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+            base_url: Optional[str] = None
     ):
 
         self.api_key = api_key or os.getenv("DASHSCOPE_API_KEY")
         if not self.api_key:
             raise ValueError(
                 "API key 未提供，请设置 DASHSCOPE_API_KEY 环境变量或传入 api_key 参数")
-        self.client = AsyncOpenAI(api_key=self.api_key, base_url=base_url)
+        if base_url is None:
+            dashscope_base_url = (os.getenv("DASHSCOPE_BASE_URL")
+                                  or DEFAULT_DASHSCOPE_BASE_URL).rstrip("/")
+            base_url = f"{dashscope_base_url}/compatible-mode/v1"
+        # openai 包导入约需数百毫秒，推迟到第一次创建客户端时再导入，加快服务冷启动
+        from openai import AsyncOpenAI
+
+        # 重试由共享的容错保护层负责，关闭 SDK 自带的重试避免叠加
+        self.client = AsyncOpenAI(api_key=self.api_key,
+                                  base_url=base_url,
+                                  max_retries=0)
+        self._guard = get_guard("vl.chat", self.api_key, VL_CHAT_RATE_LIMIT)
+
+    async def aclose(self) -> None:
+        """关闭 OpenAI 客户端的连接池
+
+        也可以使用 async with QwenVLClient(...) as client: 在退出时自动关闭。
+        """
+        await self.client.close()
+
+    async def __aenter__(self) -> "QwenVLClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    async def _create_completion(self,
+                                 timeout: Optional[float] = None,
+                                 deadline: Optional[Deadline] = None,
+                                 **kwargs):
+        """在容错保护层（限流、重试、熔断）中调用对话补全接口
+
+        每次请求（包括重试）都按剩余预算重新计算超时时间，timeout 和 deadline 都为 None 时使用 SDK 默认超时
+        """
+        def _create():
+            request_timeout = remaining_timeout(deadline, timeout)
+            if request_timeout is not None:
+                return self.client.chat.completions.create(**kwargs, timeout=request_timeout)
+            return self.client.chat.completions.create(**kwargs)
+
+        return await self._guard.call(_create, classify=classify_openai_error)
 
     async def chat(
         self,
@@ -44,7 +109,9 @@ class QwenVLClient:
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         enable_thinking: bool = False,
-        thinking_budget: Optional[int] = None
+        thinking_budget: Optional[int] = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[Deadline] = None
     ) -> Union[ChatResponse, AsyncGenerator[dict, None]]:
         """与 Qwen-VL 模型进行对话
 
@@ -56,6 +123,8 @@ class QwenVLClient:
             max_tokens: 最大输出 token 数
             enable_thinking: 是否启用思考模式，默认为 False
             thinking_budget: 思考预算，单位为 token
+            timeout: 请求超时时间（秒），默认为 None（使用 SDK 默认超时）
+            deadline: 任务截止时间，请求超时时间不超过剩余预算，默认为 None
 
         Returns:
             非流式模式返回 ChatResponse，流式模式返回异步生成器（yield dict 包含 content 或 reasoning_content）
@@ -64,6 +133,8 @@ class QwenVLClient:
             "model": model,
             "messages": messages,
             "stream": stream,
+            "timeout": timeout,
+            "deadline": deadline,
         }
         if temperature is not None:
             kwargs["temperature"] = temperature
@@ -86,7 +157,7 @@ class QwenVLClient:
         if stream:
             return self._stream_chat(**kwargs)
         else:
-            response = await self.client.chat.completions.create(**kwargs)
+            response = await self._create_completion(**kwargs)
             message = response.choices[0].message
             reasoning_content = getattr(message, 'reasoning_content', None)
             return ChatResponse(content=message.content or "",
@@ -98,7 +169,7 @@ class QwenVLClient:
         Yields:
             ChatChunkDelta: 包含思考内容或最终回复内容的增量数据类
         """
-        response = await self.client.chat.completions.create(**kwargs)
+        response = await self._create_completion(**kwargs)
         async for chunk in response:
             if not chunk.choices:
                 continue
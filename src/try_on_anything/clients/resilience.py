@@ -0,0 +1,331 @@
+from typing import Optional, Dict, Any, Callable, Awaitable, Tuple, TypeVar
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import logging
+import random
+import time
+
+import httpx
+
+from ..common.constants import (DEFAULT_MAX_RETRIES, DEFAULT_RETRY_BASE_DELAY,
+                                DEFAULT_RETRY_MAX_DELAY,
+                                CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                                CIRCUIT_BREAKER_RECOVERY_TIMEOUT)
+
+T = TypeVar("T")
+
+# 错误分类函数类型定义
+# ErrorClassifier: 判断异常是否可以重试
+# 参数说明:
+#   - error (Exception): 调用过程中抛出的异常
+# 返回值: (是否可重试, 服务端要求的重试等待时间（秒），没有则为 None)
+ErrorClassifier = Callable[[Exception], Tuple[bool, Optional[float]]]
+
+# 可重试的 HTTP 状态码
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# 请求确定未被服务端处理的状态码（非幂等请求只在这些情况下重试）
+NOT_PROCESSED_STATUS_CODES = {429, 502, 503, 504}
+
+
+class CircuitOpenError(ConnectionError):
+    """熔断器处于打开状态时抛出，调用会被直接拒绝"""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"服务 {name} 暂时不可用（熔断中），请在 {retry_in:.0f} 秒后重试")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头，支持秒数和 HTTP 日期两种格式
+
+    Args:
+        value (Optional[str]): Retry-After 响应头的值
+
+    Returns:
+        Optional[float]: 需要等待的秒数，无法解析时返回 None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def classify_httpx_error(error: Exception,
+                         idempotent: bool = True) -> Tuple[bool, Optional[float]]:
+    """httpx 请求的错误分类
+
+    Args:
+        error (Exception): 请求抛出的异常
+        idempotent (bool, optional): 请求是否幂等，默认值为 True。
+            非幂等请求（如任务提交）只在请求确定未被处理时重试，避免重复生成
+
+    Returns:
+        Tuple[bool, Optional[float]]: (是否可重试, Retry-After 秒数)
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        retryable_codes = RETRYABLE_STATUS_CODES if idempotent else NOT_PROCESSED_STATUS_CODES
+        return (status_code in retryable_codes,
+                parse_retry_after(error.response.headers.get("Retry-After")))
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return True, None
+    if isinstance(error, httpx.TransportError):
+        return idempotent, None
+    return False, None
+
+
+class TokenBucketRateLimiter:
+    """令牌桶限流器
+
+    Args:
+        rate (float): 令牌生成速率（个/秒）
+        capacity (float, optional): 桶容量，即允许的最大突发请求数，默认值为 None（等于 rate，至少为 1）
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """获取一个令牌，令牌不足时异步等待"""
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后打开，打开期间直接拒绝调用，冷却后放行一次试探请求
+
+    Args:
+        name (str): 熔断器名称（用于日志和健康检查）
+        failure_threshold (int, optional): 触发熔断的连续失败次数，默认值为 CIRCUIT_BREAKER_FAILURE_THRESHOLD (5)
+        recovery_timeout (float, optional): 熔断后进入半开状态的等待时间（秒），默认值为 CIRCUIT_BREAKER_RECOVERY_TIMEOUT (30.0)
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                 recovery_timeout: float = CIRCUIT_BREAKER_RECOVERY_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.total_failures = 0
+        self.total_rejections = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态，打开状态超过冷却时间后视为半开"""
+        if (self._state == self.OPEN and
+                time.monotonic() - self._opened_at >= self.recovery_timeout):
+            return self.HALF_OPEN
+        return self._state
+
+    def before_call(self) -> None:
+        """调用前检查，熔断中时抛出 CircuitOpenError
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或半开状态下已有试探请求在进行中
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.total_rejections += 1
+        retry_in = max(0.0, self.recovery_timeout -
+                       (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self) -> None:
+        """记录一次成功调用"""
+        if self._state != self.CLOSED:
+            logging.info(f"熔断器 {self.name} 试探请求成功，恢复正常")
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """记录一次失败调用"""
+        self.total_failures += 1
+        self._consecutive_failures += 1
+        if (self._trial_in_flight or
+                self._consecutive_failures >= self.failure_threshold):
+            if self._state != self.OPEN or self._trial_in_flight:
+                logging.warning(
+                    f"熔断器 {self.name} 打开（连续失败 {self._consecutive_failures} 次），"
+                    f"{self.recovery_timeout:.0f} 秒内的调用将直接失败")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """调用既未成功也未计为失败（如参数错误）时，释放半开状态的试探名额"""
+        self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """熔断器状态快照（用于健康检查）"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "total_failures": self.total_failures,
+            "total_rejections": self.total_rejections,
+        }
+
+
+class ResilienceGuard:
+    """远程调用保护层：令牌桶限流 + 指数退避重试（遵循 Retry-After）+ 熔断
+
+    Args:
+        name (str): 保护层名称
+        rate_limit (float): 限流速率（请求/秒）
+        max_retries (int, optional): 最大重试次数，默认值为 DEFAULT_MAX_RETRIES (3)
+        base_delay (float, optional): 首次重试等待时间（秒），默认值为 DEFAULT_RETRY_BASE_DELAY (1.0)
+        max_delay (float, optional): 单次重试最大等待时间（秒），默认值为 DEFAULT_RETRY_MAX_DELAY (30.0)
+    """
+
+    def __init__(self,
+                 name: str,
+                 rate_limit: float,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 base_delay: float = DEFAULT_RETRY_BASE_DELAY,
+                 max_delay: float = DEFAULT_RETRY_MAX_DELAY):
+        self.name = name
+        self.rate_limiter = TokenBucketRateLimiter(rate_limit)
+        self.circuit_breaker = CircuitBreaker(name)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """计算第 attempt 次重试前的等待时间，服务端给出 Retry-After 时优先使用"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        delay = min(self.base_delay * (2**attempt), self.max_delay)
+        # 加入随机抖动，避免大量请求同时重试
+        return delay * random.uniform(0.5, 1.0)
+
+    async def call(self, func: Callable[[], Awaitable[T]],
+                   classify: ErrorClassifier = classify_httpx_error) -> T:
+        """在保护层中执行一次远程调用
+
+        Args:
+            func (Callable[[], Awaitable[T]]): 发起远程调用的无参协程函数，每次重试都会重新调用
+            classify (ErrorClassifier, optional): 错误分类函数，默认按 httpx 幂等请求处理
+
+        Returns:
+            T: func 的返回值
+
+        Raises:
+            CircuitOpenError: 熔断器打开时
+            Exception: 不可重试的错误，或重试次数用尽后的最后一次错误
+        """
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            self.circuit_breaker.before_call()
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                self.circuit_breaker.release()
+                raise
+            except Exception as e:
+                retryable, retry_after = classify(e)
+                if not retryable:
+                    # 不可重试的错误（如 400 参数错误）说明服务本身可用
+                    self.circuit_breaker.release()
+                    raise
+                # 限流（429）不代表服务故障，不计入熔断
+                is_rate_limited = (isinstance(e, httpx.HTTPStatusError) and
+                                   e.response.status_code == 429) or (
+                                       getattr(e, "status_code", None) == 429)
+                if is_rate_limited:
+                    self.circuit_breaker.release()
+                else:
+                    self.circuit_breaker.record_failure()
+                if attempt >= self.max_retries:
+                    logging.error(f"{self.name} 调用失败，已重试 {attempt} 次: {e!r}")
+                    raise
+                delay = self._backoff_delay(attempt, retry_after)
+                attempt += 1
+                logging.warning(
+                    f"{self.name} 调用失败: {e!r}，{delay:.1f} 秒后进行第 {attempt} 次重试")
+                await asyncio.sleep(delay)
+            else:
+                self.circuit_breaker.record_success()
+                return result
+
+
+# 全局保护层注册表，键为 (接口名称, API Key 哈希)，保证同一接口 + API Key 共享限流和熔断状态
+_guards: Dict[Tuple[str, str], ResilienceGuard] = {}
+
+
+def _hash_api_key(api_key: Optional[str]) -> str:
+    """对 API Key 做哈希，避免在日志和健康检查中泄露明文"""
+    if not api_key:
+        return "anonymous"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def get_guard(endpoint: str, api_key: Optional[str],
+              rate_limit: float) -> ResilienceGuard:
+    """获取（或创建）指定接口和 API Key 对应的保护层
+
+    Args:
+        endpoint (str): 接口名称，如 "wan.submit"
+        api_key (Optional[str]): API Key，为 None 表示无需鉴权的接口
+        rate_limit (float): 首次创建时使用的限流速率（请求/秒）
+
+    Returns:
+        ResilienceGuard: 保护层实例
+    """
+    key = (endpoint, _hash_api_key(api_key))
+    guard = _guards.get(key)
+    if guard is None:
+        guard = ResilienceGuard(name=f"{endpoint}[{key[1]}]", rate_limit=rate_limit)
+        _guards[key] = guard
+    return guard
+
+
+def get_circuit_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """获取所有熔断器的状态（用于健康检查端点）
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 键为保护层名称，值为熔断器状态快照
+    """
+    return {
+        guard.name: guard.circuit_breaker.snapshot()
+        for guard in _guards.values()
+    }
@@ -1,27 +1,39 @@
 from typing import List, Optional, Dict, Any
+import asyncio
 import os
 import logging
 import httpx
 import base64
 import mimetypes
 import io
+from functools import partial
 from PIL import Image
 from ..common.constants import (
     MIN_IMAGE_SIZE_FOR_WAN,
     MAX_IMAGE_SIZE_FOR_WAN,
-    HTTP_REQUEST_TIMEOUT
+    HTTP_REQUEST_TIMEOUT,
+    DEFAULT_DASHSCOPE_BASE_URL,
+    WAN_SUBMIT_RATE_LIMIT,
+    WAN_QUERY_RATE_LIMIT
 )
+from ..common.deadline import Deadline, remaining_timeout
+from ..observability.metrics import observe_stage, STAGE_ENCODE, STAGE_WAN_SUBMIT
+from .resilience import get_guard, classify_httpx_error
 
 
 class WanModelClient:
     """通义万相-图像生成与编辑模型调用类"""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 base_url: Optional[str] = None):
         """
         初始化模型调用类，对于图像的输入需要满足WAN模型的最小和最大尺寸要求，最小尺寸为384，最大尺寸为5000
 
         Args:
             api_key (str, optional): API 密钥，如果不提供则从环境变量 WAN_API_KEY 读取，默认值为 None。
+            base_url (str, optional): DashScope 服务地址，如果不提供则从环境变量 DASHSCOPE_BASE_URL 读取，
+                默认值为 None（使用 DEFAULT_DASHSCOPE_BASE_URL）。
         """
         self.api_key = api_key or os.getenv("DASHSCOPE_API_KEY")
         if not self.api_key:
@@ -29,12 +41,68 @@ class WanModelClient:
                 "API key 未提供，请设置 DASHSCOPE_API_KEY 环境变量或传入 api_key 参数")
 
         # 设置API URL和请求头
-        self.base_url = "https://dashscope.aliyuncs.com/api/v1/services/aigc/image-generation/generation"
+        self.api_base_url = (base_url or os.getenv("DASHSCOPE_BASE_URL")
+                             or DEFAULT_DASHSCOPE_BASE_URL).rstrip("/")
+        self.base_url = f"{self.api_base_url}/api/v1/services/aigc/image-generation/generation"
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
             "X-DashScope-Async": "enable"
         }
+        # 复用的 HTTP 客户端（连接池和 TLS 会话在多次请求之间复用），第一次请求时在当前事件循环中创建
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        # 负责在创建客户端的事件循环结束时关闭客户端的后台任务
+        self._http_closer: Optional[asyncio.Task] = None
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """获取复用的 HTTP 客户端
+
+        httpx 的连接绑定在创建它的事件循环上，事件循环变化时（例如多次调用 asyncio.run）重新创建。
+        旧客户端只能在原事件循环中关闭：创建客户端时同时启动一个后台任务，
+        事件循环结束时（asyncio.run 退出前会取消并等待剩余任务）由该任务关闭客户端，不会泄漏连接。
+
+        Returns:
+            httpx.AsyncClient: HTTP 客户端
+        """
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_client.is_closed or self._http_loop is not loop:
+            self._release_http_client()
+            client = httpx.AsyncClient(timeout=HTTP_REQUEST_TIMEOUT)
+            self._http_client, self._http_loop = client, loop
+            self._http_closer = loop.create_task(self._close_on_loop_exit(client))
+        return self._http_client
+
+    @staticmethod
+    async def _close_on_loop_exit(client: httpx.AsyncClient) -> None:
+        """一直等待到被取消（客户端被替换、aclose 或事件循环结束），然后在当前事件循环中关闭客户端"""
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            await client.aclose()
+
+    def _release_http_client(self) -> None:
+        """丢弃当前 HTTP 客户端，并通知其所在的事件循环关闭它（原事件循环已关闭时客户端已随之关闭）"""
+        closer, loop = self._http_closer, self._http_loop
+        self._http_client = self._http_closer = None
+        if closer is not None and not closer.done() and not loop.is_closed():
+            loop.call_soon_threadsafe(closer.cancel)
+
+    async def aclose(self) -> None:
+        """关闭复用的 HTTP 客户端，释放连接（之后再发起请求时会重新创建）
+
+        也可以使用 async with WanModelClient(...) as client: 在退出时自动关闭。
+        """
+        closer = self._http_closer
+        self._release_http_client()
+        if closer is not None and self._http_loop is asyncio.get_running_loop():
+            await asyncio.wait({closer})
+
+    async def __aenter__(self) -> "WanModelClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
 
     def _ensure_size_limits(self, img: Image.Image) -> Image.Image:
         """确保图像尺寸符合 API 要求，如果太小则等比例放大，如果太大则等比例缩小
@@ -150,7 +218,9 @@ class WanModelClient:
                            watermark: bool = False,
                            n: int = 1,
                            size: str = "1280*1280",
-                           timeout: float = HTTP_REQUEST_TIMEOUT) -> Dict[str, Any]:
+                           seed: Optional[int] = None,
+                           timeout: float = HTTP_REQUEST_TIMEOUT,
+                           deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
         向通义万象系列模型发送请求
 
@@ -163,7 +233,10 @@ class WanModelClient:
             watermark (bool, optional): 是否添加水印，默认值为 False
             n (int, optional): 生成图像数量，默认值为 1
             size (str, optional): 图像尺寸，格式为 "宽度*高度"，默认值为 "1280*1280"
+            seed (int, optional): 随机数种子，默认值为 None（由 API 随机生成）
             timeout (float, optional): 请求超时时间（秒），默认值为 HTTP_REQUEST_TIMEOUT (60.0)
+            deadline (Deadline, optional): 任务截止时间，每次请求（包括重试）的超时时间不超过剩余预算，
+                默认值为 None（只受 timeout 限制）
 
         Returns:
             Dict[str, Any]: 包含任务 ID 的字典，用于后续查询结果
@@ -171,18 +244,21 @@ class WanModelClient:
         Raises:
             ValueError: 当图像格式不支持或尺寸无法满足要求时
             FileNotFoundError: 当本地图像文件不存在时
-            httpx.HTTPStatusError: 当 API 返回错误状态码时
+            httpx.HTTPStatusError: 当 API 返回错误状态码时（429/502/503/504 会先按退避策略重试）
             httpx.TimeoutException: 当请求超时时
+            DeadlineExceeded: 当任务已超过截止时间时
+            CircuitOpenError: 当任务提交接口处于熔断状态时
         """
         # 构建消息内容
         content = [{"text": text}]
 
         # 添加图像
-        for image in images:
-            if image.startswith("http"):
-                content.append({"image": image})
-            else:
-                content.append({"image": self._encode_img(image)})
+        with observe_stage(STAGE_ENCODE, model):
+            for image in images:
+                if image.startswith("http"):
+                    content.append({"image": image})
+                else:
+                    content.append({"image": self._encode_img(image)})
 
         # 构建请求体
         payload = {
@@ -201,60 +277,105 @@ class WanModelClient:
                 "size": size
             }
         }
+        if seed is not None:
+            payload["parameters"]["seed"] = seed
+
+        # 发送异步请求（任务提交非幂等，只在请求确定未被处理时重试）
+        guard = get_guard("wan.submit", self.api_key, WAN_SUBMIT_RATE_LIMIT)
+
+        async def _post() -> Dict[str, Any]:
+            response = await self._get_http_client().post(self.base_url,
+                                                          headers=self.headers,
+                                                          json=payload,
+                                                          timeout=remaining_timeout(deadline, timeout))
+            response.raise_for_status()
+            # 返回响应json字段
+            return response.json()
+
+        try:
+            with observe_stage(STAGE_WAN_SUBMIT, model):
+                return await guard.call(_post,
+                                        classify=partial(classify_httpx_error,
+                                                         idempotent=False))
+        except httpx.HTTPStatusError as e:
+            # 捕获HTTP错误，特别是400错误
+            error_info = {
+                "状态码": e.response.status_code if e.response else "N/A",
+                "URL": str(e.request.url) if e.request else self.base_url,
+            }
 
-        # 发送异步请求
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            try:
-                response = await client.post(self.base_url,
-                                             headers=self.headers,
-                                             json=payload)
-                response.raise_for_status()
-                # 返回响应json字段
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                # 捕获HTTP错误，特别是400错误
-                error_info = {
-                    "状态码": e.response.status_code if e.response else "N/A",
-                    "URL": str(e.request.url) if e.request else self.base_url,
-                }
-
-                # 尝试解析错误响应
-                error_detail = None
-                if e.response:
-                    try:
-                        error_detail = e.response.json()
-                    except:
-                        error_detail = e.response.text
-
-                logging.error("API请求失败",
-                              extra={
-                                  "status_code": error_info["状态码"],
-                                  "url": error_info["URL"],
-                                  "error_detail": error_detail,
-                              })
-                raise
+            # 尝试解析错误响应
+            error_detail = None
+            if e.response:
+                try:
+                    error_detail = e.response.json()
+                except:
+                    error_detail = e.response.text
+
+            logging.error("API请求失败",
+                          extra={
+                              "status_code": error_info["状态码"],
+                              "url": error_info["URL"],
+                              "error_detail": error_detail,
+                          })
+            raise
 
     async def get_task_result(self,
                               task_id: str,
-                              timeout: float = HTTP_REQUEST_TIMEOUT) -> Dict[str, Any]:
+                              timeout: float = HTTP_REQUEST_TIMEOUT,
+                              deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
         查询异步任务结果
 
         Args:
             task_id (str): 任务 ID，从 generate_image 返回的结果中获取
             timeout (float, optional): 请求超时时间（秒），默认值为 HTTP_REQUEST_TIMEOUT (60.0)
+            deadline (Deadline, optional): 任务截止时间，每次请求（包括重试）的超时时间不超过剩余预算，
+                默认值为 None（只受 timeout 限制）
 
         Returns:
             Dict[str, Any]: 任务结果字典（由 DashScope 图像生成 API 提供）
 
         Raises:
-            httpx.HTTPStatusError: 当 API 返回错误状态码时
+            httpx.HTTPStatusError: 当 API 返回错误状态码时（可重试的错误会先按退避策略重试）
             httpx.TimeoutException: 当请求超时时
+            DeadlineExceeded: 当任务已超过截止时间时
+            CircuitOpenError: 当任务查询接口处于熔断状态时
         """
-        query_url = f"https://dashscope.aliyuncs.com/api/v1/tasks/{task_id}"
+        query_url = f"{self.api_base_url}/api/v1/tasks/{task_id}"
         headers = {"Authorization": f"Bearer {self.api_key}"}
+        guard = get_guard("wan.query", self.api_key, WAN_QUERY_RATE_LIMIT)
 
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(query_url, headers=headers)
+        async def _get() -> Dict[str, Any]:
+            response = await self._get_http_client().get(
+                query_url, headers=headers, timeout=remaining_timeout(deadline, timeout))
             response.raise_for_status()
             return response.json()
+
+        return await guard.call(_get)
+
+    async def cancel_task(self,
+                          task_id: str,
+                          timeout: float = HTTP_REQUEST_TIMEOUT) -> Dict[str, Any]:
+        """
+        取消异步任务，释放远程排队名额（DashScope 只允许取消尚未完成的任务）
+
+        取消请求只发送一次，不经过重试和熔断：取消失败不影响调用方，远程任务会照常结束
+
+        Args:
+            task_id (str): 任务 ID
+            timeout (float, optional): 请求超时时间（秒），默认值为 HTTP_REQUEST_TIMEOUT (60.0)
+
+        Returns:
+            Dict[str, Any]: 取消接口的响应
+
+        Raises:
+            httpx.HTTPStatusError: 当任务无法取消（例如已经完成）或 API 返回错误状态码时
+            httpx.TimeoutException: 当请求超时时
+        """
+        cancel_url = f"{self.api_base_url}/api/v1/tasks/{task_id}/cancel"
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        response = await self._get_http_client().post(cancel_url, headers=headers,
+                                                      timeout=timeout)
+        response.raise_for_status()
+        return response.json()
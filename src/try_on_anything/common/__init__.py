@@ -1,2 +1,3 @@
 from .constants import *
 from .types import *
+from .deadline import Deadline, DeadlineExceeded, remaining_timeout
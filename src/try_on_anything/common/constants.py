@@ -1,3 +1,7 @@
+# ============ DashScope 服务地址 ============
+# 默认 DashScope 服务地址，可通过环境变量 DASHSCOPE_BASE_URL 指向本地模拟服务（见 try_on_anything.testing）
+DEFAULT_DASHSCOPE_BASE_URL = "https://dashscope.aliyuncs.com"
+
 # ============ WAN 模型相关常量 ============
 # 图像尺寸限制
 MIN_IMAGE_SIZE_FOR_WAN = 384  # Wan模型 API 要求的最小图像尺寸
@@ -6,10 +10,13 @@ MAX_IMAGE_SIZE_FOR_WAN = 5000  # Wan模型 API 要求的最大图像尺寸
 # HTTP 请求超时配置
 HTTP_DOWNLOAD_TIMEOUT = 30.0  # 图像下载超时时间（秒）
 HTTP_REQUEST_TIMEOUT = 60.0  # API 请求超时时间（秒）
+DOWNLOAD_CHUNK_SIZE = 256 * 1024  # 图像下载分块大小（字节），边下载边写入文件
 
 # 任务轮询配置
 DEFAULT_POLL_INTERVAL = 5.0  # 默认轮询间隔（秒）
 DEFAULT_MAX_WAIT_TIME = 300.0  # 默认最大等待时间（秒）
+MAX_CONSECUTIVE_POLL_FAILURES = 5  # 连续查询失败多少次后放弃等待已提交的任务
+REMOTE_CANCEL_TIMEOUT = 5.0  # 本地任务被取消时，取消远程生成任务的最长等待时间（秒）
 
 # ============ VL 模型相关常量 ============
 # Token 配置
@@ -28,3 +35,22 @@ SUPPORTED_OUTPUT_SIZES = [
     (1280, 720),  # 16:9
     (1344, 576)  # 21:9
 ]
+
+# ============ 生成结果缓存相关常量 ============
+DEFAULT_RESULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 结果缓存默认最大占用空间（1GB）
+
+# ============ 远程调用容错相关常量 ============
+# 重试配置（指数退避）
+DEFAULT_MAX_RETRIES = 3  # 默认最大重试次数
+DEFAULT_RETRY_BASE_DELAY = 1.0  # 首次重试等待时间（秒）
+DEFAULT_RETRY_MAX_DELAY = 30.0  # 单次重试最大等待时间（秒），同样作为 Retry-After 的上限
+
+# 熔断器配置
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5  # 连续失败多少次后熔断
+CIRCUIT_BREAKER_RECOVERY_TIMEOUT = 30.0  # 熔断后多久允许试探请求（秒）
+
+# 令牌桶限流配置（每个接口 + API Key 独立限流，单位：请求/秒）
+WAN_SUBMIT_RATE_LIMIT = 2.0  # Wan 模型任务提交
+WAN_QUERY_RATE_LIMIT = 10.0  # Wan 模型任务查询
+VL_CHAT_RATE_LIMIT = 5.0  # VL 模型对话
+IMAGE_DOWNLOAD_RATE_LIMIT = 20.0  # 生成图像下载
@@ -0,0 +1,93 @@
+from typing import Optional
+from contextlib import asynccontextmanager
+import asyncio
+import time
+
+
+class DeadlineExceeded(TimeoutError):
+    """任务超过截止时间（剩余预算耗尽）"""
+
+
+class Deadline:
+    """任务截止时间（单调时钟）
+
+    任务提交时创建，逐层传递给 VL 识别、任务提交、轮询和下载等阶段。
+    各阶段不再使用各自独立的超时时间，而是取阶段超时与剩余预算中的较小值，
+    剩余预算耗尽时立即失败，多个阶段的超时不会叠加到远超任务预算。
+
+    Args:
+        budget (float): 任务总预算（秒）
+    """
+
+    __slots__ = ("budget", "expires_at")
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        """剩余预算（秒），已超时时为 0"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """是否已超过截止时间"""
+        return time.monotonic() >= self.expires_at
+
+    def exceeded(self) -> DeadlineExceeded:
+        """构造超过截止时间的异常"""
+        return DeadlineExceeded(f"任务超过截止时间（预算 {self.budget:g} 秒）")
+
+    def check(self) -> None:
+        """已超过截止时间时抛出 DeadlineExceeded"""
+        if self.expired:
+            raise self.exceeded()
+
+    def timeout(self, stage_timeout: Optional[float] = None) -> float:
+        """本阶段可用的超时时间：阶段超时与剩余预算中的较小值
+
+        Args:
+            stage_timeout (float, optional): 阶段自身的超时时间（秒），默认值为 None（只受剩余预算限制）
+
+        Returns:
+            float: 超时时间（秒）
+
+        Raises:
+            DeadlineExceeded: 已超过截止时间时
+        """
+        self.check()
+        remaining = self.remaining()
+        return remaining if stage_timeout is None else min(stage_timeout, remaining)
+
+    @asynccontextmanager
+    async def enforce(self):
+        """在剩余预算内执行代码块，超过截止时间时取消代码块并抛出 DeadlineExceeded
+
+        代码块内部自身的超时（例如轮询最大等待时间）仍然原样抛出
+        """
+        try:
+            async with asyncio.timeout(self.remaining()):
+                yield
+        except TimeoutError as e:
+            if isinstance(e, DeadlineExceeded) or not self.expired:
+                raise
+            raise self.exceeded() from e
+
+
+def remaining_timeout(deadline: Optional[Deadline],
+                      timeout: Optional[float]) -> Optional[float]:
+    """计算请求超时时间：未设置截止时间时使用 timeout，否则取 timeout 与剩余预算中的较小值
+
+    Args:
+        deadline (Deadline, optional): 任务截止时间
+        timeout (float, optional): 请求自身的超时时间（秒），None 表示不限制
+
+    Returns:
+        Optional[float]: 超时时间（秒）
+
+    Raises:
+        DeadlineExceeded: 已超过截止时间时
+    """
+    if deadline is None:
+        return timeout
+    return deadline.timeout(timeout)
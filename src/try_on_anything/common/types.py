@@ -9,6 +9,15 @@ from pydantic import BaseModel
 # 返回值: 无返回值的协程（异步函数）
 StatusCallback = Callable[[str, int], Awaitable[None]]
 
+# 任务提交回调函数类型定义
+# TaskSubmittedCallback: 图像生成任务提交到 DashScope 后通知调用方的回调函数，
+#   调用方可以持久化任务 ID，在轮询失败后重新连接该任务而不是重新生成
+# 参数说明:
+#   - dashscope_task_id (str): DashScope 图像生成任务 ID
+#   - context (Dict[str, Any]): 提交任务时使用的识别信息，如 {"accessory_type": "项链", "person_position": "脖子"}
+# 返回值: 无返回值的协程（异步函数）
+TaskSubmittedCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
 
 class VLModelParsedResult(BaseModel):
     """VL模型解析结果"""
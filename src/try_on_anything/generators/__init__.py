@@ -1,3 +1,4 @@
 from .base import DashScopeImageGenerator
 from .accessory_try_on import AccessoryTryOnImageGenerator
 from .clothing_try_on import ClothingTryOnImageGenerator
+from .result_cache import GenerationResultCache
@@ -1,9 +1,11 @@
 from .base import DashScopeImageGenerator
+from .result_cache import GenerationResultCache
 from ..clients import WanModelClient
+from ..common.deadline import Deadline
 from ..common.constants import (DEFAULT_POLL_INTERVAL, DEFAULT_MAX_WAIT_TIME,
                                 HTTP_REQUEST_TIMEOUT)
 import textwrap
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Awaitable
 
 
 class AccessoryTryOnImageGenerator(DashScopeImageGenerator):
@@ -20,6 +22,7 @@ class AccessoryTryOnImageGenerator(DashScopeImageGenerator):
     Args:
         wan_client (WanModelClient): Wan 模型客户端实例
         download_root_path (str, optional): 下载生成的图片保存路径，默认为 None。如果保存路径为 None，则不下载生成的图片。
+        result_cache (GenerationResultCache, optional): 生成结果缓存，默认为 None（不启用缓存）
     """
 
     # 饰品试戴的额外要求提示词
@@ -37,9 +40,11 @@ class AccessoryTryOnImageGenerator(DashScopeImageGenerator):
 
     def __init__(self,
                  wan_client: WanModelClient,
-                 download_root_path: Optional[str] = None) -> None:
+                 download_root_path: Optional[str] = None,
+                 result_cache: Optional[GenerationResultCache] = None) -> None:
         super().__init__(wan_client=wan_client,
-                         download_root_path=download_root_path)
+                         download_root_path=download_root_path,
+                         result_cache=result_cache)
 
     def _build_prompt(self,
                       accessory_type: Optional[str] = None,
@@ -76,9 +81,13 @@ class AccessoryTryOnImageGenerator(DashScopeImageGenerator):
             prompt_extend: bool = True,
             watermark: bool = False,
             n: int = 1,
+            seed: Optional[int] = None,
             poll_interval: float = DEFAULT_POLL_INTERVAL,
             max_wait_time: float = DEFAULT_MAX_WAIT_TIME,
-            timeout: float = HTTP_REQUEST_TIMEOUT) -> Dict[str, Any]:
+            timeout: float = HTTP_REQUEST_TIMEOUT,
+            task_submitted_callback: Optional[Callable[[str], Awaitable[None]]] = None,
+            deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
         """生成饰品试戴效果图
 
         Args:
@@ -92,9 +101,13 @@ class AccessoryTryOnImageGenerator(DashScopeImageGenerator):
             prompt_extend (bool, optional): 是否扩展提示词，默认值为 True
             watermark (bool, optional): 是否添加水印，默认值为 False
             n (int, optional): 生成图像数量，默认值为 1
+            seed (int, optional): 随机数种子，默认值为 None（由 API 随机生成）。指定种子时才会使用生成结果缓存
             poll_interval (float, optional): 轮询间隔（秒），默认值为 DEFAULT_POLL_INTERVAL (5.0)
             max_wait_time (float, optional): 最大等待时间（秒），默认值为 DEFAULT_MAX_WAIT_TIME (300.0)
             timeout (float, optional): 请求超时时间（秒），默认值为 HTTP_REQUEST_TIMEOUT (60.0)
+            task_submitted_callback (Callable[[str], Awaitable[None]], optional): 任务提交成功后的回调函数，
+                参数为 DashScope 任务 ID，默认值为 None
+            deadline (Deadline, optional): 任务截止时间，提交、轮询和下载都只使用剩余预算，默认值为 None
 
         Returns:
             Dict[str, Any]: 生成的试戴效果图结果（由 DashScope 图像生成 API 提供）
@@ -103,7 +116,7 @@ class AccessoryTryOnImageGenerator(DashScopeImageGenerator):
             FileNotFoundError: 当图像文件不存在时
             ValueError: 当图像尺寸不符合要求时
             RuntimeError: 当任务失败或下载图像失败时
-            TimeoutError: 当等待任务完成超时时
+            TimeoutError: 当等待任务完成超时或超过截止时间时
         """
         # 获取人物图像尺寸（宽度和高度）
         person_img_size = self._get_image_size(person_img_path)
@@ -131,8 +144,11 @@ class AccessoryTryOnImageGenerator(DashScopeImageGenerator):
             prompt_extend=prompt_extend,
             watermark=watermark,
             n=n,
+            seed=seed,
             poll_interval=poll_interval,
             max_wait_time=max_wait_time,
-            timeout=timeout)
+            timeout=timeout,
+            task_submitted_callback=task_submitted_callback,
+            deadline=deadline)
 
         return result
@@ -1,15 +1,26 @@
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Callable, Awaitable
 import asyncio
 import time
 import base64
 import logging
 import httpx
 import uuid
+import aiofiles
 from PIL import Image
 from ..clients import WanModelClient
+from ..clients.resilience import get_guard
+from ..observability.metrics import (observe_stage, record_stage_duration, emit_stage_event,
+                                     STAGE_GENERATION, STAGE_WAN_QUEUE,
+                                     STAGE_WAN_POLLING, STAGE_DOWNLOAD)
+from ..observability.tracing import start_span, get_current_span
+from .result_cache import GenerationResultCache
+from ..common.deadline import Deadline, DeadlineExceeded, remaining_timeout
 from ..common.constants import (HTTP_DOWNLOAD_TIMEOUT, HTTP_REQUEST_TIMEOUT,
                                 DEFAULT_POLL_INTERVAL, DEFAULT_MAX_WAIT_TIME,
-                                SUPPORTED_OUTPUT_SIZES)
+                                SUPPORTED_OUTPUT_SIZES, DOWNLOAD_CHUNK_SIZE,
+                                IMAGE_DOWNLOAD_RATE_LIMIT,
+                                MAX_CONSECUTIVE_POLL_FAILURES,
+                                REMOTE_CANCEL_TIMEOUT)
 from pathlib import Path
 from abc import ABC, abstractmethod
 
@@ -20,6 +31,8 @@ class DashScopeImageGenerator(ABC):
     Args:
         wan_client (WanModelClient): Wan 模型客户端实例
         download_root_path (str, optional): 下载生成的图片保存路径，默认为 None。如果保存路径为 None，则不下载生成的图片。
+        result_cache (GenerationResultCache, optional): 生成结果缓存，默认为 None（不启用缓存）。
+            仅在设置了 download_root_path 且调用时指定了随机数种子时生效。
     """
 
     _BASE_PROMPT: str = ""
@@ -27,8 +40,10 @@ class DashScopeImageGenerator(ABC):
 
     def __init__(self,
                  wan_client: WanModelClient,
-                 download_root_path: Optional[str] = None) -> None:
+                 download_root_path: Optional[str] = None,
+                 result_cache: Optional[GenerationResultCache] = None) -> None:
         self.wan_client = wan_client
+        self.result_cache = result_cache
         if download_root_path:
             download_dir = Path(download_root_path)
             if not download_dir.exists():
@@ -84,11 +99,12 @@ class DashScopeImageGenerator(ABC):
                      f"长宽比为: {closest_size[0]/closest_size[1]:.2f}")
         return f"{closest_size[0]}*{closest_size[1]}"
 
-    async def _download_img(self, image_url: str) -> str:
-        """下载图像并保存到本地（异步），返回本地路径
-        
+    async def _download_img(self, image_url: str, deadline: Optional[Deadline] = None) -> str:
+        """下载图像并保存到本地（异步、分块流式写入），返回本地路径
+
         Args:
             image_url (str): 图像URL地址
+            deadline (Deadline, optional): 任务截止时间，下载超时时间不超过剩余预算，默认值为 None
         Returns:
             str: 本地保存路径
         """
@@ -99,11 +115,25 @@ class DashScopeImageGenerator(ABC):
             filename = f"image_{uuid.uuid4().hex}.png"
 
         img_path = self.download_root_path / filename
+        guard = get_guard("image.download", None, IMAGE_DOWNLOAD_RATE_LIMIT)
+
+        async def _get() -> None:
+            # 先写入临时文件，下载完成后再重命名，避免中途失败留下不完整的图片
+            tmp_path = img_path.with_name(f".{img_path.name}.part")
+            try:
+                download_timeout = remaining_timeout(deadline, HTTP_DOWNLOAD_TIMEOUT)
+                # 复用 Wan 客户端的连接池（该客户端不带默认请求头，不会把 API Key 发给图像地址）
+                client = self.wan_client._get_http_client()
+                async with client.stream("GET", image_url, timeout=download_timeout) as response:
+                    response.raise_for_status()
+                    async with aiofiles.open(tmp_path, "wb") as f:
+                        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                            await f.write(chunk)
+                tmp_path.replace(img_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
 
-        async with httpx.AsyncClient(timeout=HTTP_DOWNLOAD_TIMEOUT) as client:
-            response = await client.get(image_url)
-            response.raise_for_status()
-            img_path.write_bytes(response.content)
+        await guard.call(_get)
 
         return str(img_path)
 
@@ -117,9 +147,13 @@ class DashScopeImageGenerator(ABC):
             watermark: bool = False,
             n: int = 1,
             size: str = "1280*1280",
+            seed: Optional[int] = None,
             poll_interval: float = DEFAULT_POLL_INTERVAL,
             max_wait_time: float = DEFAULT_MAX_WAIT_TIME,
-            timeout: float = HTTP_REQUEST_TIMEOUT) -> Dict[str, Any]:
+            timeout: float = HTTP_REQUEST_TIMEOUT,
+            task_submitted_callback: Optional[Callable[[str], Awaitable[None]]] = None,
+            deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
         """
         生成图像并等待结果（同步等待异步任务完成）
 
@@ -132,9 +166,14 @@ class DashScopeImageGenerator(ABC):
             watermark (bool, optional): 是否添加水印，默认值为 False
             n (int, optional): 生成图像数量，默认值为 1
             size (str, optional): 图像尺寸，格式为 "宽度*高度"，默认值为 "1280*1280"
+            seed (int, optional): 随机数种子，默认值为 None（由 API 随机生成，此时不使用结果缓存）
             poll_interval (float, optional): 轮询间隔（秒），默认值为 DEFAULT_POLL_INTERVAL (5.0)
             max_wait_time (float, optional): 最大等待时间（秒），默认值为 DEFAULT_MAX_WAIT_TIME (300.0)
             timeout (float, optional): 请求超时时间（秒），默认值为 HTTP_REQUEST_TIMEOUT (60.0)
+            task_submitted_callback (Callable[[str], Awaitable[None]], optional): 任务提交成功后的回调函数，
+                参数为 DashScope 任务 ID，默认值为 None
+            deadline (Deadline, optional): 任务截止时间，提交、轮询和下载都只使用剩余预算，
+                默认值为 None（各阶段分别使用 timeout 和 max_wait_time）
 
         Returns:
             Dict[str, Any]: 最终任务结果字典（来自 DashScope 图像生成 API）
@@ -142,68 +181,232 @@ class DashScopeImageGenerator(ABC):
         Raises:
             ValueError: 当无法获取任务ID时
             RuntimeError: 当任务失败或下载图像失败时
-            TimeoutError: 当等待任务完成超时时
+            TimeoutError: 当等待任务完成超时或超过截止时间（DeadlineExceeded）时
             httpx.HTTPError: 当网络请求失败时
         """
-        # 提交任务
-        task_response = await self.wan_client.send_request(
-            text=text,
-            images=images,
-            model=model,
-            negative_prompt=negative_prompt,
-            prompt_extend=prompt_extend,
-            watermark=watermark,
-            n=n,
-            size=size,
-            timeout=timeout)
-
-        # 获取任务 ID
-        task_id = task_response.get("output", {}).get("task_id")
-        if not task_id:
-            raise ValueError(f"无法获取任务ID，响应: {task_response}")
-
-        # 轮询任务状态
-        start_time = time.time()
+        with observe_stage(STAGE_GENERATION, model):
+            # 启用结果缓存且指定了随机数种子时先查询缓存（未指定种子时每次生成结果不同，不能复用）；
+            # 计算图像哈希和复制缓存文件都在线程池中执行，避免阻塞事件循环
+            cache_key = None
+            if self.result_cache and self.download_root_path and seed is not None:
+                cache_key = await asyncio.to_thread(
+                    self.result_cache.build_key,
+                    text=text,
+                    images=images,
+                    params={
+                        "model": model,
+                        "negative_prompt": negative_prompt,
+                        "prompt_extend": prompt_extend,
+                        "watermark": watermark,
+                        "n": n,
+                        "size": size,
+                        "seed": seed
+                    })
+                cached_result = await asyncio.to_thread(
+                    self.result_cache.get, cache_key, self.download_root_path)
+                if cached_result is not None:
+                    return cached_result
+
+            # 提交任务
+            start_time = time.time()
+            task_response = await self.wan_client.send_request(
+                text=text,
+                images=images,
+                model=model,
+                negative_prompt=negative_prompt,
+                prompt_extend=prompt_extend,
+                watermark=watermark,
+                n=n,
+                size=size,
+                seed=seed,
+                timeout=timeout,
+                deadline=deadline)
+
+            # 获取任务 ID
+            task_id = task_response.get("output", {}).get("task_id")
+            if not task_id:
+                raise ValueError(f"无法获取任务ID，响应: {task_response}")
+            get_current_span().set_attribute("dashscope.task_id", task_id)
+
+            # 通知调用方任务已提交，便于持久化 DashScope 任务 ID，后续轮询失败时可以重新连接
+            if task_submitted_callback:
+                await task_submitted_callback(task_id)
+
+            # 轮询任务状态并下载图像
+            result, saved_paths = await self._wait_for_task(
+                task_id,
+                poll_interval=poll_interval,
+                max_wait_time=max_wait_time,
+                timeout=timeout,
+                model=model,
+                deadline=deadline)
+
+            if cache_key and saved_paths:
+                await asyncio.to_thread(self.result_cache.put, cache_key, result,
+                                        saved_paths, time.time() - start_time)
+
+            return result
+
+    async def resume_generation(
+            self,
+            task_id: str,
+            poll_interval: float = DEFAULT_POLL_INTERVAL,
+            max_wait_time: float = DEFAULT_MAX_WAIT_TIME,
+            timeout: float = HTTP_REQUEST_TIMEOUT,
+            model: str = "",
+            deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """重新连接已提交的 DashScope 图像生成任务，继续轮询并下载结果，不会重新提交生成
+
+        Args:
+            task_id (str): DashScope 任务 ID
+            poll_interval (float, optional): 轮询间隔（秒），默认值为 DEFAULT_POLL_INTERVAL (5.0)
+            max_wait_time (float, optional): 最大等待时间（秒），默认值为 DEFAULT_MAX_WAIT_TIME (300.0)
+            timeout (float, optional): 请求超时时间（秒），默认值为 HTTP_REQUEST_TIMEOUT (60.0)
+            model (str, optional): 提交任务时使用的生成模型名称，仅用于指标标签，默认值为 ""
+            deadline (Deadline, optional): 任务截止时间，轮询和下载都只使用剩余预算，默认值为 None
+
+        Returns:
+            Dict[str, Any]: 最终任务结果字典（来自 DashScope 图像生成 API）
+
+        Raises:
+            RuntimeError: 当任务失败或下载图像失败时
+            TimeoutError: 当等待任务完成超时时
+            httpx.HTTPError: 当连续多次查询任务状态都失败时
+        """
+        logging.info(f"重新连接DashScope图像生成任务 {task_id}...")
+        result, _ = await self._wait_for_task(task_id,
+                                              poll_interval=poll_interval,
+                                              max_wait_time=max_wait_time,
+                                              timeout=timeout,
+                                              model=model,
+                                              deadline=deadline)
+        return result
+
+    async def _wait_for_task(
+            self,
+            task_id: str,
+            poll_interval: float,
+            max_wait_time: float,
+            timeout: float,
+            model: str = "",
+            deadline: Optional[Deadline] = None) -> Tuple[Dict[str, Any], List[str]]:
+        """轮询任务状态直到完成，完成后下载生成的图像
 
-        while True:
-            result = await self.wan_client.get_task_result(task_id,
-                                                           timeout=timeout)
+        单次查询失败（网络错误、熔断等）不会放弃已提交的任务，而是等待下一次轮询，
+        连续失败超过 MAX_CONSECUTIVE_POLL_FAILURES 次才抛出异常。
+        等待期间被取消（asyncio.CancelledError）或超过截止时间时同时取消远程任务，释放远程排队名额
+
+        Args:
+            task_id (str): DashScope 任务 ID
+            poll_interval (float): 轮询间隔（秒）
+            max_wait_time (float): 最大等待时间（秒）
+            timeout (float): 请求超时时间（秒）
+            model (str, optional): 生成模型名称，仅用于指标标签，默认值为 ""
+            deadline (Deadline, optional): 任务截止时间，超过时不再等待（抛出 DeadlineExceeded），默认值为 None
+
+        Returns:
+            Tuple[Dict[str, Any], List[str]]: 任务结果字典，以及下载到本地的图像路径列表
+        """
+        try:
+            result = await self._poll_task(task_id, poll_interval, max_wait_time, timeout, model,
+                                           deadline)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            await self._cancel_remote_task(task_id)
+            raise
 
-            # 检查任务状态
-            task_status = result.get("output", {}).get("task_status")
+        logging.info(f"DashScope图像生成任务 {task_id} 完成，开始下载图像...")
+        output = result.get("output", {})
+        choices = output.get("choices", [])
+        saved_paths = []
+        for choice in choices:
+            try:
+                message = choice.get("message", {})
+                content = message.get("content")[0]
+                image_url = content.get("image", "")
+                if image_url and self.download_root_path:
+                    with observe_stage(STAGE_DOWNLOAD, model):
+                        saved_path = await self._download_img(image_url, deadline)
+                    saved_paths.append(saved_path)
+                    logging.info(f"图像已保存到: {saved_path}")
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logging.exception(f"下载图像失败: {e}")
+                # 重新抛出异常，让调用方感知下载失败
+                raise RuntimeError(f"下载图像失败: {e}")
 
-            if task_status == "SUCCEEDED":
-                logging.info(f"DashScope图像生成任务 {task_id} 完成，开始下载图像...")
-                output = result.get("output", {})
-                choices = output.get("choices", [])
-                for choice in choices:
+        return result, saved_paths
+
+    async def _poll_task(
+            self,
+            task_id: str,
+            poll_interval: float,
+            max_wait_time: float,
+            timeout: float,
+            model: str = "",
+            deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """轮询任务状态直到成功（参数见 _wait_for_task），返回任务结果字典"""
+        start_time = time.time()
+        consecutive_failures = 0
+        queued = True
+
+        with observe_stage(STAGE_WAN_POLLING, model) as polling_span:
+            polling_span.set_attribute("dashscope.task_id", task_id)
+            while True:
+                with start_span("wan.poll", {"dashscope.task_id": task_id}) as poll_span:
                     try:
-                        message = choice.get("message", {})
-                        content = message.get("content")[0]
-                        image_url = content.get("image", "")
-                        if image_url and self.download_root_path:
-                            saved_path = await self._download_img(image_url)
-                            logging.info(f"图像已保存到: {saved_path}")
-                    except Exception as e:
-                        logging.exception(f"下载图像失败: {e}")
-                        # 重新抛出异常，让调用方感知下载失败
-                        raise RuntimeError(f"下载图像失败: {e}")
-
-                return result
-            elif task_status == "FAILED":
-                error_code = result.get("output", {}).get("error_code", "任务失败")
-                error_msg = result.get("output", {}).get("message", "任务失败")
-                logging.error(
-                    f"DashScope图像生成任务 {task_id} 失败，错误码: {error_code}，错误信息: {error_msg}"
-                )
-                raise RuntimeError(
-                    f"任务失败: \n错误码: {error_code}\n错误信息: {error_msg}")
-
-            if time.time() - start_time > max_wait_time:
-                logging.error(f"等待任务 {task_id} 完成超时（超过 {max_wait_time} 秒）")
-                raise TimeoutError(f"等待任务完成超时（超过 {max_wait_time} 秒）")
-
-            await asyncio.sleep(poll_interval)
+                        result = await self.wan_client.get_task_result(
+                            task_id, timeout=timeout, deadline=deadline)
+                        consecutive_failures = 0
+                    except (httpx.HTTPError, ConnectionError) as e:
+                        consecutive_failures += 1
+                        poll_span.record_exception(e)
+                        if consecutive_failures >= MAX_CONSECUTIVE_POLL_FAILURES:
+                            logging.error(
+                                f"查询DashScope图像生成任务 {task_id} 状态连续失败 {consecutive_failures} 次，放弃等待"
+                            )
+                            raise
+                        logging.warning(
+                            f"查询DashScope图像生成任务 {task_id} 状态失败（第 {consecutive_failures} 次）: {e!r}，稍后继续轮询"
+                        )
+                        result = {}
+
+                    # 检查任务状态
+                    task_status = result.get("output", {}).get("task_status")
+                    poll_span.set_attribute("dashscope.task_status", task_status)
+                    emit_stage_event(f"{STAGE_WAN_POLLING}.poll", task_status)
+
+                # 远程任务离开排队状态时记录排队耗时（精度受轮询间隔限制）
+                if queued and task_status not in (None, "PENDING"):
+                    queued = False
+                    record_stage_duration(STAGE_WAN_QUEUE,
+                                          time.time() - start_time, model)
+
+                if task_status == "SUCCEEDED":
+                    return result
+                elif task_status in ("FAILED", "CANCELED", "UNKNOWN"):
+                    error_code = result.get("output", {}).get("error_code", "任务失败")
+                    error_msg = result.get("output", {}).get("message", "任务失败")
+                    logging.error(
+                        f"DashScope图像生成任务 {task_id} 失败，错误码: {error_code}，错误信息: {error_msg}"
+                    )
+                    raise RuntimeError(
+                        f"任务失败: \n错误码: {error_code}\n错误信息: {error_msg}")
+
+                if time.time() - start_time > max_wait_time:
+                    logging.error(f"等待任务 {task_id} 完成超时（超过 {max_wait_time} 秒）")
+                    raise TimeoutError(f"等待任务完成超时（超过 {max_wait_time} 秒）")
+                # 设置了截止时间时最后一次轮询不晚于截止时间，已超过时抛出 DeadlineExceeded
+                await asyncio.sleep(remaining_timeout(deadline, poll_interval))
+
+    async def _cancel_remote_task(self, task_id: str) -> None:
+        """取消远程任务（最长等待 REMOTE_CANCEL_TIMEOUT 秒），失败时只记录日志"""
+        try:
+            await asyncio.wait_for(self.wan_client.cancel_task(task_id, timeout=REMOTE_CANCEL_TIMEOUT),
+                                   REMOTE_CANCEL_TIMEOUT)
+            logging.info(f"已取消DashScope图像生成任务 {task_id}")
+        except Exception as e:
+            logging.warning(f"取消DashScope图像生成任务 {task_id} 失败: {e!r}")
 
     @abstractmethod
     async def generate_try_on_img(self, *args, **kwargs):
@@ -0,0 +1,241 @@
+from typing import List, Optional, Dict, Any
+from collections import OrderedDict
+from pathlib import Path
+import copy
+import hashlib
+import json
+import logging
+import shutil
+import threading
+import time
+
+from ..common.constants import DEFAULT_RESULT_CACHE_MAX_BYTES
+
+
+class GenerationResultCache:
+    """图像生成结果的磁盘缓存，按占用空间进行 LRU 淘汰
+
+    相同的（提示词、输入图像、模型、尺寸、种子等）组合会得到可复用的生成结果，
+    缓存命中时直接将缓存的图像复制到下载目录，无需再次调用远程 API。
+    只有指定了随机数种子的生成结果才可复现，未指定种子的调用不会查询或写入缓存（由生成器判断）。
+
+    计算缓存键、查询和写入都会读写文件，在事件循环中应通过 asyncio.to_thread 调用，
+    索引和统计的修改由锁保护，可以在多个线程中并发调用。
+
+    每个缓存条目对应缓存目录下的一个子文件夹，包含 meta.json 和生成的图像文件，
+    meta.json 中记录了原始 API 耗时以及命中次数，用于统计缓存节省的 API 时间。
+
+    Args:
+        cache_dir (str): 缓存目录路径，不存在时自动创建
+        max_size_bytes (int, optional): 缓存最大占用空间（字节），默认值为 DEFAULT_RESULT_CACHE_MAX_BYTES (1GB)
+    """
+
+    _META_FILENAME = "meta.json"
+
+    def __init__(self,
+                 cache_dir: str,
+                 max_size_bytes: int = DEFAULT_RESULT_CACHE_MAX_BYTES) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+
+        # LRU 索引：键为缓存键，值为条目占用空间（字节），越靠后越新
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+        # 命中统计
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.api_time_saved = 0.0
+
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """从磁盘加载已有缓存条目，按最近访问时间排序重建 LRU 索引"""
+        entries = []
+        for entry_dir in self.cache_dir.iterdir():
+            meta_path = entry_dir / self._META_FILENAME
+            if not entry_dir.is_dir() or not meta_path.exists():
+                continue
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                entries.append((meta["last_access_at"], entry_dir.name,
+                                meta["size_bytes"]))
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"缓存条目 {entry_dir.name} 元数据损坏，已删除: {e}")
+                shutil.rmtree(entry_dir, ignore_errors=True)
+
+        for _, key, size_bytes in sorted(entries):
+            self._index[key] = size_bytes
+            self._size_bytes += size_bytes
+
+    @staticmethod
+    def build_key(text: str, images: List[str], params: Dict[str, Any]) -> str:
+        """根据完整提示词、输入图像内容哈希和生成参数计算缓存键
+
+        Args:
+            text (str): 完整构建的提示词（即 _build_prompt 的返回值）
+            images (List[str]): 图像列表，本地路径按文件内容计算哈希，URL 直接参与计算
+            params (Dict[str, Any]): 生成参数（模型、尺寸、种子等）
+
+        Returns:
+            str: 缓存键（sha256 十六进制字符串）
+        """
+        image_digests = []
+        for image in images:
+            if image.startswith("http"):
+                image_digests.append(image)
+            else:
+                with open(image, "rb") as f:
+                    image_digests.append(hashlib.file_digest(f, "sha256").hexdigest())
+
+        payload = json.dumps(
+            {
+                "text": text,
+                "images": image_digests,
+                "params": params
+            },
+            sort_keys=True,
+            ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _read_meta(self, key: str) -> Dict[str, Any]:
+        return json.loads((self.cache_dir / key /
+                           self._META_FILENAME).read_text(encoding="utf-8"))
+
+    def _write_meta(self, key: str, meta: Dict[str, Any]) -> None:
+        (self.cache_dir / key / self._META_FILENAME).write_text(
+            json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    def get(self, key: str, target_dir: Path) -> Optional[Dict[str, Any]]:
+        """查询缓存，命中时将缓存的图像复制到目标目录
+
+        Args:
+            key (str): 缓存键
+            target_dir (Path): 图像复制的目标目录（通常为生成器的下载目录）
+
+        Returns:
+            Optional[Dict[str, Any]]: 缓存的生成结果，未命中时返回 None
+        """
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+
+            entry_dir = self.cache_dir / key
+            try:
+                meta = self._read_meta(key)
+                for filename in meta["files"]:
+                    shutil.copyfile(entry_dir / filename, Path(target_dir) / filename)
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"读取缓存条目 {key} 失败，已删除: {e}")
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            # 更新访问记录
+            meta["last_access_at"] = time.time()
+            meta["hit_count"] += 1
+            meta["time_saved_seconds"] += meta["api_time_seconds"]
+            self._write_meta(key, meta)
+            self._index.move_to_end(key)
+
+            self.hits += 1
+            self.api_time_saved += meta["api_time_seconds"]
+            logging.info(
+                f"生成结果缓存命中: {key[:12]}，节省 API 耗时 {meta['api_time_seconds']:.1f} 秒")
+
+            result = copy.deepcopy(meta["result"])
+            result["from_cache"] = True
+            return result
+
+    def put(self, key: str, result: Dict[str, Any], image_paths: List[str],
+            api_time_seconds: float) -> None:
+        """写入缓存，写入后如果超出空间上限则按 LRU 淘汰旧条目
+
+        Args:
+            key (str): 缓存键
+            result (Dict[str, Any]): 生成结果（DashScope API 返回的任务结果）
+            image_paths (List[str]): 已下载到本地的生成图像路径
+            api_time_seconds (float): 本次生成调用远程 API 的耗时（秒）
+        """
+        with self._lock:
+            if key in self._index:
+                self._remove(key)
+
+            entry_dir = self.cache_dir / key
+            entry_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                size_bytes = 0
+                files = []
+                for image_path in image_paths:
+                    filename = Path(image_path).name
+                    shutil.copyfile(image_path, entry_dir / filename)
+                    size_bytes += (entry_dir / filename).stat().st_size
+                    files.append(filename)
+
+                now = time.time()
+                self._write_meta(
+                    key, {
+                        "result": result,
+                        "files": files,
+                        "size_bytes": size_bytes,
+                        "api_time_seconds": api_time_seconds,
+                        "created_at": now,
+                        "last_access_at": now,
+                        "hit_count": 0,
+                        "time_saved_seconds": 0.0,
+                    })
+            except (OSError, TypeError, ValueError) as e:
+                logging.warning(f"写入生成结果缓存失败: {e}")
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                return
+
+            self._index[key] = size_bytes
+            self._size_bytes += size_bytes
+            self._evict()
+
+    def _remove(self, key: str) -> None:
+        """删除缓存条目"""
+        self._size_bytes -= self._index.pop(key, 0)
+        shutil.rmtree(self.cache_dir / key, ignore_errors=True)
+
+    def _evict(self) -> None:
+        """按 LRU 顺序淘汰条目，直到占用空间不超过上限（至少保留最新的一个条目）"""
+        while self._size_bytes > self.max_size_bytes and len(self._index) > 1:
+            oldest_key = next(iter(self._index))
+            logging.info(f"生成结果缓存超出上限，淘汰条目: {oldest_key[:12]}")
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def get_entry_info(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取单个缓存条目的记录（不含生成结果本身），包括原始 API 耗时和累计节省的时间
+
+        Args:
+            key (str): 缓存键
+
+        Returns:
+            Optional[Dict[str, Any]]: 条目记录，不存在时返回 None
+        """
+        if key not in self._index:
+            return None
+        meta = self._read_meta(key)
+        meta.pop("result", None)
+        return meta
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "size_bytes": self._size_bytes,
+            "max_size_bytes": self.max_size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "api_time_saved_seconds": self.api_time_saved,
+        }
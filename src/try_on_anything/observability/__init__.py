@@ -0,0 +1,6 @@
+from .metrics import (REGISTRY, MetricsRegistry, Counter, Gauge, Histogram,
+                      observe_stage, record_stage_duration, listen_stage_events,
+                      emit_stage_event, register_models)
+from .tracing import (Span, SpanExporter, InMemorySpanExporter, JsonlFileSpanExporter,
+                      OTLPHttpSpanExporter, configure_tracing, configure_tracing_from_env,
+                      shutdown_tracing, start_span, get_current_span)
@@ -0,0 +1,348 @@
+"""
+进程内指标采集，输出 Prometheus 文本格式
+
+提供计数器（Counter）、仪表盘（Gauge）和直方图（Histogram）三种指标，以及记录各处理阶段
+耗时、并发数和错误数的 observe_stage 上下文管理器。不依赖 prometheus_client，
+后端通过 /metrics 接口输出 REGISTRY.render() 的结果即可被 Prometheus 抓取。
+
+observe_stage 同时会向当前上下文的阶段事件监听器（listen_stage_events）发送
+"<阶段>.start"、"<阶段>.end"、"<阶段>.error" 事件，后端据此记录每个任务的时间线。
+"""
+from typing import Optional, Dict, Tuple, List, Callable, Iterator, Sequence, Union
+from contextlib import contextmanager
+from contextvars import ContextVar
+import math
+import threading
+import time
+
+from .tracing import start_span, Span, _NoopSpan
+
+# 阶段名称
+STAGE_TASK = "task"  # 后端任务整体处理
+STAGE_UPLOAD = "upload"  # 上传图片校验与保存
+STAGE_VL_ANALYSIS = "vl_analysis"  # VL 模型识别
+STAGE_ENCODE = "encode"  # 输入图像缩放与 base64 编码
+STAGE_WAN_SUBMIT = "wan_submit"  # 提交图像生成任务
+STAGE_WAN_QUEUE = "wan_queue"  # 远程任务排队（提交后到开始运行）
+STAGE_WAN_POLLING = "wan_polling"  # 轮询远程任务直到结束
+STAGE_DOWNLOAD = "download"  # 下载生成图像
+STAGE_GENERATION = "generation"  # 图像生成整体（提交、轮询、下载）
+
+# 阶段耗时直方图的默认分桶（秒），覆盖毫秒级的编码到分钟级的远程生成
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: LabelValues,
+                   extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(str(value))}"'
+                          for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类
+
+    Args:
+        name (str): 指标名称
+        documentation (str): 指标说明
+        labelnames (Sequence[str], optional): 标签名称列表，默认值为 ()
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def get(self, **labels: str) -> float:
+        """获取指定标签组合的当前值，不存在时返回 0"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+    def render(self) -> List[str]:
+        """输出 Prometheus 文本格式的行"""
+        return [f"# HELP {self.name} {self.documentation}",
+                f"# TYPE {self.name} {self.type_name}"] + self._samples()
+
+
+class Counter(_Metric):
+    """单调递增的计数器"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """增加计数
+
+        Raises:
+            ValueError: 当 amount 为负数时
+        """
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """可增可减的仪表盘"""
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """累积分桶直方图
+
+    Args:
+        buckets (Sequence[float], optional): 分桶上界（升序），默认值为 DEFAULT_BUCKETS
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # 每个标签组合：[各分桶计数..., 总和, 样本数]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """记录一个样本"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def get(self, **labels: str) -> float:
+        """获取指定标签组合的样本数，不存在时返回 0"""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[-1] if series else 0.0
+
+    def get_sum(self, **labels: str) -> float:
+        """获取指定标签组合的样本总和，不存在时返回 0"""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[-2] if series else 0.0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = {"le": _format_value(bound)}
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} "
+                             f"{_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表
+
+    除了直接注册的指标外，还支持注册采集回调（collector），在输出时调用，
+    适用于任务队列长度这类在抓取时计算的指标。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"指标 {metric.name} 已以不同的类型或标签注册")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """注册（或获取已注册的）计数器"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """注册（或获取已注册的）仪表盘"""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """注册（或获取已注册的）直方图"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        """注册采集回调，每次输出指标前调用（通常用于设置 Gauge 的当前值）"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """输出全部指标的 Prometheus 文本格式（text/plain; version=0.0.4）"""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        for collector in collectors:
+            collector()
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 全局指标注册表
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    "try_on_stage_duration_seconds", "各处理阶段耗时（秒）", ("stage", "model"))
+STAGE_IN_FLIGHT = REGISTRY.gauge(
+    "try_on_stage_in_flight", "各处理阶段正在执行的数量", ("stage", "model"))
+STAGE_ERRORS = REGISTRY.counter(
+    "try_on_stage_errors_total", "各处理阶段失败次数", ("stage", "model", "error_type"))
+
+# 可作为阶段指标 model 标签的模型名称。模型名称来自用户请求，
+# 不在列表中的名称统一记为 OTHER_MODEL，避免任意取值使标签组合无限增长
+KNOWN_MODELS = {"wan2.6-image", "qwen3-vl-plus", "qwen3-vl-flash"}
+OTHER_MODEL = "other"
+
+
+def register_models(*models: str) -> None:
+    """登记可作为阶段指标 model 标签的模型名称（部署中使用了默认列表以外的模型时调用）
+
+    Args:
+        *models (str): 模型名称
+    """
+    KNOWN_MODELS.update(models)
+
+
+def _model_label(model: str) -> str:
+    """返回模型名称对应的指标标签值，未登记的模型名称记为 OTHER_MODEL"""
+    return model if not model or model in KNOWN_MODELS else OTHER_MODEL
+
+
+# 阶段事件监听器：(事件名称, 事件详情)，按上下文隔离，每个后端任务只收到自己的事件
+StageListener = Callable[[str, Optional[str]], None]
+_stage_listener: ContextVar[Optional[StageListener]] = ContextVar("stage_listener", default=None)
+
+
+@contextmanager
+def listen_stage_events(listener: StageListener) -> Iterator[None]:
+    """在当前上下文中注册阶段事件监听器（对在其中创建的子协程同样生效）
+
+    Args:
+        listener (StageListener): 回调函数，参数为事件名称和事件详情
+    """
+    token = _stage_listener.set(listener)
+    try:
+        yield
+    finally:
+        _stage_listener.reset(token)
+
+
+def emit_stage_event(event: str, detail: Optional[str] = None) -> None:
+    """向当前上下文的阶段事件监听器发送事件，没有监听器时不做任何事
+
+    Args:
+        event (str): 事件名称，例如 "wan_polling.poll"
+        detail (str, optional): 事件详情，例如远程任务状态，默认值为 None
+    """
+    listener = _stage_listener.get()
+    if listener is not None:
+        listener(event, detail)
+
+
+def record_stage_duration(stage: str, seconds: float, model: str = "") -> None:
+    """直接记录一个阶段耗时（用于无法用上下文管理器包裹的阶段，例如远程排队时间）
+
+    Args:
+        stage (str): 阶段名称
+        seconds (float): 耗时（秒）
+        model (str, optional): 模型名称（未登记的名称记为 "other"），默认值为 ""
+    """
+    STAGE_DURATION.observe(seconds, stage=stage, model=_model_label(model))
+
+
+@contextmanager
+def observe_stage(stage: str, model: str = "") -> Iterator[Union[Span, _NoopSpan]]:
+    """记录一个处理阶段的耗时、并发数和错误数，启用追踪时同时创建同名 span
+
+    使用示例：
+        with observe_stage(STAGE_WAN_SUBMIT, model) as span:
+            response = await client.post(...)
+
+    Args:
+        stage (str): 阶段名称
+        model (str, optional): 模型名称，默认值为 ""
+
+    Yields:
+        Union[Span, _NoopSpan]: 该阶段的 span（未启用追踪时为空 span）
+    """
+    label = _model_label(model)
+    STAGE_IN_FLIGHT.inc(stage=stage, model=label)
+    emit_stage_event(f"{stage}.start", model or None)
+    start = time.perf_counter()
+    try:
+        with start_span(stage, {"model": model or None}) as span:
+            yield span
+    except BaseException as e:
+        STAGE_ERRORS.inc(stage=stage, model=label, error_type=type(e).__name__)
+        emit_stage_event(f"{stage}.error", type(e).__name__)
+        raise
+    else:
+        emit_stage_event(f"{stage}.end")
+    finally:
+        STAGE_IN_FLIGHT.dec(stage=stage, model=label)
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage, model=label)
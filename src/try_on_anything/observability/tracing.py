@@ -0,0 +1,400 @@
+"""
+轻量级链路追踪，数据模型与 OpenTelemetry 保持一致
+
+未配置导出器时所有追踪调用都是空操作（no-op），开销可忽略。配置导出器后，
+每个 span 结束时交给导出器处理：
+    - JsonlFileSpanExporter: 每个 span 一行 JSON 写入本地文件
+    - OTLPHttpSpanExporter: 批量以 OTLP/JSON 格式发送到 OTLP 收集器（http://host:4318/v1/traces）
+    - InMemorySpanExporter: 保存在内存中（用于测试）
+
+当前 span 通过 contextvars 传递，asyncio.create_task 创建的后台任务会自动继承创建时的
+span 作为父 span，因此 API 请求、后台任务处理、VL 模型调用和每次 Wan 任务轮询可以串成一条链路。
+
+使用示例：
+    configure_tracing(JsonlFileSpanExporter("traces.jsonl"))
+    with start_span("process_task", {"task_id": task_id}) as span:
+        span.set_attribute("dashscope.task_id", dashscope_task_id)
+"""
+from typing import Optional, Dict, Any, List, Iterator, Union
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+
+import httpx
+
+AttributeValue = Union[str, int, float, bool]
+
+# OTLP span 状态码
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """一次操作的追踪记录
+
+    Args:
+        name (str): span 名称
+        trace_id (str): 链路 ID（32 位十六进制）
+        parent_id (str, optional): 父 span ID（16 位十六进制），根 span 为 None
+        attributes (Dict[str, AttributeValue], optional): 初始属性
+    """
+
+    recording = True
+
+    def __init__(self,
+                 name: str,
+                 trace_id: str,
+                 parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, AttributeValue]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, AttributeValue] = dict(attributes or {})
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Optional[AttributeValue]) -> None:
+        """设置属性，值为 None 时忽略"""
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Optional[AttributeValue]]) -> None:
+        """批量设置属性，值为 None 的项忽略"""
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, error: BaseException) -> None:
+        """记录异常并将状态置为 ERROR"""
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+        self.attributes["exception.type"] = type(error).__name__
+
+    @property
+    def duration_seconds(self) -> Optional[float]:
+        if self.end_time_ns is None:
+            return None
+        return (self.end_time_ns - self.start_time_ns) / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为便于写入文件的字典"""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_unix_nano": self.start_time_ns,
+            "end_time_unix_nano": self.end_time_ns,
+            "duration_seconds": self.duration_seconds,
+            "status": {STATUS_UNSET: "UNSET", STATUS_OK: "OK", STATUS_ERROR: "ERROR"}[self.status_code],
+            "status_message": self.status_message or None,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """追踪未启用时返回的空 span，所有操作均为空操作"""
+
+    recording = False
+    name = ""
+    trace_id = None
+    span_id = None
+    parent_id = None
+    attributes: Dict[str, AttributeValue] = {}
+
+    def set_attribute(self, key: str, value: Optional[AttributeValue]) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Optional[AttributeValue]]) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("try_on_current_span", default=None)
+
+
+class SpanExporter:
+    """导出器基类"""
+
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """关闭导出器，发送缓冲中的数据"""
+
+
+class InMemorySpanExporter(SpanExporter):
+    """保存在内存中的导出器（用于测试）"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def find(self, name: str) -> List[Span]:
+        """按名称查找已导出的 span"""
+        with self._lock:
+            return [span for span in self.spans if span.name == name]
+
+
+class JsonlFileSpanExporter(SpanExporter):
+    """每个 span 以一行 JSON 追加写入本地文件
+
+    Args:
+        path (Union[str, Path]): 输出文件路径，父目录不存在时自动创建
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def _otlp_value(value: AttributeValue) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def span_to_otlp(span: Span) -> Dict[str, Any]:
+    """将 span 转换为 OTLP/JSON 格式"""
+    data = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_time_ns),
+        "endTimeUnixNano": str(span.end_time_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)}
+                       for key, value in span.attributes.items()],
+        "status": {"code": span.status_code},
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    if span.status_message:
+        data["status"]["message"] = span.status_message
+    return data
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    """批量以 OTLP/JSON 格式发送到 OTLP 收集器
+
+    span 先放入队列，由后台线程按批次发送，不阻塞事件循环；发送失败只记录日志，不影响业务。
+
+    Args:
+        endpoint (str): 收集器地址，例如 "http://127.0.0.1:4318/v1/traces"
+        service_name (str, optional): 服务名称，默认值为 "try-on-anything"
+        max_batch_size (int, optional): 单批最多发送的 span 数量，默认值为 256
+        flush_interval (float, optional): 定时发送间隔（秒），默认值为 2.0
+        timeout (float, optional): 发送请求超时时间（秒），默认值为 5.0
+    """
+
+    def __init__(self,
+                 endpoint: str,
+                 service_name: str = "try-on-anything",
+                 max_batch_size: int = 256,
+                 flush_interval: float = 2.0,
+                 timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._client = httpx.Client(timeout=timeout)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def _send(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "try_on_anything"},
+                    "spans": [span_to_otlp(span) for span in spans],
+                }],
+            }]
+        }
+        try:
+            self._client.post(self.endpoint, json=payload).raise_for_status()
+        except httpx.HTTPError as e:
+            logging.warning(f"发送追踪数据到 {self.endpoint} 失败（丢弃 {len(spans)} 个 span）: {e!r}")
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                items = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                items = []
+            # 取出队列中已有的全部数据，队列中的 None 表示停止，Event 表示强制发送请求
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = any(item is None for item in items)
+            spans = [item for item in items if isinstance(item, Span)]
+            for i in range(0, len(spans), self.max_batch_size):
+                self._send(spans[i:i + self.max_batch_size])
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def force_flush(self, timeout: float = 10.0) -> bool:
+        """发送队列中全部数据，返回是否在超时前完成"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._client.close()
+
+
+class Tracer:
+    """追踪器，持有当前导出器
+
+    Args:
+        exporter (SpanExporter, optional): 导出器，默认值为 None（不启用追踪）
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def start_span(self,
+                   name: str,
+                   attributes: Optional[Dict[str, Optional[AttributeValue]]] = None
+                   ) -> Iterator[Union[Span, _NoopSpan]]:
+        """创建 span 并设为当前 span，退出时结束并导出
+
+        未启用追踪时返回空 span。上下文内抛出的异常会记录到 span 后继续抛出。
+
+        Args:
+            name (str): span 名称
+            attributes (Dict[str, AttributeValue], optional): 初始属性，值为 None 的项忽略
+        """
+        exporter = self.exporter
+        if exporter is None:
+            yield NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        span = Span(name,
+                    trace_id=parent.trace_id if parent else secrets.token_hex(16),
+                    parent_id=parent.span_id if parent else None)
+        if attributes:
+            span.set_attributes(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time_ns = time.time_ns()
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logging.warning(f"导出追踪数据失败: {e!r}")
+
+
+# 全局追踪器
+tracer = Tracer()
+
+
+def configure_tracing(exporter: Optional[SpanExporter]) -> None:
+    """设置全局导出器，传入 None 关闭追踪（会先关闭之前的导出器）"""
+    previous = tracer.exporter
+    tracer.exporter = exporter
+    if previous is not None and previous is not exporter:
+        previous.shutdown()
+
+
+def configure_tracing_from_env() -> Optional[SpanExporter]:
+    """根据环境变量配置追踪
+
+    - TRACING_EXPORTER: none（默认）/ file / otlp
+    - TRACING_FILE: file 模式的输出路径，默认值为 "traces.jsonl"
+    - TRACING_OTLP_ENDPOINT: otlp 模式的收集器地址，默认值为 "http://127.0.0.1:4318/v1/traces"
+    - TRACING_SERVICE_NAME: 服务名称，默认值为 "try-on-anything"
+
+    Returns:
+        Optional[SpanExporter]: 配置的导出器，未启用时返回 None
+
+    Raises:
+        ValueError: 当 TRACING_EXPORTER 取值不支持时
+    """
+    kind = (os.getenv("TRACING_EXPORTER") or "none").strip().lower()
+    if kind == "none":
+        exporter = None
+    elif kind == "file":
+        exporter = JsonlFileSpanExporter(os.getenv("TRACING_FILE") or "traces.jsonl")
+    elif kind == "otlp":
+        exporter = OTLPHttpSpanExporter(
+            os.getenv("TRACING_OTLP_ENDPOINT") or "http://127.0.0.1:4318/v1/traces",
+            service_name=os.getenv("TRACING_SERVICE_NAME") or "try-on-anything")
+    else:
+        raise ValueError(f"不支持的 TRACING_EXPORTER: {kind}，可选值为 none/file/otlp")
+    configure_tracing(exporter)
+    return exporter
+
+
+def shutdown_tracing() -> None:
+    """关闭追踪并发送缓冲中的数据"""
+    configure_tracing(None)
+
+
+def start_span(name: str,
+               attributes: Optional[Dict[str, Optional[AttributeValue]]] = None):
+    """使用全局追踪器创建 span，参数同 Tracer.start_span"""
+    return tracer.start_span(name, attributes)
+
+
+def get_current_span() -> Union[Span, _NoopSpan]:
+    """获取当前 span，没有时返回空 span"""
+    return _current_span.get() or NOOP_SPAN
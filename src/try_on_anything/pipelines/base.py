@@ -1,11 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Awaitable, Optional
+from typing import Callable, Awaitable, Optional, Dict, Any
 import logging
 
 from ..utils import encode_image_for_vl
-from ..common.types import VLModelParsedResult
+from ..common.types import VLModelParsedResult, TaskSubmittedCallback
+from ..common.deadline import Deadline
 from ..common.constants import VL_MODEL_MAX_TOKENS, VL_MODEL_THINKING_BUDGET
 from ..generators.base import DashScopeImageGenerator
+from ..observability.metrics import observe_stage, STAGE_ENCODE, STAGE_VL_ANALYSIS
 from ..clients import QwenVLClient
 
 
@@ -32,6 +34,27 @@ class BaseTryOnPipeline(ABC):
         """
         pass
 
+    @staticmethod
+    def _bind_task_submitted_callback(
+        callback: Optional[TaskSubmittedCallback], context: Dict[str, Any]
+    ) -> Optional[Callable[[str], Awaitable[None]]]:
+        """将Pipeline级别的任务提交回调绑定提交时的识别信息，转换为图像生成器使用的回调
+
+        Args:
+            callback (Optional[TaskSubmittedCallback]): Pipeline级别的任务提交回调
+            context (Dict[str, Any]): 提交任务时使用的识别信息
+
+        Returns:
+            Optional[Callable[[str], Awaitable[None]]]: 图像生成器使用的回调，callback 为 None 时返回 None
+        """
+        if callback is None:
+            return None
+
+        async def _on_task_submitted(dashscope_task_id: str) -> None:
+            await callback(dashscope_task_id, context)
+
+        return _on_task_submitted
+
 
 class VLModelEnhancedTryOnPipeline(BaseTryOnPipeline):
     """使用VL模型增强试穿效果的Pipeline中间层基类
@@ -72,7 +95,8 @@ class VLModelEnhancedTryOnPipeline(BaseTryOnPipeline):
         max_tokens: int = VL_MODEL_MAX_TOKENS,
         enable_thinking: bool = True,
         thinking_budget: int = VL_MODEL_THINKING_BUDGET,
-        status_callback: Optional[Callable[[str, int], Awaitable[None]]] = None
+        status_callback: Optional[Callable[[str, int], Awaitable[None]]] = None,
+        deadline: Optional[Deadline] = None
     ) -> VLModelParsedResult:
         """通用方法：VL模型增强pipeline中VL大模型的调用，子类可以复用或重写此方法
 
@@ -84,6 +108,7 @@ class VLModelEnhancedTryOnPipeline(BaseTryOnPipeline):
             thinking_budget (int, optional): VL模型思考预算，默认值为 VL_MODEL_THINKING_BUDGET
             status_callback (Callable[[str, int], Awaitable[None]], optional): 状态回调函数，默认值为 None。
                 回调函数接收两个参数：status (str) 当前状态描述，progress (int) 进度百分比 (0-100)
+            deadline (Deadline, optional): 任务截止时间，VL模型请求超时时间不超过剩余预算，默认值为 None
 
         Returns:
             VLModelParsedResult: VL模型解析结果对象
@@ -91,7 +116,8 @@ class VLModelEnhancedTryOnPipeline(BaseTryOnPipeline):
 
         # 如果启用VL模型，则先调用VL模型提取信息
         # 使用纯 base64 编码，不含 data:image/xxx;base64, 前缀
-        img_base64_for_vl = encode_image_for_vl(img_path)
+        with observe_stage(STAGE_ENCODE, vl_model_name):
+            img_base64_for_vl = encode_image_for_vl(img_path)
 
         # 通过回调通知调用方：VL模型分析开始
         if status_callback:
@@ -112,12 +138,14 @@ class VLModelEnhancedTryOnPipeline(BaseTryOnPipeline):
             }]
         }]
         # 调用VL模型
-        response = await self.vl_client.chat(
-            model=vl_model_name,
-            messages=vl_messages,
-            max_tokens=max_tokens,
-            enable_thinking=enable_thinking,
-            thinking_budget=thinking_budget)
+        with observe_stage(STAGE_VL_ANALYSIS, vl_model_name):
+            response = await self.vl_client.chat(
+                model=vl_model_name,
+                messages=vl_messages,
+                max_tokens=max_tokens,
+                enable_thinking=enable_thinking,
+                thinking_budget=thinking_budget,
+                deadline=deadline)
         vl_response = response.content
 
         # 解析VL模型的响应内容
@@ -7,7 +7,8 @@ from pathlib import Path
 from ..generators.clothing_try_on import ClothingTryOnImageGenerator
 from ..clients import QwenVLClient
 from ..pipelines.base import VLModelEnhancedTryOnPipeline
-from ..common.types import VLModelParsedResult, StatusCallback
+from ..common.types import VLModelParsedResult, StatusCallback, TaskSubmittedCallback
+from ..common.deadline import Deadline
 
 
 class ClothingTryOnPipeline(VLModelEnhancedTryOnPipeline):
@@ -99,7 +100,10 @@ class ClothingTryOnPipeline(VLModelEnhancedTryOnPipeline):
         person_position: Optional[str] = None,
         vl_model_name: str = "qwen3-vl-plus",
         img_gen_model_name: str = "wan2.6-image",
+        seed: Optional[int] = None,
         status_callback: Optional[StatusCallback] = None,
+        task_submitted_callback: Optional[TaskSubmittedCallback] = None,
+        deadline: Optional[Deadline] = None,
     ) -> Dict[str, Any]:
         """运行服装试穿Pipeline
 
@@ -118,11 +122,20 @@ class ClothingTryOnPipeline(VLModelEnhancedTryOnPipeline):
                 如果提供，则直接使用；如果不提供且启用VL模型，则使用VL模型识别的结果。默认值为 None
             vl_model_name (str, optional): VL模型名称。默认为 "qwen3-vl-plus"
             img_gen_model_name (str, optional): 生成模型名称。默认为 "wan2.6-image"
+            seed (Optional[int], optional): 图像生成随机数种子。默认值为 None（由 API 随机生成）。
+                指定种子时生成结果可复现，启用生成结果缓存时相同输入直接复用之前的结果
             status_callback (Optional[StatusCallback], optional): 状态回调函数，用于通知调用方当前执行状态。
                 回调函数签名: async def callback(status: str, progress: int) -> None
                 - status: 当前状态描述文本
                 - progress: 当前进度百分比 (0-100)
                 默认值为 None（不进行状态回调）
+            task_submitted_callback (Optional[TaskSubmittedCallback], optional): 图像生成任务提交后的回调函数，
+                回调函数签名: async def callback(dashscope_task_id: str, context: Dict[str, Any]) -> None
+                - dashscope_task_id: DashScope 图像生成任务 ID
+                - context: 提交任务时使用的识别信息（clothing_type、person_position）
+                默认值为 None（不进行回调）
+            deadline (Optional[Deadline], optional): 任务截止时间，VL模型识别和图像生成都只使用剩余预算，
+                默认值为 None（各阶段分别使用自身的超时时间）
 
         Returns:
             Dict[str, Any]: 生成的试穿效果图结果，包含生成图像的URL或路径等信息
@@ -131,7 +144,7 @@ class ClothingTryOnPipeline(VLModelEnhancedTryOnPipeline):
             FileNotFoundError: 当输入的图像文件不存在时
             ValueError: 当图像尺寸不符合要求或 VL 模型响应解析失败时
             RuntimeError: 当图像生成失败时
-            TimeoutError: 当任务执行超时时
+            TimeoutError: 当任务执行超时或超过截止时间时
 
         Note:
             - 如果启用VL模型（use_vl_model=True），会自动分析服装图像
@@ -152,7 +165,8 @@ class ClothingTryOnPipeline(VLModelEnhancedTryOnPipeline):
             vl_parsed_result = await self._call_vl_model(
                 img_path=clothing_img_path,
                 vl_model_name=vl_model_name,
-                status_callback=status_callback)
+                status_callback=status_callback,
+                deadline=deadline)
 
             # 使用VL模型提取的信息（如果用户没有手动指定，则使用VL模型识别的结果）
             clothing_type = user_clothing_type if user_clothing_type else vl_parsed_result.type
@@ -186,6 +200,13 @@ class ClothingTryOnPipeline(VLModelEnhancedTryOnPipeline):
                 clothing_type=clothing_type,
                 person_position=person_position,
                 model=img_gen_model_name,
+                seed=seed,
+                task_submitted_callback=self._bind_task_submitted_callback(
+                    task_submitted_callback, {
+                        "clothing_type": clothing_type,
+                        "person_position": person_position
+                    }),
+                deadline=deadline,
             )
         except Exception as e:
             logging.error(f"调用试穿图像生成模型失败: {e}")
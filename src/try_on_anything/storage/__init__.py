@@ -0,0 +1,5 @@
+from .base import Storage
+from .local import LocalStorage
+from .s3 import S3Storage
+
+__all__ = ["Storage", "LocalStorage", "S3Storage"]
@@ -0,0 +1,88 @@
+"""
+对象存储抽象
+
+任务文件（上传图片、细节图、生成结果）按 "<任务ID>/<文件名>" 形式的键保存，
+本地磁盘和 S3 兼容对象存储实现相同的接口，读写均以分块流式进行。
+"""
+from typing import AsyncIterator, Optional
+from pathlib import Path
+from abc import ABC, abstractmethod
+
+import aiofiles
+
+# 流式读写的分块大小
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class Storage(ABC):
+    """对象存储接口
+
+    Attributes:
+        remote (bool): 是否为远程存储（远程存储需要将本地文件同步上传，删除任务时需要删除远程对象）
+    """
+
+    remote: bool = False
+
+    @abstractmethod
+    async def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        """将本地文件流式上传到指定键"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        """将字节内容保存到指定键"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_bytes(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """分块流式读取对象内容
+
+        Raises:
+            FileNotFoundError: 当对象不存在时
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """判断对象是否存在"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """删除对象（不存在时忽略）"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str) -> int:
+        """删除指定前缀下的全部对象，返回删除数量"""
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        """释放存储持有的连接（服务关闭时调用，之后再发起请求时会重新建立连接）"""
+
+    @abstractmethod
+    def url(self, key: str, expires: Optional[int] = None) -> str:
+        """获取对象的访问地址（远程存储返回预签名 URL）
+
+        Args:
+            key (str): 对象键
+            expires (int, optional): 预签名 URL 有效期（秒），默认值为 None（使用存储的默认有效期）
+        """
+        raise NotImplementedError
+
+    async def get_bytes(self, key: str) -> bytes:
+        """读取对象全部内容"""
+        return b"".join([chunk async for chunk in self.iter_bytes(key)])
+
+    async def download_to(self, key: str, path: Path) -> Path:
+        """将对象流式下载到本地文件
+
+        Returns:
+            Path: 本地文件路径
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        async with aiofiles.open(path, "wb") as f:
+            async for chunk in self.iter_bytes(key):
+                await f.write(chunk)
+        return path
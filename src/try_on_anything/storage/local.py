@@ -0,0 +1,68 @@
+"""
+本地磁盘存储
+"""
+from typing import AsyncIterator, Optional
+from pathlib import Path
+import asyncio
+import os
+import shutil
+
+import aiofiles
+
+from .base import Storage, DEFAULT_CHUNK_SIZE
+
+
+class LocalStorage(Storage):
+    """本地磁盘存储，键映射为根目录下的相对路径
+
+    后端使用任务数据目录作为根目录时，任务文件本身就是存储中的对象，put_file 不会重复复制。
+
+    Args:
+        root (Path): 存储根目录
+        url_prefix (str, optional): 访问地址前缀（静态文件挂载路径），默认值为 "/files"
+    """
+
+    def __init__(self, root: Path, url_prefix: str = "/files"):
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError(f"非法的存储键: {key}")
+        return path
+
+    async def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        target = self._path(key)
+        if target.exists() and os.path.samefile(path, target):
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(shutil.copyfile, path, target)
+
+    async def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        async with aiofiles.open(target, "wb") as f:
+            await f.write(data)
+
+    async def iter_bytes(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self._path(key), "rb") as f:
+            while chunk := await f.read(chunk_size):
+                yield chunk
+
+    async def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    async def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        base = self._path(prefix)
+        if base.is_dir():
+            count = sum(1 for p in base.rglob("*") if p.is_file())
+            await asyncio.to_thread(shutil.rmtree, base, True)
+            return count
+        return 0
+
+    def url(self, key: str, expires: Optional[int] = None) -> str:
+        return f"{self.url_prefix}/{key}"
@@ -0,0 +1,207 @@
+"""
+S3 兼容对象存储（AWS S3、MinIO、阿里云 OSS 的 S3 兼容接口等）
+
+直接使用 httpx 发送 SigV4 签名请求，不依赖 boto3。对象地址使用路径风格
+（{endpoint}/{bucket}/{key}），上传时流式发送文件内容，不预先计算请求体摘要（UNSIGNED-PAYLOAD）。
+同一个存储实例的所有请求复用一个 HTTP 客户端（连接池），按前缀删除时使用批量删除接口。
+"""
+from typing import AsyncIterator, Optional, List
+from pathlib import Path
+from urllib.parse import urlencode
+from xml.sax.saxutils import escape
+import asyncio
+import base64
+import hashlib
+import mimetypes
+import os
+import xml.etree.ElementTree as ET
+
+import aiofiles
+import httpx
+
+from .base import Storage, DEFAULT_CHUNK_SIZE
+from .sigv4 import sign_headers, presign_url, uri_encode, EMPTY_SHA256
+from ..common.constants import HTTP_REQUEST_TIMEOUT
+
+_S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+# DeleteObjects 单次请求最多删除的对象数量
+_DELETE_BATCH_SIZE = 1000
+
+
+class S3Storage(Storage):
+    """S3 兼容对象存储
+
+    Args:
+        endpoint_url (str): 服务地址，例如 "http://127.0.0.1:9000"
+        bucket (str): 存储桶名称
+        access_key (str): 访问密钥 ID
+        secret_key (str): 访问密钥
+        region (str, optional): 区域，默认值为 "us-east-1"
+        public_endpoint_url (str, optional): 生成预签名 URL 时使用的对外地址（浏览器可访问），
+            默认值为 None（与 endpoint_url 相同）
+        presign_expires (int, optional): 预签名 URL 默认有效期（秒），默认值为 3600
+        timeout (float, optional): 请求超时时间（秒），默认值为 HTTP_REQUEST_TIMEOUT
+    """
+
+    remote = True
+
+    def __init__(self,
+                 endpoint_url: str,
+                 bucket: str,
+                 access_key: str,
+                 secret_key: str,
+                 region: str = "us-east-1",
+                 public_endpoint_url: Optional[str] = None,
+                 presign_expires: int = 3600,
+                 timeout: float = HTTP_REQUEST_TIMEOUT):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.public_endpoint_url = (public_endpoint_url or endpoint_url).rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.presign_expires = presign_expires
+        self.timeout = timeout
+        # 复用的 HTTP 客户端，第一次请求时在当前事件循环中创建（与 WanModelClient 相同，
+        # 事件循环变化时重新创建，旧客户端由其事件循环中的后台任务关闭）
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http_closer: Optional[asyncio.Task] = None
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """获取复用的 HTTP 客户端"""
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_client.is_closed or self._http_loop is not loop:
+            self._release_http_client()
+            client = httpx.AsyncClient(timeout=self.timeout)
+            self._http_client, self._http_loop = client, loop
+            self._http_closer = loop.create_task(self._close_on_loop_exit(client))
+        return self._http_client
+
+    @staticmethod
+    async def _close_on_loop_exit(client: httpx.AsyncClient) -> None:
+        """一直等待到被取消（客户端被替换、aclose 或事件循环结束），然后在当前事件循环中关闭客户端"""
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            await client.aclose()
+
+    def _release_http_client(self) -> None:
+        closer, loop = self._http_closer, self._http_loop
+        self._http_client = self._http_closer = None
+        if closer is not None and not closer.done() and not loop.is_closed():
+            loop.call_soon_threadsafe(closer.cancel)
+
+    async def aclose(self) -> None:
+        closer = self._http_closer
+        self._release_http_client()
+        if closer is not None and self._http_loop is asyncio.get_running_loop():
+            await asyncio.wait({closer})
+
+    def _object_url(self, key: str, endpoint: Optional[str] = None) -> str:
+        return f"{endpoint or self.endpoint_url}/{self.bucket}/{uri_encode(key, safe='/-_.~')}"
+
+    async def _request(self, method: str, url: str, content=None,
+                       headers: Optional[dict] = None,
+                       payload_hash: Optional[str] = None) -> httpx.Response:
+        headers = dict(headers or {})
+        headers.update(sign_headers(method, url, self.access_key, self.secret_key, self.region,
+                                    payload_hash=payload_hash or EMPTY_SHA256))
+        return await self._get_http_client().request(method, url, content=content, headers=headers)
+
+    async def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        size = os.path.getsize(path)
+
+        async def _chunks():
+            async with aiofiles.open(path, "rb") as f:
+                while chunk := await f.read(DEFAULT_CHUNK_SIZE):
+                    yield chunk
+
+        headers = {"content-length": str(size),
+                   "content-type": content_type or mimetypes.guess_type(str(path))[0]
+                   or "application/octet-stream"}
+        response = await self._request("PUT", self._object_url(key), content=_chunks(),
+                                       headers=headers, payload_hash="UNSIGNED-PAYLOAD")
+        response.raise_for_status()
+
+    async def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        headers = {"content-type": content_type or mimetypes.guess_type(key)[0]
+                   or "application/octet-stream"}
+        response = await self._request("PUT", self._object_url(key), content=data,
+                                       headers=headers,
+                                       payload_hash=hashlib.sha256(data).hexdigest())
+        response.raise_for_status()
+
+    async def iter_bytes(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        url = self._object_url(key)
+        headers = sign_headers("GET", url, self.access_key, self.secret_key, self.region,
+                               payload_hash=EMPTY_SHA256)
+        async with self._get_http_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(f"对象不存在: {key}")
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+
+    async def exists(self, key: str) -> bool:
+        response = await self._request("HEAD", self._object_url(key))
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    async def delete(self, key: str) -> None:
+        response = await self._request("DELETE", self._object_url(key))
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    async def list_keys(self, prefix: str) -> List[str]:
+        """列出指定前缀下的全部对象键（ListObjectsV2，自动翻页）"""
+        keys = []
+        token = None
+        while True:
+            params = {"list-type": "2", "prefix": prefix}
+            if token:
+                params["continuation-token"] = token
+            url = f"{self.endpoint_url}/{self.bucket}?{urlencode(params)}"
+            response = await self._request("GET", url)
+            response.raise_for_status()
+            root = ET.fromstring(response.content)
+            keys.extend(el.text for el in root.iter(f"{_S3_NS}Key"))
+            token = root.findtext(f"{_S3_NS}NextContinuationToken")
+            if root.findtext(f"{_S3_NS}IsTruncated") != "true" or not token:
+                return keys
+
+    async def delete_objects(self, keys: List[str]) -> None:
+        """批量删除对象（DeleteObjects，每次请求最多 1000 个，不存在的对象视为删除成功）
+
+        Raises:
+            OSError: 部分对象删除失败时
+        """
+        for start in range(0, len(keys), _DELETE_BATCH_SIZE):
+            batch = keys[start:start + _DELETE_BATCH_SIZE]
+            body = ("<Delete><Quiet>true</Quiet>"
+                    + "".join(f"<Object><Key>{escape(key)}</Key></Object>" for key in batch)
+                    + "</Delete>").encode("utf-8")
+            headers = {"content-type": "application/xml",
+                       "content-md5": base64.b64encode(hashlib.md5(body).digest()).decode()}
+            response = await self._request("POST", f"{self.endpoint_url}/{self.bucket}?delete",
+                                           content=body, headers=headers,
+                                           payload_hash=hashlib.sha256(body).hexdigest())
+            response.raise_for_status()
+            # 安静模式下只返回删除失败的对象
+            failed = [el.findtext(f"{_S3_NS}Key")
+                      for el in ET.fromstring(response.content).iter(f"{_S3_NS}Error")] \
+                if response.content else []
+            if failed:
+                raise OSError(f"{len(failed)} 个对象删除失败: {', '.join(failed[:5])}")
+
+    async def delete_prefix(self, prefix: str) -> int:
+        keys = await self.list_keys(prefix)
+        await self.delete_objects(keys)
+        return len(keys)
+
+    def url(self, key: str, expires: Optional[int] = None) -> str:
+        return presign_url("GET", self._object_url(key, self.public_endpoint_url),
+                           self.access_key, self.secret_key, self.region,
+                           expires=expires or self.presign_expires)
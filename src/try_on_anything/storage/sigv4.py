@@ -0,0 +1,137 @@
+"""
+AWS Signature Version 4 签名（S3 兼容对象存储使用）
+
+只依赖标准库，支持请求头签名和预签名 URL 两种方式，S3Storage 和本地模拟服务
+（try_on_anything.testing.fake_s3）共用这里的实现。
+"""
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit, parse_qsl
+import hashlib
+import hmac
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+
+def uri_encode(value: str, safe: str = "-_.~") -> str:
+    """按 SigV4 规则编码（除未保留字符外全部百分号编码）"""
+    return quote(value, safe=safe)
+
+
+def canonical_query(params: List[Tuple[str, str]]) -> str:
+    """规范化查询字符串：键值分别编码后按键排序"""
+    encoded = sorted((uri_encode(k), uri_encode(v)) for k, v in params)
+    return "&".join(f"{k}={v}" for k, v in encoded)
+
+
+def canonical_request(method: str, canonical_uri: str, query: List[Tuple[str, str]],
+                      headers: Dict[str, str], signed_headers: List[str],
+                      payload_hash: str) -> str:
+    """构造规范请求
+
+    Args:
+        method (str): HTTP 方法
+        canonical_uri (str): 已编码的请求路径
+        query (List[Tuple[str, str]]): 未编码的查询参数（不含 X-Amz-Signature）
+        headers (Dict[str, str]): 请求头（键为小写）
+        signed_headers (List[str]): 参与签名的请求头名称（小写，已排序）
+        payload_hash (str): 请求体 SHA-256 摘要或 UNSIGNED-PAYLOAD
+
+    Returns:
+        str: 规范请求字符串
+    """
+    canonical_headers = "".join(f"{name}:{' '.join(headers[name].split())}\n"
+                                for name in signed_headers)
+    return "\n".join([method.upper(), canonical_uri or "/", canonical_query(query),
+                      canonical_headers, ";".join(signed_headers), payload_hash])
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def signature(secret_key: str, amz_date: str, region: str, service: str,
+              request: str) -> str:
+    """根据规范请求计算签名"""
+    date = amz_date[:8]
+    scope = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([ALGORITHM, amz_date, scope,
+                                hashlib.sha256(request.encode("utf-8")).hexdigest()])
+    key = _hmac(f"AWS4{secret_key}".encode("utf-8"), date)
+    for part in (region, service, "aws4_request"):
+        key = _hmac(key, part)
+    return hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _amz_date(now: Optional[datetime]) -> str:
+    return (now or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+
+
+def sign_headers(method: str, url: str, access_key: str, secret_key: str, region: str,
+                 payload_hash: str = UNSIGNED_PAYLOAD, headers: Optional[Dict[str, str]] = None,
+                 service: str = "s3", now: Optional[datetime] = None) -> Dict[str, str]:
+    """使用请求头方式签名
+
+    Args:
+        method (str): HTTP 方法
+        url (str): 完整请求地址（路径需已编码）
+        access_key (str): 访问密钥 ID
+        secret_key (str): 访问密钥
+        region (str): 区域
+        payload_hash (str, optional): 请求体摘要，默认值为 UNSIGNED_PAYLOAD（流式上传时不预先计算摘要）
+        headers (Dict[str, str], optional): 需要一并签名的其他请求头，默认值为 None
+        service (str, optional): 服务名称，默认值为 "s3"
+        now (datetime, optional): 签名时间，默认值为 None（当前时间）
+
+    Returns:
+        Dict[str, str]: 需要附加到请求上的请求头（包含 Authorization）
+    """
+    parts = urlsplit(url)
+    amz_date = _amz_date(now)
+    signed = {k.lower(): v for k, v in (headers or {}).items()}
+    signed.update({"host": parts.netloc, "x-amz-date": amz_date,
+                   "x-amz-content-sha256": payload_hash})
+    names = sorted(signed)
+    request = canonical_request(method, parts.path, parse_qsl(parts.query, keep_blank_values=True),
+                                signed, names, payload_hash)
+    scope = f"{amz_date[:8]}/{region}/{service}/aws4_request"
+    result = {k: v for k, v in signed.items() if k != "host"}
+    result["authorization"] = (
+        f"{ALGORITHM} Credential={access_key}/{scope}, SignedHeaders={';'.join(names)}, "
+        f"Signature={signature(secret_key, amz_date, region, service, request)}")
+    return result
+
+
+def presign_url(method: str, url: str, access_key: str, secret_key: str, region: str,
+                expires: int = 3600, service: str = "s3", now: Optional[datetime] = None) -> str:
+    """生成预签名 URL（无需请求头，可直接在浏览器中访问）
+
+    Args:
+        method (str): HTTP 方法
+        url (str): 完整请求地址（路径需已编码）
+        access_key (str): 访问密钥 ID
+        secret_key (str): 访问密钥
+        region (str): 区域
+        expires (int, optional): 有效期（秒），默认值为 3600
+        service (str, optional): 服务名称，默认值为 "s3"
+        now (datetime, optional): 签名时间，默认值为 None（当前时间）
+
+    Returns:
+        str: 预签名 URL
+    """
+    parts = urlsplit(url)
+    amz_date = _amz_date(now)
+    scope = f"{amz_date[:8]}/{region}/{service}/aws4_request"
+    query = parse_qsl(parts.query, keep_blank_values=True) + [
+        ("X-Amz-Algorithm", ALGORITHM),
+        ("X-Amz-Credential", f"{access_key}/{scope}"),
+        ("X-Amz-Date", amz_date),
+        ("X-Amz-Expires", str(expires)),
+        ("X-Amz-SignedHeaders", "host"),
+    ]
+    request = canonical_request(method, parts.path, query, {"host": parts.netloc}, ["host"],
+                                UNSIGNED_PAYLOAD)
+    query.append(("X-Amz-Signature", signature(secret_key, amz_date, region, service, request)))
+    return f"{parts.scheme}://{parts.netloc}{parts.path}?{canonical_query(query)}"
@@ -0,0 +1,5 @@
+from .fake_dashscope import (FakeDashScopeConfig, EndpointBehavior, LatencyProfile,
+                             FakeDashScopeServer, create_fake_dashscope_app)
+from .fake_otlp import FakeOTLPCollector, create_fake_otlp_app
+from .fake_s3 import FakeS3Server, create_fake_s3_app
+from .server import ThreadedServer
@@ -0,0 +1,443 @@
+"""
+本地 DashScope 模拟服务，用于离线压测和集成测试
+
+实现了 WanModelClient 和 QwenVLClient 使用到的全部接口：
+    - POST /api/v1/services/aigc/image-generation/generation  异步提交图像生成任务
+    - GET  /api/v1/tasks/{task_id}                             查询任务状态
+    - POST /api/v1/tasks/{task_id}/cancel                      取消未完成的任务
+    - GET  /__fake__/files/{filename}                          下载生成的图像
+    - POST /compatible-mode/v1/chat/completions                OpenAI 兼容对话接口（支持流式输出）
+    - GET  /compatible-mode/v1/models                          模型列表（用于测试连接）
+
+每个接口都可以单独配置延迟分布、故障注入概率和限流速率，同时提供以下管理接口：
+    - GET /__fake__/stats   查看各接口请求统计
+    - PUT /__fake__/config  运行时修改模拟服务配置
+
+启动方式：
+    python -m try_on_anything.testing.fake_dashscope --port 8010 --generation-time 3
+
+然后将客户端指向模拟服务：
+    export DASHSCOPE_BASE_URL=http://127.0.0.1:8010
+"""
+from typing import Optional, Dict, Any, Literal, Tuple
+from collections import Counter
+import argparse
+import asyncio
+import io
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request, Header
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from PIL import Image
+from pydantic import BaseModel
+
+from .server import ThreadedServer
+
+# 默认的 VL 模型回复，同时包含饰品和服装 Pipeline 需要解析的全部标签
+DEFAULT_CHAT_RESPONSE = ("<accessory_type>项链</accessory_type>\n"
+                         "<clothing_type>上衣</clothing_type>\n"
+                         "<person_position>脖子</person_position>\n"
+                         "<detail_bbox><x1>0.2</x1><y1>0.2</y1>"
+                         "<x2>0.6</x2><y2>0.6</y2></detail_bbox>")
+
+
+class LatencyProfile(BaseModel):
+    """延迟分布配置
+
+    - fixed: 固定延迟 value 秒
+    - uniform: 在 [low, high] 秒之间均匀分布
+    - lognormal: 中位数为 value 秒、形状参数为 sigma 的对数正态分布（模拟长尾延迟）
+    """
+    distribution: Literal["fixed", "uniform", "lognormal"] = "fixed"
+    value: float = 0.0
+    low: float = 0.0
+    high: float = 0.0
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        """按分布采样一个延迟（秒）"""
+        if self.distribution == "uniform":
+            return rng.uniform(self.low, self.high)
+        if self.distribution == "lognormal":
+            if self.value <= 0:
+                return 0.0
+            return rng.lognormvariate(0.0, self.sigma) * self.value
+        return self.value
+
+
+class EndpointBehavior(BaseModel):
+    """单个接口的模拟行为配置"""
+    latency: LatencyProfile = LatencyProfile()  # 接口响应延迟
+    failure_rate: float = 0.0  # 故障注入概率（0-1）
+    failure_status: int = 500  # 故障注入时返回的状态码
+    rate_limit: Optional[float] = None  # 限流速率（请求/秒），超出时返回 429，None 表示不限流
+
+
+class FakeDashScopeConfig(BaseModel):
+    """模拟服务配置"""
+    submit: EndpointBehavior = EndpointBehavior()  # 任务提交接口
+    query: EndpointBehavior = EndpointBehavior()  # 任务查询接口
+    download: EndpointBehavior = EndpointBehavior()  # 图像下载接口
+    chat: EndpointBehavior = EndpointBehavior()  # 对话接口
+    generation_time: LatencyProfile = LatencyProfile(value=2.0)  # 图像生成任务从提交到完成的耗时
+    generation_failure_rate: float = 0.0  # 图像生成任务最终失败（FAILED）的概率
+    chat_response: str = DEFAULT_CHAT_RESPONSE  # VL 模型回复内容
+    chat_reasoning: str = "分析图像中的物品类型和佩戴位置。"  # 开启思考模式时返回的思考内容
+    stream_chunk_size: int = 16  # 流式输出每个分片的字符数
+    seed: Optional[int] = None  # 随机数种子，便于复现
+
+
+class _RateLimiter:
+    """令牌桶限流器（非阻塞，令牌不足时直接拒绝）"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def try_acquire(self) -> Optional[float]:
+        """尝试获取令牌，成功返回 None，失败返回建议的重试等待时间（秒）"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return None
+        return (1 - self._tokens) / self.rate
+
+
+class FakeDashScope:
+    """模拟服务状态（任务表、限流器、请求统计）
+
+    Args:
+        config (FakeDashScopeConfig, optional): 模拟服务配置，默认值为 None（使用默认配置）
+    """
+
+    def __init__(self, config: Optional[FakeDashScopeConfig] = None):
+        self.config = config or FakeDashScopeConfig()
+        self.rng = random.Random(self.config.seed)
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.stats: Counter = Counter()
+        self._rate_limiters: Dict[str, _RateLimiter] = {}
+        self._image_cache: Dict[Tuple[int, int], bytes] = {}
+
+    def reconfigure(self, config: FakeDashScopeConfig) -> None:
+        """运行时替换配置，限流器按新配置重建"""
+        self.config = config
+        self._rate_limiters.clear()
+
+    async def apply_behavior(self, endpoint: str) -> Optional[Response]:
+        """按接口配置执行限流、延迟和故障注入
+
+        Args:
+            endpoint (str): 接口名称（submit/query/download/chat）
+
+        Returns:
+            Optional[Response]: 需要直接返回的错误响应，正常处理时返回 None
+        """
+        behavior: EndpointBehavior = getattr(self.config, endpoint)
+        self.stats[f"{endpoint}.requests"] += 1
+
+        if behavior.rate_limit:
+            limiter = self._rate_limiters.setdefault(
+                endpoint, _RateLimiter(behavior.rate_limit))
+            retry_after = limiter.try_acquire()
+            if retry_after is not None:
+                self.stats[f"{endpoint}.rate_limited"] += 1
+                return JSONResponse(
+                    status_code=429,
+                    headers={"Retry-After": f"{retry_after:.3f}"},
+                    content={"code": "Throttling.RateQuota",
+                             "message": "Requests rate limit exceeded"})
+
+        delay = behavior.latency.sample(self.rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if behavior.failure_rate and self.rng.random() < behavior.failure_rate:
+            self.stats[f"{endpoint}.failures"] += 1
+            return JSONResponse(status_code=behavior.failure_status,
+                                content={"code": "InternalError",
+                                         "message": "Injected failure"})
+        return None
+
+    def render_image(self, width: int, height: int) -> bytes:
+        """生成指定尺寸的 PNG 图像（按尺寸缓存）"""
+        key = (width, height)
+        if key not in self._image_cache:
+            buffer = io.BytesIO()
+            Image.new("RGB", (width, height), (200, 180, 160)).save(buffer, format="PNG")
+            self._image_cache[key] = buffer.getvalue()
+        return self._image_cache[key]
+
+
+def _unauthorized() -> JSONResponse:
+    return JSONResponse(status_code=401,
+                        content={"code": "InvalidApiKey",
+                                 "message": "Invalid API-key provided."})
+
+
+def create_fake_dashscope_app(
+        config: Optional[FakeDashScopeConfig] = None) -> FastAPI:
+    """创建模拟 DashScope 服务的 FastAPI 应用
+
+    Args:
+        config (FakeDashScopeConfig, optional): 模拟服务配置，默认值为 None（使用默认配置）
+
+    Returns:
+        FastAPI: 模拟服务应用，模拟服务状态保存在 app.state.fake 中
+    """
+    app = FastAPI(title="Fake DashScope")
+    fake = FakeDashScope(config)
+    app.state.fake = fake
+
+    @app.post("/api/v1/services/aigc/image-generation/generation")
+    async def submit_generation(
+            request: Request,
+            authorization: Optional[str] = Header(None),
+            x_dashscope_async: Optional[str] = Header(None)):
+        if not authorization or not authorization.startswith("Bearer "):
+            return _unauthorized()
+        if x_dashscope_async != "enable":
+            return JSONResponse(status_code=400,
+                                content={"code": "InvalidParameter",
+                                         "message": "current user api does not support synchronous calls"})
+        error = await fake.apply_behavior("submit")
+        if error:
+            return error
+
+        payload = await request.json()
+        size = payload.get("parameters", {}).get("size", "1280*1280")
+        width, height = (int(v) for v in size.split("*"))
+        task_id = str(uuid.uuid4())
+        now = time.time()
+        fake.tasks[task_id] = {
+            "submitted_at": now,
+            "ready_at": now + fake.config.generation_time.sample(fake.rng),
+            "will_fail": fake.rng.random() < fake.config.generation_failure_rate,
+            "size": (width, height),
+            "n": payload.get("parameters", {}).get("n", 1),
+        }
+        fake.stats["tasks.submitted"] += 1
+        return {
+            "output": {"task_status": "PENDING", "task_id": task_id},
+            "request_id": str(uuid.uuid4())
+        }
+
+    @app.get("/api/v1/tasks/{task_id}")
+    async def query_task(task_id: str,
+                         request: Request,
+                         authorization: Optional[str] = Header(None)):
+        if not authorization or not authorization.startswith("Bearer "):
+            return _unauthorized()
+        error = await fake.apply_behavior("query")
+        if error:
+            return error
+
+        task = fake.tasks.get(task_id)
+        if task is None:
+            return {"output": {"task_id": task_id, "task_status": "UNKNOWN"},
+                    "request_id": str(uuid.uuid4())}
+
+        now = time.time()
+        output: Dict[str, Any] = {"task_id": task_id}
+        if task.get("canceled"):
+            output["task_status"] = "CANCELED"
+        elif now < task["ready_at"]:
+            elapsed = now - task["submitted_at"]
+            output["task_status"] = "PENDING" if elapsed < 0.1 else "RUNNING"
+        elif task["will_fail"]:
+            output.update(task_status="FAILED",
+                          code="InternalError.Algo",
+                          message="Injected generation failure")
+        else:
+            width, height = task["size"]
+            base_url = str(request.base_url).rstrip("/")
+            output.update(task_status="SUCCEEDED",
+                          finished=True,
+                          choices=[{
+                              "finish_reason": "stop",
+                              "message": {
+                                  "role": "assistant",
+                                  "content": [{
+                                      "type": "image",
+                                      "image": f"{base_url}/__fake__/files/{task_id}_{i}.png"
+                                               f"?w={width}&h={height}&Expires={int(now) + 86400}"
+                                  }]
+                              }
+                          } for i in range(task["n"])])
+            if not task.get("completed"):
+                task["completed"] = True
+                fake.stats["tasks.succeeded"] += 1
+        return {"output": output, "request_id": str(uuid.uuid4())}
+
+    @app.post("/api/v1/tasks/{task_id}/cancel")
+    async def cancel_task(task_id: str, authorization: Optional[str] = Header(None)):
+        if not authorization or not authorization.startswith("Bearer "):
+            return _unauthorized()
+        task = fake.tasks.get(task_id)
+        if task is None or task.get("canceled") or time.time() >= task["ready_at"]:
+            return JSONResponse(status_code=400,
+                                content={"code": "UnsupportedOperation",
+                                         "message": "Only unfinished tasks can be canceled"})
+        task["canceled"] = True
+        fake.stats["tasks.canceled"] += 1
+        return {"request_id": str(uuid.uuid4())}
+
+    @app.get("/__fake__/files/{filename}")
+    async def download_file(filename: str, w: int = 1280, h: int = 1280):
+        error = await fake.apply_behavior("download")
+        if error:
+            return error
+        return Response(content=fake.render_image(w, h), media_type="image/png")
+
+    @app.post("/compatible-mode/v1/chat/completions")
+    async def chat_completions(request: Request,
+                               authorization: Optional[str] = Header(None)):
+        if not authorization or not authorization.startswith("Bearer "):
+            return _unauthorized()
+        error = await fake.apply_behavior("chat")
+        if error:
+            return error
+
+        payload = await request.json()
+        model = payload.get("model", "qwen3-vl-plus")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        reasoning = fake.config.chat_reasoning if payload.get("enable_thinking") else None
+        content = fake.config.chat_response
+
+        if not payload.get("stream"):
+            message = {"role": "assistant", "content": content}
+            if reasoning:
+                message["reasoning_content"] = reasoning
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": len(content),
+                          "total_tokens": len(content) + 1},
+            }
+
+        chunk_size = max(1, fake.config.stream_chunk_size)
+
+        def _chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        async def _stream():
+            yield _chunk({"role": "assistant", "content": ""})
+            for field, text in (("reasoning_content", reasoning), ("content", content)):
+                if not text:
+                    continue
+                for i in range(0, len(text), chunk_size):
+                    yield _chunk({field: text[i:i + chunk_size]})
+                    await asyncio.sleep(0)
+            yield _chunk({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(_stream(), media_type="text/event-stream")
+
+    @app.get("/compatible-mode/v1/models")
+    async def list_models(authorization: Optional[str] = Header(None)):
+        if not authorization or not authorization.startswith("Bearer "):
+            return _unauthorized()
+        return {"object": "list",
+                "data": [{"id": "qwen3-vl-plus", "object": "model"},
+                         {"id": "wan2.6-image", "object": "model"}]}
+
+    @app.get("/__fake__/stats")
+    async def get_stats():
+        return dict(fake.stats)
+
+    @app.put("/__fake__/config")
+    async def update_config(new_config: FakeDashScopeConfig):
+        fake.reconfigure(new_config)
+        return new_config
+
+    return app
+
+
+class FakeDashScopeServer(ThreadedServer):
+    """在后台线程中运行模拟服务，便于测试和压测脚本在进程内使用
+
+    使用示例：
+        with FakeDashScopeServer() as server:
+            client = WanModelClient(api_key="test", base_url=server.base_url)
+
+    Args:
+        config (FakeDashScopeConfig, optional): 模拟服务配置，默认值为 None（使用默认配置）
+        host (str, optional): 监听地址，默认值为 "127.0.0.1"
+        port (int, optional): 监听端口，默认值为 0（自动分配空闲端口），
+            base_url 可直接作为 DASHSCOPE_BASE_URL 使用
+    """
+
+    def __init__(self,
+                 config: Optional[FakeDashScopeConfig] = None,
+                 host: str = "127.0.0.1",
+                 port: int = 0):
+        super().__init__(create_fake_dashscope_app(config), host=host, port=port)
+
+    @property
+    def fake(self) -> FakeDashScope:
+        """模拟服务状态"""
+        return self.app.state.fake
+
+
+def _endpoint_behavior(latency: float, failure_rate: float,
+                       rate_limit: Optional[float]) -> EndpointBehavior:
+    return EndpointBehavior(
+        latency=LatencyProfile(distribution="lognormal", value=latency)
+        if latency > 0 else LatencyProfile(),
+        failure_rate=failure_rate,
+        rate_limit=rate_limit)
+
+
+def main():
+    """命令行启动模拟服务"""
+    parser = argparse.ArgumentParser(description="本地 DashScope 模拟服务")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="监听地址 (默认: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8010, help="监听端口 (默认: 8010)")
+    parser.add_argument("--generation-time", type=float, default=2.0,
+                        help="图像生成任务耗时中位数（秒，对数正态分布）(默认: 2.0)")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="各接口响应延迟中位数（秒，对数正态分布）(默认: 0.05)")
+    parser.add_argument("--chat-latency", type=float, default=1.0,
+                        help="对话接口响应延迟中位数（秒，对数正态分布）(默认: 1.0)")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="各接口故障注入概率 (默认: 0)")
+    parser.add_argument("--generation-failure-rate", type=float, default=0.0,
+                        help="图像生成任务失败概率 (默认: 0)")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="各接口限流速率（请求/秒）(默认: 不限流)")
+    parser.add_argument("--seed", type=int, default=None, help="随机数种子")
+    args = parser.parse_args()
+
+    behavior = _endpoint_behavior(args.latency, args.failure_rate, args.rate_limit)
+    config = FakeDashScopeConfig(
+        submit=behavior,
+        query=behavior,
+        download=behavior,
+        chat=_endpoint_behavior(args.chat_latency, args.failure_rate, args.rate_limit),
+        generation_time=LatencyProfile(distribution="lognormal", value=args.generation_time),
+        generation_failure_rate=args.generation_failure_rate,
+        seed=args.seed)
+    uvicorn.run(create_fake_dashscope_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+本地 OTLP 收集器模拟服务，接收 OTLPHttpSpanExporter 发送的 OTLP/JSON 追踪数据
+
+接口：
+    - POST /v1/traces        接收追踪数据
+    - GET  /__fake__/spans   查看已接收的 span（展开为扁平列表，可按 trace_id 过滤）
+    - DELETE /__fake__/spans 清空已接收的数据
+
+启动方式：
+    python -m try_on_anything.testing.fake_otlp --port 4318
+
+然后将后端追踪指向模拟收集器：
+    export TRACING_EXPORTER=otlp
+    export TRACING_OTLP_ENDPOINT=http://127.0.0.1:4318/v1/traces
+"""
+from typing import Optional, Dict, Any, List
+import argparse
+import threading
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+from .server import ThreadedServer
+
+
+def _attribute_value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    return None
+
+
+def flatten_otlp(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """将 OTLP/JSON 请求体展开为 span 字典列表（属性转换为普通字典）"""
+    spans = []
+    for resource_spans in payload.get("resourceSpans", []):
+        resource = {item["key"]: _attribute_value(item["value"])
+                    for item in resource_spans.get("resource", {}).get("attributes", [])}
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                spans.append({
+                    "trace_id": span.get("traceId"),
+                    "span_id": span.get("spanId"),
+                    "parent_id": span.get("parentSpanId"),
+                    "name": span.get("name"),
+                    "start_time_unix_nano": int(span.get("startTimeUnixNano", 0)),
+                    "end_time_unix_nano": int(span.get("endTimeUnixNano", 0)),
+                    "status_code": span.get("status", {}).get("code", 0),
+                    "attributes": {item["key"]: _attribute_value(item["value"])
+                                   for item in span.get("attributes", [])},
+                    "resource": resource,
+                })
+    return spans
+
+
+def create_fake_otlp_app() -> FastAPI:
+    """创建模拟 OTLP 收集器应用，已接收的 span 保存在 app.state.spans 中"""
+    app = FastAPI(title="Fake OTLP Collector")
+    app.state.spans = []
+    lock = threading.Lock()
+
+    @app.post("/v1/traces")
+    async def receive_traces(request: Request):
+        spans = flatten_otlp(await request.json())
+        with lock:
+            app.state.spans.extend(spans)
+        return {"partialSuccess": {}}
+
+    @app.get("/__fake__/spans")
+    async def list_spans(trace_id: Optional[str] = None):
+        with lock:
+            spans = list(app.state.spans)
+        if trace_id:
+            spans = [span for span in spans if span["trace_id"] == trace_id]
+        return spans
+
+    @app.delete("/__fake__/spans")
+    async def clear_spans():
+        with lock:
+            app.state.spans.clear()
+        return {"cleared": True}
+
+    return app
+
+
+class FakeOTLPCollector(ThreadedServer):
+    """在后台线程中运行模拟 OTLP 收集器
+
+    Args:
+        host (str, optional): 监听地址，默认值为 "127.0.0.1"
+        port (int, optional): 监听端口，默认值为 0（自动分配空闲端口）
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__(create_fake_otlp_app(), host=host, port=port)
+
+    @property
+    def endpoint(self) -> str:
+        """追踪数据接收地址，可直接作为 TRACING_OTLP_ENDPOINT 使用"""
+        return f"{self.base_url}/v1/traces"
+
+    @property
+    def spans(self) -> List[Dict[str, Any]]:
+        """已接收的 span 列表"""
+        return list(self.app.state.spans)
+
+
+def main():
+    """命令行启动模拟 OTLP 收集器"""
+    parser = argparse.ArgumentParser(description="本地 OTLP 收集器模拟服务")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="监听地址 (默认: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=4318, help="监听端口 (默认: 4318)")
+    args = parser.parse_args()
+    uvicorn.run(create_fake_otlp_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+本地 S3 兼容对象存储模拟服务（类似 MinIO 的最小实现），用于测试 S3Storage
+
+支持路径风格的 PutObject、GetObject、HeadObject、DeleteObject、DeleteObjects 和 ListObjectsV2，
+对象保存在内存中。所有请求都会校验 SigV4 签名（请求头签名或预签名 URL），
+签名错误或预签名 URL 过期时返回 403。
+
+接口：
+    - PUT/GET/HEAD/DELETE /{bucket}/{key}
+    - GET /{bucket}?list-type=2&prefix=...
+    - POST /{bucket}?delete    批量删除（需要 Content-MD5 请求头）
+    - GET /__fake__/stats    查看对象数量和各类请求次数
+
+启动方式：
+    python -m try_on_anything.testing.fake_s3 --port 9000 --access-key test --secret-key testsecret
+
+然后将后端存储指向模拟服务：
+    export STORAGE_BACKEND=s3
+    export S3_ENDPOINT_URL=http://127.0.0.1:9000
+    export S3_BUCKET=try-on S3_ACCESS_KEY_ID=test S3_SECRET_ACCESS_KEY=testsecret
+"""
+from typing import Optional, Dict, Tuple
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl
+from xml.sax.saxutils import escape
+import argparse
+import base64
+import hashlib
+import hmac
+import re
+import threading
+import xml.etree.ElementTree as ET
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from ..storage.sigv4 import canonical_request, signature
+from .server import ThreadedServer
+
+_AUTH_RE = re.compile(
+    r"AWS4-HMAC-SHA256 Credential=(?P<access_key>[^/]+)/(?P<date>\d{8})/(?P<region>[^/]+)/"
+    r"(?P<service>[^/]+)/aws4_request, ?SignedHeaders=(?P<signed>[^,]+), ?Signature=(?P<sig>[0-9a-f]+)")
+
+
+def _error(status_code: int, code: str, message: str) -> Response:
+    body = (f'<?xml version="1.0" encoding="UTF-8"?>\n<Error><Code>{code}</Code>'
+            f"<Message>{escape(message)}</Message></Error>")
+    return Response(body, status_code=status_code, media_type="application/xml")
+
+
+def _verify(request: Request, access_key: str, secret_key: str) -> Optional[str]:
+    """校验 SigV4 签名，通过时返回 None，否则返回错误原因"""
+    raw_path = request.scope.get("raw_path", request.url.path.encode()).decode()
+    query = parse_qsl(request.url.query, keep_blank_values=True)
+    headers = {k.lower(): v for k, v in request.headers.items()}
+
+    if "authorization" in headers:
+        match = _AUTH_RE.match(headers["authorization"])
+        if not match:
+            return "无法解析 Authorization 请求头"
+        fields = match.groupdict()
+        amz_date = headers.get("x-amz-date", "")
+        payload_hash = headers.get("x-amz-content-sha256", "")
+        signed_headers = fields["signed"].split(";")
+        expected_sig = fields["sig"]
+    else:
+        params = dict(query)
+        if "X-Amz-Signature" not in params:
+            return "缺少签名"
+        access, date, region, service, _ = params["X-Amz-Credential"].split("/")
+        fields = {"access_key": access, "date": date, "region": region, "service": service}
+        amz_date = params["X-Amz-Date"]
+        expires_at = (datetime.strptime(amz_date, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+                      + timedelta(seconds=int(params["X-Amz-Expires"])))
+        if datetime.now(timezone.utc) > expires_at:
+            return "预签名 URL 已过期"
+        payload_hash = "UNSIGNED-PAYLOAD"
+        signed_headers = params["X-Amz-SignedHeaders"].split(";")
+        query = [(k, v) for k, v in query if k != "X-Amz-Signature"]
+        expected_sig = params["X-Amz-Signature"]
+
+    if fields["access_key"] != access_key:
+        return "访问密钥 ID 不存在"
+    if any(name not in headers for name in signed_headers):
+        return "签名的请求头缺失"
+    canonical = canonical_request(request.method, raw_path, query, headers,
+                                  signed_headers, payload_hash)
+    actual = signature(secret_key, amz_date, fields["region"], fields["service"], canonical)
+    if not hmac.compare_digest(actual, expected_sig):
+        return "签名不匹配"
+    return None
+
+
+def create_fake_s3_app(access_key: str = "test", secret_key: str = "testsecret") -> FastAPI:
+    """创建模拟 S3 应用，对象保存在 app.state.objects 中（键为 (bucket, key)）
+
+    Args:
+        access_key (str, optional): 访问密钥 ID，默认值为 "test"
+        secret_key (str, optional): 访问密钥，默认值为 "testsecret"
+    """
+    app = FastAPI(title="Fake S3")
+    app.state.objects: Dict[Tuple[str, str], Tuple[bytes, str]] = {}
+    app.state.stats = Counter()
+    lock = threading.Lock()
+
+    @app.middleware("http")
+    async def check_signature(request: Request, call_next):
+        if request.url.path.startswith("/__fake__/"):
+            return await call_next(request)
+        reason = _verify(request, access_key, secret_key)
+        if reason:
+            return _error(403, "SignatureDoesNotMatch", reason)
+        return await call_next(request)
+
+    @app.get("/__fake__/stats")
+    async def stats():
+        with lock:
+            return {"objects": len(app.state.objects), "requests": dict(app.state.stats)}
+
+    @app.put("/{bucket}/{key:path}")
+    async def put_object(bucket: str, key: str, request: Request):
+        data = b"".join([chunk async for chunk in request.stream()])
+        content_type = request.headers.get("content-type", "application/octet-stream")
+        with lock:
+            app.state.objects[(bucket, key)] = (data, content_type)
+            app.state.stats["put"] += 1
+        return Response(headers={"ETag": f'"{hashlib.md5(data).hexdigest()}"'})
+
+    @app.api_route("/{bucket}/{key:path}", methods=["GET", "HEAD"])
+    async def get_object(bucket: str, key: str, request: Request):
+        with lock:
+            app.state.stats[request.method.lower()] += 1
+            obj = app.state.objects.get((bucket, key))
+        if obj is None:
+            return _error(404, "NoSuchKey", key)
+        data, content_type = obj
+        headers = {"ETag": f'"{hashlib.md5(data).hexdigest()}"', "Content-Length": str(len(data))}
+        if request.method == "HEAD":
+            return Response(headers=headers, media_type=content_type)
+        return Response(data, headers=headers, media_type=content_type)
+
+    @app.delete("/{bucket}/{key:path}")
+    async def delete_object(bucket: str, key: str):
+        with lock:
+            app.state.stats["delete"] += 1
+            app.state.objects.pop((bucket, key), None)
+        return Response(status_code=204)
+
+    @app.post("/{bucket}")
+    async def delete_objects(bucket: str, request: Request):
+        if "delete" not in request.query_params:
+            return _error(400, "InvalidRequest", "只支持 POST /{bucket}?delete")
+        body = await request.body()
+        if request.headers.get("content-md5") != base64.b64encode(hashlib.md5(body).digest()).decode():
+            return _error(400, "InvalidDigest", "Content-MD5 缺失或不匹配")
+        try:
+            root = ET.fromstring(body)
+        except ET.ParseError:
+            return _error(400, "MalformedXML", "请求体不是合法的 XML")
+        keys = [el.text or "" for el in root.iter("Key")]
+        quiet = root.findtext("Quiet") == "true"
+        with lock:
+            app.state.stats["delete_objects"] += 1
+            for key in keys:
+                app.state.objects.pop((bucket, key), None)
+        deleted = "" if quiet else "".join(
+            f"<Deleted><Key>{escape(k)}</Key></Deleted>" for k in keys)
+        body = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<DeleteResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">{deleted}</DeleteResult>')
+        return Response(body, media_type="application/xml")
+
+    @app.get("/{bucket}")
+    async def list_objects(bucket: str, request: Request):
+        params = request.query_params
+        prefix = params.get("prefix", "")
+        max_keys = int(params.get("max-keys", 1000))
+        start_after = params.get("continuation-token", "")
+        with lock:
+            app.state.stats["list"] += 1
+            keys = sorted(k for b, k in app.state.objects if b == bucket and k.startswith(prefix)
+                          and k > start_after)
+        page, truncated = keys[:max_keys], len(keys) > max_keys
+        contents = "".join(f"<Contents><Key>{escape(k)}</Key></Contents>" for k in page)
+        token = f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>" if truncated else ""
+        body = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"
+                f"<KeyCount>{len(page)}</KeyCount><IsTruncated>{str(truncated).lower()}</IsTruncated>"
+                f"{token}{contents}</ListBucketResult>")
+        return Response(body, media_type="application/xml")
+
+    return app
+
+
+class FakeS3Server(ThreadedServer):
+    """在后台线程中运行模拟 S3 服务
+
+    Args:
+        access_key (str, optional): 访问密钥 ID，默认值为 "test"
+        secret_key (str, optional): 访问密钥，默认值为 "testsecret"
+        host (str, optional): 监听地址，默认值为 "127.0.0.1"
+        port (int, optional): 监听端口，默认值为 0（自动分配空闲端口）
+    """
+
+    def __init__(self, access_key: str = "test", secret_key: str = "testsecret",
+                 host: str = "127.0.0.1", port: int = 0):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        super().__init__(create_fake_s3_app(access_key, secret_key), host=host, port=port)
+
+    @property
+    def objects(self) -> Dict[Tuple[str, str], Tuple[bytes, str]]:
+        """已保存的对象（键为 (bucket, key)，值为 (内容, Content-Type)）"""
+        return dict(self.app.state.objects)
+
+
+def main():
+    """命令行启动模拟 S3 服务"""
+    parser = argparse.ArgumentParser(description="本地 S3 兼容对象存储模拟服务")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="监听地址 (默认: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=9000, help="监听端口 (默认: 9000)")
+    parser.add_argument("--access-key", type=str, default="test", help="访问密钥 ID (默认: test)")
+    parser.add_argument("--secret-key", type=str, default="testsecret", help="访问密钥 (默认: testsecret)")
+    args = parser.parse_args()
+    uvicorn.run(create_fake_s3_app(args.access_key, args.secret_key), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
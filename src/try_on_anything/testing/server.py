@@ -0,0 +1,58 @@
+"""
+在后台线程中运行 ASGI 应用，供模拟服务在测试和压测脚本中进程内使用
+"""
+from typing import Optional
+import threading
+import time
+
+import uvicorn
+
+
+class ThreadedServer:
+    """在后台线程中运行 uvicorn 服务
+
+    Args:
+        app: ASGI 应用
+        host (str, optional): 监听地址，默认值为 "127.0.0.1"
+        port (int, optional): 监听端口，默认值为 0（自动分配空闲端口）
+    """
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        self.app = app
+        self.host = host
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """服务地址"""
+        port = self._server.servers[0].sockets[0].getsockname()[1]
+        return f"http://{self.host}:{port}"
+
+    def start(self):
+        """启动服务并等待就绪
+
+        Raises:
+            RuntimeError: 当服务在 10 秒内未能启动时
+        """
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"{type(self).__name__} 启动失败")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        """停止服务"""
+        self._server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
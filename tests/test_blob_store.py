@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+测试上传文件内容寻址存储与跨任务去重
+
+测试思路：
+1. 同一内容保存到两个任务文件夹，只写入一份 blob，任务文件为指向它的硬链接
+2. 删除任务时只有最后一个引用被删除后才回收 blob
+3. 按用途查找已有图片，不依赖修改时间
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from backend.app.api.utils import find_existing_images
+from backend.app.schemas import TaskType
+from backend.app.services import blob_store as blob_store_module
+from backend.app.services.blob_store import BlobStore, BLOB_WRITES
+from backend.app.services.task_manager import TaskManager, config
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    first_dir, second_dir = tmp_path / "t1", tmp_path / "t2"
+    first_dir.mkdir()
+    second_dir.mkdir()
+    hits = BLOB_WRITES.get(result="hit")
+
+    async def run():
+        first = await store.save(b"garment", ".JPG", first_dir, "clothing")
+        second = await store.save(b"garment", ".jpg", second_dir, "clothing")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first.name == second.name and first.name.startswith("clothing-")
+    assert os.path.samefile(first, second)
+    assert first.stat().st_nlink == 3
+    assert len(list((tmp_path / "blobs").glob("*/*"))) == 1
+    assert BLOB_WRITES.get(result="hit") == hits + 1
+
+
+def test_blob_released_after_last_task_deleted(tmp_path, monkeypatch):
+    store = BlobStore(tmp_path / "blobs")
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path / "tasks")
+    monkeypatch.setattr(blob_store_module, "blob_store", store)
+    monkeypatch.setattr(sys.modules["backend.app.services.task_manager"], "blob_store", store)
+    manager = TaskManager()
+
+    async def run():
+        first, _ = await manager.create_task(TaskType.CLOTHING)
+        second, _ = await manager.create_task(TaskType.CLOTHING)
+        path = await store.save(b"person", ".png", first.task_dir, "person")
+        await store.save(b"person", ".png", second.task_dir, "person")
+        blob = store.blob_path(path.name.split("-")[1].split(".")[0], ".png")
+
+        await manager.delete_task(first.task_id)
+        assert blob.exists() and blob.stat().st_nlink == 2
+        await manager.delete_task(second.task_id)
+        assert not blob.exists()
+
+    asyncio.run(run())
+
+
+def test_find_existing_images_by_key(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+
+    async def run():
+        # 人物图片的 blob 先写入（修改时间更早），仍应按用途返回
+        await store.save(b"person", ".jpg", tmp_path, "other")
+        person = await store.save(b"person", ".jpg", tmp_path, "person")
+        clothing = await store.save(b"clothing", ".jpg", tmp_path, "clothing")
+        return clothing, person
+
+    clothing, person = asyncio.run(run())
+
+    assert find_existing_images(tmp_path, keys=["clothing", "person"]) == [clothing, person]
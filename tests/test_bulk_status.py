@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+测试批量任务状态查询
+
+测试思路：
+1. 一次请求返回多个任务的状态（按请求顺序、去重），不存在的任务ID列在 missing 中
+2. 按任务类型和状态筛选，超过数量上限时返回400
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from backend.app.api import tasks as tasks_api
+from backend.app.schemas import TaskStatus, TaskType
+from backend.app.services.task_manager import task_manager, config
+
+
+def _create_tasks():
+    async def run():
+        clothing, _ = await task_manager.create_task(TaskType.CLOTHING)
+        accessory, _ = await task_manager.create_task(TaskType.ACCESSORY)
+        done, _ = await task_manager.create_task(TaskType.CLOTHING)
+        done.set_result({"downloaded_images": []})
+        return [clothing, accessory, done]
+    return asyncio.run(run())
+
+
+def _delete_tasks(tasks):
+    async def run():
+        for task_info in tasks:
+            await task_manager.delete_task(task_info.task_id)
+    asyncio.run(run())
+
+
+def test_bulk_status_returns_all_in_request_order(tmp_path, monkeypatch):
+    from backend.app.main import app
+
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    tasks = _create_tasks()
+    try:
+        ids = [t.task_id for t in reversed(tasks)]
+        response = TestClient(app).post("/api/task-status/batch",
+                                        json={"task_ids": ids + ["missing", ids[0]]})
+        assert response.status_code == 200
+        data = response.json()
+        assert [t["task_id"] for t in data["tasks"]] == ids
+        assert [t["status"] for t in data["tasks"]] == ["completed", "pending", "pending"]
+        assert data["tasks"][0]["version"] == tasks[2].version
+        assert data["missing"] == ["missing"]
+    finally:
+        _delete_tasks(tasks)
+
+
+def test_bulk_status_filters_and_limit(tmp_path, monkeypatch):
+    from backend.app.main import app
+
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    tasks = _create_tasks()
+    client = TestClient(app)
+    ids = [t.task_id for t in tasks]
+    try:
+        by_type = client.post("/api/task-status/batch",
+                              json={"task_ids": ids, "task_type": "clothing"}).json()
+        assert [t["task_id"] for t in by_type["tasks"]] == [ids[0], ids[2]]
+
+        by_status = client.post("/api/task-status/batch", json={
+            "task_ids": ids, "task_type": "clothing", "status": [TaskStatus.PENDING.value]}).json()
+        assert [t["task_id"] for t in by_status["tasks"]] == [ids[0]]
+        assert by_status["missing"] == []
+
+        monkeypatch.setattr(tasks_api.config, "BULK_STATUS_MAX_IDS", 2)
+        assert client.post("/api/task-status/batch", json={"task_ids": ids}).status_code == 400
+        assert client.post("/api/task-status/batch", json={"task_ids": []}).status_code == 422
+    finally:
+        _delete_tasks(tasks)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+测试模型客户端池
+
+测试思路：
+1. 相同（客户端类型, API Key）复用同一个客户端，超过上限时按 LRU 淘汰并关闭空闲客户端，正在使用的客户端不会被淘汰
+2. 服务层多个任务使用同一个 API Key 时共享客户端，任务结束后归还
+3. WanModelClient 在多次请求之间复用同一个 HTTP 客户端，关闭后释放连接，事件循环结束时关闭该循环中创建的客户端
+4. 生成器下载结果图像时复用 WanModelClient 的 HTTP 客户端，不为每次下载新建连接池
+"""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.clients import WanModelClient
+from try_on_anything.generators import ClothingTryOnImageGenerator
+from try_on_anything.testing import FakeDashScopeServer
+from backend.app.services.client_pool import ClientPool, client_pool
+from backend.app.services.clothing_try_on import ClothingTryOnService
+
+
+class FakeClient:
+    closed = []
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+
+    async def aclose(self):
+        FakeClient.closed.append(self.api_key)
+
+
+def test_pool_reuses_and_evicts_idle_clients():
+    FakeClient.closed.clear()
+
+    async def run():
+        pool = ClientPool(max_size=2)
+        a = pool.acquire(FakeClient, "a")
+        assert pool.acquire(FakeClient, "a") is a
+        b = pool.acquire(FakeClient, "b")
+        assert b is not a
+        pool.release(a)
+        pool.release(a)
+
+        # "a" 使用中时不会被淘汰；"b" 是最近最少使用的空闲客户端
+        a = pool.acquire(FakeClient, "a")
+        pool.release(b)
+        c = pool.acquire(FakeClient, "c")
+        await asyncio.sleep(0)
+        assert FakeClient.closed == ["b"]
+        assert set(pool.clients()) == {a, c}
+
+        # 全部在使用中时暂时超出上限，归还后再淘汰
+        d = pool.acquire(FakeClient, "d")
+        assert len(pool) == 3
+        pool.release(a)
+        await asyncio.sleep(0)
+        assert FakeClient.closed == ["b", "a"]
+        assert set(pool.clients()) == {c, d}
+
+        # 不是从池中获取的客户端归还时忽略
+        pool.release(FakeClient("x"))
+        pool.release(None)
+
+    asyncio.run(run())
+
+
+def test_service_tasks_share_clients(tmp_path, monkeypatch):
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "sk-default")
+    service = ClothingTryOnService()
+    api_key = f"sk-{uuid.uuid4().hex}"
+
+    async def run():
+        first = service._get_pipeline(use_vl_model=True, download_root_path=str(tmp_path / "1"),
+                                      vl_model_api_key=api_key, img_gen_model_api_key=api_key)
+        second = service._get_pipeline(use_vl_model=True, download_root_path=str(tmp_path / "2"),
+                                       vl_model_api_key=api_key, img_gen_model_api_key=api_key)
+        assert first.img_generator is not second.img_generator
+        assert first.img_generator.wan_client is second.img_generator.wan_client
+        assert first.vl_client is second.vl_client
+        other = service._get_pipeline(use_vl_model=False, download_root_path=str(tmp_path / "3"))
+        assert other.img_generator.wan_client is not first.img_generator.wan_client
+        for pipeline in (first, second, other):
+            service._release_pipeline(pipeline)
+
+    asyncio.run(run())
+
+
+def test_wan_client_reuses_http_client():
+    with FakeDashScopeServer() as server:
+        wan_client = WanModelClient(api_key=f"sk-{uuid.uuid4().hex}", base_url=server.base_url)
+
+        async def run():
+            submitted = await wan_client.send_request(text="prompt")
+            http_client = wan_client._http_client
+            await wan_client.get_task_result(submitted["output"]["task_id"])
+            assert wan_client._http_client is http_client
+            await wan_client.aclose()
+            assert http_client.is_closed and wan_client._http_client is None
+
+        asyncio.run(run())
+
+        async def query():
+            await wan_client.get_task_result("missing-task")
+            return wan_client._http_client
+
+        # 新的事件循环中重新创建 HTTP 客户端，事件循环结束时关闭
+        first = asyncio.run(query())
+        assert first.is_closed and wan_client._http_client is first
+        second = asyncio.run(query())
+        assert second is not first and second.is_closed
+
+
+def test_generator_download_reuses_wan_http_client(tmp_path, monkeypatch):
+    created = []
+    original_init = httpx.AsyncClient.__init__
+
+    def recording_init(self, *args, **kwargs):
+        created.append(self)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(httpx.AsyncClient, "__init__", recording_init)
+    with FakeDashScopeServer() as server:
+        wan_client = WanModelClient(api_key=f"sk-{uuid.uuid4().hex}", base_url=server.base_url)
+        generator = ClothingTryOnImageGenerator(wan_client=wan_client,
+                                                download_root_path=str(tmp_path))
+
+        async def run():
+            await generator.call_generate_model(text="prompt", size="512*512", poll_interval=0.05)
+            assert len(list(tmp_path.glob("*.png"))) == 1
+            assert created == [wan_client._http_client]
+            await wan_client.aclose()
+
+        asyncio.run(run())
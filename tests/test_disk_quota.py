@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+测试任务目录磁盘配额与按最近访问淘汰
+
+测试思路：
+1. 写入任务文件后增量统计磁盘占用，删除任务时扣除
+2. 超出配额时淘汰最久未访问的已结束任务，处理中的任务和当前任务不被淘汰
+3. 配额为 0 时不淘汰任何任务
+4. 开启上传去重时，多个任务共享的 blob 只计算一次，淘汰任务回收 blob 后扣除其占用
+5. 淘汰任务时在线程中删除文件，删除期间不持有任务锁
+"""
+import asyncio
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from backend.app.schemas import TaskStatus, TaskType
+from backend.app.services.blob_store import BlobStore
+from backend.app.services.task_manager import TaskManager, config
+
+task_manager_module = sys.modules["backend.app.services.task_manager"]
+
+
+def _write(manager: TaskManager, task_info, size: int):
+    (task_info.task_dir / "upload.jpg").write_bytes(b"x" * size)
+    manager.refresh_disk_usage(task_info)
+
+
+def test_incremental_disk_usage(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    monkeypatch.setattr(task_manager_module, "blob_store", None)
+    manager = TaskManager()
+
+    async def run():
+        first, _ = await manager.create_task(TaskType.CLOTHING)
+        second, _ = await manager.create_task(TaskType.CLOTHING)
+        _write(manager, first, 1000)
+        _write(manager, second, 300)
+        assert manager.disk_usage == 1300
+        # 同一文件被覆盖时按新大小计算
+        _write(manager, first, 400)
+        assert manager.disk_usage == 700
+        await manager.delete_task(first.task_id)
+        assert manager.disk_usage == 300
+
+    asyncio.run(run())
+
+
+def test_quota_evicts_least_recently_accessed(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    monkeypatch.setattr(task_manager_module, "blob_store", None)
+    monkeypatch.setattr(config, "TASKS_DIR_MAX_BYTES", 2500)
+    manager = TaskManager()
+
+    async def run():
+        old, recent, running, current = [
+            (await manager.create_task(TaskType.ACCESSORY))[0] for _ in range(4)]
+        for task_info in (old, recent, running, current):
+            _write(manager, task_info, 1000)
+        old.set_result({})
+        recent.set_result({})
+        running.update_status(TaskStatus.PROCESSING)
+        current.set_result({})
+        # 访问后 old 比 recent 更新，应优先淘汰 recent
+        await manager.get_task(recent.task_id)
+        await manager.get_task(old.task_id)
+
+        evicted = await manager.enforce_disk_quota(exclude=current.task_id)
+
+        assert evicted == [recent.task_id, old.task_id]
+        assert not Path(recent.task_dir).exists()
+        assert manager.disk_usage == 2000
+        assert await manager.get_task(running.task_id) is running
+
+    asyncio.run(run())
+
+
+def test_quota_disabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    monkeypatch.setattr(task_manager_module, "blob_store", None)
+    monkeypatch.setattr(config, "TASKS_DIR_MAX_BYTES", 0)
+    manager = TaskManager()
+
+    async def run():
+        task_info, _ = await manager.create_task(TaskType.CLOTHING)
+        _write(manager, task_info, 5000)
+        task_info.set_result({})
+        assert await manager.enforce_disk_quota() == []
+
+    asyncio.run(run())
+
+
+def test_quota_counts_shared_blobs_once(tmp_path, monkeypatch):
+    store = BlobStore(tmp_path / "blobs")
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path / "tasks")
+    monkeypatch.setattr(config, "TASKS_DIR_MAX_BYTES", 2500)
+    monkeypatch.setattr(task_manager_module, "blob_store", store)
+    manager = TaskManager()
+
+    async def run():
+        old, recent, current = [
+            (await manager.create_task(TaskType.CLOTHING))[0] for _ in range(3)]
+        # 三个任务上传同一张图片，只占用一份 blob
+        for task_info in (old, recent, current):
+            await store.save(b"p" * 1000, ".jpg", task_info.task_dir, "person")
+            manager.refresh_disk_usage(task_info)
+            task_info.set_result({})
+        assert store.disk_usage == 1000
+        assert manager.disk_usage == 1000
+        assert await manager.enforce_disk_quota() == []
+
+        # old 独占的图片在淘汰时随 blob 一起回收
+        await store.save(b"c" * 2000, ".jpg", old.task_dir, "clothing")
+        manager.refresh_disk_usage(old)
+        assert manager.disk_usage == 3000
+        await manager.get_task(recent.task_id)
+
+        evicted = await manager.enforce_disk_quota(exclude=current.task_id)
+
+        assert evicted == [old.task_id]
+        assert store.disk_usage == 1000
+        assert manager.disk_usage == 1000
+
+    asyncio.run(run())
+
+
+def test_quota_removes_files_off_loop_without_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    monkeypatch.setattr(task_manager_module, "blob_store", None)
+    monkeypatch.setattr(config, "TASKS_DIR_MAX_BYTES", 500)
+    manager = TaskManager()
+    calls = []
+    rmtree = shutil.rmtree
+
+    def recording_rmtree(path, *args, **kwargs):
+        calls.append((threading.current_thread() is threading.main_thread(), manager._lock.locked()))
+        rmtree(path, *args, **kwargs)
+
+    monkeypatch.setattr(task_manager_module.shutil, "rmtree", recording_rmtree)
+
+    async def run():
+        task_info, _ = await manager.create_task(TaskType.CLOTHING)
+        _write(manager, task_info, 1000)
+        task_info.set_result({})
+
+        evicted = await manager.enforce_disk_quota()
+
+        assert evicted == [task_info.task_id]
+        assert not Path(task_info.task_dir).exists()
+        assert manager.disk_usage == 0
+
+    asyncio.run(run())
+    # 不在事件循环线程中删除，且删除时任务锁已释放
+    assert calls == [(False, False)]
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+测试本地 DashScope 模拟服务与客户端的对接
+
+测试思路：
+1. 在后台线程启动模拟服务，客户端通过 base_url 指向模拟服务
+2. 走完整的提交、轮询、下载流程，以及 VL 模型的流式/非流式对话
+3. 验证限流（429 + Retry-After）可以被客户端的容错保护层正确处理
+"""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.clients import WanModelClient, QwenVLClient
+from try_on_anything.generators import ClothingTryOnImageGenerator
+from try_on_anything.testing import (FakeDashScopeConfig, FakeDashScopeServer,
+                                     EndpointBehavior, LatencyProfile)
+
+
+def _api_key() -> str:
+    # 容错保护层按 API Key 共享，每个测试使用独立的 Key 避免相互影响
+    return f"sk-fake-{uuid.uuid4().hex}"
+
+
+def test_generation_round_trip(tmp_path):
+    """提交任务、轮询至成功并下载图像"""
+    config = FakeDashScopeConfig(generation_time=LatencyProfile(value=0.2))
+    with FakeDashScopeServer(config) as server:
+        wan_client = WanModelClient(api_key=_api_key(), base_url=server.base_url)
+        generator = ClothingTryOnImageGenerator(wan_client=wan_client,
+                                                download_root_path=str(tmp_path))
+        result = asyncio.run(generator.call_generate_model(
+            text="prompt", size="512*512", poll_interval=0.05))
+
+        assert result["output"]["task_status"] == "SUCCEEDED"
+        saved = list(tmp_path.glob("*.png"))
+        assert len(saved) == 1
+        assert server.fake.stats["tasks.submitted"] == 1
+        assert server.fake.stats["query.requests"] >= 2
+
+
+def test_chat_stream_and_non_stream():
+    """VL 模型对话支持流式与非流式，流式开启思考模式时返回思考内容"""
+    with FakeDashScopeServer() as server:
+        client = QwenVLClient(api_key=_api_key(),
+                              base_url=f"{server.base_url}/compatible-mode/v1")
+        messages = [{"role": "user", "content": "hi"}]
+
+        async def run():
+            response = await client.chat(messages=messages)
+            chunks = [chunk async for chunk in await client.chat(
+                messages=messages, stream=True, enable_thinking=True, thinking_budget=100)]
+            return response, chunks
+
+        response, chunks = asyncio.run(run())
+        assert "<clothing_type>上衣</clothing_type>" in response.content
+        content = "".join(c.content for c in chunks if c.type == "content")
+        reasoning = "".join(c.content for c in chunks if c.type == "reasoning")
+        assert content == response.content
+        assert reasoning
+
+
+def test_rate_limited_submit_is_retried():
+    """提交接口限流返回 429 时，客户端按 Retry-After 等待后重试成功"""
+    config = FakeDashScopeConfig(submit=EndpointBehavior(rate_limit=1))
+    with FakeDashScopeServer(config) as server:
+        wan_client = WanModelClient(api_key=_api_key(), base_url=server.base_url)
+
+        async def submit_many():
+            return await asyncio.gather(*[
+                wan_client.send_request(text="prompt") for _ in range(4)])
+
+        results = asyncio.run(submit_many())
+        assert all(r["output"]["task_status"] == "PENDING" for r in results)
+        assert server.fake.stats["tasks.submitted"] == 4
+        assert server.fake.stats["submit.rate_limited"] >= 1
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+测试图像生成任务的轮询容错与重新连接
+
+测试思路：
+1. 假的 Wan 客户端在前几次查询时抛出网络异常，验证轮询不会放弃已提交的任务
+2. 服务层重新提交时，如果远程任务仍在运行则重新连接，而不是重新生成
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.generators import ClothingTryOnImageGenerator
+from backend.app.services.clothing_try_on import ClothingTryOnService
+from backend.app.services.task_manager import TaskInfo
+from backend.app.schemas import TaskStatus, TaskType
+
+
+class FlakyWanClient:
+    """假的 Wan 客户端：前 poll_failures 次查询抛出网络异常，之后返回 final_status"""
+
+    def __init__(self, poll_failures: int = 0, final_status: str = "SUCCEEDED"):
+        self.poll_failures = poll_failures
+        self.final_status = final_status
+        self.submitted = 0
+        self.polls = 0
+
+    async def send_request(self, **kwargs):
+        self.submitted += 1
+        return {"output": {"task_id": "remote-1"}}
+
+    async def get_task_result(self, task_id, timeout=None, deadline=None):
+        self.polls += 1
+        if self.polls <= self.poll_failures:
+            raise httpx.ConnectError("connection reset")
+        return {
+            "output": {
+                "task_id": task_id,
+                "task_status": self.final_status,
+                "choices": [{"message": {"content": [{"image": "https://example.com/result.png"}]}}]
+            }
+        }
+
+
+def test_poll_errors_do_not_abandon_submitted_task():
+    """单次查询失败后继续轮询，并通过回调上报 DashScope 任务 ID"""
+    wan_client = FlakyWanClient(poll_failures=2)
+    generator = ClothingTryOnImageGenerator(wan_client=wan_client)
+    submitted_ids = []
+
+    async def on_submitted(task_id):
+        submitted_ids.append(task_id)
+
+    result = asyncio.run(generator.call_generate_model(
+        text="prompt", poll_interval=0, task_submitted_callback=on_submitted))
+
+    assert result["output"]["task_status"] == "SUCCEEDED"
+    assert submitted_ids == ["remote-1"]
+    assert wan_client.submitted == 1
+    assert wan_client.polls == 3
+
+
+def test_poll_gives_up_after_consecutive_failures():
+    """连续查询失败超过上限后抛出异常"""
+    wan_client = FlakyWanClient(poll_failures=100)
+    generator = ClothingTryOnImageGenerator(wan_client=wan_client)
+
+    try:
+        asyncio.run(generator.call_generate_model(text="prompt", poll_interval=0))
+        assert False, "应抛出 ConnectError"
+    except httpx.ConnectError:
+        pass
+
+
+class FakePipeline:
+    """假的 Pipeline，记录 run 是否被调用"""
+
+    def __init__(self, wan_client):
+        self.img_generator = ClothingTryOnImageGenerator(wan_client=wan_client)
+        self.run_called = False
+
+    async def run(self, **kwargs):
+        self.run_called = True
+        return {"output": {"task_status": "SUCCEEDED", "choices": []}}
+
+
+def _process(service, task_info, pipeline):
+    service._get_pipeline = lambda **kwargs: pipeline
+    asyncio.run(service.process_task(
+        task_info=task_info,
+        image_paths={"clothing_img_path": "c.png", "person_img_path": "p.png"},
+        task_params={"clothing_type": None, "person_position": None},
+    ))
+
+
+def test_resubmit_reattaches_to_running_remote_task(tmp_path):
+    """输入不变且远程任务仍在运行时，重新连接远程任务而不是重新执行Pipeline"""
+    service = ClothingTryOnService()
+    task_info = TaskInfo("task-1", tmp_path, TaskType.CLOTHING)
+    task_info.dashscope_task_id = "remote-1"
+    task_info.dashscope_task_signature = service._build_task_signature(
+        {"clothing_img_path": "c.png", "person_img_path": "p.png"},
+        {"clothing_type": None, "person_position": None},
+        True, "qwen3-vl-plus", "wan2.6-image")
+    task_info.dashscope_task_context = {"clothing_type": "上衣", "person_position": "上身"}
+
+    wan_client = FlakyWanClient()
+    pipeline = FakePipeline(wan_client)
+    _process(service, task_info, pipeline)
+
+    assert not pipeline.run_called
+    assert wan_client.submitted == 0
+    assert task_info.status == TaskStatus.COMPLETED
+    assert task_info.clothing_type == "上衣"
+
+
+def test_resubmit_regenerates_when_remote_task_failed(tmp_path):
+    """远程任务已失败时重新执行Pipeline"""
+    service = ClothingTryOnService()
+    task_info = TaskInfo("task-1", tmp_path, TaskType.CLOTHING)
+    task_info.dashscope_task_id = "remote-1"
+    task_info.dashscope_task_signature = service._build_task_signature(
+        {"clothing_img_path": "c.png", "person_img_path": "p.png"},
+        {"clothing_type": None, "person_position": None},
+        True, "qwen3-vl-plus", "wan2.6-image")
+
+    pipeline = FakePipeline(FlakyWanClient(final_status="FAILED"))
+    _process(service, task_info, pipeline)
+
+    assert pipeline.run_called
+    assert task_info.dashscope_task_id is None
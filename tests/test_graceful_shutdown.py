@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+测试客户端生命周期与服务关闭时的任务排空
+
+测试思路：
+1. WanModelClient / QwenVLClient 支持 async with，退出时关闭连接池
+2. 关闭服务时等待进行中的任务完成；超时未完成的任务被取消并标记为已取消，客户端归还到池中
+3. 客户端池关闭时关闭全部客户端
+"""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.clients import WanModelClient, QwenVLClient
+from try_on_anything.testing import FakeDashScopeServer
+from backend.app.schemas import TaskStatus, TaskType
+from backend.app.services.base import drain_tasks
+from backend.app.services.client_pool import ClientPool
+from backend.app.services.clothing_try_on import ClothingTryOnService
+from backend.app.services.task_manager import TaskInfo
+
+
+class SlowPipeline:
+    """假的 Pipeline：等待 delay 秒后返回成功结果"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.img_generator = None
+        self.vl_client = None
+
+    async def run(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        return {"output": {"task_status": "SUCCEEDED", "choices": []}, "downloaded_images": []}
+
+
+def _start(service, task_info, delay):
+    pipeline = SlowPipeline(delay)
+    service._get_pipeline = lambda **kwargs: pipeline
+    service._release_pipeline = lambda pipeline: None
+    service.start_task(task_info, clothing_image_path="c.png", person_image_path="p.png",
+                       use_vl_model=False)
+
+
+def test_clients_are_async_context_managers():
+    with FakeDashScopeServer() as server:
+        async def run():
+            async with WanModelClient(api_key=f"sk-{uuid.uuid4().hex}",
+                                      base_url=server.base_url) as wan_client:
+                await wan_client.send_request(text="prompt")
+                http_client = wan_client._http_client
+            assert http_client.is_closed
+
+            async with QwenVLClient(api_key=f"sk-{uuid.uuid4().hex}",
+                                    base_url=f"{server.base_url}/compatible-mode/v1") as vl_client:
+                await vl_client.chat(messages=[{"role": "user", "content": "hi"}])
+            assert vl_client.client.is_closed()
+
+        asyncio.run(run())
+
+
+def test_drain_waits_then_cancels(tmp_path):
+    service = ClothingTryOnService()
+    fast = TaskInfo("fast", tmp_path / "fast", TaskType.CLOTHING)
+    slow = TaskInfo("slow", tmp_path / "slow", TaskType.CLOTHING)
+
+    async def run():
+        _start(service, fast, 0.05)
+        assert await drain_tasks(timeout=5) == 0
+        assert fast.status == TaskStatus.COMPLETED
+
+        _start(service, slow, 30)
+        await asyncio.sleep(0.05)
+        assert slow.status == TaskStatus.PROCESSING
+        assert await drain_tasks(timeout=0.1) == 1
+        assert await drain_tasks(timeout=0.1) == 0
+
+    asyncio.run(run())
+    assert slow.status == TaskStatus.CANCELLED
+    assert "服务正在关闭" in slow.message
+
+
+def test_pool_aclose_closes_all_clients():
+    closed = []
+
+    class FakeClient:
+        def __init__(self, api_key=None):
+            self.api_key = api_key
+
+        async def aclose(self):
+            closed.append(self.api_key)
+
+    async def run():
+        pool = ClientPool(max_size=4)
+        pool.release(pool.acquire(FakeClient, "a"))
+        pool.acquire(FakeClient, "b")
+        await pool.aclose()
+        assert len(pool) == 0
+
+    asyncio.run(run())
+    assert sorted(closed) == ["a", "b"]
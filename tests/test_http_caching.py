@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+测试任务状态/结果的 HTTP 缓存验证与任务文件缓存策略
+
+测试思路：
+1. 状态和结果接口返回 ETag/Last-Modified，携带 If-None-Match 且状态未变化时返回 304，变化后返回 200
+2. 指定 wait 的状态请求在状态变化时立即返回新状态，超时后返回 304
+3. 写入后不会修改的任务文件返回 immutable 缓存头，细节图需要重新验证
+4. 使用远程存储时 ETag/Last-Modified 随预签名窗口变化，新窗口内旧的验证头不再命中 304
+"""
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+from pathlib import Path
+
+import httpx
+from fastapi.testclient import TestClient
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from backend.app.schemas import TaskStatus, TaskType
+from backend.app.services.task_manager import task_manager, config
+
+
+def test_status_and_result_conditional_requests(tmp_path, monkeypatch):
+    from backend.app.main import app
+
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    task_info, _ = asyncio.run(task_manager.create_task(TaskType.CLOTHING))
+    client = TestClient(app)
+    try:
+        for route in ("status", "result"):
+            url = f"/api/clothing-try-on/{route}/{task_info.task_id}"
+            first = client.get(url)
+            etag = first.headers["etag"]
+            assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+
+            cached = client.get(url, headers={"If-None-Match": etag})
+            assert cached.status_code == 304 and cached.headers["etag"] == etag and not cached.content
+            # Last-Modified 只精确到秒，同一秒内不能据此返回 304
+            since = first.headers["last-modified"]
+            assert client.get(url, headers={"If-Modified-Since": since}).status_code == 200
+
+        status_url = f"/api/clothing-try-on/status/{task_info.task_id}"
+        etag = client.get(status_url).headers["etag"]
+        task_info.update_status(TaskStatus.PROCESSING, "处理中", 10)
+        changed = client.get(status_url, headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+        assert changed.json()["progress"] == 10
+    finally:
+        asyncio.run(task_manager.delete_task(task_info.task_id))
+
+
+def test_status_wait_returns_on_change(tmp_path, monkeypatch):
+    from backend.app.main import app
+
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+
+    async def run():
+        task_info, _ = await task_manager.create_task(TaskType.CLOTHING)
+        url = f"/api/clothing-try-on/status/{task_info.task_id}"
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                etag = (await client.get(url)).headers["etag"]
+
+                start = time.perf_counter()
+                timed_out = await client.get(url, params={"wait": 0.2}, headers={"If-None-Match": etag})
+                assert timed_out.status_code == 304
+                assert time.perf_counter() - start >= 0.2
+
+                request = asyncio.create_task(
+                    client.get(url, params={"wait": 10}, headers={"If-None-Match": etag}))
+                await asyncio.sleep(0.05)
+                assert not request.done()
+                start = time.perf_counter()
+                task_info.update_status(TaskStatus.PROCESSING, "处理中", 30)
+                changed = await request
+                assert changed.status_code == 200 and changed.json()["progress"] == 30
+                assert time.perf_counter() - start < 1
+
+                # 等待期间任务被删除时立即返回 404
+                etag = changed.headers["etag"]
+                request = asyncio.create_task(
+                    client.get(url, params={"wait": 10}, headers={"If-None-Match": etag}))
+                await asyncio.sleep(0.05)
+                await task_manager.delete_task(task_info.task_id)
+                assert (await request).status_code == 404
+        finally:
+            await task_manager.delete_task(task_info.task_id)
+
+    asyncio.run(run())
+
+
+def test_task_files_cache_control(tmp_path):
+    from backend.app.api.utils import TaskFilesStaticFiles, IMMUTABLE_CACHE_CONTROL
+    from fastapi import FastAPI
+
+    task_dir = tmp_path / "task-1"
+    task_dir.mkdir()
+    (task_dir / f"person-{'a' * 64}.jpg").write_bytes(b"person")
+    (task_dir / f"accessory-{'b' * 64}_detail.jpg").write_bytes(b"detail")
+    app = FastAPI()
+    app.mount("/api/tasks", TaskFilesStaticFiles(directory=str(tmp_path)), name="tasks")
+    client = TestClient(app)
+
+    upload = client.get(f"/api/tasks/task-1/person-{'a' * 64}.jpg")
+    assert upload.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    not_modified = client.get(f"/api/tasks/task-1/person-{'a' * 64}.jpg",
+                              headers={"If-None-Match": upload.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+    detail = client.get(f"/api/tasks/task-1/accessory-{'b' * 64}_detail.jpg")
+    assert detail.headers["cache-control"] == "no-cache"
+
+
+def test_presigned_results_revalidate_per_window(tmp_path, monkeypatch):
+    from backend.app.api import utils
+
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    monkeypatch.setattr(config, "S3_PRESIGN_EXPIRES", 3600)
+    monkeypatch.setattr(utils, "storage", SimpleNamespace(remote=True))
+    task_info, _ = asyncio.run(task_manager.create_task(TaskType.CLOTHING))
+    try:
+        now = time.time()
+        monkeypatch.setattr(utils, "time", SimpleNamespace(time=lambda: now))
+        headers = utils.task_cache_headers(task_info)
+        request = SimpleNamespace(headers={"if-none-match": headers["ETag"]})
+        assert utils.is_not_modified(request, task_info)
+
+        # 进入下一个签名窗口（有效期的一半）后，客户端缓存的预签名 URL 需要重新获取
+        now += 1800
+        assert utils.task_cache_headers(task_info)["ETag"] != headers["ETag"]
+        assert not utils.is_not_modified(request, task_info)
+        request = SimpleNamespace(headers={"if-modified-since": headers["Last-Modified"]})
+        assert not utils.is_not_modified(request, task_info)
+    finally:
+        asyncio.run(task_manager.delete_task(task_info.task_id))
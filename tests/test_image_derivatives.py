@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+测试图片派生图（缩略图 / WebP / AVIF）
+
+测试思路：
+1. 派生图按宽度缩放、按 EXIF 方向旋转、不放大窄图，透明图转 JPEG 时铺白色背景
+2. 相同派生图的并发请求只生成一次，之后直接命中缓存文件
+3. 结果接口返回缩略图地址和 srcset，派生图接口返回长期缓存响应头，非法参数返回400
+4. 源文件被覆盖（重新提交细节图）后派生图地址和内容随之更新，旧地址返回需要重新验证的响应头
+5. 使用远程存储且本地没有源图片时，先从存储下载再生成派生图
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from backend.app.schemas import TaskType
+from backend.app.services.derivatives import (DerivativeService, DERIVATIVE_REQUESTS,
+                                              render_derivative)
+from backend.app.services.task_manager import task_manager, config
+
+
+def test_render_resizes_rotates_and_flattens(tmp_path):
+    source = tmp_path / "photo.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # 需要顺时针旋转 90 度
+    Image.new("RGB", (2000, 1000), (200, 30, 30)).save(source, exif=exif)
+
+    target = render_derivative(source, tmp_path / "out" / "photo.webp", 256, "webp")
+    with Image.open(target) as img:
+        assert img.format == "WEBP" and img.size == (256, 512)
+
+    small = tmp_path / "small.png"
+    Image.new("RGBA", (100, 50), (0, 0, 0, 0)).save(small)
+    target = render_derivative(small, tmp_path / "out" / "small.jpg", 512, "jpeg")
+    with Image.open(target) as img:
+        assert img.mode == "RGB" and img.size == (100, 50)
+        assert img.getpixel((10, 10)) == (255, 255, 255)
+    assert not [p for p in (tmp_path / "out").iterdir() if p.name.endswith(".tmp")]
+
+
+def test_concurrent_requests_render_once(tmp_path):
+    service = DerivativeService([128, 256], max_workers=2)
+    Image.new("RGB", (800, 600), (10, 120, 200)).save(tmp_path / "result.png")
+    misses = DERIVATIVE_REQUESTS.get(format="webp", result="miss")
+    hits = DERIVATIVE_REQUESTS.get(format="webp", result="hit")
+
+    async def run():
+        paths = await asyncio.gather(*[service.get(tmp_path, "result.png", 128, "webp")
+                                       for _ in range(5)])
+        cached = await service.get(tmp_path, "result.png", 128, "webp")
+        return paths, cached
+
+    try:
+        paths, cached = asyncio.run(run())
+    finally:
+        service.shutdown()
+
+    assert len(set(paths)) == 1 and cached == paths[0]
+    assert paths[0].parent.name == "derived"
+    assert DERIVATIVE_REQUESTS.get(format="webp", result="miss") == misses + 1
+    assert DERIVATIVE_REQUESTS.get(format="webp", result="hit") == hits + 1
+    assert service.validate(100, "webp") and service.validate(128, "gif")
+
+
+def test_result_and_derivative_endpoints(tmp_path, monkeypatch):
+    from backend.app.main import app
+
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    task_info, _ = asyncio.run(task_manager.create_task(TaskType.CLOTHING))
+    try:
+        Image.new("RGB", (1600, 1200), (90, 90, 90)).save(task_info.task_dir / "result-1.png")
+        Image.new("RGB", (1200, 1600), (20, 20, 20)).save(task_info.task_dir / "person-1.jpg")
+        task_info.person_image_path = str(task_info.task_dir / "person-1.jpg")
+        task_info.set_result({"downloaded_images": [str(task_info.task_dir / "result-1.png")]})
+
+        client = TestClient(app)
+        data = client.get(f"/api/clothing-try-on/result/{task_info.task_id}").json()
+        assert data["result_image_url"].endswith("/result-1.png")
+        assert f"/person-1.jpg?w={config.DERIVATIVE_THUMBNAIL_WIDTH}&format=webp&v=" \
+            in data["person_image_thumbnail_url"]
+        assert "256w" in data["result_image_srcset"]["webp"]
+
+        response = client.get(data["result_image_thumbnail_url"])
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert "immutable" in response.headers["cache-control"]
+        assert task_info.disk_bytes > 0
+
+        base = f"/api/derivatives/{task_info.task_id}"
+        assert client.get(f"{base}/result-1.png?w=300").status_code == 400
+        assert client.get(f"{base}/missing.png?w=256").status_code == 404
+        assert client.get(f"{base}/..%2Fother.png?w=256").status_code in (400, 404)
+    finally:
+        asyncio.run(task_manager.delete_task(task_info.task_id))
+
+
+def test_overwritten_source_gets_new_derivative(tmp_path, monkeypatch):
+    from backend.app.main import app
+
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    task_info, _ = asyncio.run(task_manager.create_task(TaskType.ACCESSORY))
+    try:
+        detail = task_info.task_dir / "accessory_detail.png"
+        Image.new("RGB", (800, 800), (255, 0, 0)).save(detail)
+        client = TestClient(app)
+        first_url = DerivativeService([256]).url(task_info.task_id, str(detail), 256, "webp")
+        first = client.get(first_url)
+        assert "immutable" in first.headers["cache-control"]
+
+        # 重新提交细节图：覆盖源文件后地址变化，旧地址不再返回长期缓存头
+        Image.new("RGB", (800, 600), (0, 0, 255)).save(detail)
+        stat = detail.stat()
+        os.utime(detail, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        second_url = DerivativeService([256]).url(task_info.task_id, str(detail), 256, "webp")
+        assert second_url != first_url
+        second = client.get(second_url)
+        assert "immutable" in second.headers["cache-control"]
+        assert second.content != first.content
+        stale = client.get(first_url)
+        assert stale.headers["cache-control"] == "no-cache"
+        assert stale.content == second.content
+    finally:
+        asyncio.run(task_manager.delete_task(task_info.task_id))
+
+
+def test_derivative_downloads_source_from_remote_storage(tmp_path, monkeypatch):
+    from backend.app.api import derivatives as derivatives_api
+    from backend.app.main import app
+
+    class RemoteStorage:
+        remote = True
+
+        def __init__(self):
+            self.downloaded = []
+
+        async def download_to(self, key, path):
+            self.downloaded.append(key)
+            if not key.endswith("/result-1.png"):
+                raise FileNotFoundError(key)
+            Image.new("RGB", (600, 400), (0, 200, 0)).save(path, format="PNG")
+            return path
+
+    remote = RemoteStorage()
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    monkeypatch.setattr(derivatives_api, "storage", remote)
+    task_info, _ = asyncio.run(task_manager.create_task(TaskType.CLOTHING))
+    try:
+        client = TestClient(app)
+        base = f"/api/derivatives/{task_info.task_id}"
+        response = client.get(f"{base}/result-1.png?w=256")
+        assert response.status_code == 200
+        assert remote.downloaded == [f"{task_info.task_id}/result-1.png"]
+        assert (task_info.task_dir / "result-1.png").is_file()
+        assert client.get(f"{base}/missing.png?w=256").status_code == 404
+        assert not (task_info.task_dir / "missing.png").exists()
+    finally:
+        asyncio.run(task_manager.delete_task(task_info.task_id))
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+测试后端冷启动导入耗时
+
+测试思路：
+1. 正确解析 -X importtime 输出中的模块名、自身耗时、累计耗时和嵌套层级
+2. 导入后端应用时不加载 openai（推迟到第一次创建 QwenVLClient 时）；耗时受机器负载影响，
+   预算只在基准脚本 benchmarks/import_time.py 中检查，测试不断言耗时
+3. 所有模块共享同一个配置实例
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from benchmarks.import_time import parse_importtime, run_benchmark
+
+
+def test_parse_importtime():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |     _io",
+        "import time:      2000 |       2500 |   backend.app.config",
+        "import time:       300 |       5000 | backend.app.main",
+        "unrelated line",
+    ])
+    assert parse_importtime(stderr) == [
+        ("_io", 120, 120, 2),
+        ("backend.app.config", 2000, 2500, 1),
+        ("backend.app.main", 300, 5000, 0),
+    ]
+
+
+def test_backend_import_defers_heavy_dependencies():
+    report = run_benchmark(repeat=1)
+
+    assert report["forbidden_imported"] == []
+    assert "openai" not in report["top_packages_ms"]
+
+
+def test_modules_share_one_config():
+    from backend.app.config import get_config
+    from backend.app.api import tasks as tasks_api
+    from backend.app.services.task_manager import config
+
+    assert tasks_api.config is get_config()
+    assert config is get_config()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+测试事件循环阻塞检测
+
+测试思路：
+1. 在事件循环中执行同步 time.sleep，验证监控记录到阻塞，且阻塞位置指向该调用
+2. 未阻塞时只记录延迟样本，不产生阻塞点
+3. 诊断接口在未开启监控时返回 404，开启后返回统计结果
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from backend.app.config import get_config
+from backend.app.services import loop_monitor as loop_monitor_module
+from backend.app.services.loop_monitor import LoopMonitor
+
+
+def _blocking_handler():
+    time.sleep(0.3)
+
+
+async def _run_with_monitor(monitor: LoopMonitor, block: bool):
+    monitor.start()
+    await asyncio.sleep(0.1)
+    if block:
+        _blocking_handler()
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+
+
+def test_blocking_call_is_attributed_to_caller():
+    monitor = LoopMonitor(threshold=0.1, sample_interval=0.01)
+    asyncio.run(_run_with_monitor(monitor, block=True))
+
+    stats = monitor.snapshot()
+    assert stats["blocked_events"] >= 1
+    assert stats["lag_ms"]["max"] >= 200
+    offender = stats["offenders"][0]
+    assert "test_loop_monitor.py" in offender["location"]
+    assert "_blocking_handler" in offender["location"]
+
+
+def test_idle_loop_has_no_offenders():
+    monitor = LoopMonitor(threshold=0.1, sample_interval=0.01)
+    asyncio.run(_run_with_monitor(monitor, block=False))
+
+    stats = monitor.snapshot()
+    assert stats["total_samples"] > 0
+    assert stats["blocked_events"] == 0
+    assert stats["offenders"] == []
+
+
+def test_diagnostics_endpoint(monkeypatch):
+    from backend.app.main import app
+
+    monkeypatch.setattr(get_config(), "ADMIN_TOKEN", "admin-secret")
+    client = TestClient(app, headers={"X-Admin-Token": "admin-secret"})
+    monkeypatch.setattr(loop_monitor_module, "loop_monitor", None)
+    assert client.get("/api/diagnostics/event-loop").status_code == 404
+
+    monitor = LoopMonitor()
+    monkeypatch.setattr(loop_monitor_module, "loop_monitor", monitor)
+    response = client.get("/api/diagnostics/event-loop")
+    assert response.status_code == 200
+    assert response.json()["offenders"] == []
+    assert client.post("/api/diagnostics/event-loop/reset").json() == {"success": True}
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+测试阶段耗时指标与 /metrics 接口
+
+测试思路：
+1. 使用假的 Wan 客户端执行一次生成，验证生成、轮询、排队阶段均有记录
+2. 远程任务失败时按模型名称记录错误数
+3. /metrics 接口输出 Prometheus 文本格式
+4. 未登记的模型名称（来自用户请求）在指标标签中统一记为 other
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.generators import ClothingTryOnImageGenerator
+from try_on_anything.observability.metrics import (MetricsRegistry, STAGE_DURATION,
+                                                   STAGE_ERRORS, STAGE_IN_FLIGHT,
+                                                   register_models)
+
+
+class FakeWanClient:
+    """假的 Wan 客户端：第一次查询返回 RUNNING，之后返回 final_status"""
+
+    def __init__(self, final_status: str = "SUCCEEDED"):
+        self.final_status = final_status
+        self.polls = 0
+
+    async def send_request(self, **kwargs):
+        return {"output": {"task_id": "remote-1"}}
+
+    async def get_task_result(self, task_id, timeout=None, deadline=None):
+        self.polls += 1
+        status = "RUNNING" if self.polls == 1 else self.final_status
+        return {"output": {"task_id": task_id, "task_status": status, "choices": []}}
+
+
+def test_generation_records_stage_metrics():
+    model = "metrics-test-ok"
+    register_models(model)
+    generator = ClothingTryOnImageGenerator(wan_client=FakeWanClient())
+
+    asyncio.run(generator.call_generate_model(text="prompt", model=model, poll_interval=0))
+
+    for stage in ("generation", "wan_polling", "wan_queue"):
+        assert STAGE_DURATION.get(stage=stage, model=model) == 1
+    assert STAGE_IN_FLIGHT.get(stage="generation", model=model) == 0
+
+
+def test_failed_generation_counts_errors_by_model():
+    model = "metrics-test-failed"
+    register_models(model)
+    generator = ClothingTryOnImageGenerator(wan_client=FakeWanClient(final_status="FAILED"))
+
+    try:
+        asyncio.run(generator.call_generate_model(text="prompt", model=model, poll_interval=0))
+        assert False, "应抛出 RuntimeError"
+    except RuntimeError:
+        pass
+
+    assert STAGE_ERRORS.get(stage="wan_polling", model=model, error_type="RuntimeError") == 1
+    assert STAGE_ERRORS.get(stage="generation", model=model, error_type="RuntimeError") == 1
+
+
+def test_unknown_model_label_is_other():
+    model = "metrics-test-unregistered"
+    before = STAGE_DURATION.get(stage="generation", model="other")
+    generator = ClothingTryOnImageGenerator(wan_client=FakeWanClient())
+
+    asyncio.run(generator.call_generate_model(text="prompt", model=model, poll_interval=0))
+
+    assert STAGE_DURATION.get(stage="generation", model=model) == 0
+    assert STAGE_DURATION.get(stage="generation", model="other") == before + 1
+
+
+def test_registry_render_format():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "演示", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.5, stage="a")
+    registry.gauge("demo_depth", "演示").set(3)
+
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 0' in text
+    assert 'demo_seconds_bucket{stage="a",le="1"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 1' in text
+    assert 'demo_seconds_count{stage="a"} 1' in text
+    assert 'demo_depth 3' in text
+
+
+def test_metrics_endpoint():
+    from backend.app.main import app
+
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "try_on_stage_duration_seconds" in response.text
+    assert 'try_on_tasks{task_type="clothing",status="pending"}' in response.text
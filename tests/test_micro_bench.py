@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+测试图像预处理微基准测试及其劣化检测
+
+测试思路：
+1. 以 quick 模式在小规模合成语料上运行全部被测函数
+2. 与自身结果对比不应报告劣化，人为放大耗时和内存后应报告劣化
+"""
+import copy
+import sys
+from pathlib import Path
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from benchmarks.micro_bench import run_benchmarks, compare_with_baseline
+
+
+def test_micro_bench_quick_mode_and_regression_check():
+    report = run_benchmarks(quick=True, repeat=1)
+
+    functions = {key.split("[")[0] for key in report["results"]}
+    assert functions == {
+        "WanModelClient._ensure_size_limits",
+        "WanModelClient._encode_img",
+        "encode_image_for_vl",
+        "AccessoryTryOnPipeline._crop_detail_image",
+        "validate_file_size",
+    }
+    assert all(r["median_ms"] >= 0 and r["peak_mem_bytes"] >= 0
+               for r in report["results"].values())
+    assert compare_with_baseline(report, report) == []
+
+    # 人为劣化一个用例：耗时和内存均翻倍
+    slower = copy.deepcopy(report)
+    key = next(k for k in slower["results"] if k.startswith("encode_image_for_vl"))
+    slower["results"][key]["median_ms"] = report["results"][key]["median_ms"] * 2 + 1
+    slower["results"][key]["peak_mem_bytes"] = report["results"][key]["peak_mem_bytes"] * 2 + 1
+    regressions = compare_with_baseline(slower, report, threshold=0.5)
+    assert len(regressions) == 2
+    assert all(line.startswith(key) for line in regressions)
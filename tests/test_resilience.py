@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+测试远程调用容错保护层（重试、熔断、限流）
+
+测试思路：
+1. 构造 httpx 异常模拟 DashScope 返回 429/5xx/400
+2. 使用很小的退避时间，避免测试真的等待
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.clients.resilience import (ResilienceGuard, CircuitBreaker,
+                                                CircuitOpenError,
+                                                TokenBucketRateLimiter,
+                                                classify_httpx_error,
+                                                parse_retry_after)
+
+
+def _status_error(status_code: int, headers: dict = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://dashscope.example/api/v1/tasks/1")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+class FlakyCall:
+    """前 failures 次调用抛出指定异常，之后返回 "ok" """
+
+    def __init__(self, error: Exception, failures: int):
+        self.error = error
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+
+def test_retry_honors_retry_after():
+    """429 按 Retry-After 等待后重试成功，且不计入熔断"""
+    guard = ResilienceGuard("test", rate_limit=100, base_delay=10, max_delay=10)
+    call = FlakyCall(_status_error(429, {"Retry-After": "0"}), failures=2)
+
+    result = asyncio.run(guard.call(call))
+
+    assert result == "ok"
+    assert call.calls == 3
+    assert guard.circuit_breaker.total_failures == 0
+
+
+def test_non_retryable_error_raises_immediately():
+    """400 参数错误不重试"""
+    guard = ResilienceGuard("test", rate_limit=100, base_delay=0)
+    call = FlakyCall(_status_error(400), failures=1)
+
+    try:
+        asyncio.run(guard.call(call))
+        assert False, "应抛出 HTTPStatusError"
+    except httpx.HTTPStatusError:
+        pass
+    assert call.calls == 1
+
+
+def test_submit_not_retried_on_ambiguous_errors():
+    """非幂等请求遇到 500 或读超时不重试，遇到 503 重试"""
+    assert classify_httpx_error(_status_error(500), idempotent=False)[0] is False
+    assert classify_httpx_error(httpx.ReadTimeout("timeout"), idempotent=False)[0] is False
+    assert classify_httpx_error(_status_error(503), idempotent=False)[0] is True
+    assert classify_httpx_error(httpx.ReadTimeout("timeout"))[0] is True
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """连续失败达到阈值后熔断，冷却后试探请求成功则恢复"""
+    guard = ResilienceGuard("test", rate_limit=100, max_retries=0)
+    guard.circuit_breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.05)
+
+    for _ in range(2):
+        try:
+            asyncio.run(guard.call(FlakyCall(_status_error(502), failures=1)))
+        except httpx.HTTPStatusError:
+            pass
+    assert guard.circuit_breaker.state == CircuitBreaker.OPEN
+
+    call = FlakyCall(_status_error(502), failures=0)
+    try:
+        asyncio.run(guard.call(call))
+        assert False, "熔断期间应直接失败"
+    except CircuitOpenError:
+        pass
+    assert call.calls == 0
+
+    time.sleep(0.06)
+    assert guard.circuit_breaker.state == CircuitBreaker.HALF_OPEN
+    assert asyncio.run(guard.call(call)) == "ok"
+    assert guard.circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_token_bucket_limits_rate():
+    """令牌耗尽后按速率等待"""
+    limiter = TokenBucketRateLimiter(rate=20, capacity=1)
+
+    async def acquire_three():
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(acquire_three())
+    assert elapsed >= 0.09
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+测试生成结果缓存功能
+
+测试思路：
+1. 使用假的 Wan 客户端代替远程 API，统计实际提交的任务数量
+2. 相同参数第二次调用应命中缓存，不再提交任务
+3. 缓存超过空间上限时按 LRU 淘汰
+4. 未指定随机数种子时生成结果不可复现，不查询也不写入缓存
+5. 后端提交任务时指定的随机数种子经服务层和 Pipeline 传递到图像生成，重复提交命中缓存
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from PIL import Image
+
+from try_on_anything.generators import (ClothingTryOnImageGenerator,
+                                        GenerationResultCache)
+from try_on_anything.pipelines import ClothingTryOnPipeline
+from backend.app.schemas import TaskStatus, TaskType
+from backend.app.services.clothing_try_on import ClothingTryOnService
+from backend.app.services.task_manager import TaskInfo
+
+
+class FakeWanClient:
+    """假的 Wan 客户端，任务提交后第一次查询即返回成功"""
+
+    def __init__(self):
+        self.submitted = 0
+
+    async def send_request(self, **kwargs):
+        self.submitted += 1
+        return {"output": {"task_id": f"task-{self.submitted}"}}
+
+    async def get_task_result(self, task_id, timeout=None, deadline=None):
+        return {
+            "output": {
+                "task_id": task_id,
+                "task_status": "SUCCEEDED",
+                "choices": [{
+                    "message": {
+                        "content": [{
+                            "image": f"https://example.com/{task_id}.png?sign=1"
+                        }]
+                    }
+                }]
+            }
+        }
+
+
+def _make_generator(tmp_path: Path, cache: GenerationResultCache):
+    wan_client = FakeWanClient()
+    generator = ClothingTryOnImageGenerator(wan_client=wan_client,
+                                            download_root_path=str(tmp_path / "task"),
+                                            result_cache=cache)
+
+    async def fake_download(image_url, deadline=None):
+        filename = Path(image_url.split("?")[0]).name
+        img_path = generator.download_root_path / filename
+        img_path.write_bytes(b"x" * 100)
+        return str(img_path)
+
+    generator._download_img = fake_download
+    return generator, wan_client
+
+
+def test_cache_hit_skips_remote_call(tmp_path):
+    """相同输入第二次调用命中缓存，图像被复制到下载目录"""
+    cache = GenerationResultCache(str(tmp_path / "cache"))
+    generator, wan_client = _make_generator(tmp_path, cache)
+    clothing = tmp_path / "clothing.png"
+    clothing.write_bytes(b"clothing")
+
+    first = asyncio.run(generator.call_generate_model(text="prompt", images=[str(clothing)], seed=7))
+    (generator.download_root_path / "task-1.png").unlink()
+    second = asyncio.run(generator.call_generate_model(text="prompt", images=[str(clothing)], seed=7))
+
+    assert wan_client.submitted == 1
+    assert "from_cache" not in first
+    assert second["from_cache"] is True
+    assert (generator.download_root_path / "task-1.png").exists()
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+    key = next(iter(cache._index))
+    entry = cache.get_entry_info(key)
+    assert entry["hit_count"] == 1
+    assert entry["time_saved_seconds"] == entry["api_time_seconds"]
+
+
+def test_cache_key_depends_on_image_content_and_params(tmp_path):
+    """输入图像内容或生成参数变化时不命中缓存"""
+    cache = GenerationResultCache(str(tmp_path / "cache"))
+    generator, wan_client = _make_generator(tmp_path, cache)
+    clothing = tmp_path / "clothing.png"
+    clothing.write_bytes(b"clothing-v1")
+
+    asyncio.run(generator.call_generate_model(text="prompt", images=[str(clothing)], seed=7))
+    clothing.write_bytes(b"clothing-v2")
+    asyncio.run(generator.call_generate_model(text="prompt", images=[str(clothing)], seed=7))
+    asyncio.run(generator.call_generate_model(text="prompt", images=[str(clothing)], seed=42))
+
+    assert wan_client.submitted == 3
+    assert cache.stats["hits"] == 0
+
+
+def test_cache_skipped_without_seed(tmp_path):
+    """未指定随机数种子时每次都提交任务，也不写入缓存"""
+    cache = GenerationResultCache(str(tmp_path / "cache"))
+    generator, wan_client = _make_generator(tmp_path, cache)
+
+    asyncio.run(generator.call_generate_model(text="prompt"))
+    asyncio.run(generator.call_generate_model(text="prompt"))
+
+    assert wan_client.submitted == 2
+    assert cache.stats["entries"] == 0
+    assert cache.stats["hits"] == 0 and cache.stats["misses"] == 0
+
+
+def test_backend_seed_reaches_cache(tmp_path):
+    """服务层启动任务时指定的种子传递到 call_generate_model，第二次提交直接复用缓存结果"""
+    cache = GenerationResultCache(str(tmp_path / "cache"))
+    generator, wan_client = _make_generator(tmp_path, cache)
+    pipeline = ClothingTryOnPipeline(img_generator=generator, vl_client=None, use_vl_model=False)
+    service = ClothingTryOnService()
+    service._get_pipeline = lambda **kwargs: pipeline
+    service._release_pipeline = lambda pipeline: None
+    clothing, person = tmp_path / "clothing.png", tmp_path / "person.png"
+    Image.new("RGB", (512, 512), (200, 0, 0)).save(clothing)
+    Image.new("RGB", (512, 768), (0, 0, 200)).save(person)
+
+    async def submit(task_id):
+        task_info = TaskInfo(task_id, tmp_path / task_id, TaskType.CLOTHING)
+        service.start_task(task_info, clothing_image_path=str(clothing),
+                           person_image_path=str(person), use_vl_model=False, seed=7)
+        await asyncio.wait({task_info.runner})
+        return task_info
+
+    first = asyncio.run(submit("seeded-1"))
+    second = asyncio.run(submit("seeded-2"))
+
+    assert first.status == TaskStatus.COMPLETED and second.status == TaskStatus.COMPLETED
+    assert wan_client.submitted == 1
+    assert cache.stats["hits"] == 1
+
+
+def test_cache_lru_eviction_and_reload(tmp_path):
+    """超出空间上限时淘汰最久未访问的条目，重新加载后索引保持一致"""
+    cache = GenerationResultCache(str(tmp_path / "cache"), max_size_bytes=250)
+    generator, wan_client = _make_generator(tmp_path, cache)
+
+    for prompt in ["a", "b", "a", "c"]:
+        asyncio.run(generator.call_generate_model(text=prompt, seed=7))
+
+    # a 最近被访问过，b 最久未访问，应被淘汰
+    assert wan_client.submitted == 3
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["entries"] == 2
+
+    reloaded = GenerationResultCache(str(tmp_path / "cache"), max_size_bytes=250)
+    assert reloaded.stats["entries"] == 2
+    assert reloaded.stats["size_bytes"] == 200
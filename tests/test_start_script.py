@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+测试生产模式启动脚本
+
+测试思路：
+1. 任务状态只保存在进程内存中时，拒绝启动多个工作进程
+2. 生产模式的 uvicorn 配置：已安装 uvloop/httptools 时使用，未安装时退回 asyncio/h11
+3. 开启 WARMUP_ON_STARTUP 时，应用启动阶段执行预热
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+_spec = importlib.util.spec_from_file_location("start_script", project_root / "scripts" / "start.py")
+start_script = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(start_script)
+
+
+def test_validate_workers_requires_shared_task_store(monkeypatch):
+    assert start_script.validate_workers(1, "memory") is None
+    assert "TASK_STORE=memory" in start_script.validate_workers(4, "memory")
+    assert start_script.validate_workers(0, "memory") is not None
+
+    monkeypatch.setattr(start_script, "SHARED_TASK_STORES", frozenset({"shared"}))
+    assert start_script.validate_workers(4, "shared") is None
+
+
+def test_build_server_config(monkeypatch):
+    monkeypatch.setattr(start_script, "_module_available", lambda name: True)
+    server_config = start_script.build_server_config("127.0.0.1", 9000, 2, 15)
+    assert (server_config.app, server_config.workers) == ("backend.app.main:app", 2)
+    assert (server_config.loop, server_config.http) == ("uvloop", "httptools")
+    assert server_config.timeout_graceful_shutdown == 15
+
+    monkeypatch.setattr(start_script, "_module_available", lambda name: False)
+    server_config = start_script.build_server_config("127.0.0.1", 9000, 1, 15)
+    assert (server_config.loop, server_config.http) == ("asyncio", "h11")
+
+
+def test_warmup_runs_on_startup(monkeypatch):
+    from backend.app import main
+
+    calls = []
+
+    async def fake_warm_up():
+        calls.append("warm_up")
+
+    monkeypatch.setattr(main, "warm_up", fake_warm_up)
+    monkeypatch.setattr(main.config, "WARMUP_ON_STARTUP", True)
+    with TestClient(main.app):
+        assert calls == ["warm_up"]
+
+    monkeypatch.setattr(main.config, "WARMUP_ON_STARTUP", False)
+    with TestClient(main.app):
+        assert calls == ["warm_up"]
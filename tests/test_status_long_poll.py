@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+测试状态接口按版本号长轮询（wait_for_change）
+
+测试思路：
+1. 版本号与当前一致时请求挂起，update_status/set_result/set_error 任一变化都会立即唤醒并返回新版本
+2. 版本号已过期时立即返回，超时后返回 200 且版本号不变
+3. 模拟一次完整处理过程，长轮询客户端的请求数只比状态变化次数多一次
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from backend.app.schemas import TaskStatus, TaskType
+from backend.app.services.task_manager import task_manager, config
+
+
+def _client():
+    from backend.app.main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_wait_for_change_wakes_on_every_kind_of_update(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    updates = [
+        lambda t: t.update_status(TaskStatus.PROCESSING, "处理中", 50),
+        lambda t: t.set_result({"downloaded_images": []}),
+        lambda t: t.set_error("boom"),
+    ]
+
+    async def run():
+        task_info, _ = await task_manager.create_task(TaskType.ACCESSORY)
+        url = f"/api/accessory-try-on/status/{task_info.task_id}"
+        try:
+            async with _client() as client:
+                version = (await client.get(url)).json()["version"]
+                for update in updates:
+                    request = asyncio.create_task(
+                        client.get(url, params={"wait_for_change": version, "timeout": 10}))
+                    await asyncio.sleep(0.05)
+                    assert not request.done()
+                    start = time.perf_counter()
+                    update(task_info)
+                    data = (await request).json()
+                    assert time.perf_counter() - start < 1
+                    assert data["version"] == version + 1
+                    version = data["version"]
+                assert data["status"] == "failed"
+        finally:
+            await task_manager.delete_task(task_info.task_id)
+
+    asyncio.run(run())
+
+
+def test_stale_version_and_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+
+    async def run():
+        task_info, _ = await task_manager.create_task(TaskType.CLOTHING)
+        task_info.update_status(TaskStatus.PROCESSING, "处理中", 10)
+        url = f"/api/clothing-try-on/status/{task_info.task_id}"
+        try:
+            async with _client() as client:
+                start = time.perf_counter()
+                stale = await client.get(url, params={"wait_for_change": 0, "timeout": 10})
+                assert time.perf_counter() - start < 1
+                assert stale.json()["version"] == task_info.version
+
+                start = time.perf_counter()
+                unchanged = await client.get(
+                    url, params={"wait_for_change": task_info.version, "timeout": 0.2})
+                assert unchanged.status_code == 200
+                assert unchanged.json()["version"] == task_info.version
+                assert time.perf_counter() - start >= 0.2
+        finally:
+            await task_manager.delete_task(task_info.task_id)
+
+    asyncio.run(run())
+
+
+def test_long_poll_request_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+
+    async def process(task_info):
+        for progress in (10, 40, 80):
+            await asyncio.sleep(0.1)
+            task_info.update_status(TaskStatus.PROCESSING, "处理中", progress)
+        await asyncio.sleep(0.1)
+        task_info.set_result({"downloaded_images": []})
+
+    async def run():
+        task_info, _ = await task_manager.create_task(TaskType.CLOTHING)
+        url = f"/api/clothing-try-on/status/{task_info.task_id}"
+        worker = asyncio.create_task(process(task_info))
+        requests, version, progress_seen = 0, None, []
+        try:
+            async with _client() as client:
+                while True:
+                    params = {} if version is None else {"wait_for_change": version, "timeout": 5}
+                    data = (await client.get(url, params=params)).json()
+                    requests += 1
+                    version = data["version"]
+                    progress_seen.append(data["progress"])
+                    if data["status"] == "completed":
+                        break
+            await worker
+        finally:
+            await task_manager.delete_task(task_info.task_id)
+        return requests, progress_seen
+
+    requests, progress_seen = asyncio.run(run())
+    # 4 次状态变化 + 首次查询，且没有错过任何一次进度
+    assert requests == 5
+    assert progress_seen == [0, 10, 40, 80, 100]
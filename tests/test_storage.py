@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+测试任务文件存储抽象与本地 S3 模拟服务
+
+测试思路：
+1. S3Storage 对模拟服务流式上传、读取、列举和按前缀批量删除对象，请求均通过 SigV4 校验并复用同一个 HTTP 客户端
+2. 预签名 URL 可直接访问，篡改或密钥错误时返回 403
+3. LocalStorage 以任务目录为根时不重复复制文件，访问地址为静态文件路径
+4. 后端切换到 s3 存储后，任务文件上传到对象存储，删除任务时删除远程对象
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.storage import LocalStorage, S3Storage
+from try_on_anything.testing import FakeS3Server
+from backend.app.schemas import TaskType
+from backend.app.services import storage as storage_module
+from backend.app.services.task_manager import TaskManager, config
+
+
+@pytest.fixture
+def fake_s3():
+    with FakeS3Server() as server:
+        yield server
+
+
+def test_s3_storage_roundtrip(fake_s3, tmp_path):
+    storage = S3Storage(fake_s3.base_url, "bucket", "test", "testsecret")
+    source = tmp_path / "result.png"
+    source.write_bytes(b"p" * 700_000)
+
+    async def run():
+        await storage.put_file("task-1/result.png", source)
+        await storage.put_bytes("task-1/meta.json", b"{}")
+        assert await storage.exists("task-1/result.png")
+        assert not await storage.exists("task-1/missing.png")
+        chunks = [chunk async for chunk in storage.iter_bytes("task-1/result.png", chunk_size=65536)]
+        assert b"".join(chunks) == source.read_bytes()
+        assert await storage.list_keys("task-1/") == ["task-1/meta.json", "task-1/result.png"]
+        downloaded = await storage.download_to("task-1/result.png", tmp_path / "copy.png")
+        assert downloaded.read_bytes() == source.read_bytes()
+        http_client = storage._http_client
+        assert await storage.delete_prefix("task-1/") == 2
+        with pytest.raises(FileNotFoundError):
+            await storage.get_bytes("task-1/result.png")
+        assert storage._http_client is http_client
+        await storage.aclose()
+        assert http_client.is_closed
+
+    asyncio.run(run())
+    assert fake_s3.objects == {}
+    stats = httpx.get(f"{fake_s3.base_url}/__fake__/stats").json()["requests"]
+    assert stats["delete_objects"] == 1 and "delete" not in stats
+
+
+def test_presigned_url_and_signature_checks(fake_s3):
+    storage = S3Storage(fake_s3.base_url, "bucket", "test", "testsecret")
+    asyncio.run(storage.put_bytes("task-2/a.txt", b"hello"))
+
+    url = storage.url("task-2/a.txt", expires=60)
+    assert httpx.get(url).content == b"hello"
+    assert httpx.get(url.replace("a.txt", "b.txt")).status_code == 403
+
+    wrong = S3Storage(fake_s3.base_url, "bucket", "test", "wrong-secret")
+    with pytest.raises(httpx.HTTPStatusError) as exc_info:
+        asyncio.run(wrong.put_bytes("task-2/b.txt", b"x"))
+    assert exc_info.value.response.status_code == 403
+
+
+def test_local_storage_rooted_at_tasks_dir(tmp_path):
+    storage = LocalStorage(tmp_path, url_prefix="/api/tasks")
+    task_file = tmp_path / "task-3" / "person.jpg"
+    task_file.parent.mkdir()
+    task_file.write_bytes(b"person")
+
+    asyncio.run(storage.put_file("task-3/person.jpg", task_file))
+
+    assert storage.url("task-3/person.jpg") == "/api/tasks/task-3/person.jpg"
+    assert asyncio.run(storage.get_bytes("task-3/person.jpg")) == b"person"
+    with pytest.raises(ValueError):
+        asyncio.run(storage.exists("../outside.jpg"))
+
+
+def test_backend_task_files_on_s3(fake_s3, tmp_path, monkeypatch):
+    s3 = S3Storage(fake_s3.base_url, "bucket", "test", "testsecret")
+    monkeypatch.setattr(storage_module, "storage", s3)
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    manager = TaskManager()
+
+    async def run():
+        task_info, _ = await manager.create_task(TaskType.CLOTHING)
+        result = task_info.task_dir / "result.png"
+        result.write_bytes(b"result")
+        await storage_module.save_task_files(task_info.task_id, [str(result), None])
+        assert fake_s3.objects[("bucket", f"{task_info.task_id}/result.png")][0] == b"result"
+        assert "X-Amz-Signature=" in storage_module.task_file_url(task_info.task_id, str(result))
+
+        await manager.delete_task(task_info.task_id)
+        await asyncio.gather(*storage_module._background_tasks)
+
+    asyncio.run(run())
+    assert fake_s3.objects == {}
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+测试任务取消
+
+测试思路：
+1. 等待图像生成期间被取消时，同时取消已提交的远程任务（模拟服务中的任务变为 CANCELED）
+2. 取消接口停止处理中的任务并返回已取消状态，已结束的任务返回409，不存在的任务返回404
+3. 删除处理中的任务时一并停止其处理协程
+4. 重新提交处理中的任务时先停止上一次处理，新旧两次处理不会同时进行
+"""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.clients import WanModelClient
+from try_on_anything.generators import ClothingTryOnImageGenerator
+from try_on_anything.testing import FakeDashScopeConfig, FakeDashScopeServer, LatencyProfile
+from backend.app.schemas import TaskStatus, TaskType
+from backend.app.services.clothing_try_on import ClothingTryOnService
+from backend.app.services.task_manager import task_manager, config
+
+
+class SlowPipeline:
+    """假的 Pipeline：一直等待，直到被取消"""
+
+    def __init__(self):
+        self.img_generator = None
+        self.vl_client = None
+
+    async def run(self, **kwargs):
+        await asyncio.sleep(30)
+
+
+def _start(service, task_info):
+    service._get_pipeline = lambda **kwargs: SlowPipeline()
+    service._release_pipeline = lambda pipeline: None
+    service.start_task(task_info, clothing_image_path="c.png", person_image_path="p.png",
+                       use_vl_model=False)
+
+
+def test_cancel_generation_cancels_remote_task():
+    fake_config = FakeDashScopeConfig(generation_time=LatencyProfile(value=30))
+    with FakeDashScopeServer(fake_config) as server:
+        async def run():
+            wan_client = WanModelClient(api_key=f"sk-{uuid.uuid4().hex}", base_url=server.base_url)
+            generator = ClothingTryOnImageGenerator(wan_client=wan_client)
+            submitted = asyncio.Event()
+            remote_ids = []
+
+            async def on_submitted(task_id):
+                remote_ids.append(task_id)
+                submitted.set()
+
+            generation = asyncio.create_task(generator.call_generate_model(
+                text="prompt", poll_interval=0.05, task_submitted_callback=on_submitted))
+            await submitted.wait()
+            generation.cancel()
+            try:
+                await generation
+                assert False, "应抛出 CancelledError"
+            except asyncio.CancelledError:
+                pass
+
+            remote = await wan_client.get_task_result(remote_ids[0])
+            assert remote["output"]["task_status"] == "CANCELED"
+            # 已取消的任务不能再次取消
+            try:
+                await wan_client.cancel_task(remote_ids[0])
+                assert False, "应抛出 HTTPStatusError"
+            except httpx.HTTPStatusError as e:
+                assert e.response.status_code == 400
+            await wan_client.aclose()
+
+        asyncio.run(run())
+        assert server.fake.stats["tasks.canceled"] == 1
+
+
+def test_cancel_endpoint_and_delete_stop_running_tasks(tmp_path, monkeypatch):
+    from backend.app.main import app
+
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    service = ClothingTryOnService()
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            task_info, _ = await task_manager.create_task(TaskType.CLOTHING)
+            _start(service, task_info)
+            await asyncio.sleep(0.05)
+            assert task_info.status == TaskStatus.PROCESSING
+
+            response = await client.post(f"/api/clothing-try-on/cancel/{task_info.task_id}")
+            assert response.status_code == 200
+            assert response.json()["status"] == "cancelled"
+            assert "用户取消" in response.json()["message"]
+            # 返回时处理协程已经退出
+            assert task_info.runner is None
+            assert task_info.timeline[-1][1:] == ("cancelled", "用户取消")
+
+            response = await client.post(f"/api/clothing-try-on/cancel/{task_info.task_id}")
+            assert response.status_code == 409
+            response = await client.post("/api/clothing-try-on/cancel/missing")
+            assert response.status_code == 404
+
+            # 删除处理中的任务时停止处理协程
+            deleted, _ = await task_manager.create_task(TaskType.CLOTHING)
+            _start(service, deleted)
+            await asyncio.sleep(0.05)
+            runner = deleted.runner
+            response = await client.delete(f"/api/clothing-try-on/task/{deleted.task_id}")
+            assert response.status_code == 200
+            await asyncio.wait({runner}, timeout=5)
+            assert runner.cancelled()
+            assert deleted.status == TaskStatus.CANCELLED
+
+            # 开始执行前就被取消的任务同样标记为已取消
+            pending, _ = await task_manager.create_task(TaskType.CLOTHING)
+            _start(service, pending)
+            runner = pending.runner
+            runner.cancel()
+            await asyncio.wait({runner})
+            await asyncio.sleep(0)
+            assert pending.status == TaskStatus.CANCELLED
+            await task_manager.delete_task(task_info.task_id)
+            await task_manager.delete_task(pending.task_id)
+
+    asyncio.run(run())
+
+
+def test_resubmit_stops_previous_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    service = ClothingTryOnService()
+
+    async def run():
+        task_info, _ = await task_manager.create_task(TaskType.CLOTHING)
+        _start(service, task_info)
+        await asyncio.sleep(0.05)
+        first = task_info.runner
+        assert task_info.status == TaskStatus.PROCESSING
+
+        reset = await task_manager.reset_task(task_info.task_id)
+
+        assert reset is task_info and first.cancelled()
+        assert task_info.status == TaskStatus.PENDING and task_info.runner is None
+        assert [event[1:] for event in task_info.timeline[-2:]] == [
+            ("cancelled", "任务已重新提交"), ("queued", "resubmit")]
+
+        # 重新启动后只有新的处理协程在运行，可以被取消
+        _start(service, task_info)
+        await asyncio.sleep(0.05)
+        second = task_info.runner
+        assert second is not first and task_info.status == TaskStatus.PROCESSING
+        assert task_info.cancel("用户取消")
+        await asyncio.wait({second})
+        assert second.cancelled()
+        await task_manager.delete_task(task_info.task_id)
+
+    asyncio.run(run())
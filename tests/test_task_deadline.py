@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+测试任务截止时间预算
+
+测试思路：
+1. Deadline 按剩余预算缩短各阶段超时时间，超过截止时间时抛出 DeadlineExceeded（TimeoutError 子类）
+2. 图像生成在预算耗尽时立即失败并取消远程任务，而不是等待 max_wait_time
+3. 服务层处理任务超过截止时间时标记为失败，不会因阶段超时叠加而超出预算
+"""
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.clients import WanModelClient
+from try_on_anything.common import Deadline, DeadlineExceeded, remaining_timeout
+from try_on_anything.generators import ClothingTryOnImageGenerator
+from try_on_anything.testing import FakeDashScopeConfig, FakeDashScopeServer, LatencyProfile
+from backend.app.schemas import TaskStatus, TaskType
+from backend.app.services.clothing_try_on import ClothingTryOnService
+from backend.app.services.task_manager import TaskInfo
+
+
+def test_deadline_budget():
+    assert remaining_timeout(None, 60) == 60
+    deadline = Deadline(10)
+    assert deadline.timeout(60) <= 10
+    assert deadline.timeout(1) == 1
+    assert 9 < remaining_timeout(deadline, None) <= 10
+
+    expired = Deadline(0)
+    assert expired.expired and expired.remaining() == 0
+    try:
+        expired.timeout(60)
+        assert False, "应抛出 DeadlineExceeded"
+    except TimeoutError as e:
+        assert isinstance(e, DeadlineExceeded)
+
+    async def run():
+        # 代码块超过截止时间时被取消，抛出 DeadlineExceeded
+        try:
+            async with Deadline(0.05).enforce():
+                await asyncio.sleep(5)
+            assert False, "应抛出 DeadlineExceeded"
+        except DeadlineExceeded:
+            pass
+        # 代码块自身的超时原样抛出
+        try:
+            async with Deadline(5).enforce():
+                raise TimeoutError("poll timeout")
+        except DeadlineExceeded:
+            assert False, "不应转换为 DeadlineExceeded"
+        except TimeoutError as e:
+            assert str(e) == "poll timeout"
+
+    asyncio.run(run())
+
+
+def test_generation_fails_fast_and_cancels_remote_task():
+    fake_config = FakeDashScopeConfig(generation_time=LatencyProfile(value=30))
+    with FakeDashScopeServer(fake_config) as server:
+        async def run():
+            wan_client = WanModelClient(api_key=f"sk-{uuid.uuid4().hex}", base_url=server.base_url)
+            generator = ClothingTryOnImageGenerator(wan_client=wan_client)
+            start = time.monotonic()
+            try:
+                await generator.call_generate_model(text="prompt", poll_interval=0.05,
+                                                    deadline=Deadline(0.5))
+                assert False, "应抛出 DeadlineExceeded"
+            except DeadlineExceeded:
+                pass
+            assert time.monotonic() - start < 3
+            await wan_client.aclose()
+
+        asyncio.run(run())
+        assert server.fake.stats["tasks.submitted"] == 1
+        assert server.fake.stats["tasks.canceled"] == 1
+
+
+def test_process_task_respects_deadline(tmp_path):
+    class SlowPipeline:
+        img_generator = None
+        vl_client = None
+
+        async def run(self, deadline=None, **kwargs):
+            assert deadline is not None
+            await asyncio.sleep(30)
+
+    service = ClothingTryOnService()
+    service._get_pipeline = lambda **kwargs: SlowPipeline()
+    service._release_pipeline = lambda pipeline: None
+    task_info = TaskInfo("deadline", tmp_path / "deadline", TaskType.CLOTHING)
+
+    start = time.monotonic()
+    asyncio.run(service.process_task(task_info, image_paths={}, task_params={},
+                                     use_vl_model=False, deadline=Deadline(0.1)))
+
+    assert time.monotonic() - start < 3
+    assert task_info.status == TaskStatus.FAILED
+    assert "截止时间" in task_info.error_message
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+测试任务二级索引与任务列表分页
+
+测试思路：
+1. 游标分页按创建时间顺序不重不漏地返回全部任务，筛选条件和创建时间范围可组合使用
+2. 状态变化和删除任务时索引同步更新，只扫描最短的索引列表，不遍历全部任务
+3. /api/diagnostics/tasks 按租户（API Key 哈希）筛选并返回下一页游标，无效游标返回400
+4. 未配置 ADMIN_TOKEN 时诊断接口全部关闭（404），令牌错误时返回403
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from backend.app.schemas import TaskStatus, TaskType
+from backend.app.services.task_index import TaskIndex, encode_cursor, decode_cursor
+from backend.app.services.task_manager import TaskInfo, task_manager, tenant_key_hash, config
+
+
+def _build_index(tmp_path, count):
+    tasks = {}
+    lookups = []
+
+    def get_task(task_id):
+        lookups.append(task_id)
+        return tasks.get(task_id)
+
+    index = TaskIndex(get_task)
+    base = datetime(2026, 1, 1)
+    for i in range(count):
+        task_type = TaskType.CLOTHING if i % 2 else TaskType.ACCESSORY
+        task_info = TaskInfo(f"task-{i:04d}", tmp_path, task_type, tenant="t1" if i % 100 == 0 else None)
+        task_info.created_at = base + timedelta(seconds=i)
+        tasks[task_info.task_id] = task_info
+        index.add(task_info)
+        task_info._status_listener = index.status_changed
+    return index, tasks, lookups
+
+
+def test_cursor_pagination_and_filters(tmp_path):
+    index, tasks, _ = _build_index(tmp_path, 250)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = index.query(cursor=cursor, limit=40)
+        seen.extend(page)
+        if cursor is None:
+            break
+        assert decode_cursor(encode_cursor(cursor)) == cursor
+    assert seen == sorted(tasks, reverse=True)
+
+    page, cursor = index.query(task_type=TaskType.CLOTHING, limit=3, newest_first=False)
+    assert page == ["task-0001", "task-0003", "task-0005"]
+    page, _ = index.query(task_type=TaskType.CLOTHING, limit=2, newest_first=False, cursor=cursor)
+    assert page == ["task-0007", "task-0009"]
+
+    start = datetime(2026, 1, 1).timestamp()
+    page, cursor = index.query(created_after=start + 10, created_before=start + 15, limit=10)
+    assert page == [f"task-{i:04d}" for i in range(14, 9, -1)] and cursor is None
+
+
+def test_index_follows_status_changes_and_deletes(tmp_path):
+    index, tasks, lookups = _build_index(tmp_path, 2000)
+    tasks["task-0300"].set_error("boom")
+    tasks["task-0301"].update_status(TaskStatus.PROCESSING)
+    assert index.count(TaskType.ACCESSORY, TaskStatus.FAILED) == 1
+    assert index.count(TaskType.ACCESSORY, TaskStatus.PENDING) == 999
+
+    lookups.clear()
+    page, _ = index.query(status=TaskStatus.FAILED, tenant="t1")
+    assert page == ["task-0300"]
+    # 扫描最短的索引列表（失败任务只有一个），不遍历全部任务
+    assert len(lookups) <= 1
+
+    page, _ = index.query(tenant="t1", status=TaskStatus.PENDING, limit=100)
+    assert len(page) == 19 and "task-0300" not in page
+
+    index.remove(tasks.pop("task-0300"))
+    assert index.query(status=TaskStatus.FAILED)[0] == []
+    assert index.count(TaskType.ACCESSORY, TaskStatus.FAILED) == 0
+    assert len(index) == 1999
+
+
+def test_list_tasks_endpoint(tmp_path, monkeypatch):
+    from backend.app.main import app
+
+    monkeypatch.setattr(config, "TASKS_DIR", tmp_path)
+    tenant = tenant_key_hash("sk-tenant")
+
+    async def create():
+        created = [await task_manager.create_task(TaskType.CLOTHING, tenant) for _ in range(3)]
+        other, _ = await task_manager.create_task(TaskType.CLOTHING)
+        return [t for t, _ in created] + [other]
+
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "admin-secret")
+    tasks = asyncio.run(create())
+    client = TestClient(app, headers={"X-Admin-Token": "admin-secret"})
+    try:
+        assert tenant == tenant_key_hash(" sk-tenant ") and len(tenant) == 16
+        first = client.get("/api/diagnostics/tasks", params={"tenant": tenant, "limit": 2}).json()
+        assert [t["task_id"] for t in first["tasks"]] == [tasks[2].task_id, tasks[1].task_id]
+        assert first["tasks"][0]["tenant"] == tenant
+        second = client.get("/api/diagnostics/tasks",
+                            params={"tenant": tenant, "limit": 2, "cursor": first["next_cursor"]}).json()
+        assert [t["task_id"] for t in second["tasks"]] == [tasks[0].task_id]
+        assert second["next_cursor"] is None
+
+        tasks[3].update_status(TaskStatus.PROCESSING)
+        processing = client.get("/api/diagnostics/tasks", params={"status": "processing"}).json()
+        assert tasks[3].task_id in [t["task_id"] for t in processing["tasks"]]
+
+        assert client.get("/api/diagnostics/tasks", params={"cursor": "!!"}).status_code == 400
+    finally:
+        async def cleanup():
+            for task_info in tasks:
+                await task_manager.delete_task(task_info.task_id)
+        asyncio.run(cleanup())
+
+
+def test_diagnostics_closed_without_admin_token(monkeypatch):
+    from backend.app.main import app
+
+    client = TestClient(app)
+    monkeypatch.setattr(config, "ADMIN_TOKEN", None)
+    for path in ("/api/diagnostics/tasks", "/api/diagnostics/timeline-stats",
+                 "/api/diagnostics/event-loop"):
+        assert client.get(path).status_code == 404
+        assert client.get(path, headers={"X-Admin-Token": ""}).status_code == 404
+
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "admin-secret")
+    assert client.get("/api/diagnostics/tasks").status_code == 403
+    assert client.get("/api/diagnostics/tasks",
+                      headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/api/diagnostics/tasks",
+                      headers={"X-Admin-Token": "admin-secret"}).status_code == 200
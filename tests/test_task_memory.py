@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+测试任务信息的内存占用
+
+测试思路：
+1. TaskInfo 使用 __slots__，实例没有 __dict__
+2. 设置结果后只保留本地结果图路径，不保存完整的 DashScope 响应
+3. 按真实流程填充的任务平均内存占用不超过基准测试的预算
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from benchmarks.task_memory import DEFAULT_BUDGET_BYTES, build_task, measure_tasks
+
+
+def test_task_info_is_slotted(tmp_path):
+    task_info = build_task(tmp_path)
+
+    assert not hasattr(task_info, "__dict__")
+    with pytest.raises(AttributeError):
+        task_info.unknown_field = 1
+
+
+def test_set_result_keeps_only_result_images(tmp_path):
+    task_info = build_task(tmp_path)
+
+    assert len(task_info.result_images) == 1
+    assert task_info.result_images[0].endswith(".png")
+    assert task_info.progress == 100
+
+
+def test_bytes_per_task_within_budget():
+    result = measure_tasks(2000)
+
+    assert result["bytes_per_task"] <= DEFAULT_BUDGET_BYTES
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+测试任务阶段时间线
+
+测试思路：
+1. 在阶段事件监听下执行一次生成，验证时间线记录了提交、每次轮询和生成结束事件
+2. 阶段耗时分解只统计最近一次提交，并给出排队等待和总耗时
+3. /timeline/{task_id} 接口返回事件列表和耗时分解
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.generators import ClothingTryOnImageGenerator
+from try_on_anything.observability.metrics import listen_stage_events
+from backend.app.schemas import TaskType
+from backend.app.services.task_manager import TaskInfo, task_manager, config
+
+
+class FakeWanClient:
+    """假的 Wan 客户端：前两次查询返回 PENDING/RUNNING，之后返回 SUCCEEDED"""
+
+    def __init__(self):
+        self.statuses = ["PENDING", "RUNNING", "SUCCEEDED"]
+
+    async def send_request(self, **kwargs):
+        return {"output": {"task_id": "remote-timeline"}}
+
+    async def get_task_result(self, task_id, timeout=None, deadline=None):
+        return {"output": {"task_id": task_id, "task_status": self.statuses.pop(0), "choices": []}}
+
+
+def test_generation_events_recorded_on_timeline(tmp_path):
+    task_info = TaskInfo("timeline-1", tmp_path, TaskType.CLOTHING)
+    generator = ClothingTryOnImageGenerator(wan_client=FakeWanClient())
+
+    async def run():
+        with listen_stage_events(task_info.add_event):
+            task_info.add_event("started")
+            await generator.call_generate_model(text="prompt", model="wan-timeline",
+                                                poll_interval=0)
+        task_info.set_result({})
+
+    asyncio.run(run())
+
+    events = [event for _, event, _ in task_info.timeline]
+    assert events[0] == "queued"
+    assert events[-1] == "completed"
+    assert "generation.start" in events and "generation.end" in events
+    polls = [detail for _, event, detail in task_info.timeline if event == "wan_polling.poll"]
+    assert polls == ["PENDING", "RUNNING", "SUCCEEDED"]
+    offsets = [t_ms for t_ms, _, _ in task_info.timeline]
+    assert offsets == sorted(offsets)
+
+    breakdown = task_info.stage_breakdown()
+    for stage in ("generation", "wan_polling", "queue_wait", "total"):
+        assert stage in breakdown
+
+
+def test_breakdown_uses_latest_submission(tmp_path):
+    task_info = TaskInfo("timeline-2", tmp_path, TaskType.ACCESSORY)
+    events = [
+        (5.0, "started", None),
+        (10.0, "vl_analysis.start", "qwen"), (40.0, "vl_analysis.error", "TimeoutError"),
+        (41.0, "failed", None),
+        (100.0, "queued", "resubmit"), (102.0, "started", None),
+        (110.0, "vl_analysis.start", "qwen"), (130.0, "vl_analysis.end", None),
+        (150.0, "completed", None),
+    ]
+    for t_ms, event, detail in events:
+        task_info._append_event(t_ms, event, detail)
+
+    assert task_info.stage_breakdown() == {"vl_analysis": 20.0, "queue_wait": 2.0, "total": 50.0}
+
+
+def test_timeline_endpoint(monkeypatch):
+    from backend.app.main import app
+
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "admin-secret")
+    task_info, _ = asyncio.run(task_manager.create_task(TaskType.CLOTHING))
+    try:
+        task_info.add_event("started")
+        task_info.set_error("boom")
+        response = TestClient(app).get(f"/api/clothing-try-on/timeline/{task_info.task_id}")
+        assert response.status_code == 200
+        data = response.json()
+        assert [e["event"] for e in data["events"]] == ["queued", "started", "failed"]
+        assert set(data["breakdown_ms"]) == {"queue_wait", "total"}
+
+        stats = TestClient(app, headers={"X-Admin-Token": "admin-secret"}).get(
+            "/api/diagnostics/timeline-stats?status=failed").json()
+        assert stats["task_count"] >= 1
+        assert stats["stages"]["total"]["count"] >= 1
+    finally:
+        asyncio.run(task_manager.delete_task(task_info.task_id))
+
+    assert TestClient(app).get("/api/clothing-try-on/timeline/missing").status_code == 404
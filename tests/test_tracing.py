@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+测试链路追踪
+
+测试思路：
+1. 未配置导出器时 start_span 返回空 span，不产生任何数据
+2. 在请求 span 下创建后台任务执行 process_task（DashScope 由本地模拟服务代替），
+   验证 API 请求、后台任务、VL 调用和每次 Wan 轮询属于同一条链路，且带有 task_id 和 DashScope 任务 ID
+3. OTLP 导出器可以将数据发送到模拟收集器
+"""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+# 添加项目根目录和 src 目录到 Python 路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from try_on_anything.observability.tracing import (InMemorySpanExporter, OTLPHttpSpanExporter,
+                                                   configure_tracing, start_span, NOOP_SPAN)
+from try_on_anything.testing import (FakeDashScopeConfig, FakeDashScopeServer,
+                                     FakeOTLPCollector, LatencyProfile)
+from backend.app.services.clothing_try_on import ClothingTryOnService
+from backend.app.services.task_manager import TaskInfo
+from backend.app.schemas import TaskStatus, TaskType
+
+
+def test_disabled_tracing_is_noop():
+    configure_tracing(None)
+    with start_span("anything", {"task_id": "t"}) as span:
+        assert span is NOOP_SPAN
+
+
+def test_trace_links_request_task_vl_and_polls(tmp_path, monkeypatch):
+    exporter = InMemorySpanExporter()
+    configure_tracing(exporter)
+    config = FakeDashScopeConfig(generation_time=LatencyProfile(value=0))
+    try:
+        with FakeDashScopeServer(config) as server:
+            monkeypatch.setenv("DASHSCOPE_BASE_URL", server.base_url)
+            api_key = f"sk-fake-{uuid.uuid4().hex}"
+            for name in ("clothing.png", "person.png"):
+                Image.new("RGB", (512, 512), (120, 100, 80)).save(tmp_path / name)
+            task_info = TaskInfo("task-trace", tmp_path, TaskType.CLOTHING)
+
+            async def handle_request():
+                # 模拟 API 请求：在请求 span 内创建后台任务
+                with start_span("HTTP POST /api/clothing-try-on/submit"):
+                    background = asyncio.create_task(ClothingTryOnService().process_task(
+                        task_info=task_info,
+                        image_paths={"clothing_img_path": str(tmp_path / "clothing.png"),
+                                     "person_img_path": str(tmp_path / "person.png")},
+                        task_params={"clothing_type": None, "person_position": None},
+                        vl_model_api_key=api_key,
+                        img_gen_model_api_key=api_key,
+                    ))
+                await background
+
+            asyncio.run(handle_request())
+    finally:
+        configure_tracing(None)
+
+    assert task_info.status == TaskStatus.COMPLETED
+    request_span = exporter.find("HTTP POST /api/clothing-try-on/submit")[0]
+    task_span = exporter.find("process_task")[0]
+    vl_span = exporter.find("vl_analysis")[0]
+    poll_spans = exporter.find("wan.poll")
+
+    assert {span.trace_id for span in exporter.spans} == {request_span.trace_id}
+    assert task_span.parent_id == request_span.span_id
+    assert task_span.attributes["task_id"] == "task-trace"
+    assert task_span.attributes["dashscope.task_id"] == task_info.dashscope_task_id
+    assert vl_span.attributes["model"] == "qwen3-vl-plus"
+    assert poll_spans and all(span.attributes["dashscope.task_id"] == task_info.dashscope_task_id
+                              for span in poll_spans)
+
+
+def test_http_middleware_creates_request_span():
+    from backend.app.main import app
+
+    exporter = InMemorySpanExporter()
+    configure_tracing(exporter)
+    try:
+        response = TestClient(app).get("/health")
+    finally:
+        configure_tracing(None)
+
+    assert response.status_code == 200
+    span = exporter.find("HTTP GET /health")[0]
+    assert span.attributes["http.status_code"] == 200
+
+
+def test_otlp_exporter_sends_to_collector():
+    with FakeOTLPCollector() as collector:
+        exporter = OTLPHttpSpanExporter(collector.endpoint, flush_interval=60)
+        configure_tracing(exporter)
+        try:
+            with start_span("parent", {"task_id": "t1"}):
+                with start_span("child", {"attempt": 2, "ratio": 0.5, "ok": True}):
+                    pass
+            assert exporter.force_flush()
+        finally:
+            configure_tracing(None)
+
+        spans = {span["name"]: span for span in collector.spans}
+        assert spans["child"]["parent_id"] == spans["parent"]["span_id"]
+        assert spans["parent"]["attributes"] == {"task_id": "t1"}
+        assert spans["child"]["attributes"] == {"attempt": 2, "ratio": 0.5, "ok": True}
+        assert spans["parent"]["resource"]["service.name"] == "try-on-anything"